@@ -25,39 +25,49 @@ def backfill_merchants():
     
     count = 0
     updated_expense_id = []
+    client = TestClient(app)
+
+    # Check hardcoded rules first
+    merchants = {}
     for exp in expenses:
         if not exp.description:
             continue
-            
-        print(f"Processing document [{exp.id}]: {exp.description}")
-        
-        # Override the auth dependency dynamically per user
-        app.dependency_overrides[auth_required] = lambda: exp.user_email
-        client = TestClient(app)
-        
-        # Check hardcoded rules first
         desc_lower = exp.description.lower().strip()
-        merchant = None
-        
         if "tnc" in desc_lower:
-            merchant = "TNC"
+            merchants[exp.id] = "TNC"
         elif "car insurance" == desc_lower:
-            merchant = "Tesla"
+            merchants[exp.id] = "Tesla"
         elif "ny gyro" in desc_lower:
-            merchant = "NewYork Gyro"
+            merchants[exp.id] = "NewYork Gyro"
+
+    # 1. Call the batch categorization api to generate the remaining merchant
+    # names — repeated descriptions are answered once, many per LLM call.
+    pending = [exp for exp in expenses if exp.description and exp.id not in merchants]
+    for start in range(0, len(pending), 500):
+        chunk = pending[start:start + 500]
+        app.dependency_overrides[auth_required] = lambda: chunk[0].user_email
+        cat_res = client.post(
+            "/api/v1/categorize/batch", json={"descriptions": [exp.description for exp in chunk]}
+        )
+        if cat_res.status_code != 200:
+            print(f" Failed categorization API: {cat_res.text}")
+            continue
+        for exp, result in zip(chunk, cat_res.json()["results"]):
+            if result.get("merchant_name"):
+                merchants[exp.id] = result["merchant_name"]
+
+    for exp in expenses:
+        if not exp.description:
+            continue
+
+        print(f"Processing document [{exp.id}]: {exp.description}")
+        merchant = merchants.get(exp.id)
+        if merchant:
+            print(f" -> Generated merchant: {merchant}")
+
+        # Override the auth dependency dynamically per user
+        app.dependency_overrides[auth_required] = lambda: exp.user_email
 
-            
-        if not merchant:
-            # 1. Call the categorization api to generate the merchant name
-            cat_res = client.post("/api/v1/expenses/categorize", json={"description": exp.description})
-            if cat_res.status_code != 200:
-                print(f" Failed categorization API: {cat_res.text}")
-                continue
-                
-            merchant = cat_res.json().get("merchant_name")
-            if merchant:
-                print(f" -> Generated merchant: {merchant}")
-                
         if merchant:
             
             # 2. Call the update expense api to save it
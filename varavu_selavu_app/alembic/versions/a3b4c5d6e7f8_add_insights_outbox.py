@@ -0,0 +1,44 @@
+"""add_insights_outbox
+
+Revision ID: a3b4c5d6e7f8
+Revises: f2a3b4c5d6e7
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3b4c5d6e7f8'
+down_revision: Union[str, None] = 'f2a3b4c5d6e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'insights_outbox',
+        sa.Column('seq', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('event_type', sa.String(length=40), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+        sa.UniqueConstraint('id'),
+        schema='trackspense',
+    )
+    op.create_index(
+        'idx_insights_outbox_due', 'insights_outbox', ['status', 'available_at'], unique=False, schema='trackspense',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_insights_outbox_due', table_name='insights_outbox', schema='trackspense')
+    op.drop_table('insights_outbox', schema='trackspense')
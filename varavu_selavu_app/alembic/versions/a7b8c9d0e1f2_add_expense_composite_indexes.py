@@ -0,0 +1,58 @@
+"""add_expense_composite_indexes
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, None] = 'f6a7b8c9d0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, amount column carried by the covering unique index)
+_LEDGERS = (('expense_payers', 'amount_paid'), ('expense_splits', 'amount_owed'))
+
+
+def upgrade() -> None:
+    # expenses and the split/payer tables are the hottest tables in the schema;
+    # build concurrently so writes aren't blocked for the length of the build.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_expenses_personal_user_purchased', 'expenses', ['user_email', 'purchased_at', 'id'], unique=False,
+            schema='trackspense', postgresql_where=sa.text('group_id IS NULL'), postgresql_concurrently=True,
+        )
+        op.create_index(
+            'idx_expenses_group_purchased', 'expenses', ['group_id', 'purchased_at', 'id'], unique=False,
+            schema='trackspense', postgresql_concurrently=True,
+        )
+        for table, amount in _LEDGERS:
+            op.create_index(
+                f'uq_{table}_expense_member_cover', table, ['expense_id', 'member_id'], unique=True,
+                schema='trackspense', postgresql_include=[amount], postgresql_concurrently=True,
+            )
+
+    # group_id is the leading column of idx_expenses_group_purchased.
+    op.drop_index(op.f('ix_trackspense_expenses_group_id'), table_name='expenses', schema='trackspense')
+    # Swap each (expense_id, member_id) unique constraint for the covering unique
+    # index built above, keeping the constraint's name. The new index already
+    # enforces uniqueness, so there is no unprotected window.
+    for table, _ in _LEDGERS:
+        op.drop_constraint(f'uq_{table}_expense_member', table, schema='trackspense', type_='unique')
+        op.execute(f'ALTER INDEX trackspense.uq_{table}_expense_member_cover RENAME TO uq_{table}_expense_member')
+
+
+def downgrade() -> None:
+    for table, _ in _LEDGERS:
+        op.drop_index(f'uq_{table}_expense_member', table_name=table, schema='trackspense')
+        op.create_unique_constraint(f'uq_{table}_expense_member', table, ['expense_id', 'member_id'], schema='trackspense')
+    op.create_index(op.f('ix_trackspense_expenses_group_id'), 'expenses', ['group_id'], unique=False, schema='trackspense')
+    op.drop_index('idx_expenses_group_purchased', table_name='expenses', schema='trackspense')
+    op.drop_index('idx_expenses_personal_user_purchased', table_name='expenses', schema='trackspense')
@@ -0,0 +1,62 @@
+"""add_notification_outbox
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c9d0e1f2a3'
+down_revision: Union[str, None] = 'a7b8c9d0e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('group_id', sa.UUID(), nullable=False),
+        sa.Column('actor_email', sa.String(length=255), nullable=False),
+        sa.Column('event_type', sa.String(length=40), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['trackspense.groups.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        schema='trackspense',
+    )
+    op.create_index(
+        'idx_notification_outbox_due', 'notification_outbox', ['status', 'available_at'], unique=False,
+        schema='trackspense',
+    )
+    op.create_table(
+        'push_tickets',
+        sa.Column('ticket_id', sa.String(length=64), nullable=False),
+        sa.Column('user_email', sa.String(length=255), nullable=False),
+        sa.Column('expo_push_token', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_email'], ['trackspense.users.email'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ticket_id'),
+        schema='trackspense',
+    )
+    op.create_index(
+        op.f('ix_trackspense_push_tickets_created_at'), 'push_tickets', ['created_at'], unique=False,
+        schema='trackspense',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_trackspense_push_tickets_created_at'), table_name='push_tickets', schema='trackspense')
+    op.drop_table('push_tickets', schema='trackspense')
+    op.drop_index('idx_notification_outbox_due', table_name='notification_outbox', schema='trackspense')
+    op.drop_table('notification_outbox', schema='trackspense')
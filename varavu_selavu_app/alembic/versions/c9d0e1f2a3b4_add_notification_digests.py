@@ -0,0 +1,50 @@
+"""add_notification_digests
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d0e1f2a3b4'
+down_revision: Union[str, None] = 'b8c9d0e1f2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'group_notification_preferences', sa.Column('digest_minutes', sa.Integer(), nullable=True),
+        schema='trackspense',
+    )
+    op.create_table(
+        'notification_digests',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('user_email', sa.String(length=255), nullable=False),
+        sa.Column('group_id', sa.UUID(), nullable=False),
+        sa.Column('mode', sa.String(length=10), nullable=False),
+        sa.Column('items', sa.JSON(), nullable=False),
+        sa.Column('item_count', sa.Integer(), nullable=False),
+        sa.Column('window_ends_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_email'], ['trackspense.users.email'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['group_id'], ['trackspense.groups.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_email', 'group_id', name='uq_notification_digests_user_group'),
+        schema='trackspense',
+    )
+    op.create_index(
+        'idx_notification_digests_due', 'notification_digests', ['window_ends_at'], unique=False,
+        schema='trackspense',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_notification_digests_due', table_name='notification_digests', schema='trackspense')
+    op.drop_table('notification_digests', schema='trackspense')
+    op.drop_column('group_notification_preferences', 'digest_minutes', schema='trackspense')
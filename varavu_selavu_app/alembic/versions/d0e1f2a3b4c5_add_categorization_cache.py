@@ -0,0 +1,35 @@
+"""add_categorization_cache
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0e1f2a3b4c5'
+down_revision: Union[str, None] = 'c9d0e1f2a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'categorization_cache',
+        sa.Column('description_key', sa.String(length=255), nullable=False),
+        sa.Column('main_category', sa.String(length=100), nullable=False),
+        sa.Column('subcategory', sa.String(length=100), nullable=False),
+        sa.Column('merchant_name', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('description_key'),
+        schema='trackspense',
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('categorization_cache', schema='trackspense')
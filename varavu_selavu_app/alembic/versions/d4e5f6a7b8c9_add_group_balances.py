@@ -0,0 +1,44 @@
+"""add_group_balances
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e5f6a7b8c9'
+down_revision: Union[str, None] = 'c3d4e5f6a7b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Created empty on purpose: BalanceService treats a group with no rows as
+    # never-materialized and reads its raw ledger instead, and seeds it on that
+    # group's next balance-affecting write. Run scripts/reconcile_group_balances.py
+    # --fix after deploying to materialize every existing group up front.
+    op.create_table(
+        'group_balances',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('group_id', sa.UUID(), nullable=False),
+        sa.Column('member_id', sa.UUID(), nullable=False),
+        sa.Column('net', sa.Numeric(precision=20, scale=8), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['trackspense.groups.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['member_id'], ['trackspense.group_members.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('group_id', 'member_id', name='uq_group_balances_group_member'),
+        schema='trackspense',
+    )
+    op.create_index(op.f('ix_trackspense_group_balances_group_id'), 'group_balances', ['group_id'], unique=False, schema='trackspense')
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_trackspense_group_balances_group_id'), table_name='group_balances', schema='trackspense')
+    op.drop_table('group_balances', schema='trackspense')
@@ -0,0 +1,51 @@
+"""add_receipt_parse_jobs
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f2a3b4c5d6'
+down_revision: Union[str, None] = 'd0e1f2a3b4c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'receipt_parse_jobs',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('user_email', sa.String(length=255), nullable=False),
+        sa.Column('content_sha256', sa.String(length=64), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=False),
+        sa.Column('engine', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_email'], ['trackspense.users.email'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        schema='trackspense',
+    )
+    op.create_index(
+        op.f('ix_trackspense_receipt_parse_jobs_user_email'), 'receipt_parse_jobs', ['user_email'], unique=False,
+        schema='trackspense',
+    )
+    op.create_index(
+        'idx_receipt_parse_jobs_sha_engine', 'receipt_parse_jobs', ['content_sha256', 'engine'], unique=False,
+        schema='trackspense',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_receipt_parse_jobs_sha_engine', table_name='receipt_parse_jobs', schema='trackspense')
+    op.drop_index(op.f('ix_trackspense_receipt_parse_jobs_user_email'), table_name='receipt_parse_jobs', schema='trackspense')
+    op.drop_table('receipt_parse_jobs', schema='trackspense')
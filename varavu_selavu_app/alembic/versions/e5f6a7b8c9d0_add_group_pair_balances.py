@@ -0,0 +1,50 @@
+"""add_group_pair_balances
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f6a7b8c9d0'
+down_revision: Union[str, None] = 'd4e5f6a7b8c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'group_pair_balances',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('group_id', sa.UUID(), nullable=False),
+        sa.Column('member_a_id', sa.UUID(), nullable=False),
+        sa.Column('member_b_id', sa.UUID(), nullable=False),
+        sa.Column('net', sa.Numeric(precision=20, scale=8), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['trackspense.groups.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['member_a_id'], ['trackspense.group_members.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['member_b_id'], ['trackspense.group_members.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('group_id', 'member_a_id', 'member_b_id', name='uq_group_pair_balances_group_pair'),
+        schema='trackspense',
+    )
+    op.create_index(op.f('ix_trackspense_group_pair_balances_group_id'), 'group_pair_balances', ['group_id'], unique=False, schema='trackspense')
+    op.create_index(op.f('ix_trackspense_group_pair_balances_member_a_id'), 'group_pair_balances', ['member_a_id'], unique=False, schema='trackspense')
+    op.create_index(op.f('ix_trackspense_group_pair_balances_member_b_id'), 'group_pair_balances', ['member_b_id'], unique=False, schema='trackspense')
+    # group_balances rows mark a group as materialized for both tables. Drop any
+    # seeded before pair rows existed so each group re-seeds both together on its
+    # next write (or via scripts/reconcile_group_balances.py --fix).
+    op.execute("DELETE FROM trackspense.group_balances")
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_trackspense_group_pair_balances_member_b_id'), table_name='group_pair_balances', schema='trackspense')
+    op.drop_index(op.f('ix_trackspense_group_pair_balances_member_a_id'), table_name='group_pair_balances', schema='trackspense')
+    op.drop_index(op.f('ix_trackspense_group_pair_balances_group_id'), table_name='group_pair_balances', schema='trackspense')
+    op.drop_table('group_pair_balances', schema='trackspense')
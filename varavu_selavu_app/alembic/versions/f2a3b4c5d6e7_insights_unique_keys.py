@@ -0,0 +1,132 @@
+"""insights_unique_keys
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a3b4c5d6e7'
+down_revision: Union[str, None] = 'e1f2a3b4c5d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # InsightsAggregationService now upserts on these keys. The old
+    # read-then-write path could race into duplicate rows, so fold each
+    # duplicate into the oldest row of its key first, moving its price
+    # history and monthly aggregates along with it.
+    op.execute("""
+        CREATE TEMP TABLE insight_dupes ON COMMIT DROP AS
+        SELECT id, keeper FROM (
+            SELECT id, first_value(id) OVER (
+                PARTITION BY user_email, normalized_name ORDER BY created_at NULLS LAST, id
+            ) AS keeper
+            FROM trackspense.item_insights
+        ) ranked WHERE id <> keeper
+    """)
+    op.execute("""
+        UPDATE trackspense.item_insights k SET
+            total_spent = m.total_spent,
+            total_quantity_bought = m.quantity,
+            avg_unit_price = CASE WHEN m.quantity <> 0 THEN m.total_spent / m.quantity ELSE 0 END,
+            min_price = COALESCE(m.min_price, k.min_price),
+            max_price = m.max_price,
+            canonical_item_id = COALESCE(k.canonical_item_id, m.canonical_item_id)
+        FROM (
+            SELECT g.keeper,
+                   sum(COALESCE(i.total_spent, 0)) AS total_spent,
+                   sum(COALESCE(i.total_quantity_bought, 0)) AS quantity,
+                   min(NULLIF(i.min_price, 0)) AS min_price,
+                   max(i.max_price) AS max_price,
+                   (array_agg(i.canonical_item_id) FILTER (WHERE i.canonical_item_id IS NOT NULL))[1] AS canonical_item_id
+            FROM (SELECT id, keeper FROM insight_dupes UNION SELECT keeper, keeper FROM insight_dupes) g
+            JOIN trackspense.item_insights i ON i.id = g.id
+            GROUP BY g.keeper
+        ) m
+        WHERE k.id = m.keeper
+    """)
+    op.execute("""
+        UPDATE trackspense.item_price_history h SET item_insight_id = d.keeper
+        FROM insight_dupes d WHERE h.item_insight_id = d.id
+    """)
+    op.execute("DELETE FROM trackspense.item_insights i USING insight_dupes d WHERE i.id = d.id")
+
+    op.execute("""
+        CREATE TEMP TABLE merchant_dupes ON COMMIT DROP AS
+        SELECT id, keeper FROM (
+            SELECT id, first_value(id) OVER (
+                PARTITION BY user_email, merchant_name ORDER BY created_at NULLS LAST, id
+            ) AS keeper
+            FROM trackspense.merchant_insights
+        ) ranked WHERE id <> keeper
+    """)
+    op.execute("""
+        UPDATE trackspense.merchant_insights k SET
+            total_spent = m.total_spent,
+            transaction_count = m.transaction_count,
+            canonical_merchant_id = COALESCE(k.canonical_merchant_id, m.canonical_merchant_id)
+        FROM (
+            SELECT g.keeper,
+                   sum(COALESCE(i.total_spent, 0)) AS total_spent,
+                   sum(COALESCE(i.transaction_count, 0)) AS transaction_count,
+                   (array_agg(i.canonical_merchant_id) FILTER (WHERE i.canonical_merchant_id IS NOT NULL))[1] AS canonical_merchant_id
+            FROM (SELECT id, keeper FROM merchant_dupes UNION SELECT keeper, keeper FROM merchant_dupes) g
+            JOIN trackspense.merchant_insights i ON i.id = g.id
+            GROUP BY g.keeper
+        ) m
+        WHERE k.id = m.keeper
+    """)
+    op.execute("""
+        UPDATE trackspense.merchant_aggregates a SET merchant_insight_id = d.keeper
+        FROM merchant_dupes d WHERE a.merchant_insight_id = d.id
+    """)
+    op.execute("DELETE FROM trackspense.merchant_insights i USING merchant_dupes d WHERE i.id = d.id")
+
+    op.execute("""
+        CREATE TEMP TABLE aggregate_dupes ON COMMIT DROP AS
+        SELECT id, keeper FROM (
+            SELECT id, first_value(id) OVER (
+                PARTITION BY merchant_insight_id, year, month ORDER BY created_at NULLS LAST, id
+            ) AS keeper
+            FROM trackspense.merchant_aggregates
+        ) ranked WHERE id <> keeper
+    """)
+    op.execute("""
+        UPDATE trackspense.merchant_aggregates k SET
+            total_spent = m.total_spent,
+            transaction_count = m.transaction_count
+        FROM (
+            SELECT g.keeper,
+                   sum(COALESCE(a.total_spent, 0)) AS total_spent,
+                   sum(COALESCE(a.transaction_count, 0)) AS transaction_count
+            FROM (SELECT id, keeper FROM aggregate_dupes UNION SELECT keeper, keeper FROM aggregate_dupes) g
+            JOIN trackspense.merchant_aggregates a ON a.id = g.id
+            GROUP BY g.keeper
+        ) m
+        WHERE k.id = m.keeper
+    """)
+    op.execute("DELETE FROM trackspense.merchant_aggregates a USING aggregate_dupes d WHERE a.id = d.id")
+
+    op.create_unique_constraint(
+        'uq_item_insights_user_name', 'item_insights', ['user_email', 'normalized_name'], schema='trackspense',
+    )
+    op.create_unique_constraint(
+        'uq_merchant_insights_user_name', 'merchant_insights', ['user_email', 'merchant_name'], schema='trackspense',
+    )
+    op.create_unique_constraint(
+        'uq_merchant_aggregates_month', 'merchant_aggregates', ['merchant_insight_id', 'year', 'month'], schema='trackspense',
+    )
+
+
+def downgrade() -> None:
+    # Merged duplicates are not split back apart.
+    op.drop_constraint('uq_merchant_aggregates_month', 'merchant_aggregates', schema='trackspense', type_='unique')
+    op.drop_constraint('uq_merchant_insights_user_name', 'merchant_insights', schema='trackspense', type_='unique')
+    op.drop_constraint('uq_item_insights_user_name', 'item_insights', schema='trackspense', type_='unique')
@@ -0,0 +1,50 @@
+"""add_monthly_spend_rollups
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a7b8c9d0e1'
+down_revision: Union[str, None] = 'e5f6a7b8c9d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'monthly_spend_rollups',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('user_email', sa.String(length=255), nullable=False),
+        sa.Column('scope', sa.String(length=20), nullable=False),
+        sa.Column('year_month', sa.String(length=7), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('total', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('expense_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_email', 'scope', 'year_month', 'category', name='uq_monthly_spend_rollups_key'),
+        schema='trackspense',
+    )
+    op.create_table(
+        'spend_rollup_state',
+        sa.Column('user_email', sa.String(length=255), nullable=False),
+        sa.Column('built_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('user_email'),
+        schema='trackspense',
+    )
+    # No rows are seeded here: each user's rollup is built on their next expense
+    # write, or ahead of time with scripts/backfill_spend_rollups.py. Until then
+    # analytics keep reading that user's raw rows.
+
+
+def downgrade() -> None:
+    op.drop_table('spend_rollup_state', schema='trackspense')
+    op.drop_table('monthly_spend_rollups', schema='trackspense')
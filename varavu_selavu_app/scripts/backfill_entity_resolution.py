@@ -4,27 +4,44 @@ scripts/backfill_entity_resolution.py
 TS-ENT-1xx: one-off backfill for ItemInsight/MerchantInsight rows written
 before the dual-write change shipped (their canonical_item_id /
 canonical_merchant_id is still NULL). Runs each row's raw key through the
-exact same EntityResolutionService.resolve() cascade normal writes use, so
-it produces the same classification a fresh write would — deliberately not
-a separate/looser clustering heuristic, per the spec's guidance to err
-toward under-merging rather than over-merging distinct entities (§17.2).
-Aliases it writes are tagged source='backfill' so they stay distinguishable
-from a genuine seed/user/LLM source later.
-
-There is no safe dry-run mode: resolve()'s cascade (tiers 3 and 5) commits
-internally the moment it creates a new canonical entity or alias, so any
-attempt to roll back at the end of this script would not undo those
-creations — they're already durable by then. Test against a snapshot or
-staging database first, not a --dry-run flag.
+exact same cascade normal writes use (EntityResolutionService.resolve_many,
+the batch form of resolve()), so it produces the same classification a fresh
+write would — deliberately not a separate/looser clustering heuristic, per
+the spec's guidance to err toward under-merging rather than over-merging
+distinct entities (§17.2). Aliases it writes are tagged source='backfill' so
+they stay distinguishable from a genuine seed/user/LLM source later.
+
+Work is split by user: --workers users are resolved at once, each on its own
+session, --batch-size names per resolve_many() call and per commit. Users
+never share a canonical entity the cascade creates (tier 5 is user-scoped),
+so they cannot race each other. With --checkpoint, every user finished
+without errors is recorded in that JSON file and skipped by the next run;
+an interrupted user simply resumes, since rows already linked are excluded
+by the query. Rows left ambiguous ("suggested") stay NULL either way.
+
+There is no safe dry-run mode: resolve_many() commits the canonical
+entities and aliases it creates with each batch, so any attempt to roll back
+at the end of this script would not undo those creations — they're already
+durable by then. Test against a snapshot or staging database first, not a
+--dry-run flag.
 
 Usage:
-    PYTHONPATH=. poetry run python scripts/backfill_entity_resolution.py [--batch-size 500]
+    PYTHONPATH=. poetry run python scripts/backfill_entity_resolution.py \\
+        [--batch-size 500] [--workers 4] [--checkpoint backfill_entity_resolution.json]
 """
 from __future__ import annotations
 
 import argparse
+import json
 import logging
+import os
+import threading
 import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
 
 from varavu_selavu_service.db.models import ItemInsight, MerchantInsight
 from varavu_selavu_service.db.session import SessionLocal
@@ -33,63 +50,134 @@ from varavu_selavu_service.services.entity_resolution_service import EntityResol
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("varavu_selavu.backfill_entity_resolution")
 
+# entity_type -> (insight model, raw-name column, canonical FK column)
+_TABLES = {
+    "merchant": (MerchantInsight, MerchantInsight.merchant_name, MerchantInsight.canonical_merchant_id),
+    "item": (ItemInsight, ItemInsight.normalized_name, ItemInsight.canonical_item_id),
+}
 
-def backfill_items(db, resolver: EntityResolutionService, batch_size: int) -> dict:
-    rows = db.query(ItemInsight).filter(ItemInsight.canonical_item_id.is_(None)).all()
-    linked = skipped = errors = 0
-    for i, row in enumerate(rows, 1):
-        try:
-            result = resolver.resolve(row.normalized_name, "item", row.user_email, source_hint="backfill")
-        except Exception:
-            logger.exception("Failed to resolve item_insight %s ('%s')", row.id, row.normalized_name)
-            errors += 1
-            continue
-        if result.canonical is not None:
-            row.canonical_item_id = uuid.UUID(result.canonical.id)
-            linked += 1
-        else:
-            skipped += 1  # ambiguous ("suggested") — left for a later confirm step, not linked
-        if i % batch_size == 0:
-            db.commit()
-            logger.info("item_insights: committed through row %d/%d", i, len(rows))
-    db.commit()
-    return {"total": len(rows), "linked": linked, "skipped_ambiguous": skipped, "errors": errors}
+
+class Checkpoint:
+    """Users already backfilled, per entity type, persisted as JSON after
+    every user so a killed run loses at most the users in flight."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done: Dict[str, Set[str]] = {"merchant": set(), "item": set()}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for entity_type, users in json.load(f).items():
+                    self._done.setdefault(entity_type, set()).update(users)
+
+    def done(self, entity_type: str, user_email: str) -> bool:
+        return user_email in self._done[entity_type]
+
+    def mark(self, entity_type: str, user_email: str) -> None:
+        with self._lock:
+            self._done[entity_type].add(user_email)
+            if not self.path:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({k: sorted(v) for k, v in self._done.items()}, f)
+            os.replace(tmp, self.path)
 
 
-def backfill_merchants(db, resolver: EntityResolutionService, batch_size: int) -> dict:
-    rows = db.query(MerchantInsight).filter(MerchantInsight.canonical_merchant_id.is_(None)).all()
+def pending_users(db: Session, entity_type: str) -> List[str]:
+    model, _, fk = _TABLES[entity_type]
+    return [e for (e,) in db.query(model.user_email).filter(fk.is_(None)).distinct().order_by(model.user_email).all()]
+
+
+def backfill_user(db: Session, resolver: EntityResolutionService, entity_type: str, user_email: str, batch_size: int) -> dict:
+    model, name_col, fk = _TABLES[entity_type]
+    rows = (
+        db.query(model.id, name_col)
+        .filter(model.user_email == user_email, fk.is_(None))
+        .order_by(model.id)
+        .all()
+    )
     linked = skipped = errors = 0
-    for i, row in enumerate(rows, 1):
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start:start + batch_size]
         try:
-            result = resolver.resolve(row.merchant_name, "merchant", row.user_email, source_hint="backfill")
+            results = resolver.resolve_many([name or "" for _, name in chunk], entity_type, user_email, source_hint="backfill")
         except Exception:
-            logger.exception("Failed to resolve merchant_insight %s ('%s')", row.id, row.merchant_name)
-            errors += 1
+            db.rollback()
+            logger.exception("Failed to resolve %d %s names for %s", len(chunk), entity_type, user_email)
+            errors += len(chunk)
             continue
-        if result.canonical is not None:
-            row.canonical_merchant_id = uuid.UUID(result.canonical.id)
-            linked += 1
-        else:
-            skipped += 1
-        if i % batch_size == 0:
-            db.commit()
-            logger.info("merchant_insights: committed through row %d/%d", i, len(rows))
-    db.commit()
+        updates = []
+        for (row_id, _), result in zip(chunk, results):
+            if result.canonical is not None:
+                updates.append({"id": row_id, fk.key: uuid.UUID(result.canonical.id)})
+                linked += 1
+            else:
+                skipped += 1  # ambiguous ("suggested") — left for a later confirm step, not linked
+        if updates:
+            db.bulk_update_mappings(model, updates)
+        db.commit()
+        logger.info("%s_insights: %s committed through row %d/%d", entity_type, user_email, start + len(chunk), len(rows))
     return {"total": len(rows), "linked": linked, "skipped_ambiguous": skipped, "errors": errors}
 
 
+def _backfill_all(db: Session, resolver: EntityResolutionService, entity_type: str, batch_size: int) -> dict:
+    totals: Counter = Counter(total=0, linked=0, skipped_ambiguous=0, errors=0)
+    for user_email in pending_users(db, entity_type):
+        totals.update(backfill_user(db, resolver, entity_type, user_email, batch_size))
+    return dict(totals)
+
+
+def backfill_items(db: Session, resolver: EntityResolutionService, batch_size: int) -> dict:
+    return _backfill_all(db, resolver, "item", batch_size)
+
+
+def backfill_merchants(db: Session, resolver: EntityResolutionService, batch_size: int) -> dict:
+    return _backfill_all(db, resolver, "merchant", batch_size)
+
+
+def backfill_parallel(
+    session_factory: Callable[[], Session],
+    entity_type: str,
+    batch_size: int,
+    workers: int,
+    checkpoint: Checkpoint,
+) -> dict:
+    with session_factory() as db:
+        users = [u for u in pending_users(db, entity_type) if not checkpoint.done(entity_type, u)]
+
+    def run(user_email: str) -> dict:
+        with session_factory() as db:
+            return backfill_user(db, EntityResolutionService(db), entity_type, user_email, batch_size)
+
+    totals: Counter = Counter(total=0, linked=0, skipped_ambiguous=0, errors=0)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill") as pool:
+        futures = {pool.submit(run, u): u for u in users}
+        for done, future in enumerate(as_completed(futures), 1):
+            user_email = futures[future]
+            try:
+                stats = future.result()
+            except Exception:
+                logger.exception("Backfill of %s_insights for %s failed", entity_type, user_email)
+                totals["errors"] += 1
+                continue
+            totals.update(stats)
+            if not stats["errors"]:
+                checkpoint.mark(entity_type, user_email)
+            logger.info("%s_insights: %d/%d users done", entity_type, done, len(users))
+    return {**totals, "users": len(users)}
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
     parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", default=None, help="JSON file of finished users; created if missing")
     args = parser.parse_args()
 
-    db = SessionLocal()
-    resolver = EntityResolutionService(db)
-    try:
-        merchant_stats = backfill_merchants(db, resolver, args.batch_size)
-        item_stats = backfill_items(db, resolver, args.batch_size)
-    finally:
-        db.close()
+    checkpoint = Checkpoint(args.checkpoint)
+    merchant_stats = backfill_parallel(SessionLocal, "merchant", args.batch_size, args.workers, checkpoint)
+    item_stats = backfill_parallel(SessionLocal, "item", args.batch_size, args.workers, checkpoint)
 
     print(f"merchant_insights: {merchant_stats}")
     print(f"item_insights: {item_stats}")
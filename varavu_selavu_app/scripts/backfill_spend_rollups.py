@@ -0,0 +1,100 @@
+"""
+scripts/backfill_spend_rollups.py
+=================================
+Builds monthly_spend_rollups from expense history. Users get a rollup built in
+the background after their first expense write following the
+add_monthly_spend_rollups migration (unless SPEND_ROLLUP_BACKGROUND_BUILD is off);
+until then analytics read their raw rows. Run this once after deploying to build
+everyone up front, one user per transaction.
+
+With --verify, already-built users are recomputed from raw rows instead and any
+(scope, month, category) cell whose stored total or count differs is reported;
+add --fix to rebuild the drifted users. Writes the flush hooks cannot see (bulk
+Query.update()/delete(), Core inserts, manual SQL) are the only source of drift.
+Exits non-zero if drift was found and not fixed.
+
+Usage:
+    PYTHONPATH=. poetry run python scripts/backfill_spend_rollups.py [--user <email>] [--rebuild]
+    PYTHONPATH=. poetry run python scripts/backfill_spend_rollups.py --verify [--fix] [--user <email>]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from varavu_selavu_service.db.models import GroupMember, User
+from varavu_selavu_service.db.session import SessionLocal
+from varavu_selavu_service.services.spend_rollup_service import SpendRollupService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("varavu_selavu.backfill_spend_rollups")
+
+
+def _candidate_users(db: Session, user: Optional[str]) -> List[str]:
+    if user is not None:
+        return [user]
+    emails = {e for (e,) in db.query(User.email).all()}
+    # Split/payer seats of invitees who haven't registered yet still get a rollup.
+    emails.update(e for (e,) in db.query(GroupMember.user_email).filter(GroupMember.user_email.isnot(None)).distinct().all())
+    return sorted(emails)
+
+
+def backfill(db: Session, user: Optional[str] = None, rebuild: bool = False) -> dict:
+    rollups = SpendRollupService(db)
+    emails = _candidate_users(db, user)
+    built = set() if rebuild else rollups.built_users(emails)
+    todo = [e for e in emails if e not in built]
+    for i, email in enumerate(todo, 1):
+        rollups.build(email)
+        db.commit()
+        if i % 100 == 0:
+            logger.info("built %d/%d users", i, len(todo))
+    return {"users": len(emails), "built": len(todo), "already_built": len(built)}
+
+
+def verify(db: Session, user: Optional[str] = None, fix: bool = False) -> List[dict]:
+    rollups = SpendRollupService(db)
+    results = []
+    for email in sorted(rollups.built_users(_candidate_users(db, user))):
+        drift = rollups.drift(email)
+        if drift and fix:
+            rollups.build(email)
+            db.commit()
+        if drift:
+            results.append({"user": email, "cells": drift, "fixed": fix})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", help="Only this user's rollup")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild users that already have a rollup too")
+    parser.add_argument("--verify", action="store_true", help="Compare built rollups against raw rows instead of building")
+    parser.add_argument("--fix", action="store_true", help="With --verify, rebuild drifted users")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if not args.verify:
+            print(backfill(db, args.user, args.rebuild))
+            return
+        results = verify(db, args.user, args.fix)
+    finally:
+        db.close()
+
+    for r in results:
+        print(f"{r['user']}: {len(r['cells'])} drifted cell(s){' (fixed)' if r['fixed'] else ''}")
+        for (scope, year_month, category), (stored, computed) in sorted(r["cells"].items()):
+            print(f"    {scope:<8} {year_month} {category:<24} stored={stored} computed={computed}")
+    if not results:
+        print("No drift.")
+    if results and not args.fix:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
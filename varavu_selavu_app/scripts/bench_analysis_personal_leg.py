@@ -0,0 +1,202 @@
+"""
+scripts/bench_analysis_personal_leg.py
+======================================
+Compares the five-query AnalysisService personal leg (count, sum, per-category
+sum, per-month sum, full detail scan) against the single-scan aggregation, on
+synthetic expenses for one user seeded into a throwaway in-memory SQLite
+database. For each size it reports query count and wall time for the legacy
+path, the single scan without detail rows (the summary payload), and the
+single scan with details, and fails if the aggregates ever disagree.
+
+Usage:
+    PYTHONPATH=. poetry run python scripts/bench_analysis_personal_leg.py [--sizes 10000 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, event, func, insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from varavu_selavu_service.db.models import Expense, User
+from varavu_selavu_service.db.session import Base
+from varavu_selavu_service.services.analysis_service import AnalysisService
+
+_USER = "bench@example.com"
+_CATEGORIES = ["Groceries", "Dining", "Transport", "Utilities", "Shopping", "Travel", "Health", "Entertainment"]
+
+
+def _legacy_personal_leg(svc: AnalysisService, user_id, year, month, start_date, end_date, is_sqlite) -> Dict[str, Any]:
+    """The pre-single-scan implementation, kept verbatim as the parity/perf baseline."""
+    db = svc.db
+    filters = [Expense.user_email == user_id, Expense.group_id.is_(None)]
+    filters += svc._date_filters(Expense.purchased_at, year, month, start_date, end_date)
+
+    category_totals: List[Dict[str, Any]] = []
+    monthly_trend: List[Dict[str, Any]] = []
+    total = 0.0
+    category_expense_details: Dict[str, list] = {}
+
+    row_count = db.query(func.count(Expense.id)).filter(*filters).scalar() or 0
+
+    if row_count > 0:
+        total_val = db.query(func.sum(Expense.amount)).filter(*filters).scalar()
+        total = round(float(total_val), 2) if total_val else 0.0
+
+        cat_results = db.query(
+            Expense.category_id,
+            func.sum(Expense.amount).label('cost')
+        ).filter(*filters).group_by(Expense.category_id).order_by(func.sum(Expense.amount).desc()).all()
+
+        for r in cat_results:
+            category_totals.append({"category": r[0] or "Uncategorized", "total": round(float(r[1]), 2)})
+
+        month_expr = svc._month_expr(Expense.purchased_at, is_sqlite)
+        trend_results = db.query(
+            month_expr.label('month'),
+            func.sum(Expense.amount).label('total')
+        ).filter(*filters).group_by(month_expr).order_by(month_expr.asc()).all()
+
+        for r in trend_results:
+            if r[0]:
+                monthly_trend.append({"month": r[0], "total": round(float(r[1]), 2)})
+
+        detail_rows = db.query(
+            Expense.purchased_at,
+            Expense.description,
+            Expense.category_id,
+            Expense.amount
+        ).filter(*filters).order_by(Expense.purchased_at.desc()).all()
+
+        for r in detail_rows:
+            cat_name = r[2] or "Uncategorized"
+            category_expense_details.setdefault(cat_name, []).append({
+                "date": r[0].strftime("%Y-%m-%d") if r[0] else "",
+                "description": r[1] or "",
+                "category": cat_name,
+                "cost": float(r[3] or 0),
+            })
+
+    return {
+        "category_totals": category_totals,
+        "monthly_trend": monthly_trend,
+        "total": total,
+        "category_expense_details": category_expense_details,
+        "row_count": row_count,
+    }
+
+
+def _seed(db: Session, n_expenses: int) -> None:
+    db.add(User(id=uuid.uuid4(), email=_USER, password_hash="x", name="Bench"))
+    db.commit()
+    start = datetime(2022, 1, 1, 12, tzinfo=timezone.utc)
+    batch = []
+    for n in range(n_expenses):
+        batch.append({
+            "id": uuid.uuid4(),
+            "user_email": _USER,
+            "purchased_at": start + timedelta(hours=(n * 7) % (24 * 365 * 3)),
+            "category_id": _CATEGORIES[n % len(_CATEGORIES)],
+            "amount": Decimal(100 + (n * 37) % 20000) / 100,
+            "description": f"Expense {n}",
+        })
+        if len(batch) == 5000:
+            db.execute(insert(Expense), batch)
+            batch = []
+    if batch:
+        db.execute(insert(Expense), batch)
+    db.commit()
+
+
+def _measure(engine, fn):
+    counter = {"queries": 0}
+
+    def _count(*_args, **_kwargs):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    return result, counter["queries"], elapsed
+
+
+def _aggregates(leg: Dict[str, Any]) -> tuple:
+    return (
+        sorted((c["category"], c["total"]) for c in leg["category_totals"]),
+        leg["monthly_trend"],
+        leg["total"],
+        leg["row_count"],
+    )
+
+
+def run(n_expenses: int) -> dict:
+    engine = create_engine(
+        "sqlite:///:memory:",
+        poolclass=StaticPool,
+        execution_options={"schema_translate_map": {"trackspense": None}},
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        _seed(db, n_expenses)
+        svc = AnalysisService(db)
+        args = (_USER, None, None, None, None, True)
+
+        legacy, legacy_queries, legacy_secs = _measure(engine, lambda: _legacy_personal_leg(svc, *args))
+        summary, summary_queries, summary_secs = _measure(
+            engine, lambda: svc._compute_personal_leg(*args, include_details=False)
+        )
+        detailed, detailed_queries, detailed_secs = _measure(engine, lambda: svc._compute_personal_leg(*args))
+    finally:
+        db.close()
+        engine.dispose()
+
+    return {
+        "expenses": n_expenses,
+        "legacy_queries": legacy_queries,
+        "legacy_secs": legacy_secs,
+        "summary_queries": summary_queries,
+        "summary_secs": summary_secs,
+        "detailed_queries": detailed_queries,
+        "detailed_secs": detailed_secs,
+        "identical": (
+            _aggregates(legacy) == _aggregates(summary) == _aggregates(detailed)
+            and sum(len(v) for v in detailed["category_expense_details"].values()) == legacy["row_count"]
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    ok = True
+    print(f"{'expenses':>9} {'legacy q':>9} {'legacy s':>9} {'summary q':>10} {'summary s':>10} {'detail q':>9} {'detail s':>9} identical")
+    for size in args.sizes:
+        r = run(size)
+        print(
+            f"{r['expenses']:>9} {r['legacy_queries']:>9} {r['legacy_secs']:>9.3f} "
+            f"{r['summary_queries']:>10} {r['summary_secs']:>10.3f} "
+            f"{r['detailed_queries']:>9} {r['detailed_secs']:>9.3f} {r['identical']}"
+        )
+        ok = ok and r["identical"]
+
+    if not ok:
+        print("\nFAIL: single-scan aggregates differ from the five-query baseline.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
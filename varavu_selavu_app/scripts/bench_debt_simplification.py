@@ -0,0 +1,135 @@
+"""
+scripts/bench_debt_simplification.py
+====================================
+Compares the debt_simplification modes on randomized group nets: for each
+member count and net distribution it reports the average transfer count and
+per-call wall time of greedy vs optimal, how often optimal saved a transfer,
+and how often it blew its time budget and fell back to greedy. Fails if any
+optimal result does not settle every member to zero or uses more transfers
+than greedy.
+
+Distributions:
+    uniform   independent amounts in whole cents
+    round     amounts rounded to $5 (common real-world splits; many zero-sum subsets)
+    fx        FX-converted amounts carrying 8 decimal places
+    whale     one member fronted most of the spend, the rest owe small amounts
+
+Usage:
+    PYTHONPATH=. poetry run python scripts/bench_debt_simplification.py [--members 5 10 15 20] [--trials 50] [--budget-ms 250]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from decimal import Decimal
+from typing import Callable, Dict, List
+
+from varavu_selavu_service.services.debt_simplification import greedy_transfers, optimal_transfers
+
+
+def _close(rng: random.Random, values: List[Decimal]) -> Dict[str, Decimal]:
+    values.append(-sum(values))
+    rng.shuffle(values)
+    return {f"m{i}": v for i, v in enumerate(values)}
+
+
+def _uniform(rng: random.Random, n: int) -> Dict[str, Decimal]:
+    return _close(rng, [Decimal(rng.randint(-20000, 20000)) / 100 for _ in range(n - 1)])
+
+
+def _round(rng: random.Random, n: int) -> Dict[str, Decimal]:
+    return _close(rng, [Decimal(rng.randint(-20, 20) * 5) for _ in range(n - 1)])
+
+
+def _fx(rng: random.Random, n: int) -> Dict[str, Decimal]:
+    rate = Decimal("0.01204800")
+    return _close(rng, [(Decimal(rng.randint(-500000, 500000)) * rate).quantize(Decimal("0.00000001")) for _ in range(n - 1)])
+
+
+def _whale(rng: random.Random, n: int) -> Dict[str, Decimal]:
+    return _close(rng, [-Decimal(rng.randint(100, 5000)) / 100 for _ in range(n - 1)])
+
+
+DISTRIBUTIONS: Dict[str, Callable[[random.Random, int], Dict[str, Decimal]]] = {
+    "uniform": _uniform,
+    "round": _round,
+    "fx": _fx,
+    "whale": _whale,
+}
+
+
+def _settles(nets: Dict[str, Decimal], transfers: List[Dict]) -> bool:
+    remaining = dict(nets)
+    for t in transfers:
+        remaining[t["from_member_id"]] += t["amount"]
+        remaining[t["to_member_id"]] -= t["amount"]
+    return all(v == 0 for v in remaining.values())
+
+
+def run(distribution: str, members: int, trials: int, budget_ms: int, seed: int = 0) -> dict:
+    rng = random.Random(f"{seed}:{distribution}:{members}")
+    greedy_count = optimal_count = improved = fallbacks = 0
+    greedy_secs = optimal_secs = 0.0
+    ok = True
+
+    for _ in range(trials):
+        nets = DISTRIBUTIONS[distribution](rng, members)
+
+        started = time.perf_counter()
+        greedy = greedy_transfers(nets)
+        greedy_secs += time.perf_counter() - started
+
+        started = time.perf_counter()
+        optimal = optimal_transfers(nets, max_members=members, time_budget_ms=budget_ms)
+        optimal_secs += time.perf_counter() - started
+
+        if optimal is None:
+            fallbacks += 1
+            optimal = greedy
+        ok = ok and _settles(nets, greedy) and _settles(nets, optimal) and len(optimal) <= len(greedy)
+        greedy_count += len(greedy)
+        optimal_count += len(optimal)
+        improved += len(optimal) < len(greedy)
+
+    return {
+        "distribution": distribution,
+        "members": members,
+        "greedy_transfers": greedy_count / trials,
+        "optimal_transfers": optimal_count / trials,
+        "improved": improved,
+        "fallbacks": fallbacks,
+        "greedy_ms": greedy_secs / trials * 1000,
+        "optimal_ms": optimal_secs / trials * 1000,
+        "ok": ok,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, nargs="+", default=[5, 10, 15, 20])
+    parser.add_argument("--distributions", nargs="+", choices=list(DISTRIBUTIONS), default=list(DISTRIBUTIONS))
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--budget-ms", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ok = True
+    print(f"{'dist':>8} {'members':>7} {'greedy tx':>9} {'optimal tx':>10} {'improved':>8} {'fallback':>8} {'greedy ms':>9} {'optimal ms':>10}")
+    for distribution in args.distributions:
+        for members in args.members:
+            r = run(distribution, members, args.trials, args.budget_ms, args.seed)
+            print(
+                f"{r['distribution']:>8} {r['members']:>7} {r['greedy_transfers']:>9.2f} {r['optimal_transfers']:>10.2f} "
+                f"{r['improved']:>8} {r['fallbacks']:>8} {r['greedy_ms']:>9.3f} {r['optimal_ms']:>10.3f}"
+            )
+            ok = ok and r["ok"]
+
+    if not ok:
+        print("\nFAIL: a simplification did not settle every member, or optimal used more transfers than greedy.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+scripts/bench_export_formats.py
+===============================
+Compares the personal CSV export (PersonalExportService) against the columnar
+exports (ColumnarExportService, Parquet and Arrow IPC), on synthetic expenses
+with line items for one user seeded into a throwaway in-memory SQLite database.
+For each size it reports, per format, wall time to produce the whole body, time
+to the first chunk, the body size, and the time an analyst spends loading it
+back into a table (csv.reader / pyarrow), and fails if any export is missing
+rows.
+
+The columnar body also carries expense_items, which the CSV only summarizes as
+an item_count, so its size is an upper bound on the like-for-like comparison.
+
+Usage:
+    PYTHONPATH=. poetry run python scripts/bench_export_formats.py [--sizes 10000 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import sys
+import time
+import uuid
+import zipfile
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from varavu_selavu_service.db.models import Expense, ExpenseItem, User
+from varavu_selavu_service.db.session import Base
+from varavu_selavu_service.services.columnar_export_service import ColumnarExportService, ColumnarFormat
+from varavu_selavu_service.services.personal_export_service import PersonalExportService
+
+_USER = "bench@example.com"
+_CATEGORIES = ["Groceries", "Dining", "Transport", "Utilities", "Shopping", "Travel", "Health", "Entertainment"]
+_ITEMS_EVERY = 4  # one expense in four has two line items
+
+
+def _seed(db: Session, n_expenses: int) -> None:
+    db.add(User(id=uuid.uuid4(), email=_USER, password_hash="x", name="Bench"))
+    db.commit()
+    start = datetime(2020, 1, 1, 12, tzinfo=timezone.utc)
+    expenses, items = [], []
+    for n in range(n_expenses):
+        eid = uuid.uuid4()
+        expenses.append({
+            "id": eid,
+            "user_email": _USER,
+            "purchased_at": start + timedelta(hours=(n * 7) % (24 * 365 * 5)),
+            "category_id": _CATEGORIES[n % len(_CATEGORIES)],
+            "amount": Decimal(100 + (n * 37) % 20000) / 100,
+            "merchant_name": f"Merchant {n % 250}",
+            "description": f"Expense {n}",
+        })
+        if n % _ITEMS_EVERY == 0:
+            for line in (1, 2):
+                items.append({
+                    "id": uuid.uuid4(), "expense_id": eid, "line_no": line, "item_name": f"Item {n % 500}",
+                    "quantity": Decimal(line), "unit_price": Decimal("1.99"), "line_total": Decimal("1.99") * line,
+                })
+        if len(expenses) == 5000:
+            db.execute(insert(Expense), expenses)
+            db.execute(insert(ExpenseItem), items) if items else None
+            expenses, items = [], []
+    if expenses:
+        db.execute(insert(Expense), expenses)
+    if items:
+        db.execute(insert(ExpenseItem), items)
+    db.commit()
+
+
+def _drain(chunks) -> tuple:
+    started = time.perf_counter()
+    first = None
+    parts = []
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - started
+        parts.append(chunk.encode() if isinstance(chunk, str) else chunk)
+    return b"".join(parts), first, time.perf_counter() - started
+
+
+def _load_csv(body: bytes) -> int:
+    return len(list(csv.reader(io.StringIO(body.decode("utf-8-sig"))))) - 1
+
+
+def _load_columnar(body: bytes, fmt: ColumnarFormat) -> int:
+    with zipfile.ZipFile(io.BytesIO(body)) as zf:
+        data = zf.read(f"expenses.{fmt.value}")
+    if fmt is ColumnarFormat.PARQUET:
+        return pq.read_table(io.BytesIO(data)).num_rows
+    return pa.ipc.open_file(data).read_all().num_rows
+
+
+def run(n_expenses: int) -> list:
+    engine = create_engine(
+        "sqlite:///:memory:",
+        poolclass=StaticPool,
+        execution_options={"schema_translate_map": {"trackspense": None}},
+    )
+    Base.metadata.create_all(bind=engine)
+    make_session = sessionmaker(bind=engine, autoflush=False)
+    with make_session() as db:
+        _seed(db, n_expenses)
+
+    results = []
+    try:
+        # Each export closes its session when done, as it would after a response.
+        body, first, secs = _drain(PersonalExportService(make_session()).export_csv(_USER))
+        started = time.perf_counter()
+        rows = _load_csv(body)
+        results.append(("csv", secs, first, len(body), time.perf_counter() - started, rows))
+        for fmt in ColumnarFormat:
+            body, first, secs = _drain(ColumnarExportService(make_session()).export_personal(_USER, fmt))
+            started = time.perf_counter()
+            rows = _load_columnar(body, fmt)
+            results.append((fmt.value, secs, first, len(body), time.perf_counter() - started, rows))
+    finally:
+        engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    ok = True
+    print(f"{'expenses':>9} {'format':>8} {'write s':>8} {'first s':>8} {'bytes':>11} {'load s':>7} {'rows':>8}")
+    for size in args.sizes:
+        for fmt, secs, first, size_bytes, load_secs, rows in run(size):
+            print(f"{size:>9} {fmt:>8} {secs:>8.3f} {first:>8.4f} {size_bytes:>11} {load_secs:>7.3f} {rows:>8}")
+            ok = ok and rows == size
+
+    if not ok:
+        print("\nFAIL: an export is missing rows.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+scripts/bench_insights_aggregation.py
+=====================================
+Compares the per-line insight aggregation InsightsAggregationService used to
+run (a SELECT plus an ORM update per item, per merchant and per month, and a
+resolve() per name) against the batched upsert path, on a throwaway in-memory
+SQLite database. For each receipt size it feeds the same receipts through both
+paths and reports statements per receipt and wall time. It fails if the
+resulting item_insights, merchant_insights, merchant_aggregates or
+item_price_history rows ever differ.
+
+Receipts reuse half of their item names from the previous receipt and
+repeat some lines within a receipt, so both the insert and the
+on-conflict-update branches are exercised.
+
+Usage:
+    PYTHONPATH=. poetry run python scripts/bench_insights_aggregation.py [--sizes 10 60 200] [--receipts 20]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from varavu_selavu_service.db.models import (
+    Expense,
+    ItemInsight,
+    ItemPriceHistory,
+    MerchantAggregate,
+    MerchantInsight,
+    User,
+)
+from varavu_selavu_service.db.session import Base
+from varavu_selavu_service.services.entity_resolution_service import EntityResolutionService
+from varavu_selavu_service.services.insights_aggregation_service import InsightsAggregationService
+
+_USER = "bench@example.com"
+
+
+class _LegacyAggregation:
+    """The pre-batching implementation of on_expense_with_items_created, kept
+    verbatim as the parity/perf baseline."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._resolver = EntityResolutionService(db)
+
+    def on_expense_with_items_created(self, user_email, expense_id, merchant_name, purchased_at, items, total_amount=None):
+        if total_amount is not None:
+            merchant_amount = total_amount
+        else:
+            merchant_amount = float(sum(i.get("line_total", 0) for i in items))
+        self._update_merchant_insight(user_email, merchant_name, purchased_at, merchant_amount)
+        for item in items:
+            self._update_item_insight(
+                user_email=user_email,
+                expense_id=expense_id,
+                store_name=merchant_name,
+                purchased_at=purchased_at,
+                normalized_name=item.get("normalized_name") or item.get("item_name", "Unknown"),
+                unit_price=float(item.get("unit_price") or item.get("line_total", 0)),
+                quantity=float(item.get("quantity", 1) or 1),
+                line_total=float(item.get("line_total", 0)),
+            )
+        self.db.commit()
+
+    def _update_item_insight(self, user_email, expense_id, store_name, purchased_at, normalized_name, unit_price, quantity, line_total):
+        insight = (
+            self.db.query(ItemInsight)
+            .filter(ItemInsight.user_email == user_email, ItemInsight.normalized_name == normalized_name)
+            .first()
+        )
+        if insight is None:
+            insight = ItemInsight(
+                id=uuid.uuid4(),
+                user_email=user_email,
+                normalized_name=normalized_name,
+                avg_unit_price=Decimal(str(unit_price)),
+                min_price=Decimal(str(unit_price)),
+                max_price=Decimal(str(unit_price)),
+                total_quantity_bought=Decimal(str(quantity)),
+                total_spent=Decimal(str(line_total)),
+            )
+            self.db.add(insight)
+            self.db.flush()
+        else:
+            prev_total = float(insight.total_spent or 0)
+            prev_qty = float(insight.total_quantity_bought or 0)
+            new_total = prev_total + line_total
+            new_qty = prev_qty + quantity
+            insight.total_spent = Decimal(str(new_total))
+            insight.total_quantity_bought = Decimal(str(new_qty))
+            insight.avg_unit_price = Decimal(str(new_total / new_qty)) if new_qty else Decimal("0")
+            if unit_price < float(insight.min_price or unit_price):
+                insight.min_price = Decimal(str(unit_price))
+            if unit_price > float(insight.max_price or 0):
+                insight.max_price = Decimal(str(unit_price))
+
+        result = self._resolver.resolve(normalized_name, "item", user_email)
+        if result.canonical is not None:
+            insight.canonical_item_id = uuid.UUID(result.canonical.id)
+
+        self.db.add(ItemPriceHistory(
+            id=uuid.uuid4(),
+            item_insight_id=insight.id,
+            expense_id=uuid.UUID(str(expense_id)),
+            store_name=store_name,
+            date=purchased_at or datetime.utcnow(),
+            unit_price=Decimal(str(unit_price)),
+            quantity=Decimal(str(quantity)),
+        ))
+
+    def _update_merchant_insight(self, user_email, merchant_name, purchased_at, amount, count_delta=1):
+        if not merchant_name:
+            return
+        insight = (
+            self.db.query(MerchantInsight)
+            .filter(MerchantInsight.user_email == user_email, MerchantInsight.merchant_name == merchant_name)
+            .first()
+        )
+        if insight is None:
+            insight = MerchantInsight(
+                id=uuid.uuid4(), user_email=user_email, merchant_name=merchant_name,
+                total_spent=Decimal(str(amount)), transaction_count=count_delta,
+            )
+            self.db.add(insight)
+            self.db.flush()
+        else:
+            insight.total_spent = Decimal(str(float(insight.total_spent or 0) + amount))
+            insight.transaction_count = (insight.transaction_count or 0) + count_delta
+
+        result = self._resolver.resolve(merchant_name, "merchant", user_email)
+        if result.canonical is not None:
+            insight.canonical_merchant_id = uuid.UUID(result.canonical.id)
+
+        dt = purchased_at or datetime.utcnow()
+        agg = (
+            self.db.query(MerchantAggregate)
+            .filter(
+                MerchantAggregate.merchant_insight_id == insight.id,
+                MerchantAggregate.year == dt.year,
+                MerchantAggregate.month == dt.month,
+            )
+            .first()
+        )
+        if agg is None:
+            self.db.add(MerchantAggregate(
+                id=uuid.uuid4(), merchant_insight_id=insight.id, year=dt.year, month=dt.month,
+                total_spent=Decimal(str(amount)), transaction_count=count_delta,
+            ))
+        else:
+            agg.total_spent = Decimal(str(float(agg.total_spent or 0) + amount))
+            agg.transaction_count = (agg.transaction_count or 0) + count_delta
+
+
+def _receipts(lines: int, count: int) -> List[Dict[str, Any]]:
+    receipts = []
+    for r in range(count):
+        items = []
+        for i in range(lines):
+            # Half the names carry over from the previous receipt; every
+            # seventh line repeats the one before it.
+            n = i if i % 7 else max(i - 1, 0)
+            name = f"product {n + (r * lines) // 2}"
+            price = 1 + ((n * 13 + r * 7) % 400) / 100
+            qty = 1 + (n + r) % 3
+            items.append({"normalized_name": name, "unit_price": price, "quantity": qty, "line_total": round(price * qty, 2)})
+        receipts.append({
+            "merchant_name": f"Store {r % 3}",
+            "purchased_at": datetime(2026, 1 + r % 12, 1 + r % 28, 12),
+            "items": items,
+        })
+    return receipts
+
+
+def _snapshot(db: Session) -> Dict[str, Any]:
+    def num(v: Optional[Decimal]) -> Optional[float]:
+        return None if v is None else round(float(v), 2)
+
+    merchants = {m.id: m.merchant_name for m in db.query(MerchantInsight)}
+    items = {i.id: i.normalized_name for i in db.query(ItemInsight)}
+    return {
+        "items": sorted(
+            (i.normalized_name, num(i.total_spent), num(i.total_quantity_bought), num(i.avg_unit_price),
+             num(i.min_price), num(i.max_price), i.canonical_item_id is not None)
+            for i in db.query(ItemInsight)
+        ),
+        "merchants": sorted(
+            (m.merchant_name, num(m.total_spent), m.transaction_count, m.canonical_merchant_id is not None)
+            for m in db.query(MerchantInsight)
+        ),
+        "months": sorted(
+            (merchants[a.merchant_insight_id], a.year, a.month, num(a.total_spent), a.transaction_count)
+            for a in db.query(MerchantAggregate)
+        ),
+        "history": sorted(
+            (items[h.item_insight_id], str(h.expense_id), num(h.unit_price), num(h.quantity))
+            for h in db.query(ItemPriceHistory)
+        ),
+    }
+
+
+def _replay(service_cls, receipts: List[Dict[str, Any]], expense_ids: List[uuid.UUID]):
+    EntityResolutionService.reset_index()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        poolclass=StaticPool,
+        execution_options={"schema_translate_map": {"trackspense": None}},
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    db.add(User(id=uuid.uuid4(), email=_USER, password_hash="x", name="Bench"))
+    db.add_all(Expense(id=expense_id, user_email=_USER, category_id="groceries", amount=Decimal("1.00")) for expense_id in expense_ids)
+    db.commit()
+
+    counter = {"statements": 0}
+
+    def _count(*_args, **_kwargs):
+        counter["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        service = service_cls(db)
+        started = time.perf_counter()
+        for expense_id, receipt in zip(expense_ids, receipts):
+            service.on_expense_with_items_created(
+                user_email=_USER, expense_id=str(expense_id), merchant_name=receipt["merchant_name"],
+                purchased_at=receipt["purchased_at"], items=receipt["items"],
+            )
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    try:
+        return _snapshot(db), counter["statements"], elapsed
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def run(lines: int, count: int) -> dict:
+    receipts = _receipts(lines, count)
+    expense_ids = [uuid.uuid4() for _ in receipts]
+    legacy, legacy_statements, legacy_secs = _replay(_LegacyAggregation, receipts, expense_ids)
+    batched, batched_statements, batched_secs = _replay(InsightsAggregationService, receipts, expense_ids)
+    return {
+        "lines": lines,
+        "legacy_statements": legacy_statements / count,
+        "legacy_secs": legacy_secs,
+        "batched_statements": batched_statements / count,
+        "batched_secs": batched_secs,
+        "identical": legacy == batched,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 60, 200])
+    parser.add_argument("--receipts", type=int, default=20)
+    args = parser.parse_args()
+
+    ok = True
+    print(f"{'lines':>6} {'legacy stmt/rcpt':>17} {'legacy s':>9} {'batched stmt/rcpt':>18} {'batched s':>10} {'speedup':>8} identical")
+    for size in args.sizes:
+        r = run(size, args.receipts)
+        speedup = r["legacy_secs"] / r["batched_secs"] if r["batched_secs"] else float("inf")
+        print(
+            f"{r['lines']:>6} {r['legacy_statements']:>17.1f} {r['legacy_secs']:>9.3f} "
+            f"{r['batched_statements']:>18.1f} {r['batched_secs']:>10.3f} {speedup:>7.1f}x {r['identical']}"
+        )
+        ok = ok and r["identical"]
+
+    if not ok:
+        print("\nFAIL: batched aggregation differs from the per-line baseline.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
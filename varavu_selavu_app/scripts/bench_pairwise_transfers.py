@@ -0,0 +1,185 @@
+"""
+scripts/bench_pairwise_transfers.py
+===================================
+Compares the per-expense pairwise-transfer loop BalanceService used to run
+(two queries per expense) against the set-based
+BalanceService._pairwise_transfers_for_groups, on a synthetic group seeded into
+a throwaway in-memory SQLite database. For each size it reports query count and
+wall time for both paths, and fails if the two ever disagree on a transfer.
+
+Seeded expenses rotate through 5 members with 1-3 payers each and odd amounts,
+so the proportional cent-rounding path is exercised, not just single-payer.
+
+Usage:
+    PYTHONPATH=. poetry run python scripts/bench_pairwise_transfers.py [--sizes 100 1000 10000]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from varavu_selavu_service.db.models import Expense, ExpensePayer, ExpenseSplit, Group, GroupMember, Settlement, User
+from varavu_selavu_service.db.session import Base
+from varavu_selavu_service.services.balance_service import BalanceService
+
+_MEMBERS = 5
+
+
+def _legacy_pairwise_transfers(db: Session, group_id: uuid.UUID) -> List[Dict]:
+    """The pre-bulk implementation, kept verbatim as the parity/perf baseline."""
+    pair_net: Dict[tuple, Decimal] = {}
+
+    def _add(debtor_id, creditor_id, amount):
+        if debtor_id == creditor_id:
+            return
+        a, b = sorted([str(debtor_id), str(creditor_id)])
+        key = (uuid.UUID(a), uuid.UUID(b))
+        sign = 1 if str(debtor_id) == a else -1
+        pair_net[key] = pair_net.get(key, Decimal("0.00")) + sign * amount
+
+    for exp in db.query(Expense).filter(Expense.group_id == group_id).all():
+        payer_rows = db.query(ExpensePayer).filter(ExpensePayer.expense_id == exp.id).all()
+        if not payer_rows:
+            continue
+        total_paid = sum(p.amount_paid for p in payer_rows)
+        if total_paid == Decimal("0.00"):
+            continue
+        fx_rate = BalanceService._fx_rate(exp)
+        for s in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == exp.id).all():
+            debt_amount = s.amount_owed * fx_rate
+            if debt_amount == Decimal("0.00"):
+                continue
+            allocated_sum = Decimal("0.00")
+            for i, p in enumerate(payer_rows):
+                if i == len(payer_rows) - 1:
+                    portion = debt_amount - allocated_sum
+                else:
+                    portion = (debt_amount * (p.amount_paid / total_paid)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+                    allocated_sum += portion
+                _add(s.member_id, p.member_id, portion)
+
+    for st in db.query(Settlement).filter(Settlement.group_id == group_id).all():
+        _add(st.from_member_id, st.to_member_id, -st.amount)
+
+    transfers = []
+    for (a, b), net in pair_net.items():
+        if net > Decimal("0.00"):
+            transfers.append({"from_member_id": str(a), "to_member_id": str(b), "amount": float(net)})
+        elif net < Decimal("0.00"):
+            transfers.append({"from_member_id": str(b), "to_member_id": str(a), "amount": float(-net)})
+    return transfers
+
+
+def _seed(db: Session, n_expenses: int) -> uuid.UUID:
+    owner = User(id=uuid.uuid4(), email="bench@example.com", password_hash="x", name="Bench")
+    group = Group(id=uuid.uuid4(), name="Bench trip", created_by=owner.email)
+    members = [
+        GroupMember(id=uuid.uuid4(), group_id=group.id, user_email=owner.email if i == 0 else None, display_name=f"m{i}")
+        for i in range(_MEMBERS)
+    ]
+    db.add_all([owner, group, *members])
+
+    rows = []
+    for n in range(n_expenses):
+        cents = 1000 + (n * 37) % 9000
+        amount = Decimal(cents) / 100
+        expense = Expense(
+            id=uuid.uuid4(), user_email=owner.email, group_id=group.id, split_type="equal",
+            purchased_at=datetime(2026, 1, 1, 12, tzinfo=timezone.utc), category_id="Food", amount=amount,
+        )
+        rows.append(expense)
+
+        payers = [members[(n + k) % _MEMBERS] for k in range(1 + n % 3)]
+        paid_cents = [cents // len(payers)] * len(payers)
+        paid_cents[0] += cents - sum(paid_cents)
+        for m, c in zip(payers, paid_cents):
+            rows.append(ExpensePayer(id=uuid.uuid4(), expense_id=expense.id, member_id=m.id, amount_paid=Decimal(c) / 100))
+
+        owed_cents = [cents // _MEMBERS] * _MEMBERS
+        owed_cents[-1] += cents - sum(owed_cents)
+        for m, c in zip(members, owed_cents):
+            rows.append(ExpenseSplit(id=uuid.uuid4(), expense_id=expense.id, member_id=m.id, amount_owed=Decimal(c) / 100, basis_type="equal"))
+
+    rows.append(Settlement(id=uuid.uuid4(), group_id=group.id, from_member_id=members[1].id, to_member_id=members[0].id, amount=Decimal("12.34")))
+    db.add_all(rows)
+    db.commit()
+    return group.id
+
+
+def _measure(engine, fn):
+    counter = {"queries": 0}
+
+    def _count(*_args, **_kwargs):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    return result, counter["queries"], elapsed
+
+
+def run(n_expenses: int) -> dict:
+    engine = create_engine(
+        "sqlite:///:memory:",
+        poolclass=StaticPool,
+        execution_options={"schema_translate_map": {"trackspense": None}},
+    )
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        group_id = _seed(db, n_expenses)
+
+        db.expire_all()
+        legacy, legacy_queries, legacy_secs = _measure(engine, lambda: _legacy_pairwise_transfers(db, group_id))
+        db.expire_all()
+        bulk, bulk_queries, bulk_secs = _measure(engine, lambda: BalanceService(db)._pairwise_transfers(group_id))
+    finally:
+        db.close()
+        engine.dispose()
+
+    return {
+        "expenses": n_expenses,
+        "legacy_queries": legacy_queries,
+        "legacy_secs": legacy_secs,
+        "bulk_queries": bulk_queries,
+        "bulk_secs": bulk_secs,
+        "identical": legacy == bulk,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    ok = True
+    print(f"{'expenses':>9} {'legacy q':>9} {'legacy s':>9} {'bulk q':>7} {'bulk s':>8} {'speedup':>8} identical")
+    for size in args.sizes:
+        r = run(size)
+        speedup = r["legacy_secs"] / r["bulk_secs"] if r["bulk_secs"] else float("inf")
+        print(
+            f"{r['expenses']:>9} {r['legacy_queries']:>9} {r['legacy_secs']:>9.3f} "
+            f"{r['bulk_queries']:>7} {r['bulk_secs']:>8.3f} {speedup:>7.1f}x {r['identical']}"
+        )
+        ok = ok and r["identical"]
+
+    if not ok:
+        print("\nFAIL: bulk transfers differ from the per-expense baseline.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
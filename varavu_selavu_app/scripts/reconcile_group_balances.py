@@ -0,0 +1,77 @@
+"""
+scripts/reconcile_group_balances.py
+===================================
+TS-GRP-135 drift check for the materialized `group_balances` and
+`group_pair_balances` tables. Every balance-affecting write (expense
+create/edit/delete/convert, itemized edits, settlements) applies its own delta
+to both in the same transaction, so they should always equal a from-scratch
+computation over the raw expense_payers/expense_splits/settlements ledger. This
+script recomputes that ledger for every group, reports any member net or member
+pair net whose stored value differs, and lists groups that were never
+materialized (history predating the tables).
+
+With --fix, drifted and never-materialized groups are rebuilt from the raw
+ledger — run it once after the add_group_balances/add_group_pair_balances migrations to materialize
+existing groups up front instead of lazily on their next write.
+
+Exits non-zero if drift was found and not fixed.
+
+Usage:
+    PYTHONPATH=. poetry run python scripts/reconcile_group_balances.py [--fix] [--group-id <uuid>]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from varavu_selavu_service.db.models import Group
+from varavu_selavu_service.db.session import SessionLocal
+from varavu_selavu_service.services.balance_service import BalanceService
+
+
+def reconcile(db: Session, fix: bool = False, group_id: Optional[str] = None) -> List[dict]:
+    balance_service = BalanceService(db)
+    query = db.query(Group.id)
+    if group_id is not None:
+        query = query.filter(Group.id == balance_service._coerce_group_id(group_id))
+    results = [balance_service.reconcile_group(gid, fix=fix) for (gid,) in query.all()]
+    if fix:
+        db.commit()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fix", action="store_true", help="Rebuild drifted/unmaterialized groups from the raw ledger")
+    parser.add_argument("--group-id", default=None, help="Only reconcile this one group")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        results = reconcile(db, fix=args.fix, group_id=args.group_id)
+    finally:
+        db.close()
+
+    drifted = [r for r in results if r["drift"] or r["pair_drift"]]
+    unmaterialized = [r for r in results if not r["materialized"]]
+    for r in drifted:
+        print(f"[drift] group={r['group_id']}")
+        for d in r["drift"]:
+            print(f"    member={d['member_id']} stored={d['stored']} ledger={d['ledger']}")
+        for d in r["pair_drift"]:
+            print(f"    pair={d['member_a_id']}->{d['member_b_id']} stored={d['stored']} ledger={d['ledger']}")
+
+    print(
+        f"\ngroups={len(results)} drifted={len(drifted)} unmaterialized={len(unmaterialized)}"
+        f"{' (rebuilt)' if args.fix and (drifted or unmaterialized) else ''}"
+    )
+    if drifted and not args.fix:
+        print("FAIL: group_balances/group_pair_balances have drifted from the raw ledger. Re-run with --fix to rebuild.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
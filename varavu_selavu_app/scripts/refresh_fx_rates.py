@@ -0,0 +1,69 @@
+"""
+scripts/refresh_fx_rates.py
+===========================
+Pre-warms the FX rate table (TS-GRP-131) so expense creation never waits on
+the rate provider: loads today's rates for every currency an active group uses,
+one provider call per base currency. Each API process does the same on a timer
+(FX_RATE_REFRESH_INTERVAL_SEC); this is the cron / one-off equivalent.
+
+With --import, instead stores a rate table from a CSV file with the header
+rate_date,from_currency,to_currency,rate (rate_date as YYYY-MM-DD) and never
+calls the provider; for tests and air-gapped runs (pair with FX_RATE_OFFLINE).
+Already-stored (date, pair) rows are kept.
+
+Usage:
+    PYTHONPATH=. poetry run python scripts/refresh_fx_rates.py [--date YYYY-MM-DD]
+    PYTHONPATH=. poetry run python scripts/refresh_fx_rates.py --import rates.csv
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import sys
+from datetime import date
+from decimal import Decimal
+from typing import Iterator, Tuple
+
+from varavu_selavu_service.db.session import SessionLocal
+from varavu_selavu_service.services.fx_rate_service import FxRateService
+
+
+def read_rate_table(path: str) -> Iterator[Tuple[date, str, str, Decimal]]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        for line_no, row in enumerate(csv.DictReader(fh), start=2):
+            try:
+                yield (
+                    date.fromisoformat(row["rate_date"].strip()),
+                    row["from_currency"].strip(),
+                    row["to_currency"].strip(),
+                    Decimal(row["rate"].strip()),
+                )
+            except Exception as exc:
+                raise SystemExit(f"{path}:{line_no}: bad rate row {row!r} ({exc})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--date", type=date.fromisoformat, help="rate date to load (default: today, UTC)")
+    parser.add_argument("--import", dest="import_path", metavar="CSV", help="store this rate table instead")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        svc = FxRateService(db)
+        if args.import_path:
+            inserted = svc.import_rates(read_rate_table(args.import_path))
+            print(f"imported {inserted} new rate(s) from {args.import_path}")
+            return
+        loaded = svc.refresh_active_currencies(args.date)
+
+    for base, count in loaded.items():
+        print(f"{base}: {count} rate(s)")
+    if any(count == 0 for count in loaded.values()):
+        print("FAIL: the provider returned no rates for some currencies.")
+        sys.exit(1)
+    if not loaded:
+        print("nothing to do: every active currency already has rates for that date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+scripts/run_insights_worker.py
+==============================
+Runs the insight aggregation outbox worker (InsightsOutboxWorker) as a process
+of its own, for deployments that set INSIGHTS_WORKER_IN_PROCESS=false so API
+workers never aggregate. Several copies may run at once: each claims its own
+outbox rows (FOR UPDATE SKIP LOCKED).
+
+With --once it drains the due outbox, prints the remaining lag and exits;
+otherwise it polls until SIGINT/SIGTERM and then drains for up to
+INSIGHTS_DRAIN_TIMEOUT_SEC before exiting.
+
+Usage:
+    PYTHONPATH=. poetry run python scripts/run_insights_worker.py [--once]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+import threading
+
+from varavu_selavu_service.core.config import Settings
+from varavu_selavu_service.db.session import SessionLocal
+from varavu_selavu_service.services.insights_outbox import InsightsOutboxWorker, lag
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="drain the due outbox once and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    worker = InsightsOutboxWorker(SessionLocal, Settings())
+    if args.once:
+        applied = worker.drain()
+        with SessionLocal() as db:
+            stats = lag(db)
+        print(f"applied {applied} event(s); {stats['pending']} pending, {stats['dead']} dead, lag {stats['lag_seconds']:.0f}s")
+        return
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    worker.run_forever(stop)
+
+
+if __name__ == "__main__":
+    main()
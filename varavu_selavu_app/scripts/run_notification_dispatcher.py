@@ -0,0 +1,57 @@
+"""
+scripts/run_notification_dispatcher.py
+======================================
+Runs the push-notification dispatcher (NotificationDispatcher) as a process of
+its own, for deployments that set NOTIFICATION_DISPATCHER_IN_PROCESS=false so
+API workers never send pushes. Several copies may run at once: each claims its
+own outbox rows (FOR UPDATE SKIP LOCKED).
+
+With --once it drains the due outbox, checks receipts once and exits; otherwise
+it polls until SIGINT/SIGTERM.
+
+Usage:
+    PYTHONPATH=. poetry run python scripts/run_notification_dispatcher.py [--once]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import signal
+import threading
+
+from varavu_selavu_service.core.config import Settings
+from varavu_selavu_service.db.session import SessionLocal
+from varavu_selavu_service.services.notification_dispatcher import NotificationDispatcher
+
+
+async def _run(once: bool) -> None:
+    async with NotificationDispatcher(SessionLocal, Settings()) as dispatcher:
+        if once:
+            total = 0
+            while True:
+                claimed = await dispatcher.run_once()
+                total += claimed
+                if claimed < dispatcher.CLAIM_SIZE:
+                    break
+            receipts = await dispatcher.check_receipts()
+            print(f"dispatched {total} event(s), resolved {receipts} receipt(s)")
+            return
+
+        stop = threading.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await dispatcher.run_forever(stop)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="drain the due outbox once and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    asyncio.run(_run(args.once))
+
+
+if __name__ == "__main__":
+    main()
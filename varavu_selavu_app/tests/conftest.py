@@ -1,7 +1,10 @@
+import asyncio
+import json
 import pytest
 import os
 import uuid
 from datetime import datetime
+import httpx
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -17,6 +20,7 @@ from varavu_selavu_service.main import app
 from varavu_selavu_service.db.session import Base, get_db
 from varavu_selavu_service.auth.security import auth_required
 from varavu_selavu_service.db.models import Expense, User, ExpenseItem, RecurringTemplate
+from varavu_selavu_service.services import spend_rollup_service
 
 from sqlalchemy import event
 
@@ -37,6 +41,8 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor.close()
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Spend rollups are maintained for the app's SessionLocal; tests' sessions come from here.
+spend_rollup_service.install(TestingSessionLocal)
 
 def override_get_db():
     try:
@@ -59,6 +65,13 @@ def test_app():
 def test_client(test_app):
     return TestClient(test_app)
 
+@pytest.fixture(autouse=True)
+def _inline_spend_rollup_builds(monkeypatch):
+    """Background rollup builds would share the single in-memory connection with
+    the test from another thread; run them at commit time instead."""
+    monkeypatch.setattr(spend_rollup_service, "_spawn", lambda fn: fn())
+
+
 @pytest.fixture(autouse=True)
 def _reset_rate_limiter():
     """Rate-limit counters are process-global; without this, tests that log in or
@@ -81,6 +94,26 @@ def _clear_analysis_cache():
     AnalysisService._CACHE.clear()
 
 
+@pytest.fixture(autouse=True)
+def _clear_fx_rate_cache():
+    """FxRateService._CACHE is process-wide, like the analysis cache above."""
+    from varavu_selavu_service.services.fx_rate_service import FxRateService
+
+    FxRateService._CACHE.clear()
+    yield
+    FxRateService._CACHE.clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_categorization():
+    """CategorizationService's LRU, counters and merchant rules are process-wide too."""
+    from varavu_selavu_service.services.categorization_service import CategorizationService
+
+    CategorizationService.reset()
+    yield
+    CategorizationService.reset()
+
+
 @pytest.fixture(scope="function")
 def db_session():
     # Create the db structure per test to ensure clean state
@@ -98,3 +131,97 @@ def db_session():
         db.close()
         # Drop all after test
         Base.metadata.drop_all(bind=engine)
+
+
+class FakeExpo:
+    """Expo's push API, served in-process through httpx.MockTransport. Records
+    every /send request; `failures` is a queue of status codes to answer /send
+    with before it starts succeeding; `ticket_errors` / `receipt_errors` map a
+    push token to the error code Expo reports for it on the ticket / receipt."""
+
+    def __init__(self):
+        self.requests = []
+        self.receipt_requests = []
+        self.failures = []
+        self.ticket_errors = {}
+        self.receipt_errors = {}
+        self._tickets = {}
+        self.transport = httpx.MockTransport(self._handle)
+
+    @property
+    def messages(self):
+        return [msg for batch in self.requests for msg in batch]
+
+    def _handle(self, request):
+        payload = json.loads(request.content)
+        if request.url.path.endswith("/getReceipts"):
+            self.receipt_requests.append(payload["ids"])
+            receipts = {}
+            for ticket_id in payload["ids"]:
+                error = self.receipt_errors.get(self._tickets.get(ticket_id))
+                receipts[ticket_id] = {"status": "error", "details": {"error": error}} if error else {"status": "ok"}
+            return httpx.Response(200, json={"data": receipts})
+        if self.failures:
+            return httpx.Response(self.failures.pop(0))
+        self.requests.append(payload)
+        tickets = []
+        for msg in payload:
+            error = self.ticket_errors.get(msg["to"])
+            if error:
+                tickets.append({"status": "error", "message": error, "details": {"error": error}})
+            else:
+                ticket_id = str(uuid.uuid4())
+                self._tickets[ticket_id] = msg["to"]
+                tickets.append({"status": "ok", "id": ticket_id})
+        return httpx.Response(200, json={"data": tickets})
+
+
+@pytest.fixture
+def fake_expo():
+    return FakeExpo()
+
+
+@pytest.fixture
+def dispatch_notifications(db_session, fake_expo):
+    """Runs one NotificationDispatcher pass against fake_expo; returns the number
+    of outbox events it claimed."""
+    from varavu_selavu_service.services.notification_dispatcher import NotificationDispatcher
+
+    def dispatch(**attrs):
+        dispatcher = NotificationDispatcher(TestingSessionLocal, transport=fake_expo.transport)
+        dispatcher.SEND_BACKOFF_SEC = 0
+        for name, value in attrs.items():
+            setattr(dispatcher, name, value)
+
+        async def run():
+            async with dispatcher:
+                return await dispatcher.run_once()
+
+        return asyncio.run(run())
+
+    return dispatch
+
+
+@pytest.fixture
+def apply_insights(db_session):
+    """Runs one InsightsOutboxWorker pass; returns the number of outbox events it
+    claimed."""
+    from varavu_selavu_service.services.insights_outbox import InsightsOutboxWorker
+
+    def apply(**attrs):
+        worker = InsightsOutboxWorker(TestingSessionLocal)
+        for name, value in attrs.items():
+            setattr(worker, name, value)
+        return worker.run_once()
+
+    return apply
+
+
+@pytest.fixture(autouse=True)
+def _reset_entity_index():
+    """EntityResolutionService's name/alias index is process-wide as well."""
+    from varavu_selavu_service.services.entity_resolution_service import EntityResolutionService
+
+    EntityResolutionService.reset_index()
+    yield
+    EntityResolutionService.reset_index()
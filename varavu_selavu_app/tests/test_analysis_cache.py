@@ -0,0 +1,126 @@
+import time
+import uuid
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from varavu_selavu_service.db.models import Expense, User
+from varavu_selavu_service.services.analysis_cache import LocalRedis, LRUCacheBackend, RedisCacheBackend
+from varavu_selavu_service.services.analysis_service import AnalysisService
+
+
+@pytest.fixture(params=["lru", "redis"])
+def backend(request):
+    if request.param == "lru":
+        return LRUCacheBackend(max_entries=100, max_bytes=1_000_000)
+    return RedisCacheBackend(LocalRedis())
+
+
+def test_generation_bump_only_invalidates_that_user(backend):
+    a_key = backend.entry_key("a@test.com", (2025, None))
+    b_key = backend.entry_key("b@test.com", (2025, None))
+    backend.set(a_key, {"total": 1.0}, 60)
+    backend.set(b_key, {"total": 2.0}, 60)
+
+    backend.bump_generation("a@test.com")
+
+    assert backend.get(backend.entry_key("a@test.com", (2025, None))) is None
+    assert backend.get(backend.entry_key("b@test.com", (2025, None))) == {"total": 2.0}
+
+
+def test_clear_drops_every_user(backend):
+    key = backend.entry_key("a@test.com", ())
+    backend.set(key, {"x": 1}, 60)
+    backend.clear()
+    assert backend.get(backend.entry_key("a@test.com", ())) is None
+
+
+def test_entries_expire_after_ttl(backend):
+    key = backend.entry_key("a@test.com", ())
+    backend.set(key, {"x": 1}, 1)
+    with patch("varavu_selavu_service.services.analysis_cache.time.time", return_value=time.time() + 5):
+        assert backend.get(key) is None
+
+
+def test_cached_values_are_copies(backend):
+    key = backend.entry_key("a@test.com", ())
+    backend.set(key, {"rows": [1, 2]}, 60)
+    backend.get(key)["rows"].append(3)
+    assert backend.get(key) == {"rows": [1, 2]}
+
+
+def test_lru_evicts_least_recently_used_past_entry_and_byte_bounds():
+    cache = LRUCacheBackend(max_entries=2, max_bytes=1_000_000)
+    cache.set("k1", {"v": 1}, 60)
+    cache.set("k2", {"v": 2}, 60)
+    cache.get("k1")
+    cache.set("k3", {"v": 3}, 60)
+    assert len(cache) == 2
+    assert cache.get("k2") is None
+    assert cache.get("k1") == {"v": 1}
+
+    small = LRUCacheBackend(max_entries=100, max_bytes=60)
+    small.set("a", {"pad": "x" * 20}, 60)
+    small.set("b", {"pad": "y" * 20}, 60)
+    assert small.size_bytes <= 60
+    assert small.get("a") is None
+    assert small.get("b") is not None
+    small.set("huge", {"pad": "z" * 100}, 60)
+    assert small.get("huge") is None
+
+
+def _add_expense(db_session, email, amount):
+    db_session.add(Expense(
+        id=uuid.uuid4(), user_email=email, purchased_at=datetime(2025, 1, 15), amount=amount,
+        category_id="Groceries", description="Market",
+    ))
+    db_session.commit()
+
+
+def test_one_users_write_keeps_other_users_cached_analysis(test_client, db_session):
+    db_session.add(User(id=uuid.uuid4(), email="other@test.com", password_hash="hash", name="Other"))
+    db_session.commit()
+    _add_expense(db_session, "other@test.com", 10.0)
+    svc = AnalysisService(db_session)
+    svc.analyze("other@test.com")
+    hits_before = AnalysisService._CACHE.stats()["hits"]
+
+    # test@user.com writes through the API — only their generation moves.
+    res = test_client.post("/api/v1/expenses", json={
+        "user_id": "test@user.com", "date": "01/16/2025", "description": "Lunch", "category": "Food", "cost": 12.5,
+    })
+    assert res.status_code in (200, 201), res.text
+
+    svc.analyze("other@test.com")
+    assert AnalysisService._CACHE.stats()["hits"] == hits_before + 1
+
+    # ...and the writer's own next read is fresh.
+    assert test_client.get("/api/v1/analysis").json()["total_expenses"] == 12.5
+    test_client.post("/api/v1/expenses", json={
+        "user_id": "test@user.com", "date": "01/17/2025", "description": "Dinner", "category": "Food", "cost": 7.5,
+    })
+    assert test_client.get("/api/v1/analysis").json()["total_expenses"] == 20.0
+
+
+def test_group_write_invalidates_every_member(db_session):
+    from varavu_selavu_service.db.models import Group, GroupMember
+
+    db_session.add(User(id=uuid.uuid4(), email="b@test.com", password_hash="hash", name="b"))
+    group = Group(id=uuid.uuid4(), name="Trip", created_by="test@user.com")
+    db_session.add(group)
+    db_session.flush()
+    db_session.add_all([
+        GroupMember(id=uuid.uuid4(), group_id=group.id, user_email="test@user.com", display_name="me"),
+        GroupMember(id=uuid.uuid4(), group_id=group.id, user_email="b@test.com", display_name="b"),
+    ])
+    db_session.commit()
+
+    svc = AnalysisService(db_session)
+    before = {e: AnalysisService._CACHE.generation(e) for e in ("test@user.com", "b@test.com", "c@test.com")}
+    svc.invalidate_group_cache(str(group.id))
+    after = {e: AnalysisService._CACHE.generation(e) for e in before}
+
+    assert after["test@user.com"] == before["test@user.com"] + 1
+    assert after["b@test.com"] == before["b@test.com"] + 1
+    assert after["c@test.com"] == before["c@test.com"]
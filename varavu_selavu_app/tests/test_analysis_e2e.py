@@ -55,3 +55,165 @@ def test_analysis_endpoint_e2e(test_client, db_session):
     data_filtered = resp.json()
     assert data_filtered["total_expenses"] == 45.5
     assert "Utilities" not in {c["category"] for c in data_filtered["category_totals"]}
+
+
+def _count_queries(db_session, fn):
+    from sqlalchemy import event
+
+    engine = db_session.get_bind()
+    count = {"n": 0}
+
+    def _on_execute(*_args, **_kwargs):
+        count["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _on_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_execute)
+    return result, count["n"]
+
+
+def _seed_personal(db_session, n):
+    categories = ["Groceries", "Dining", "Transport"]
+    rows = [
+        Expense(
+            id=uuid.uuid4(),
+            user_email="test@user.com",
+            purchased_at=datetime(2025, 1 + i % 4, 1 + i % 28, 12),
+            amount=round(1.01 + i * 0.37, 2),
+            category_id=categories[i % 3],
+            description=f"Expense {i}",
+        )
+        for i in range(n)
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+
+
+def test_personal_leg_single_scan_matches_five_query_baseline(db_session):
+    from scripts.bench_analysis_personal_leg import _legacy_personal_leg
+    from varavu_selavu_service.services.analysis_service import AnalysisService
+
+    _seed_personal(db_session, 60)
+    svc = AnalysisService(db_session)
+
+    # Rollup marker check + rollup read + detail read, plus one raw scan for the
+    # edges unless the filter is exactly whole months.
+    for year, month, start, end, expected_queries in [
+        (None, None, None, None, 4), (2025, 2, None, None, 3), (None, None, "2025-01-10", "2025-03-05", 4),
+    ]:
+        legacy = _legacy_personal_leg(svc, "test@user.com", year, month, start, end, True)
+        leg, queries = _count_queries(
+            db_session, lambda: svc._compute_personal_leg("test@user.com", year, month, start, end, True)
+        )
+        assert queries == expected_queries
+        assert sorted(leg["category_totals"], key=lambda c: c["category"]) == sorted(legacy["category_totals"], key=lambda c: c["category"])
+        assert leg["monthly_trend"] == legacy["monthly_trend"]
+        assert leg["total"] == legacy["total"]
+        assert leg["row_count"] == legacy["row_count"]
+        for cat, rows in legacy["category_expense_details"].items():
+            assert sorted(r["description"] for r in leg["category_expense_details"][cat]) == sorted(r["description"] for r in rows)
+
+
+def test_personal_leg_details_are_optional(db_session):
+    from varavu_selavu_service.services.analysis_service import AnalysisService
+
+    _seed_personal(db_session, 30)
+    svc = AnalysisService(db_session)
+
+    summary, queries = _count_queries(
+        db_session, lambda: svc._compute_personal_leg("test@user.com", None, None, None, None, True, include_details=False)
+    )
+    assert queries == 3  # rollup marker, rollup cells, undated rows
+    assert summary["row_count"] == 30
+    assert summary["category_expense_details"] == {}
+
+    detailed = svc._compute_personal_leg("test@user.com", None, None, None, None, True)
+    seen = [r["description"] for rows in detailed["category_expense_details"].values() for r in rows]
+    assert len(set(seen)) == 30
+
+
+def test_analysis_include_details_false_keeps_aggregates_and_drops_rows(test_client, db_session):
+    _seed_personal(db_session, 20)
+
+    full = test_client.get("/api/v1/analysis?include_details=true").json()
+    summary = test_client.get("/api/v1/analysis?include_details=false").json()
+
+    assert summary["category_expense_details"] == {}
+    assert sum(len(v) for v in full["category_expense_details"].values()) == 20
+    for key in ("category_totals", "monthly_trend", "total_expenses", "top_categories"):
+        assert summary[key] == full[key]
+
+
+def test_analysis_details_pages_through_a_category_newest_first(test_client, db_session):
+    _seed_personal(db_session, 30)
+    # Same-day rows and an undated row exercise the (purchased_at, id) tie-break
+    # and NULLs-last ordering.
+    db_session.add_all([
+        Expense(id=uuid.uuid4(), user_email="test@user.com", purchased_at=datetime(2025, 1, 1, 12),
+                amount=5.0, category_id="Groceries", description="Tie A"),
+        Expense(id=uuid.uuid4(), user_email="test@user.com", purchased_at=datetime(2025, 1, 1, 12),
+                amount=6.0, category_id="Groceries", description="Tie B"),
+        Expense(id=uuid.uuid4(), user_email="test@user.com", purchased_at=None,
+                amount=7.0, category_id="Groceries", description="Undated"),
+    ])
+    db_session.commit()
+
+    expected = test_client.get("/api/v1/analysis?use_cache=false").json()["category_expense_details"]["Groceries"]
+
+    items, cursor, pages = [], None, 0
+    while True:
+        url = "/api/v1/analysis/details?category=Groceries&limit=4"
+        res = test_client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert res.status_code == 200, res.text
+        body = res.json()
+        items.extend(body["items"])
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 4  # 13 rows at 4 per page
+    assert len(items) == len(expected) == 13
+    assert sorted(r["description"] for r in items) == sorted(r["description"] for r in expected)
+    dated = [r["date"] for r in items if r["date"]]
+    assert dated == sorted(dated, reverse=True)
+    assert items[-1]["description"] == "Undated"
+
+    filtered = test_client.get("/api/v1/analysis/details?category=Groceries&year=2025&month=2&limit=50").json()
+    assert filtered["next_cursor"] is None
+    assert all(r["date"].startswith("2025-02") for r in filtered["items"])
+
+
+def test_analysis_details_rejects_a_malformed_cursor(test_client):
+    res = test_client.get("/api/v1/analysis/details?category=Groceries&cursor=not-a-cursor")
+    assert res.status_code == 400
+
+
+def test_analysis_details_combined_scope_merges_my_share_rows(test_client, db_session, monkeypatch):
+    from varavu_selavu_service.db.models import GroupMember, User
+
+    monkeypatch.setenv("GROUPS_ENABLED", "true")
+    db_session.add(User(id=uuid.uuid4(), email="b@test.com", password_hash="hash", name="b"))
+    db_session.commit()
+    group_id = test_client.post("/api/v1/groups", json={"name": "Trip"}).json()["group_id"]
+    b_id = test_client.post(f"/api/v1/groups/{group_id}/members", json={"email": "b@test.com"}).json()["member_id"]
+    me_id = str(db_session.query(GroupMember.id).filter(
+        GroupMember.group_id == uuid.UUID(group_id), GroupMember.user_email == "test@user.com"
+    ).scalar())
+    res = test_client.post(f"/api/v1/groups/{group_id}/expenses", json={
+        "date": "03/15/2025", "description": "Shared groceries", "category": "Groceries", "amount": 40.0,
+        "payers": [{"member_id": b_id, "amount_paid": 40.0}],
+        "split": {"type": "equal", "entries": [{"member_id": me_id}, {"member_id": b_id}]},
+    })
+    assert res.status_code == 201, res.text
+    _seed_personal(db_session, 6)
+
+    expected = test_client.get("/api/v1/analysis?scope=combined&use_cache=false").json()["category_expense_details"]["Groceries"]
+    first = test_client.get("/api/v1/analysis/details?category=Groceries&scope=combined&limit=2").json()
+    rest = test_client.get(f"/api/v1/analysis/details?category=Groceries&scope=combined&limit=50&cursor={first['next_cursor']}").json()
+    items = first["items"] + rest["items"]
+
+    assert sorted((r["description"], r["cost"]) for r in items) == sorted((r["description"], r["cost"]) for r in expected)
+    assert ("Shared groceries", 20.0) in [(r["description"], r["cost"]) for r in items]
@@ -1,8 +1,11 @@
+import json
 import uuid
 
-from varavu_selavu_service.db.models import CanonicalItem, CanonicalMerchant, ItemInsight, MerchantInsight
+from sqlalchemy.orm import sessionmaker
+
+from varavu_selavu_service.db.models import CanonicalItem, CanonicalMerchant, ItemInsight, MerchantInsight, User
 from varavu_selavu_service.services.entity_resolution_service import EntityResolutionService
-from scripts.backfill_entity_resolution import backfill_items, backfill_merchants
+from scripts.backfill_entity_resolution import Checkpoint, backfill_items, backfill_merchants, backfill_parallel
 
 
 def test_backfill_merchants_links_exact_match(db_session):
@@ -68,10 +71,11 @@ def test_backfill_items_skips_already_linked_rows(db_session):
 def test_backfill_items_batches_commits(db_session):
     rows = [
         ItemInsight(
-            id=uuid.uuid4(), user_email="test@user.com", normalized_name=f"item {i}",
+            id=uuid.uuid4(), user_email="test@user.com", normalized_name=name,
             canonical_item_id=None, total_spent=1,
         )
-        for i in range(3)
+        # Dissimilar names: "item 0"/"item 1" would (correctly) be tier-4 suggestions of each other.
+        for name in ("apple", "bread", "cheese")
     ]
     db_session.add_all(rows)
     db_session.commit()
@@ -84,3 +88,32 @@ def test_backfill_items_batches_commits(db_session):
     for row in rows:
         db_session.refresh(row)
         assert row.canonical_item_id is not None
+
+
+def test_parallel_backfill_checkpoints_finished_users(db_session, tmp_path):
+    db_session.add(User(id=uuid.uuid4(), email="other@test.com", password_hash="hash", name="Other"))
+    db_session.commit()
+    rows = {
+        email: MerchantInsight(
+            id=uuid.uuid4(), user_email=email, merchant_name="Corner Deli", canonical_merchant_id=None, total_spent=5,
+        )
+        for email in ("test@user.com", "other@test.com")
+    }
+    db_session.add_all(rows.values())
+    db_session.commit()
+
+    path = tmp_path / "checkpoint.json"
+    path.write_text(json.dumps({"merchant": ["other@test.com"]}))  # finished by an earlier run
+    session_factory = sessionmaker(bind=db_session.get_bind())
+    stats = backfill_parallel(session_factory, "merchant", batch_size=500, workers=1, checkpoint=Checkpoint(str(path)))
+
+    assert stats["users"] == 1
+    assert stats["linked"] == 1
+    assert json.loads(path.read_text())["merchant"] == ["other@test.com", "test@user.com"]
+    db_session.expire_all()
+    assert rows["test@user.com"].canonical_merchant_id is not None
+    assert rows["other@test.com"].canonical_merchant_id is None
+
+    # Everyone is checkpointed now: a rerun does nothing.
+    again = backfill_parallel(session_factory, "merchant", batch_size=500, workers=1, checkpoint=Checkpoint(str(path)))
+    assert again["users"] == 0
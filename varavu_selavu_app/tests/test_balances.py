@@ -306,6 +306,37 @@ def test_simplified_debts_greedy_netting(test_client, db_session):
     assert transfers[0]["amount"] == 100.0
 
 
+def test_simplified_debts_use_fewest_transfers_unless_greedy_configured(test_client, db_session, monkeypatch):
+    from varavu_selavu_service.db.models import Group
+    group_id, m = _make_group_with_members(
+        test_client, db_session, ["b@test.com", "c@test.com", "d@test.com", "e@test.com"]
+    )
+    a, b, c, d, e = (m[k] for k in ["test@user.com", "b@test.com", "c@test.com", "d@test.com", "e@test.com"])
+
+    # Nets: a -3, b -4, c -5, d +7, e +5.
+    test_client.post(f"/api/v1/groups/{group_id}/expenses", json={
+        "date": "01/01/2026", "description": "1", "category": "Food", "amount": 7.0,
+        "payers": [{"member_id": d, "amount_paid": 7.0}],
+        "split": {"type": "exact", "entries": [{"member_id": a, "value": 3.0}, {"member_id": b, "value": 4.0}]}
+    })
+    test_client.post(f"/api/v1/groups/{group_id}/expenses", json={
+        "date": "01/02/2026", "description": "2", "category": "Food", "amount": 5.0,
+        "payers": [{"member_id": e, "amount_paid": 5.0}],
+        "split": {"type": "exact", "entries": [{"member_id": c, "value": 5.0}]}
+    })
+    group = db_session.query(Group).filter(Group.id == uuid.UUID(group_id)).first()
+    group.simplify_debts = True
+    db_session.commit()
+
+    transfers = test_client.get(f"/api/v1/groups/{group_id}/balances").json()["transfers"]
+    assert len(transfers) == 3
+    assert {"from_member_id": c, "to_member_id": e, "amount": 5.0} in transfers
+
+    monkeypatch.setenv("DEBT_SIMPLIFY_MODE", "greedy")
+    transfers = test_client.get(f"/api/v1/groups/{group_id}/balances").json()["transfers"]
+    assert len(transfers) == 4
+
+
 # ----------------------------------------------------------------------
 # List-vs-detail balance consistency.
 # GET /groups used to hardcode my_balance=0.0 ("settled up") while
@@ -471,3 +502,79 @@ def test_list_my_balance_respects_expense_currency_fx(test_client, db_session):
         test_client, group_id, m["test@user.com"]
     )
 
+
+
+# ----------------------------------------------------------------------
+# Set-based pairwise transfers: constant query count, same cents as the
+# per-expense loop it replaced.
+# ----------------------------------------------------------------------
+
+
+def _add_three_payer_expense(test_client, group_id, m, amount):
+    third = round(amount / 3, 2)
+    res = test_client.post(
+        f"/api/v1/groups/{group_id}/expenses",
+        json={
+            "date": "01/15/2026",
+            "description": "Odd split",
+            "category": "Food",
+            "amount": amount,
+            "payers": [
+                {"member_id": m["test@user.com"], "amount_paid": third},
+                {"member_id": m["b@test.com"], "amount_paid": third},
+                {"member_id": m["c@test.com"], "amount_paid": round(amount - 2 * third, 2)},
+            ],
+            "split": {"type": "equal", "entries": [{"member_id": m[e]} for e in m]},
+        },
+    )
+    assert res.status_code == 201, res.text
+
+
+def _count_queries(db_session, fn):
+    from sqlalchemy import event
+
+    engine = db_session.get_bind()
+    count = {"n": 0}
+
+    def _on_execute(*_args, **_kwargs):
+        count["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _on_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_execute)
+    return result, count["n"]
+
+
+def test_pairwise_transfers_query_count_independent_of_expense_count(test_client, db_session):
+    from varavu_selavu_service.services.balance_service import BalanceService
+
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com", "c@test.com", "d@test.com"])
+    gid = uuid.UUID(group_id)
+
+    _add_three_payer_expense(test_client, group_id, m, 10.00)
+    _, few = _count_queries(db_session, lambda: BalanceService(db_session)._pairwise_transfers(gid))
+
+    for cents in range(1001, 1013):
+        _add_three_payer_expense(test_client, group_id, m, cents / 100)
+    _, many = _count_queries(db_session, lambda: BalanceService(db_session)._pairwise_transfers(gid))
+
+    assert few == many
+
+
+def test_pairwise_transfers_match_per_expense_baseline_to_the_cent(test_client, db_session):
+    from scripts.bench_pairwise_transfers import _legacy_pairwise_transfers
+    from varavu_selavu_service.services.balance_service import BalanceService
+
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com", "c@test.com", "d@test.com"])
+    for cents in (1000, 1001, 3337, 9999, 12345):
+        _add_three_payer_expense(test_client, group_id, m, cents / 100)
+    test_client.post(
+        f"/api/v1/groups/{group_id}/settlements",
+        json={"from_member_id": m["d@test.com"], "to_member_id": m["b@test.com"], "amount": 7.77},
+    )
+
+    db_session.expire_all()
+    gid = uuid.UUID(group_id)
+    assert BalanceService(db_session)._pairwise_transfers(gid) == _legacy_pairwise_transfers(db_session, gid)
@@ -0,0 +1,163 @@
+"""CategorizationService answers from its LRU, the rule pre-classifier and the
+categorization_cache table before ever calling the LLM."""
+import json
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from varavu_selavu_service.db.models import CanonicalMerchant, CategorizationCacheEntry, EntityAlias
+from varavu_selavu_service.services.categorization_rules import MERCHANT_CATEGORIES, RuleClassifier
+from varavu_selavu_service.services.categorization_service import CATEGORY_GROUPS, CategorizationService
+
+
+@pytest.fixture
+def seeded_merchants(db_session):
+    for canonical_name, display_name, aliases in [
+        ("starbucks", "Starbucks", ["sbux"]),
+        ("shell", "Shell", []),
+        ("bp", "BP", []),
+        ("uber eats", "Uber Eats", ["ubereats"]),
+        ("uber", "Uber", []),
+        ("total wine and more", "Total Wine & More", ["total wine"]),
+    ]:
+        merchant = CanonicalMerchant(
+            id=uuid.uuid4(), canonical_name=canonical_name, display_name=display_name, is_global=True
+        )
+        db_session.add(merchant)
+        db_session.flush()
+        for alias in aliases:
+            db_session.add(EntityAlias(id=uuid.uuid4(), entity_type="merchant", entity_id=merchant.id, raw_key=alias, source="seed"))
+    db_session.commit()
+
+
+@pytest.mark.parametrize("description, expected", [
+    ("STARBUCKS #1234 Seattle", ("Food & Drink", "Dining out", "Starbucks")),
+    ("sbux latte", ("Food & Drink", "Dining out", "Starbucks")),
+    ("Uber Eats - dinner", ("Food & Drink", "Dining out", "Uber Eats")),
+    ("uber to the airport", ("Transportation", "Taxi", "Uber")),
+    ("Total Wine", ("Food & Drink", "Liquor", "Total Wine & More")),
+    ("BP", ("Transportation", "Gas/fuel", "BP")),
+    ("Groceries", ("Food & Drink", "Groceries", None)),
+    ("monthly rent", ("Home", "Rent", None)),
+    ("Parking fee", ("Transportation", "Parking", None)),
+    ("electricity bill", ("Utilities", "Electricity", None)),
+])
+def test_confident_descriptions_never_reach_the_llm(db_session, seeded_merchants, description, expected):
+    with patch.object(CategorizationService, "llm_classify") as llm:
+        assert CategorizationService(db_session).classify(description) == expected
+        llm.assert_not_called()
+
+
+@pytest.mark.parametrize("description", [
+    "joe's diner",  # unknown word: may be a merchant
+    "car insurance",  # keywords disagree
+    "gas",  # Gas/fuel or Heat/gas
+    "sea shell necklace",  # one-word merchant names only count first
+    "bp ticket",  # very short names only count alone
+    "shell rent",  # merchant and keyword disagree
+])
+def test_ambiguous_descriptions_go_to_the_llm(db_session, seeded_merchants, description):
+    with patch.object(CategorizationService, "llm_classify", return_value=("Other", "Services", None)) as llm:
+        assert CategorizationService(db_session).classify(description) == ("Other", "Services", None)
+        llm.assert_called_once()
+
+
+def test_llm_answers_are_stored_and_reused(db_session):
+    answer = ("Food & Drink", "Dining out", "Joe's Diner")
+    with patch.object(CategorizationService, "llm_classify", return_value=answer) as llm:
+        assert CategorizationService(db_session).classify("Joe's Diner") == answer
+        assert CategorizationService(db_session).classify("  JOE'S diner!") == answer
+        llm.assert_called_once()
+    assert db_session.query(CategorizationCacheEntry).one().description_key == "joe s diner"
+
+    # Another process (empty LRU) reads the stored answer.
+    CategorizationService._CACHE.clear()
+    with patch.object(CategorizationService, "llm_classify") as llm:
+        assert CategorizationService(db_session).classify("joe's diner") == answer
+        llm.assert_not_called()
+
+    counts = {s: v["count"] for s, v in CategorizationService.stats()["sources"].items()}
+    assert counts == {"memory": 1, "rule": 0, "db": 1, "llm": 1, "fallback": 0}
+
+
+def test_fallback_is_not_cached(db_session):
+    with patch.object(CategorizationService, "llm_classify", return_value=None) as llm:
+        assert CategorizationService(db_session).classify("mystery payment") == ("Other", "General", None)
+        assert CategorizationService(db_session).classify("mystery payment") == ("Other", "General", None)
+        assert llm.call_count == 2
+    assert db_session.query(CategorizationCacheEntry).count() == 0
+    assert CategorizationService.stats()["hit_rate"] == 0.0
+
+
+def test_hit_rate_counts_local_answers(db_session, seeded_merchants):
+    with patch.object(CategorizationService, "llm_classify", return_value=("Life", "Gifts", None)):
+        svc = CategorizationService(db_session)
+        for description in ["starbucks", "starbucks", "groceries", "birthday surprise"]:
+            svc.classify(description)
+    stats = CategorizationService.stats()
+    assert stats["requests"] == 4
+    assert stats["hit_rate"] == 0.75
+    assert {s: v["count"] for s, v in stats["sources"].items()} == {
+        "memory": 1, "rule": 2, "db": 0, "llm": 1, "fallback": 0,
+    }
+
+
+def test_rule_tables_use_real_categories():
+    for main, sub in [*MERCHANT_CATEGORIES.values(), *RuleClassifier(CATEGORY_GROUPS).keywords.values()]:
+        assert sub in CATEGORY_GROUPS[main]
+
+
+def _fake_batch_llm(calls):
+    def generate(self, prompt):
+        entries = json.loads(prompt.split("Descriptions: ", 1)[1])
+        calls.append([e["description"] for e in entries])
+        return json.dumps({"results": [
+            {"index": e["index"], "main_category": "Other", "subcategory": "Services", "merchant_name": e["description"].title()}
+            for e in entries
+            if e["description"] != "skip me"
+        ]})
+    return generate
+
+
+def test_batch_dedupes_and_packs_novel_descriptions(db_session, seeded_merchants, monkeypatch):
+    monkeypatch.setenv("CATEGORIZE_BATCH_SIZE", "2")
+    calls = []
+    descriptions = ["acme plumbing", "starbucks", "ACME Plumbing!", "zed tailoring", "lumen co", "skip me"]
+    with patch.object(CategorizationService, "_generate", _fake_batch_llm(calls)):
+        results = CategorizationService(db_session).classify_many(descriptions)
+
+    assert results == [
+        ("Other", "Services", "Acme Plumbing"),
+        ("Food & Drink", "Dining out", "Starbucks"),
+        ("Other", "Services", "Acme Plumbing"),
+        ("Other", "Services", "Zed Tailoring"),
+        ("Other", "Services", "Lumen Co"),
+        ("Other", "General", None),
+    ]
+    # Four novel descriptions, two per prompt; the duplicate and the merchant never reach the model.
+    assert sorted(d for call in calls for d in call) == ["acme plumbing", "lumen co", "skip me", "zed tailoring"]
+    assert all(len(call) == 2 for call in calls)
+    assert db_session.query(CategorizationCacheEntry).count() == 3  # the unanswered one is not stored
+
+    calls.clear()
+    with patch.object(CategorizationService, "_generate", _fake_batch_llm(calls)):
+        assert CategorizationService(db_session).classify_many(["lumen co", "skip me"])[0][2] == "Lumen Co"
+    assert calls == [["skip me"]]
+
+
+def test_batch_endpoint_returns_results_in_order(test_client, db_session):
+    gifts = lambda descriptions: [("Life", "Gifts", None)] * len(descriptions)  # noqa: E731
+    with patch.object(CategorizationService, "llm_classify_batch", side_effect=gifts) as batch:
+        res = test_client.post(
+            "/api/v1/categorize/batch", json={"descriptions": ["groceries", "birthday flowers", "groceries"]}
+        )
+    assert res.status_code == 200, res.text
+    assert res.json()["results"] == [
+        {"description": "groceries", "main_category": "Food & Drink", "subcategory": "Groceries", "merchant_name": None},
+        {"description": "birthday flowers", "main_category": "Life", "subcategory": "Gifts", "merchant_name": None},
+        {"description": "groceries", "main_category": "Food & Drink", "subcategory": "Groceries", "merchant_name": None},
+    ]
+    batch.assert_called_once_with(["birthday flowers"])
+
+    assert test_client.post("/api/v1/categorize/batch", json={"descriptions": []}).status_code == 422
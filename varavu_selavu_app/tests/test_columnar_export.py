@@ -0,0 +1,129 @@
+"""Parquet / Arrow IPC exports: one zip member per table, typed columns, batched
+row groups, and the same scoping as the CSV exports."""
+import io
+import os
+import uuid
+import zipfile
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from varavu_selavu_service.auth.security import auth_required  # noqa: E402
+from varavu_selavu_service.db.models import Expense, ExpenseItem, GroupMember, User  # noqa: E402
+from varavu_selavu_service.main import app  # noqa: E402
+from varavu_selavu_service.services.columnar_export_service import ColumnarExportService  # noqa: E402
+
+ME = "test@user.com"
+
+
+@pytest.fixture(autouse=True)
+def _groups_enabled():
+    old_val = os.environ.get("GROUPS_ENABLED")
+    os.environ["GROUPS_ENABLED"] = "true"
+    try:
+        yield
+    finally:
+        if old_val is not None:
+            os.environ["GROUPS_ENABLED"] = old_val
+        else:
+            os.environ.pop("GROUPS_ENABLED", None)
+
+
+def _tables(body: bytes, fmt: str) -> dict:
+    tables = {}
+    with zipfile.ZipFile(io.BytesIO(body)) as zf:
+        for name in zf.namelist():
+            data = zf.read(name)
+            table = pq.read_table(io.BytesIO(data)) if fmt == "parquet" else pa.ipc.open_file(data).read_all()
+            tables[name.rsplit(".", 1)[0]] = table
+    return tables
+
+
+def _add_expense(db_session, when, amount="12.34", email=ME, items=0):
+    eid = uuid.uuid4()
+    db_session.add(Expense(id=eid, user_email=email, purchased_at=when, category_id="Food",
+                           amount=Decimal(amount), description="x"))
+    for n in range(items):
+        db_session.add(ExpenseItem(id=uuid.uuid4(), expense_id=eid, line_no=n + 1, item_name=f"item{n}",
+                                   quantity=Decimal("2"), unit_price=Decimal("1.25"), line_total=Decimal("2.50")))
+    db_session.commit()
+    return eid
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_personal_export_is_typed_and_scoped(test_client, db_session, fmt):
+    db_session.add(User(id=uuid.uuid4(), email="other@test.com", password_hash="h", name="O"))
+    db_session.commit()
+    mine = _add_expense(db_session, datetime(2026, 2, 10, 9), items=2)
+    _add_expense(db_session, datetime(2026, 3, 10, 9))
+    _add_expense(db_session, datetime(2026, 2, 11, 9), email="other@test.com", items=1)
+
+    res = test_client.get(f"/api/v1/expenses/export.{fmt}.zip", params={"start_date": "02/01/2026", "end_date": "02/28/2026"})
+    assert res.status_code == 200, res.text
+    assert res.headers["content-type"] == "application/zip"
+    tables = _tables(res.content, fmt)
+    assert set(tables) == {"expenses", "expense_items"}
+
+    expenses, items = tables["expenses"], tables["expense_items"]
+    assert expenses.column("id").to_pylist() == [str(mine)]
+    assert expenses.schema.field("amount").type == pa.decimal128(12, 2)
+    assert expenses.column("amount").to_pylist() == [Decimal("12.34")]
+    assert expenses.schema.field("purchased_at").type == pa.timestamp("us", tz="UTC")
+    assert items.num_rows == 2
+    assert items.column("line_total").to_pylist() == [Decimal("2.50")] * 2
+
+
+def test_unknown_format_is_rejected(test_client, db_session):
+    assert test_client.get("/api/v1/expenses/export.xlsx.zip").status_code == 422
+
+
+def test_rows_are_written_in_batches(db_session):
+    for day in range(1, 8):
+        _add_expense(db_session, datetime(2026, 1, day, 12))
+    svc = ColumnarExportService(db_session)
+    svc.BATCH_SIZE = 3
+    body = b"".join(svc.export_personal(ME, "parquet"))
+    with zipfile.ZipFile(io.BytesIO(body)) as zf:
+        meta = pq.ParquetFile(io.BytesIO(zf.read("expenses.parquet"))).metadata
+    assert (meta.num_rows, meta.num_row_groups) == (7, 3)
+
+
+def test_group_export_covers_the_ledger_tables(test_client, db_session):
+    db_session.add(User(id=uuid.uuid4(), email="friend@test.com", password_hash="h", name="Friend"))
+    db_session.commit()
+    group_id = test_client.post("/api/v1/groups", json={"name": "Trip"}).json()["group_id"]
+    friend_id = test_client.post(f"/api/v1/groups/{group_id}/members", json={"email": "friend@test.com"}).json()["member_id"]
+    me_id = str(db_session.query(GroupMember.id).filter(
+        GroupMember.group_id == uuid.UUID(group_id), GroupMember.user_email == ME
+    ).scalar())
+    res = test_client.post(f"/api/v1/groups/{group_id}/expenses", json={
+        "date": "01/15/2026", "description": "Dinner", "category": "Food", "amount": 60.00,
+        "payers": [{"member_id": me_id, "amount_paid": 60.00}],
+        "split": {"type": "equal", "entries": [{"member_id": me_id}, {"member_id": friend_id}]},
+    })
+    assert res.status_code == 201, res.text
+    test_client.post(f"/api/v1/groups/{group_id}/settlements",
+                     json={"from_member_id": friend_id, "to_member_id": me_id, "amount": 30.00})
+
+    res = test_client.get(f"/api/v1/groups/{group_id}/export.arrow.zip")
+    assert res.status_code == 200, res.text
+    tables = _tables(res.content, "arrow")
+    assert {name: t.num_rows for name, t in tables.items()} == {
+        "expenses": 1, "expense_items": 0, "expense_payers": 1, "expense_splits": 2, "settlements": 1,
+    }
+    assert tables["expense_splits"].column("amount_owed").to_pylist() == [Decimal("30.00")] * 2
+    assert tables["settlements"].column("amount").to_pylist() == [Decimal("30.00")]
+
+    old = app.dependency_overrides.get(auth_required)
+    app.dependency_overrides[auth_required] = lambda: "friend@test.com"
+    try:
+        assert test_client.get(f"/api/v1/groups/{group_id}/export.parquet.zip").status_code == 200
+        app.dependency_overrides[auth_required] = lambda: "stranger@test.com"
+        assert test_client.get(f"/api/v1/groups/{group_id}/export.parquet.zip").status_code in (403, 404)
+    finally:
+        app.dependency_overrides[auth_required] = old
@@ -0,0 +1,91 @@
+"""services/date_scope.py: every analytics date parameter combination becomes a
+half-open purchased_at range, never a per-row extract()/strftime()."""
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from varavu_selavu_service.db.models import Expense
+from varavu_selavu_service.services.analysis_service import AnalysisService
+from varavu_selavu_service.services.date_scope import DateScope, month_block
+from varavu_selavu_service.services.insight_analytics_service import InsightAnalyticsService
+from varavu_selavu_service.services.personal_export_service import PersonalExportService
+
+ME = "test@user.com"
+
+
+def _sql(clauses, dialect) -> str:
+    stmt = select(Expense.id).where(*clauses)
+    return str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True})).lower()
+
+
+def test_params_resolve_to_half_open_ranges():
+    assert DateScope.from_params(year=2025) == DateScope(date(2025, 1, 1), date(2026, 1, 1))
+    assert DateScope.from_params(year=2025, month=12) == DateScope(date(2025, 12, 1), date(2026, 1, 1))
+    # end_date covers its whole day.
+    assert DateScope.from_params(start_date="2025-01-10", end_date="2025-03-05") == DateScope(date(2025, 1, 10), date(2025, 3, 6))
+    # Analysis applies every parameter; insights let explicit dates win.
+    assert DateScope.from_params(2025, 3, "2025-03-10", "2025-05-01") == DateScope(date(2025, 3, 10), date(2025, 4, 1))
+    assert DateScope.from_params(2025, 3, "2025-03-10", "2025-05-01", dates_take_precedence=True) == DateScope(
+        date(2025, 3, 10), date(2025, 5, 2)
+    )
+    assert DateScope.from_params(month=3) == DateScope(month_of_year=3)
+    assert DateScope.from_params() == DateScope()
+
+
+def test_month_block_keeps_only_whole_months():
+    assert month_block(date(2025, 1, 1), date(2025, 4, 1)) == (date(2025, 1, 1), date(2025, 4, 1))
+    assert month_block(date(2025, 1, 10), date(2025, 3, 5)) == (date(2025, 2, 1), date(2025, 3, 1))
+    assert month_block(date(2025, 1, 10), date(2025, 2, 20)) is None
+    assert month_block(None, date(2025, 3, 5)) == (None, date(2025, 3, 1))
+    assert month_block(date(2025, 12, 2), None) == (date(2026, 1, 1), None)
+
+    assert DateScope.from_params(year=2025, month=2).month_block() == ((date(2025, 2, 1), date(2025, 3, 1)), True)
+    assert DateScope.from_params(start_date="2025-01-10", end_date="2025-03-31").month_block() == (
+        (date(2025, 2, 1), date(2025, 4, 1)), False
+    )
+    assert DateScope().month_block() == ((None, None), False)
+    assert DateScope(month_of_year=3).month_block() is None
+
+
+def test_filters_are_plain_range_comparisons_on_both_dialects():
+    scope = DateScope.from_params(year=2025, month=3)
+    for dialect in (sqlite.dialect(), postgresql.dialect()):
+        sql = _sql(scope.filters(Expense.purchased_at), dialect)
+        assert "purchased_at >= '2025-03-01'" in sql and "purchased_at < '2025-04-01'" in sql
+        assert "extract" not in sql and "strftime" not in sql
+
+    svc = AnalysisService.__new__(AnalysisService)
+    analysis_sql = _sql(svc._date_filters(Expense.purchased_at, 2025, 3, None, None), sqlite.dialect())
+    insights_sql = _sql(InsightAnalyticsService(None)._build_date_filters(year=2025, month=3), postgresql.dialect())
+    assert "strftime" not in analysis_sql and "extract" not in insights_sql
+
+
+def test_range_bounds_select_the_same_rows_as_calendar_fields(db_session):
+    for when in [
+        datetime(2025, 2, 28, 23, 59, 59), datetime(2025, 3, 1, 0, 0), datetime(2025, 3, 31, 23, 59, 59),
+        datetime(2025, 4, 1, 0, 0), None,
+    ]:
+        db_session.add(Expense(id=uuid.uuid4(), user_email=ME, purchased_at=when, amount=1, category_id="Misc", description="x"))
+    db_session.commit()
+
+    svc = AnalysisService(db_session)
+    march = svc.analyze(ME, year=2025, month=3, use_cache=False, include_details=False)
+    assert march["filter_info"]["row_count"] == 2
+    # The last day of an explicit range counts in full.
+    ranged = svc.analyze(ME, start_date="2025-03-01", end_date="2025-03-31", use_cache=False, include_details=False)
+    assert ranged["total_expenses"] == march["total_expenses"] == 2.0
+
+    csv_text = "".join(PersonalExportService(db_session).export_csv(ME, start_date="03/01/2025", end_date="03/31/2025"))
+    assert len(csv_text.strip().splitlines()) == 3
+
+
+def test_sqlite_plans_a_range_search_on_purchased_at(db_session):
+    scope = DateScope.from_params(year=2025, month=3)
+    stmt = select(func.count()).select_from(Expense).where(*scope.filters(Expense.purchased_at))
+    compiled = stmt.compile(
+        dialect=db_session.get_bind().dialect, schema_translate_map={"trackspense": None}, compile_kwargs={"literal_binds": True}
+    )
+    plan = " ".join(str(r[-1]) for r in db_session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+    assert "SEARCH" in plan and "purchased_at>" in plan.replace(" ", ""), plan
@@ -0,0 +1,111 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from varavu_selavu_service.services.debt_simplification import (
+    DebtSimplificationError,
+    greedy_transfers,
+    optimal_transfers,
+    simplify_debts,
+)
+
+
+def _nets(**amounts):
+    return {m: Decimal(str(v)) for m, v in amounts.items()}
+
+
+def _assert_settles(nets, transfers):
+    remaining = dict(nets)
+    for t in transfers:
+        assert t["amount"] > 0
+        remaining[t["from_member_id"]] += t["amount"]
+        remaining[t["to_member_id"]] -= t["amount"]
+    assert all(v == 0 for v in remaining.values())
+
+
+def _brute_force_min_transfers(values):
+    """n - (max disjoint zero-sum subsets), by exhaustive search."""
+    values = [v for v in values if v]
+    n = len(values)
+    memo = {}
+
+    def pieces(mask):
+        if mask == 0:
+            return 0
+        if mask in memo:
+            return memo[mask]
+        low = mask & -mask
+        best = 0
+        sub = mask
+        while sub:
+            if sub & low and sum(values[i] for i in range(n) if sub >> i & 1) == 0:
+                best = max(best, 1 + pieces(mask ^ sub))
+            sub = (sub - 1) & mask
+        memo[mask] = best
+        return best
+
+    return n - pieces((1 << n) - 1)
+
+
+def test_greedy_is_not_always_minimal_but_optimal_is():
+    # Greedy pairs the largest debtor (-5) with the largest creditor (7) and
+    # needs 4 transfers; {-5, 5} and {-3, -4, 7} settle in 3.
+    nets = _nets(a=-3, b=-4, c=-5, d=7, e=5)
+    greedy = greedy_transfers(nets)
+    optimal = optimal_transfers(nets)
+
+    assert len(greedy) == 4
+    assert len(optimal) == 3
+    _assert_settles(nets, greedy)
+    _assert_settles(nets, optimal)
+    assert {"from_member_id": "c", "to_member_id": "e", "amount": Decimal("5")} in optimal
+
+
+def test_optimal_matches_exhaustive_search_on_random_groups():
+    rng = random.Random(7)
+    for _ in range(200):
+        n = rng.randint(2, 9)
+        values = [rng.randint(-8, 8) for _ in range(n - 1)]
+        values.append(-sum(values))
+        nets = {f"m{i}": Decimal(v) for i, v in enumerate(values)}
+
+        transfers = optimal_transfers(nets)
+
+        _assert_settles(nets, transfers)
+        assert len(transfers) == _brute_force_min_transfers(values)
+        assert len(transfers) <= len(greedy_transfers(nets))
+
+
+def test_optimal_handles_fx_precision_nets():
+    nets = _nets(a="12.04800000", b="-12.04800000", c="7.22880000", d="-3.61440000", e="-3.61440000")
+    transfers = optimal_transfers(nets)
+    _assert_settles(nets, transfers)
+    assert len(transfers) == 3
+
+
+def test_all_zero_nets_need_no_transfers():
+    assert optimal_transfers(_nets(a=0, b=0)) == []
+    assert simplify_debts({}) == []
+
+
+def test_optimal_gives_up_past_member_limit_or_budget_and_simplify_falls_back_to_greedy():
+    rng = random.Random(3)
+    values = [Decimal(rng.randint(-5000, 5000)) / 100 for _ in range(17)]
+    values.append(-sum(values))
+    nets = {f"m{i}": v for i, v in enumerate(values)}
+
+    assert optimal_transfers(nets, max_members=10) is None
+    assert optimal_transfers(nets, time_budget_ms=0) is None
+    assert simplify_debts(nets, mode="optimal", time_budget_ms=0) == greedy_transfers(nets)
+
+
+def test_unbalanced_nets_fall_back_to_greedy():
+    nets = _nets(a=10, b=-9)
+    assert optimal_transfers(nets) is None
+    assert simplify_debts(nets) == greedy_transfers(nets)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(DebtSimplificationError):
+        simplify_debts(_nets(a=1, b=-1), mode="fastest")
@@ -0,0 +1,178 @@
+"""EntityResolutionService's in-process index: pg_trgm scoring on SQLite,
+per-user shards, the resolution LRU, and staying correct when the database
+moves under it."""
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from varavu_selavu_service.db.models import CanonicalMerchant, EntityAlias, User
+from varavu_selavu_service.services.entity_index import Shard, trigram_similarity, trigrams
+from varavu_selavu_service.services.entity_resolution_service import EntityResolutionService
+
+
+def _merchant(db, canonical_name, display_name, user_email=None, aliases=()):
+    entity = CanonicalMerchant(
+        id=uuid.uuid4(), user_email=user_email, canonical_name=canonical_name,
+        display_name=display_name, is_global=user_email is None,
+    )
+    db.add(entity)
+    db.flush()
+    for raw_key in aliases:
+        db.add(EntityAlias(
+            id=uuid.uuid4(), user_email=user_email, entity_type="merchant", entity_id=entity.id,
+            raw_key=raw_key, source="seed", confirmed=True,
+        ))
+    db.commit()
+    return entity
+
+
+@pytest.fixture
+def queries(db_session):
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    bind = db_session.get_bind()
+    event.listen(bind, "before_cursor_execute", count)
+    yield statements
+    event.remove(bind, "before_cursor_execute", count)
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("word", "two words", 0.363636),  # the pg_trgm documentation's own example
+    ("costco", "costco", 1.0),
+    ("costco", "walmart", 0.0),
+    ("", "costco", 0.0),
+])
+def test_similarity_matches_pg_trgm(a, b, expected):
+    assert trigram_similarity(trigrams(a), trigrams(b)) == pytest.approx(expected, abs=1e-6)
+
+
+def test_fuzzy_tiers_work_without_pg_trgm(db_session):
+    market = _merchant(db_session, "whole foods market", "Whole Foods Market")
+    gas = _merchant(db_session, "costco gas", "Costco Gas")
+    svc = EntityResolutionService(db_session)
+
+    linked = svc.resolve("Whole Foods Markets", "merchant", "test@user.com")  # 0.857
+    assert linked.status == "linked"
+    assert linked.canonical.id == str(market.id)
+    assert db_session.query(EntityAlias).filter_by(raw_key="whole foods markets", entity_id=market.id).count() == 1
+
+    suggested = svc.resolve("costco gass", "merchant", "test@user.com")  # 0.769
+    assert suggested.status == "suggested"
+    assert [c.id for c in suggested.candidates] == [str(gas.id)]
+
+    assert svc.resolve("Blue Bottle", "merchant", "test@user.com").status == "new"
+
+
+def test_aliases_are_fuzzy_matched_too(db_session):
+    costco = _merchant(db_session, "costco", "Costco", aliases=["costco wholesale"])
+    result = EntityResolutionService(db_session).resolve("Costco Wholesale Corp", "merchant", "test@user.com")
+    assert result.status == "linked"
+    assert result.canonical.id == str(costco.id)
+
+
+def test_users_only_see_their_own_entities(db_session):
+    db_session.add(User(id=uuid.uuid4(), email="other@test.com", password_hash="hash", name="Other"))
+    db_session.commit()
+    _merchant(db_session, "corner deli", "Corner Deli", user_email="other@test.com")
+    result = EntityResolutionService(db_session).resolve("Corner Deli", "merchant", "test@user.com")
+    assert result.status == "new"
+    assert db_session.query(CanonicalMerchant).filter_by(canonical_name="corner deli").count() == 2
+
+
+def test_user_entity_wins_over_global_one(db_session):
+    _merchant(db_session, "target", "Target")
+    mine = _merchant(db_session, "target", "My Target", user_email="test@user.com")
+    result = EntityResolutionService(db_session).resolve("TARGET", "merchant", "test@user.com")
+    assert result.canonical.id == str(mine.id)
+
+
+def test_repeat_resolutions_do_not_query(db_session, queries):
+    costco = _merchant(db_session, "costco", "Costco", aliases=["cosco"])
+    svc = EntityResolutionService(db_session)
+    assert svc.resolve("cosco", "merchant", "test@user.com").canonical.id == str(costco.id)
+
+    queries.clear()
+    for raw in ["Costco", "COSCO", "cosco!"]:
+        assert svc.resolve(raw, "merchant", "test@user.com").canonical.id == str(costco.id)
+    assert queries == []
+
+
+def test_new_entities_are_indexed_as_they_are_created(db_session, queries):
+    svc = EntityResolutionService(db_session)
+    created = svc.resolve("Blue Bottle Coffee", "merchant", "test@user.com")
+    assert created.status == "new"
+
+    queries.clear()
+    again = svc.resolve("blue bottle coffee", "merchant", "test@user.com")
+    assert again.status == "linked"
+    assert again.canonical.id == created.canonical.id
+    assert queries == []
+
+
+def test_stale_index_never_mints_a_duplicate(db_session):
+    svc = EntityResolutionService(db_session)
+    svc.resolve("Costco", "merchant", "test@user.com")  # loads the shards
+    # Another process creates an entity this process has not loaded yet.
+    other = _merchant(db_session, "blue bottle", "Blue Bottle", user_email="test@user.com")
+
+    result = svc.resolve("Blue Bottle", "merchant", "test@user.com")
+    assert result.status == "linked"
+    assert result.canonical.id == str(other.id)
+    assert db_session.query(CanonicalMerchant).filter_by(canonical_name="blue bottle").count() == 1
+
+
+def test_shards_reload_after_ttl(db_session, monkeypatch):
+    EntityResolutionService(db_session).resolve("Costco", "merchant", "test@user.com")
+    gas = _merchant(db_session, "costco gas", "Costco Gas")
+
+    monkeypatch.setenv("ENTITY_INDEX_TTL_SEC", "0")
+    result = EntityResolutionService(db_session).resolve("costco gass", "merchant", "test@user.com")
+    assert result.status == "suggested"
+    assert result.candidates[0].id == str(gas.id)
+
+
+def test_created_canonical_is_resolvable_at_once(test_client, db_session, monkeypatch):
+    monkeypatch.setenv("ENTITY_RESOLUTION_ENABLED", "true")
+    svc = EntityResolutionService(db_session)
+    svc.resolve("Costco", "merchant", "test@user.com")  # loads the shards
+    body = test_client.post("/api/v1/canonical/merchants", json={"display_name": "Joe's Pizza"}).json()
+
+    result = svc.resolve("JOE'S PIZZA", "merchant", "test@user.com")
+    assert result.status == "linked"
+    assert result.canonical.id == body["id"]
+
+
+def test_suggest_covers_prefixes_typos_and_aliases(db_session):
+    costco = _merchant(db_session, "costco wholesale", "Costco Wholesale", aliases=["cosco"])
+    gas = _merchant(db_session, "costco gas", "Costco Gas")
+    _merchant(db_session, "target", "Target")
+    db_session.add(User(id=uuid.uuid4(), email="other@test.com", password_hash="hash", name="Other"))
+    db_session.commit()
+    _merchant(db_session, "costco outlet", "Costco Outlet", user_email="other@test.com")
+    svc = EntityResolutionService(db_session)
+
+    prefix = svc.suggest("cos", "merchant", "test@user.com")
+    assert {c.id for c in prefix} == {str(costco.id), str(gas.id)}
+    assert prefix[0].id == str(costco.id)  # the "cosco" alias is the closer key
+    assert [c.id for c in svc.suggest("costco gsa", "merchant", "test@user.com")][0] == str(gas.id)
+    assert svc.suggest("zzz", "merchant", "test@user.com") == []
+    assert len(svc.suggest("c", "merchant", "test@user.com", limit=1)) == 1
+
+
+def test_suggest_is_memoized_and_updated_in_place(db_session, queries, monkeypatch):
+    _merchant(db_session, "blue apron", "Blue Apron")
+    svc = EntityResolutionService(db_session)
+    assert [c.display_name for c in svc.suggest("blu", "merchant", "test@user.com")] == ["Blue Apron"]
+
+    queries.clear()
+    monkeypatch.setattr(Shard, "scores", lambda *a: pytest.fail("memoized query was recomputed"))
+    assert [c.display_name for c in svc.suggest("BLU", "merchant", "test@user.com")] == ["Blue Apron"]
+    assert queries == []
+    monkeypatch.undo()
+
+    svc.resolve("Blue Bottle", "merchant", "test@user.com")  # tier 5 adds a user entity
+    assert {c.display_name for c in svc.suggest("blu", "merchant", "test@user.com")} == {"Blue Apron", "Blue Bottle"}
@@ -92,11 +92,8 @@ def test_create_canonical_item(test_client, db_session):
 
 
 def test_suggest_merchants_wires_through_to_service(test_client, monkeypatch):
-    # suggest() relies on pg_trgm's similarity(), which SQLite (this test
-    # suite's engine) doesn't implement — real trigram behavior is only
-    # exercised against live Postgres. Here we only verify the route wires
-    # auth/flag/serialization correctly, mirroring how resolve()'s tier-3+
-    # trigram path is monkeypatched in test_entity_resolution_service.py.
+    # Ranking itself is covered in test_entity_index.py; here we only verify
+    # the route wires auth/flag/serialization correctly.
     def fake_suggest(self, query, entity_type, user_email, merchant_id=None, limit=20):
         assert entity_type == "merchant"
         return [Candidate(id=str(uuid.uuid4()), display_name="Costco Wholesale", score=0.9, category_id=None)]
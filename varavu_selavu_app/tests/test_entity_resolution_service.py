@@ -268,3 +268,79 @@ def test_resolve_second_call_reuses_alias_no_duplicate(db_session, monkeypatch):
 
     assert first.canonical.id == second.canonical.id
     assert db_session.query(CanonicalItem).filter_by(canonical_name="kombucha").count() == 1
+
+
+# ---------------------------------------------------------------------------
+# resolve_many — the batch form of the cascade
+# ---------------------------------------------------------------------------
+
+def test_resolve_many_matches_resolve_in_input_order(db_session):
+    costco = _make_merchant(db_session, "costco", "Costco Wholesale", is_global=True)
+    db_session.add(EntityAlias(
+        id=uuid.uuid4(), user_email=None, entity_type="merchant", entity_id=costco.id,
+        raw_key="cosco", source="seed", confirmed=True,
+    ))
+    db_session.commit()
+
+    names = ["Costco", "cosco", "Whole Foods Market", "", "Whole Foods Markets", "WHOLE FOODS MARKET!"]
+    results = EntityResolutionService(db_session).resolve_many(names, "merchant", "test@user.com", source_hint="backfill")
+
+    assert [r.status for r in results] == ["linked", "linked", "new", "new", "linked", "new"]
+    assert results[0].canonical.id == results[1].canonical.id == str(costco.id)
+    assert results[3].canonical is None
+    # Keys are classified in order: the entity minted for the third name is
+    # a tier-3 match for the fifth, and the sixth is the third deduped.
+    assert results[4].canonical.id == results[5].canonical.id == results[2].canonical.id
+    assert results[2].canonical.display_name == "Whole Foods Market"
+
+    assert db_session.query(CanonicalMerchant).filter_by(canonical_name="whole foods market").count() == 1
+    sources = {a.raw_key: a.source for a in db_session.query(EntityAlias).filter_by(user_email="test@user.com")}
+    assert sources == {"whole foods market": "backfill", "whole foods markets": "auto_high"}
+
+
+def test_resolve_many_catches_up_with_other_writers(db_session):
+    svc = EntityResolutionService(db_session)
+    svc.resolve("Costco", "merchant", "test@user.com")  # loads the index
+    kombucha = _make_merchant(db_session, "kombucha bar", "Kombucha Bar", user_email="test@user.com")
+
+    result, = svc.resolve_many(["Kombucha Bar"], "merchant", "test@user.com")
+    assert result.status == "linked"
+    assert result.canonical.id == str(kombucha.id)
+    assert db_session.query(CanonicalMerchant).filter_by(canonical_name="kombucha bar").count() == 1
+
+
+def test_resolve_many_falls_back_to_resolve_when_the_bulk_write_fails(db_session, monkeypatch):
+    svc = EntityResolutionService(db_session)
+    real_commit = db_session.commit
+    calls = []
+
+    def flaky_commit():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("duplicate key")
+        real_commit()
+    monkeypatch.setattr(db_session, "commit", flaky_commit)
+
+    results = svc.resolve_many(["Dragonfruit", "Kombucha"], "item", "test@user.com")
+    assert [r.status for r in results] == ["new", "new"]
+    ids = {str(i.id) for i in db_session.query(CanonicalItem).all()}
+    assert ids == {r.canonical.id for r in results}
+
+
+def test_resolve_many_publishes_new_entities_only_after_its_commit(db_session, monkeypatch):
+    svc = EntityResolutionService(db_session)
+    svc.resolve("Costco", "merchant", "test@user.com")  # loads the index
+    real_commit = db_session.commit
+    seen_before_commit = []
+
+    def observing_commit():
+        # What a concurrent resolve() for the same user would find.
+        shards = svc._shards("merchant", "test@user.com")
+        seen_before_commit.append(svc._known("merchant", shards, "whole foods market", "test@user.com"))
+        real_commit()
+    monkeypatch.setattr(db_session, "commit", observing_commit)
+
+    result, = svc.resolve_many(["Whole Foods Market"], "merchant", "test@user.com")
+    assert seen_before_commit == [None]
+    monkeypatch.setattr(db_session, "commit", real_commit)
+    assert svc.resolve("Whole Foods Market", "merchant", "test@user.com").canonical.id == result.canonical.id
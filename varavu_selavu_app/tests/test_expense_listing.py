@@ -0,0 +1,108 @@
+"""GET /expenses: keyset pages over (purchased_at, id), SQL-side filters, and the
+offset fallback existing clients still use."""
+import uuid
+from datetime import datetime
+
+from sqlalchemy import event
+
+from varavu_selavu_service.db.models import Expense
+
+ME = "test@user.com"
+
+
+def _seed(db_session):
+    rows = [
+        Expense(id=uuid.uuid4(), user_email=ME, purchased_at=datetime(2024, 1, 1 + i % 28, 12),
+                category_id="Food" if i % 2 else "Travel", amount=i + 1,
+                merchant_name="Cafe" if i % 3 == 0 else "Store", description=f"e{i}")
+        for i in range(40)
+    ]
+    # Same timestamp, so ties are broken by id; and undated rows, which sort last.
+    rows += [Expense(id=uuid.uuid4(), user_email=ME, purchased_at=datetime(2024, 2, 1, 12), category_id="Misc",
+                     amount=5, description=f"tie{i}") for i in range(3)]
+    rows += [Expense(id=uuid.uuid4(), user_email=ME, purchased_at=None, category_id="Misc", amount=5,
+                     description=f"undated{i}") for i in range(4)]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def _walk(test_client, **params):
+    seen, cursor = [], None
+    while True:
+        res = test_client.get("/api/v1/expenses", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert res.status_code == 200, res.text
+        data = res.json()
+        seen += data["items"]
+        cursor = data["next_cursor"]
+        if not cursor:
+            return seen
+
+
+def test_cursor_pages_cover_every_row_once_in_order(test_client, db_session):
+    rows = _seed(db_session)
+    seen = _walk(test_client, limit=7)
+    assert sorted(r["row_id"] for r in seen) == sorted(str(r.id) for r in rows)
+
+    expected = sorted((r for r in rows if r.purchased_at), key=lambda r: (r.purchased_at, r.id), reverse=True)
+    expected += sorted((r for r in rows if r.purchased_at is None), key=lambda r: r.id, reverse=True)
+    assert [r["row_id"] for r in seen] == [str(r.id) for r in expected]
+
+
+def test_offset_paging_still_works_and_matches_cursor_order(test_client, db_session):
+    _seed(db_session)
+    by_cursor = _walk(test_client, limit=10)
+    by_offset, offset = [], 0
+    while offset is not None:
+        data = test_client.get("/api/v1/expenses", params={"limit": 10, "offset": offset}).json()
+        by_offset += data["items"]
+        offset = data["next_offset"]
+    assert [r["row_id"] for r in by_offset] == [r["row_id"] for r in by_cursor]
+
+
+def test_filters_are_applied_server_side(test_client, db_session):
+    rows = _seed(db_session)
+
+    def ids(**params):
+        return {r["row_id"] for r in _walk(test_client, limit=5, **params)}
+
+    assert ids(category="Food") == {str(r.id) for r in rows if r.category_id == "Food"}
+    assert ids(merchant=" cafe ") == {str(r.id) for r in rows if r.merchant_name == "Cafe"}
+    assert ids(min_amount=10, max_amount=20) == {str(r.id) for r in rows if 10 <= r.amount <= 20}
+    # end_date is inclusive of the whole day.
+    assert ids(start_date="2024-01-05", end_date="2024-01-06") == {
+        str(r.id) for r in rows if r.purchased_at and datetime(2024, 1, 5) <= r.purchased_at < datetime(2024, 1, 7)
+    }
+
+
+def test_bad_cursor_and_bad_date_are_400(test_client, db_session):
+    assert test_client.get("/api/v1/expenses", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert test_client.get("/api/v1/expenses", params={"start_date": "soon"}).status_code == 400
+
+
+def test_deep_cursor_pages_cost_the_same_queries(test_client, db_session):
+    _seed(db_session)
+    engine = db_session.get_bind()
+    per_page, statements, cursor = [], [], None
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "expense" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        while True:
+            statements.clear()
+            data = test_client.get("/api/v1/expenses", params={"limit": 5, **({"cursor": cursor} if cursor else {})}).json()
+            per_page.append(list(statements))
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    # A dated page is the page read plus one item-count read; only the page where
+    # dated rows run out adds the undated read.
+    assert len(per_page) == 10
+    assert all(len(s) == 2 for s in per_page[:8])
+    assert all(len(s) <= 3 for s in per_page)
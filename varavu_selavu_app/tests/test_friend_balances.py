@@ -88,3 +88,103 @@ def test_placeholder_members_are_not_aggregated_across_groups(test_client, db_se
     assert len(balances) == 2
     assert all(b["counterparty_email"] is None for b in balances)
     assert {b["net"] for b in balances} == {25.0, 15.0}
+
+
+def _count_queries(db_session, fn):
+    from sqlalchemy import event
+
+    engine = db_session.get_bind()
+    count = {"n": 0}
+
+    def _on_execute(*_args, **_kwargs):
+        count["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _on_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_execute)
+    return result, count["n"]
+
+
+def _group_with_friend(test_client, db_session, name):
+    gid = test_client.post("/api/v1/groups", json={"name": name}).json()["group_id"]
+    test_client.post(f"/api/v1/groups/{gid}/members", json={"email": "friend@test.com"})
+    return gid, _member_id(db_session, gid, "test@user.com"), _member_id(db_session, gid, "friend@test.com")
+
+
+def test_friend_balances_query_count_independent_of_group_and_expense_count(test_client, db_session):
+    from varavu_selavu_service.services.friend_balance_service import FriendBalanceService
+
+    db_session.add(User(id=uuid.uuid4(), email="friend@test.com", password_hash="hash", name="Friend"))
+    db_session.commit()
+
+    g1, me1, friend1 = _group_with_friend(test_client, db_session, "Apartment")
+    _add_equal_expense(test_client, g1, 100.0, me1, [me1, friend1])
+    db_session.expire_all()
+    _, few = _count_queries(db_session, lambda: FriendBalanceService(db_session).get_friend_balances("test@user.com"))
+
+    for i in range(4):
+        gid, me, friend = _group_with_friend(test_client, db_session, f"Trip {i}")
+        for _ in range(3):
+            _add_equal_expense(test_client, gid, 30.0, friend, [me, friend])
+    db_session.expire_all()
+    balances, many = _count_queries(db_session, lambda: FriendBalanceService(db_session).get_friend_balances("test@user.com"))
+
+    assert many == few
+    # +50 from the apartment, -15 x 3 expenses x 4 trips.
+    assert balances[0]["net"] == -130.0
+    assert len(balances[0]["groups"]) == 5
+
+
+def test_friend_balances_match_ledger_for_materialized_and_legacy_groups(test_client, db_session):
+    from datetime import datetime, timezone
+
+    from varavu_selavu_service.db.models import Expense, ExpensePayer, ExpenseSplit, GroupBalance
+
+    db_session.add(User(id=uuid.uuid4(), email="friend@test.com", password_hash="hash", name="Friend"))
+    db_session.commit()
+
+    # Materialized via the API, including a settlement against the pairwise net.
+    g1, me1, friend1 = _group_with_friend(test_client, db_session, "Apartment")
+    _add_equal_expense(test_client, g1, 90.0, me1, [me1, friend1])
+    test_client.post(
+        f"/api/v1/groups/{g1}/settlements",
+        json={"from_member_id": friend1, "to_member_id": me1, "amount": 10.0},
+    )
+
+    # Legacy history written straight to the ledger — never materialized.
+    g2, me2, friend2 = _group_with_friend(test_client, db_session, "Old trip")
+    legacy = Expense(
+        id=uuid.uuid4(), user_email="test@user.com", group_id=uuid.UUID(g2), split_type="equal",
+        purchased_at=datetime(2025, 12, 1, 12, tzinfo=timezone.utc), category_id="Food", amount=60.00,
+    )
+    db_session.add(legacy)
+    db_session.flush()
+    db_session.add(ExpensePayer(id=uuid.uuid4(), expense_id=legacy.id, member_id=uuid.UUID(friend2), amount_paid=60.00))
+    for mid in (me2, friend2):
+        db_session.add(ExpenseSplit(id=uuid.uuid4(), expense_id=legacy.id, member_id=uuid.UUID(mid), amount_owed=30.00, basis_type="equal"))
+    db_session.commit()
+    assert db_session.query(GroupBalance).filter(GroupBalance.group_id == uuid.UUID(g2)).count() == 0
+
+    entry = test_client.get("/api/v1/friends/balances").json()["balances"][0]
+    assert {g["group_id"]: g["net"] for g in entry["groups"]} == {g1: 35.0, g2: -30.0}
+    assert entry["net"] == 5.0
+
+
+def test_friend_balances_follow_invite_acceptance_on_placeholder_seat(test_client, db_session):
+    g1 = test_client.post("/api/v1/groups", json={"name": "Apartment"}).json()["group_id"]
+    test_client.post(f"/api/v1/groups/{g1}/members", json={"display_name": "Roommate"})
+    admin1 = _member_id(db_session, g1, "test@user.com")
+    seat = [m for m in db_session.query(GroupMember).filter(GroupMember.group_id == uuid.UUID(g1)).all() if m.user_email is None][0]
+    _add_equal_expense(test_client, g1, 50.0, admin1, [admin1, str(seat.id)])
+
+    # The seat is later claimed by a registered user: the pairwise rows are keyed by
+    # seat, so the friends view picks up the new email without any rewrite.
+    db_session.add(User(id=uuid.uuid4(), email="roommate@test.com", password_hash="hash", name="Roommate"))
+    db_session.commit()
+    seat.user_email = "roommate@test.com"
+    db_session.commit()
+
+    balances = test_client.get("/api/v1/friends/balances").json()["balances"]
+    assert [(b["counterparty_email"], b["net"]) for b in balances] == [("roommate@test.com", 25.0)]
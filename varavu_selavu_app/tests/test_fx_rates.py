@@ -0,0 +1,114 @@
+"""FxRateService caching: the in-process LRU, one provider call per base currency,
+stale-while-revalidate, the active-currency refresher and offline imports."""
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event
+
+from scripts.refresh_fx_rates import read_rate_table
+from varavu_selavu_service.db.models import Expense, FxRate, Group
+from varavu_selavu_service.services.fx_rate_service import FxRateService, _today
+
+USD_RATES = {"EUR": Decimal("0.9"), "INR": Decimal("83.0"), "GBP": Decimal("0.8")}
+
+
+@pytest.fixture
+def inline_revalidation(monkeypatch):
+    monkeypatch.setattr(FxRateService, "_spawn", staticmethod(lambda fn: fn()))
+
+
+@patch("varavu_selavu_service.services.fx_rate_service.FxRateService._fetch_rates", return_value=USD_RATES)
+def test_one_provider_call_stores_every_pair_from_the_base(mock_fetch, db_session):
+    svc = FxRateService(db_session)
+    assert svc.get_rate("usd", "inr") == Decimal("83.0")
+    assert svc.get_rate("USD", "EUR") == Decimal("0.9")
+    assert svc.get_rate("USD", "GBP") == Decimal("0.8")
+    mock_fetch.assert_called_once_with("USD")
+    assert db_session.query(FxRate).filter(FxRate.rate_date == _today()).count() == 3
+
+
+@patch("varavu_selavu_service.services.fx_rate_service.FxRateService._fetch_rates", return_value=USD_RATES)
+def test_cached_rates_skip_the_database(mock_fetch, db_session):
+    FxRateService(db_session).load_rates("USD")
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        for _ in range(5):
+            assert FxRateService(db_session).get_rate("USD", "EUR") == Decimal("0.9")
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+    assert statements == []
+    assert FxRateService._CACHE.hits == 5
+
+
+def test_recent_rate_is_served_while_todays_is_fetched(db_session, inline_revalidation):
+    yesterday = _today() - timedelta(days=1)
+    FxRateService(db_session).import_rates([(yesterday, "USD", "EUR", Decimal("0.91"))])
+    FxRateService._CACHE.clear()
+
+    with patch.object(FxRateService, "_fetch_rates", return_value=USD_RATES) as mock_fetch:
+        assert FxRateService(db_session).get_rate("USD", "EUR") == Decimal("0.91")
+        mock_fetch.assert_called_once_with("USD")
+
+    # The background load stored today's rates, so the next lookup is fresh.
+    with patch.object(FxRateService, "_fetch_rates") as mock_fetch:
+        assert FxRateService(db_session).get_rate("USD", "EUR") == Decimal("0.9")
+        mock_fetch.assert_not_called()
+
+
+def test_old_rate_is_not_served_stale(db_session, inline_revalidation):
+    FxRateService(db_session).import_rates([(_today() - timedelta(days=30), "USD", "EUR", Decimal("0.5"))])
+    with patch.object(FxRateService, "_fetch_rates", return_value=USD_RATES):
+        assert FxRateService(db_session).get_rate("USD", "EUR") == Decimal("0.9")
+
+
+def test_provider_failure_falls_back_without_storing(db_session):
+    with patch.object(FxRateService, "_fetch_rates", return_value={}) as mock_fetch:
+        svc = FxRateService(db_session)
+        assert svc.get_rate("USD", "EUR") == Decimal("1.0")
+        assert svc.get_rate("USD", "EUR") == Decimal("1.0")
+        assert mock_fetch.call_count == 2  # the fallback is neither stored nor cached
+    assert db_session.query(FxRate).count() == 0
+
+
+def test_offline_mode_serves_stored_rates_without_the_provider(db_session, monkeypatch):
+    monkeypatch.setenv("FX_RATE_OFFLINE", "true")
+    FxRateService(db_session).import_rates([(date(2020, 1, 1), "EUR", "USD", Decimal("1.12"))])
+    with patch.object(FxRateService, "_fetch_rates") as mock_fetch:
+        svc = FxRateService(db_session)
+        assert svc.get_rate("EUR", "USD") == Decimal("1.12")
+        assert svc.get_rate("JPY", "USD") == Decimal("1.0")
+        mock_fetch.assert_not_called()
+
+
+def test_refresher_loads_each_active_currency_once(db_session):
+    trip = Group(id=uuid.uuid4(), name="Trip", currency="USD", created_by="test@user.com", status="active")
+    old = Group(id=uuid.uuid4(), name="Old", currency="JPY", created_by="test@user.com", status="archived")
+    db_session.add_all([trip, old])
+    db_session.flush()
+    db_session.add(Expense(id=uuid.uuid4(), user_email="test@user.com", group_id=trip.id, amount=Decimal("10"),
+                           currency="INR", category_id="Food", description="x"))
+    db_session.commit()
+
+    with patch.object(FxRateService, "_fetch_rates", side_effect=lambda base: {"XYZ": Decimal("2")}) as mock_fetch:
+        assert FxRateService(db_session).refresh_active_currencies() == {"INR": 1, "USD": 1}
+        assert FxRateService(db_session).refresh_active_currencies() == {}
+    assert sorted(call.args[0] for call in mock_fetch.call_args_list) == ["INR", "USD"]
+
+
+def test_rate_table_import_is_idempotent(db_session, tmp_path):
+    path = tmp_path / "rates.csv"
+    path.write_text(
+        "rate_date,from_currency,to_currency,rate\n"
+        "2026-01-15,usd,inr,83.10\n"
+        "2026-01-15,EUR,USD,1.09\n"
+    )
+    svc = FxRateService(db_session)
+    assert svc.import_rates(read_rate_table(str(path))) == 2
+    assert svc.import_rates(read_rate_table(str(path))) == 0
+    FxRateService._CACHE.clear()
+    assert svc.get_rate("USD", "INR", as_of=date(2026, 1, 15)) == Decimal("83.10")
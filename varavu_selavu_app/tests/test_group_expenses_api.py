@@ -376,6 +376,65 @@ def test_list_pagination(test_client, db_session):
     assert body2["next_offset"] is None
 
 
+def _add_expenses(test_client, group_id, m, n):
+    for i in range(n):
+        res = test_client.post(
+            f"/api/v1/groups/{group_id}/expenses",
+            json={
+                "date": f"01/{i % 28 + 1:02d}/2026",
+                "description": f"Item {i}",
+                "category": "Food",
+                "amount": 20.00,
+                "payers": [{"member_id": m["test@user.com"], "amount_paid": 20.00}],
+                "split": {"type": "equal", "entries": [{"member_id": mid} for mid in m.values()]},
+            },
+        )
+        assert res.status_code == 201, res.text
+
+
+def test_list_cursor_pages_cover_every_expense_once(test_client, db_session):
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
+    _add_expenses(test_client, group_id, m, 35)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 8, **({"cursor": cursor} if cursor else {})}
+        body = test_client.get(f"/api/v1/groups/{group_id}/expenses", params=params).json()
+        seen += body["items"]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == 35 == len({r["row_id"] for r in seen})
+    assert all(r["my_share"] == 10.00 and len(r["splits"]) == 2 and len(r["payer_summary"]) == 1 for r in seen)
+
+    bad = test_client.get(f"/api/v1/groups/{group_id}/expenses", params={"cursor": "garbage"})
+    assert bad.status_code == 400
+
+
+def test_list_query_count_is_independent_of_page_size(test_client, db_session):
+    from sqlalchemy import event
+
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com", "c@test.com"])
+    _add_expenses(test_client, group_id, m, 25)
+    engine = db_session.get_bind()
+
+    def queries_for(limit):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            res = test_client.get(f"/api/v1/groups/{group_id}/expenses", params={"limit": limit})
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        assert len(res.json()["items"]) == limit
+        return len(statements)
+
+    assert queries_for(1) == queries_for(5) == queries_for(20)
+
+
 def test_random_amounts_sum_to_the_cent_after_persistence_and_readback(test_client, db_session):
     """§3.3 invariant reused from TS-GRP-103's SplitEngine unit tests, exercised at the
     API layer this time: sum(splits.amount_owed) == expense.amount, to the cent, after
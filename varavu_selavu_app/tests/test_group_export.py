@@ -219,3 +219,30 @@ def test_ordinary_description_is_left_untouched(test_client, db_session):
     )
     rows = _export_rows(test_client, group_id)
     assert rows[1][2] == "Dinner at Joe's"
+
+
+def test_export_streams_every_expense_in_chunks(test_client, db_session):
+    from varavu_selavu_service.services.group_export_service import GroupExportService
+
+    group_id = test_client.post("/api/v1/groups", json={"name": "Trip"}).json()["group_id"]
+    admin_id = _member_id(db_session, group_id, "test@user.com")
+    for day in range(1, 8):
+        test_client.post(
+            f"/api/v1/groups/{group_id}/expenses",
+            json={
+                "date": f"01/{day:02d}/2026",
+                "description": f"e{day}",
+                "category": "Food",
+                "amount": 10.00,
+                "payers": [{"member_id": admin_id, "amount_paid": 10.00}],
+                "split": {"type": "equal", "entries": [{"member_id": admin_id}]},
+            },
+        )
+
+    svc = GroupExportService(db_session)
+    svc.CHUNK_SIZE = 3
+    chunks = list(svc.export_csv(group_id, "test@user.com"))
+    assert [len(c.splitlines()) for c in chunks] == [1, 3, 3, 1]
+    rows = list(csv.reader(io.StringIO("".join(chunks).lstrip("﻿"))))
+    assert [r[2] for r in rows[1:]] == [f"e{d}" for d in range(1, 8)]
+    assert all(r[6].endswith("($10.00)") and r[7].endswith("($10.00)") for r in rows[1:])
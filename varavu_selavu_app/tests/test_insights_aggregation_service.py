@@ -4,9 +4,9 @@ from uuid import uuid4
 from decimal import Decimal
 
 from varavu_selavu_service.services.insights_aggregation_service import InsightsAggregationService
-from varavu_selavu_service.db.models import MerchantInsight, ItemInsight, ItemPriceHistory
+from varavu_selavu_service.db.models import MerchantAggregate, MerchantInsight, ItemInsight, ItemPriceHistory
 from varavu_selavu_service.db.session import Base
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 @pytest.fixture(scope="module")
@@ -107,11 +107,9 @@ def test_on_group_expense_with_items_created(db_session):
 
 # ---------------------------------------------------------------------------
 # TS-ENT-105: dual-write of canonical_merchant_id / canonical_item_id.
-# SQLite has no pg_trgm, so entity_resolution_service's tier-3/4 trigram
-# lookup always degrades to "no candidates" here (see
-# EntityResolutionService._fetch_trigram_candidates) and every new name falls
-# through to tier 5 (mint a new canonical entity) — which is enough to
-# exercise that the FK actually gets populated end-to-end.
+# No canonical entities are seeded here, so every new name falls through to
+# tier 5 (mint a new canonical entity) — which is enough to exercise that the
+# FK actually gets populated end-to-end.
 # ---------------------------------------------------------------------------
 
 def test_merchant_insight_dual_writes_canonical_merchant_id(db_session):
@@ -176,3 +174,95 @@ def test_merchant_insight_reuses_same_canonical_id_on_repeat_writes(db_session):
     )
     db_session.refresh(first)
     assert first.canonical_merchant_id == first_canonical_id
+
+
+# ---------------------------------------------------------------------------
+# Batched path: a receipt's deltas are folded in memory and upserted set-wise.
+# ---------------------------------------------------------------------------
+
+def _receipt(service, user_email, items, merchant="Batch Mart", when=datetime(2024, 3, 5)):
+    service.on_expense_with_items_created(
+        user_email=user_email, expense_id=str(uuid4()), merchant_name=merchant, purchased_at=when, items=items,
+    )
+
+
+def _item(db_session, user_email, name):
+    return db_session.query(ItemInsight).filter_by(user_email=user_email, normalized_name=name).one()
+
+
+def test_repeated_lines_fold_into_one_row(db_session):
+    service = InsightsAggregationService(db_session)
+    _receipt(service, "batch1@example.com", [
+        {"normalized_name": "milk", "unit_price": 3.0, "quantity": 1, "line_total": 3.0},
+        {"normalized_name": "milk", "unit_price": 2.5, "quantity": 2, "line_total": 5.0},
+        {"normalized_name": "eggs", "unit_price": 4.0, "quantity": 1, "line_total": 4.0},
+    ])
+    milk = _item(db_session, "batch1@example.com", "milk")
+    assert float(milk.total_spent) == 8.0
+    assert float(milk.total_quantity_bought) == 3.0
+    assert (float(milk.min_price), float(milk.max_price)) == (2.5, 3.0)
+    assert float(milk.avg_unit_price) == pytest.approx(8 / 3, abs=0.01)
+    assert float(_item(db_session, "batch1@example.com", "eggs").avg_unit_price) == 4.0
+    assert db_session.query(ItemPriceHistory).filter_by(item_insight_id=milk.id).count() == 2
+
+    # A second receipt updates the same rows in place.
+    _receipt(service, "batch1@example.com", [{"normalized_name": "milk", "unit_price": 2.0, "quantity": 1, "line_total": 2.0}])
+    db_session.expire_all()
+    milk = _item(db_session, "batch1@example.com", "milk")
+    assert (float(milk.total_spent), float(milk.total_quantity_bought)) == (10.0, 4.0)
+    assert (float(milk.min_price), float(milk.max_price)) == (2.0, 3.0)
+    merchant = db_session.query(MerchantInsight).filter_by(user_email="batch1@example.com").one()
+    assert (float(merchant.total_spent), merchant.transaction_count) == (14.0, 2)
+    month = db_session.query(MerchantAggregate).filter_by(merchant_insight_id=merchant.id).one()
+    assert (month.year, month.month, float(month.total_spent), month.transaction_count) == (2024, 3, 14.0, 2)
+
+
+def test_statement_count_does_not_grow_with_receipt_lines(db_session):
+    statements = []
+    bind = db_session.get_bind()
+    listener = lambda *args: statements.append(1)  # noqa: E731
+    event.listen(bind, "before_cursor_execute", listener)
+    try:
+        # Warm the process-wide entity index so neither receipt pays for loading it.
+        _receipt(InsightsAggregationService(db_session), "batch-warmup@example.com", [{"normalized_name": "x", "line_total": 1.0}])
+        counts = []
+        for lines in (5, 60):
+            items = [
+                {"normalized_name": f"product {i}", "unit_price": 1.0, "quantity": 1, "line_total": 1.0}
+                for i in range(lines)
+            ]
+            statements.clear()
+            _receipt(InsightsAggregationService(db_session), f"batch-{lines}@example.com", items)
+            counts.append(len(statements))
+    finally:
+        event.remove(bind, "before_cursor_execute", listener)
+    assert counts[0] == counts[1]
+
+
+def test_delete_backs_out_and_never_creates(db_session):
+    service = InsightsAggregationService(db_session)
+    items = [
+        {"normalized_name": "bread", "unit_price": 3.0, "quantity": 1, "line_total": 3.0},
+        {"normalized_name": "jam", "unit_price": 5.0, "quantity": 2, "line_total": 10.0},
+    ]
+    _receipt(service, "batch2@example.com", items)
+    _receipt(service, "batch2@example.com", [items[1]])
+
+    service.on_expense_deleted(
+        user_email="batch2@example.com", merchant_name="Batch Mart", amount=13.0,
+        purchased_at=datetime(2024, 3, 5), items=items,
+    )
+    db_session.expire_all()
+    bread = _item(db_session, "batch2@example.com", "bread")
+    assert (float(bread.total_spent), float(bread.total_quantity_bought), float(bread.min_price)) == (0.0, 0.0, 0.0)
+    jam = _item(db_session, "batch2@example.com", "jam")
+    assert (float(jam.total_spent), float(jam.total_quantity_bought), float(jam.avg_unit_price)) == (10.0, 2.0, 5.0)
+    merchant = db_session.query(MerchantInsight).filter_by(user_email="batch2@example.com").one()
+    assert (float(merchant.total_spent), merchant.transaction_count) == (10.0, 1)
+
+    service.on_expense_deleted(
+        user_email="batch2@example.com", merchant_name="Never Visited", amount=5.0,
+        purchased_at=datetime(2024, 3, 5), items=[{"normalized_name": "ghost", "line_total": 5.0}],
+    )
+    assert db_session.query(MerchantInsight).filter_by(user_email="batch2@example.com", merchant_name="Never Visited").count() == 0
+    assert db_session.query(ItemInsight).filter_by(user_email="batch2@example.com", normalized_name="ghost").count() == 0
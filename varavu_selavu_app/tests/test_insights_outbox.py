@@ -0,0 +1,246 @@
+"""The insight aggregation outbox: events commit with the expense mutation, the
+worker folds a claim into one set of deltas, failures are isolated and retried,
+and lag and shutdown draining."""
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from varavu_selavu_service.db.models import (
+    Expense,
+    GroupMember,
+    InsightsOutbox,
+    ItemInsight,
+    MerchantAggregate,
+    MerchantInsight,
+)
+from varavu_selavu_service.db.session import Base
+from varavu_selavu_service.services import insights_outbox
+from varavu_selavu_service.services.expense_service import ExpenseService
+from varavu_selavu_service.services.group_expense_service import GroupExpenseService
+from varavu_selavu_service.services.group_service import GroupService
+from varavu_selavu_service.services.insights_aggregation_service import InsightsAggregationService
+
+
+def _expense(**overrides):
+    payload = {
+        "user_id": "test@user.com",
+        "cost": 10.0,
+        "category": "Food & Drink",
+        "description": "Latte",
+        "date": "03/11/2026",
+        "merchant_name": "Starbucks",
+    }
+    return {**payload, **overrides}
+
+
+def _merchant(db, name="Starbucks"):
+    db.expire_all()
+    return db.query(MerchantInsight).filter_by(user_email="test@user.com", merchant_name=name).first()
+
+
+def test_expense_writes_are_queued_not_aggregated(test_client, db_session, apply_insights):
+    assert test_client.post("/api/v1/expenses", json=_expense()).status_code == 201
+    rows = db_session.query(InsightsOutbox).all()
+    assert [r.event_type for r in rows] == ["simple_expense_created"]
+    assert _merchant(db_session) is None
+
+    assert apply_insights() == 1
+    insight = _merchant(db_session)
+    assert float(insight.total_spent) == 10.0
+    assert insight.transaction_count == 1
+    assert db_session.query(InsightsOutbox).count() == 0
+
+
+def test_event_rolls_back_with_the_mutation(db_session):
+    svc = ExpenseService(db_session)
+    svc.add_expense("test@user.com", "2026-03-11", "Latte", "Food & Drink", 10.0, "Starbucks", queue_insights=True)
+    row_id = db_session.query(Expense.id).scalar()
+
+    insights_outbox.enqueue(db_session, "simple_expense_created", user_email="test@user.com", merchant_name="X", purchased_at=None, amount=1)
+    db_session.rollback()
+    assert db_session.query(InsightsOutbox).count() == 1
+
+    svc.delete_expense(row_id, queue_insights=True)
+    assert [r.event_type for r in db_session.query(InsightsOutbox).order_by(InsightsOutbox.seq)] == [
+        "simple_expense_created", "expense_deleted",
+    ]
+
+
+def test_group_expense_event_commits_with_the_expense(db_session, monkeypatch):
+    group_id = GroupService(db_session).create_group("test@user.com", "Trip")["group_id"]
+    member_id = str(db_session.query(GroupMember.id).scalar())
+    svc = GroupExpenseService(db_session)
+
+    def create():
+        return svc.create_expense(
+            group_id, "test@user.com", "03/11/2026", "Dinner", "Food & Drink", 30.0, "Dishoom",
+            payers=[{"member_id": member_id, "amount_paid": 30.0}],
+            split_type="equal", split_entries=[{"member_id": member_id}], queue_insights=True,
+        )
+
+    real_enqueue = insights_outbox.enqueue
+    monkeypatch.setattr(insights_outbox, "enqueue", lambda *a, **kw: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        create()
+    db_session.rollback()
+    assert db_session.query(Expense).count() == 0
+
+    monkeypatch.setattr(insights_outbox, "enqueue", real_enqueue)
+    row = create()
+    svc.delete_expense(group_id, row["row_id"], "test@user.com", queue_insights=True)
+    events = {e.event_type: e.payload for e in db_session.query(InsightsOutbox)}
+    assert set(events) == {"group_expense_created", "group_expense_deleted"}
+    assert events["group_expense_created"]["member_shares"] == {"test@user.com": 30.0}
+
+
+def test_repeated_edits_are_applied_as_one_net_delta(test_client, db_session, apply_insights, monkeypatch):
+    test_client.post("/api/v1/expenses", json=_expense())
+    apply_insights()
+    row_id = str(db_session.query(Expense.id).scalar())
+    for cost, date in [(11.0, "03/12/2026"), (12.0, "04/02/2026"), (13.0, "04/03/2026"), (14.0, "04/04/2026"), (15.0, "04/05/2026")]:
+        res = test_client.put(f"/api/v1/expenses/{row_id}", json=_expense(cost=cost, date=date))
+        assert res.status_code == 200
+
+    applied = []
+    real_apply = InsightsAggregationService._apply
+    monkeypatch.setattr(InsightsAggregationService, "_apply", lambda self, d: applied.append(d) or real_apply(self, d))
+    assert apply_insights() == 5
+    assert len(applied) == 1
+    assert dict(applied[0].merchants[("test@user.com", "Starbucks")].months) == {(2026, 3): [-10.0, -1], (2026, 4): [15.0, 1]}
+
+    insight = _merchant(db_session)
+    assert (float(insight.total_spent), insight.transaction_count) == (15.0, 1)
+    months = {
+        (a.year, a.month): (float(a.total_spent), a.transaction_count)
+        for a in db_session.query(MerchantAggregate).filter_by(merchant_insight_id=insight.id)
+    }
+    assert months == {(2026, 3): (0.0, 0), (2026, 4): (15.0, 1)}
+
+
+def test_item_add_and_back_out_keep_their_order(db_session, apply_insights):
+    expense_id = uuid.uuid4()
+    db_session.add(Expense(
+        id=expense_id, user_email="test@user.com", purchased_at=datetime(2026, 3, 1),
+        category_id="groceries", amount=10.0, merchant_name="Costco",
+    ))
+    items = [{"normalized_name": "milk", "unit_price": 4.0, "quantity": 1, "line_total": 4.0}]
+    insights_outbox.enqueue(
+        db_session, "expense_with_items_created", user_email="test@user.com", expense_id=expense_id,
+        merchant_name="Costco", purchased_at=datetime(2026, 3, 1, tzinfo=timezone.utc), items=items,
+    )
+    insights_outbox.enqueue(
+        db_session, "expense_deleted", user_email="test@user.com", merchant_name="Costco", amount=Decimal("4.00"),
+        purchased_at=datetime(2026, 3, 1, tzinfo=timezone.utc), items=items,
+    )
+    insights_outbox.enqueue(
+        db_session, "expense_with_items_created", user_email="test@user.com", expense_id=expense_id,
+        merchant_name="Costco", purchased_at=datetime(2026, 3, 1, tzinfo=timezone.utc),
+        items=[{"normalized_name": "milk", "unit_price": 5.0, "quantity": 2, "line_total": 10.0}],
+    )
+    db_session.commit()
+
+    assert apply_insights() == 3
+    milk = db_session.query(ItemInsight).filter_by(user_email="test@user.com", normalized_name="milk").one()
+    assert (float(milk.total_spent), float(milk.total_quantity_bought)) == (10.0, 2.0)
+    assert float(milk.avg_unit_price) == 5.0
+    costco = _merchant(db_session, "Costco")
+    assert (float(costco.total_spent), costco.transaction_count) == (10.0, 1)
+
+
+def test_a_failing_event_does_not_hold_up_the_rest(db_session, apply_insights):
+    insights_outbox.enqueue(db_session, "simple_expense_created", user_email="test@user.com", merchant_name="Starbucks", purchased_at=None, amount=5)
+    bad = InsightsOutbox(
+        id=uuid.uuid4(), event_type="simple_expense_created", payload={"user_email": "test@user.com"},
+        status="pending", attempts=0, available_at=datetime.now(timezone.utc),
+    )
+    db_session.add(bad)
+    db_session.commit()
+
+    assert apply_insights() == 2
+    assert float(_merchant(db_session).total_spent) == 5.0
+    db_session.refresh(bad)
+    assert (bad.status, bad.attempts) == ("pending", 1)
+    assert "amount" in bad.last_error
+    assert bad.available_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+
+    bad.available_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+    assert apply_insights(MAX_ATTEMPTS=2) == 1
+    db_session.refresh(bad)
+    assert bad.status == "dead"
+    assert apply_insights() == 0
+
+
+def test_events_behind_a_failing_one_wait_for_it(db_session, apply_insights, monkeypatch):
+    for amount in (1, 2):
+        insights_outbox.enqueue(db_session, "simple_expense_created", user_email="test@user.com", merchant_name="Starbucks", purchased_at=None, amount=amount)
+    insights_outbox.enqueue(db_session, "simple_expense_created", user_email="test@user.com", merchant_name="Costco", purchased_at=None, amount=4)
+    db_session.commit()
+    first, second, other = db_session.query(InsightsOutbox).order_by(InsightsOutbox.seq).all()
+
+    real_apply = InsightsAggregationService._apply
+
+    def fail_with_first(self, d):  # any delta the first (amount 1) event is part of
+        starbucks = d.merchants.get(("test@user.com", "Starbucks"))
+        if starbucks is not None and starbucks.amount != 2:
+            raise RuntimeError("boom")
+        return real_apply(self, d)
+
+    monkeypatch.setattr(InsightsAggregationService, "_apply", fail_with_first)
+
+    assert apply_insights() == 3
+    assert _merchant(db_session) is None  # the later Starbucks event did not overtake
+    assert float(_merchant(db_session, "Costco").total_spent) == 4.0
+    db_session.refresh(first)
+    db_session.refresh(second)
+    assert (first.attempts, second.attempts) == (1, 0)
+    assert second.available_at >= first.available_at
+
+    monkeypatch.setattr(InsightsAggregationService, "_apply", real_apply)
+    db_session.query(InsightsOutbox).update({"available_at": datetime.now(timezone.utc) - timedelta(seconds=1)})
+    db_session.commit()
+    assert apply_insights() == 2
+    assert float(_merchant(db_session).total_spent) == 3.0
+
+
+def test_lag_endpoint(test_client, db_session):
+    assert test_client.get("/api/v1/healthz/insights").json() == {"pending": 0, "dead": 0, "lag_seconds": 0.0}
+    test_client.post("/api/v1/expenses", json=_expense())
+    db_session.query(InsightsOutbox).update({"created_at": datetime.now(timezone.utc) - timedelta(minutes=5)})
+    db_session.commit()
+
+    body = test_client.get("/api/v1/healthz/insights").json()
+    assert body["pending"] == 1
+    assert body["lag_seconds"] >= 299
+
+
+def test_stopping_the_worker_drains_the_outbox(tmp_path, monkeypatch):
+    # The worker thread needs connections of its own, which the shared in-memory
+    # test database cannot give it.
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'outbox.db'}",
+        connect_args={"check_same_thread": False},
+        execution_options={"schema_translate_map": {"trackspense": None}},
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setenv("INSIGHTS_POLL_INTERVAL_SEC", "3600")
+
+    thread, stop = insights_outbox.run_in_thread(session_factory)
+    with session_factory() as db:
+        for amount in (1, 2, 3):
+            insights_outbox.enqueue(db, "simple_expense_created", user_email="test@user.com", merchant_name="Starbucks", purchased_at=None, amount=amount)
+        db.commit()
+
+    stop.set()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    with session_factory() as db:
+        insight = _merchant(db)
+        assert (float(insight.total_spent), insight.transaction_count) == (6.0, 3)
+        assert db.query(InsightsOutbox).count() == 0
+    engine.dispose()
@@ -0,0 +1,272 @@
+"""TS-GRP-135: group_balances and group_pair_balances must equal a from-scratch ledger computation after
+every kind of balance-affecting write — this parity check is what catches a
+mutation path that forgot to apply its delta."""
+import os
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from scripts.reconcile_group_balances import reconcile
+from varavu_selavu_service.db.models import Expense, ExpensePayer, ExpenseSplit, Group, GroupBalance, GroupMember, GroupPairBalance, User
+from varavu_selavu_service.services.balance_service import BalanceService
+
+
+@pytest.fixture(autouse=True)
+def _groups_enabled():
+    old_val = os.environ.get("GROUPS_ENABLED")
+    os.environ["GROUPS_ENABLED"] = "true"
+    try:
+        yield
+    finally:
+        if old_val is not None:
+            os.environ["GROUPS_ENABLED"] = old_val
+        else:
+            os.environ.pop("GROUPS_ENABLED", None)
+
+
+def _make_group_with_members(test_client, db_session, other_emails):
+    for email in other_emails:
+        db_session.add(User(id=uuid.uuid4(), email=email, password_hash="hash", name=email.split("@")[0]))
+    db_session.commit()
+
+    group_id = test_client.post("/api/v1/groups", json={"name": "Trip"}).json()["group_id"]
+    group = db_session.query(Group).filter(Group.id == uuid.UUID(group_id)).first()
+    admin = db_session.query(GroupMember).filter(
+        GroupMember.group_id == group.id, GroupMember.user_email == "test@user.com"
+    ).first()
+    member_ids = {"test@user.com": str(admin.id)}
+    for email in other_emails:
+        res = test_client.post(f"/api/v1/groups/{group_id}/members", json={"email": email})
+        member_ids[email] = res.json()["member_id"]
+    return group_id, member_ids
+
+
+def _assert_parity(db_session, group_id):
+    db_session.expire_all()
+    result = BalanceService(db_session).reconcile_group(group_id)
+    assert result["materialized"] is True
+    assert result["drift"] == []
+    assert result["pair_drift"] == []
+
+
+def _expense_payload(m, amount, payer_amounts, entries, description="Dinner"):
+    return {
+        "date": "01/15/2026",
+        "description": description,
+        "category": "Food",
+        "amount": amount,
+        "payers": [{"member_id": m[e], "amount_paid": a} for e, a in payer_amounts.items()],
+        "split": {"type": "equal", "entries": [{"member_id": m[e]} for e in entries]},
+    }
+
+
+@patch("varavu_selavu_service.services.fx_rate_service.FxRateService._fetch_rates")
+def test_every_mutation_type_keeps_materialized_nets_in_parity(mock_fetch, test_client, db_session):
+    mock_fetch.return_value = {"USD": Decimal("0.012048")}
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com", "c@test.com"])
+    everyone = list(m)
+
+    # Multi-payer create.
+    res = test_client.post(
+        f"/api/v1/groups/{group_id}/expenses",
+        json=_expense_payload(m, 100.00, {"test@user.com": 70.00, "b@test.com": 30.00}, everyone),
+    )
+    assert res.status_code == 201, res.text
+    expense_id = res.json()["expense"]["row_id"]
+    _assert_parity(db_session, group_id)
+
+    # Foreign-currency create (FX-converted contribution).
+    res = test_client.post(
+        f"/api/v1/groups/{group_id}/expenses",
+        json={**_expense_payload(m, 999.00, {"c@test.com": 999.00}, everyone), "currency": "INR"},
+    )
+    assert res.status_code == 201, res.text
+    _assert_parity(db_session, group_id)
+
+    # Edit: payers, splits and amount all change.
+    res = test_client.put(
+        f"/api/v1/groups/{group_id}/expenses/{expense_id}",
+        json=_expense_payload(m, 55.55, {"b@test.com": 55.55}, ["test@user.com", "b@test.com"]),
+    )
+    assert res.status_code == 200, res.text
+    _assert_parity(db_session, group_id)
+
+    # Itemized create, then an items edit that rescales payers/splits.
+    res = test_client.post(
+        f"/api/v1/groups/{group_id}/expenses/itemized",
+        json={
+            "date": "01/16/2026",
+            "description": "Groceries",
+            "category": "Food",
+            "amount": 100.0,
+            "payers": [{"member_id": m["test@user.com"], "amount_paid": 100.0}],
+            "items": [
+                {"line_no": 1, "item_name": "Steak", "line_total": 60.0, "member_ratios": {m["test@user.com"]: 1.0}},
+                {"line_no": 2, "item_name": "Wine", "line_total": 40.0, "member_ratios": {m["b@test.com"]: 0.5, m["c@test.com"]: 0.5}},
+            ],
+        },
+    )
+    assert res.status_code == 201, res.text
+    itemized_id = res.json()["expense"]["row_id"]
+    _assert_parity(db_session, group_id)
+
+    res = test_client.put(
+        f"/api/v1/groups/{group_id}/expenses/{itemized_id}/items",
+        json={
+            "items": [
+                {"line_no": 1, "item_name": "Steak", "line_total": 70.0},
+                {"line_no": 2, "item_name": "Wine", "line_total": 50.0},
+            ],
+            "amount": 120.0,
+            "tax": 0.0,
+            "discount": 0.0,
+        },
+    )
+    assert res.status_code == 200, res.text
+    _assert_parity(db_session, group_id)
+
+    # Settlement create, settle-by-share, settlement delete.
+    res = test_client.post(
+        f"/api/v1/groups/{group_id}/settlements",
+        json={"from_member_id": m["c@test.com"], "to_member_id": m["test@user.com"], "amount": 12.34},
+    )
+    assert res.status_code == 201, res.text
+    settlement_id = res.json()["id"]
+    _assert_parity(db_session, group_id)
+
+    res = test_client.post(
+        f"/api/v1/groups/{group_id}/expenses/{itemized_id}/settle_share",
+        json={"member_id": m["b@test.com"]},
+    )
+    assert res.status_code in (200, 201), res.text
+    _assert_parity(db_session, group_id)
+
+    res = test_client.delete(f"/api/v1/groups/{group_id}/settlements/{settlement_id}")
+    assert res.status_code == 200, res.text
+    _assert_parity(db_session, group_id)
+
+    # Delete.
+    res = test_client.delete(f"/api/v1/groups/{group_id}/expenses/{expense_id}")
+    assert res.status_code == 200, res.text
+    _assert_parity(db_session, group_id)
+
+    # Convert a personal expense into the group.
+    personal = Expense(
+        id=uuid.uuid4(), user_email="test@user.com", purchased_at=datetime(2026, 1, 10, 12, tzinfo=timezone.utc),
+        category_id="Food", amount=45.00, description="Lunch",
+    )
+    db_session.add(personal)
+    db_session.commit()
+    res = test_client.post(
+        f"/api/v1/expenses/{personal.id}/move_to_group",
+        json={"group_id": group_id, "split": {"type": "equal", "entries": [{"member_id": m[e]} for e in everyone]}},
+    )
+    assert res.status_code == 200, res.text
+    _assert_parity(db_session, group_id)
+
+    # The balances endpoint serves the materialized nets, and they still sum to zero.
+    body = test_client.get(f"/api/v1/groups/{group_id}/balances").json()
+    assert round(sum(row["net"] for row in body["members"]), 2) == 0.0
+
+
+def test_unmaterialized_group_falls_back_to_ledger_then_seeds_on_next_write(test_client, db_session):
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
+    gid = uuid.UUID(group_id)
+
+    # History written straight to the ledger, as if it predates group_balances.
+    legacy = Expense(
+        id=uuid.uuid4(), user_email="test@user.com", group_id=gid, split_type="equal",
+        purchased_at=datetime(2025, 12, 1, 12, tzinfo=timezone.utc), category_id="Food", amount=80.00,
+    )
+    db_session.add(legacy)
+    db_session.flush()
+    db_session.add(ExpensePayer(id=uuid.uuid4(), expense_id=legacy.id, member_id=uuid.UUID(m["test@user.com"]), amount_paid=80.00))
+    for email in m:
+        db_session.add(ExpenseSplit(id=uuid.uuid4(), expense_id=legacy.id, member_id=uuid.UUID(m[email]), amount_owed=40.00, basis_type="equal"))
+    db_session.commit()
+    assert db_session.query(GroupBalance).filter(GroupBalance.group_id == gid).count() == 0
+
+    nets = {row["member_id"]: row["net"] for row in test_client.get(f"/api/v1/groups/{group_id}/balances").json()["members"]}
+    assert nets[m["test@user.com"]] == 40.00
+    assert nets[m["b@test.com"]] == -40.00
+
+    test_client.post(
+        f"/api/v1/groups/{group_id}/settlements",
+        json={"from_member_id": m["b@test.com"], "to_member_id": m["test@user.com"], "amount": 15.00},
+    )
+    _assert_parity(db_session, group_id)
+    nets = {row["member_id"]: row["net"] for row in test_client.get(f"/api/v1/groups/{group_id}/balances").json()["members"]}
+    assert nets[m["test@user.com"]] == 25.00
+    assert nets[m["b@test.com"]] == -25.00
+
+
+def test_concurrent_seeding_of_one_group_does_not_conflict(test_client, db_session):
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
+    gid = uuid.UUID(group_id)
+    legacy = Expense(
+        id=uuid.uuid4(), user_email="test@user.com", group_id=gid, split_type="equal",
+        purchased_at=datetime(2025, 12, 1, 12, tzinfo=timezone.utc), category_id="Food", amount=80.00,
+    )
+    db_session.add(legacy)
+    db_session.flush()
+    db_session.add(ExpensePayer(id=uuid.uuid4(), expense_id=legacy.id, member_id=uuid.UUID(m["test@user.com"]), amount_paid=80.00))
+    for email in m:
+        db_session.add(ExpenseSplit(id=uuid.uuid4(), expense_id=legacy.id, member_id=uuid.UUID(m[email]), amount_owed=40.00, basis_type="equal"))
+    db_session.commit()
+
+    # Two writers both found the group unmaterialized; the second seeds after the
+    # first has seeded and applied its own delta.
+    svc = BalanceService(db_session)
+    nets, pairs = svc._ledger_nets(gid), svc._ledger_pair_nets_for_groups([gid])[gid]
+    svc.ensure_materialized(gid)
+    svc.apply_contribution(gid, {uuid.UUID(m["b@test.com"]): Decimal("15.00"), uuid.UUID(m["test@user.com"]): Decimal("-15.00")})
+    svc._seed_ledger(gid, nets, pairs)
+    db_session.commit()
+
+    assert svc.member_net(group_id, m["test@user.com"]) == Decimal("25.00")
+    assert svc.member_net(group_id, m["b@test.com"]) == Decimal("-25.00")
+
+
+def test_reconcile_reports_and_fixes_drift(test_client, db_session):
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
+    test_client.post(
+        f"/api/v1/groups/{group_id}/expenses",
+        json=_expense_payload(m, 50.00, {"test@user.com": 50.00}, list(m)),
+    )
+    db_session.expire_all()
+
+    row = db_session.query(GroupBalance).filter(GroupBalance.member_id == uuid.UUID(m["b@test.com"])).one()
+    row.net = Decimal("-99.00")
+    db_session.commit()
+
+    results = reconcile(db_session)
+    drift = next(r for r in results if r["group_id"] == group_id)["drift"]
+    assert [d["member_id"] for d in drift] == [m["b@test.com"]]
+    assert drift[0]["ledger"] == Decimal("-25.00")
+
+    reconcile(db_session, fix=True)
+    _assert_parity(db_session, group_id)
+    assert BalanceService(db_session).member_net(group_id, m["b@test.com"]) == Decimal("-25.00")
+
+
+def test_reconcile_reports_and_fixes_pair_drift(test_client, db_session):
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
+    test_client.post(
+        f"/api/v1/groups/{group_id}/expenses",
+        json=_expense_payload(m, 50.00, {"test@user.com": 50.00}, list(m)),
+    )
+    db_session.expire_all()
+
+    row = db_session.query(GroupPairBalance).filter(GroupPairBalance.group_id == uuid.UUID(group_id)).one()
+    row.net = Decimal("1.00")
+    db_session.commit()
+
+    result = next(r for r in reconcile(db_session) if r["group_id"] == group_id)
+    assert result["drift"] == []
+    assert abs(result["pair_drift"][0]["ledger"]) == Decimal("25.00")
+
+    reconcile(db_session, fix=True)
+    _assert_parity(db_session, group_id)
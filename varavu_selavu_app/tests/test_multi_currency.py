@@ -28,9 +28,9 @@ def _member_id(db_session, group_id, email):
     return str(m.id)
 
 
-@patch("varavu_selavu_service.services.fx_rate_service.FxRateService._fetch_rate")
+@patch("varavu_selavu_service.services.fx_rate_service.FxRateService._fetch_rates")
 def test_expense_in_foreign_currency_snapshots_fx_rate(mock_fetch, test_client, db_session):
-    mock_fetch.return_value = __import__("decimal").Decimal("83.0")  # 1 USD = 83 INR
+    mock_fetch.return_value = {"USD": __import__("decimal").Decimal("83.0")}  # 1 USD = 83 INR
 
     group_id = test_client.post("/api/v1/groups", json={"name": "India Trip", "currency": "USD"}).json()["group_id"]
     admin_id = _member_id(db_session, group_id, "test@user.com")
@@ -74,9 +74,9 @@ def test_same_currency_expense_has_no_fx_rate(test_client, db_session):
     assert row["fx_rate_to_group_currency"] is None
 
 
-@patch("varavu_selavu_service.services.fx_rate_service.FxRateService._fetch_rate")
+@patch("varavu_selavu_service.services.fx_rate_service.FxRateService._fetch_rates")
 def test_balances_convert_foreign_currency_expense_to_group_currency(mock_fetch, test_client, db_session):
-    mock_fetch.return_value = __import__("decimal").Decimal("2.0")  # 1 XXX = 2 USD
+    mock_fetch.return_value = {"USD": __import__("decimal").Decimal("2.0")}  # 1 XXX = 2 USD
 
     db_session.add(User(id=uuid.uuid4(), email="friend@test.com", password_hash="hash"))
     db_session.commit()
@@ -108,12 +108,12 @@ def test_balances_convert_foreign_currency_expense_to_group_currency(mock_fetch,
     assert transfer["amount"] == 100.0
 
 
-@patch("varavu_selavu_service.services.fx_rate_service.FxRateService._fetch_rate")
+@patch("varavu_selavu_service.services.fx_rate_service.FxRateService._fetch_rates")
 def test_fx_rate_is_cached_per_day(mock_fetch, db_session):
     from varavu_selavu_service.services.fx_rate_service import FxRateService
     from decimal import Decimal
 
-    mock_fetch.return_value = Decimal("1.1")
+    mock_fetch.return_value = {"USD": Decimal("1.1")}
     svc = FxRateService(db_session)
     r1 = svc.get_rate("EUR", "USD")
     r2 = svc.get_rate("EUR", "USD")
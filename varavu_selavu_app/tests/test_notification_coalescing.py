@@ -0,0 +1,179 @@
+"""Coalescing and digest pushes: bursts of expense/comment events in a group reach
+each recipient as one summary push per window (NotificationDigest)."""
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from varavu_selavu_service.auth.security import auth_required
+from varavu_selavu_service.db.models import DeviceToken, GroupMember, NotificationDigest, NotificationOutbox, User
+from varavu_selavu_service.main import app
+from varavu_selavu_service.services.notification_service import build_digest_body
+
+
+@pytest.fixture(autouse=True)
+def _groups_enabled():
+    old_val = os.environ.get("GROUPS_ENABLED")
+    os.environ["GROUPS_ENABLED"] = "true"
+    try:
+        yield
+    finally:
+        if old_val is not None:
+            os.environ["GROUPS_ENABLED"] = old_val
+        else:
+            os.environ.pop("GROUPS_ENABLED", None)
+
+
+def _make_group(test_client, db_session):
+    """test@user.com (the default auth override) creates "Trip" and adds b@test.com,
+    who has a device. Returns (group_id, admin member id, b's member id)."""
+    db_session.add(User(id=uuid.uuid4(), email="b@test.com", password_hash="hash", name="b"))
+    db_session.commit()
+    group_id = test_client.post("/api/v1/groups", json={"name": "Trip"}).json()["group_id"]
+    b_id = test_client.post(f"/api/v1/groups/{group_id}/members", json={"email": "b@test.com"}).json()["member_id"]
+    admin_id = str(db_session.query(GroupMember.id).filter(
+        GroupMember.group_id == uuid.UUID(group_id), GroupMember.user_email == "test@user.com"
+    ).scalar())
+    db_session.add(DeviceToken(id=uuid.uuid4(), user_email="b@test.com", expo_push_token="tok-b", platform="ios"))
+    db_session.query(NotificationOutbox).delete()
+    db_session.commit()
+    return group_id, admin_id, b_id
+
+
+def _add_expense(test_client, group_id, admin_id, b_id, description="Dinner"):
+    res = test_client.post(
+        f"/api/v1/groups/{group_id}/expenses",
+        json={
+            "date": "01/15/2026",
+            "description": description,
+            "category": "Food & Drink",
+            "amount": 90.00,
+            "payers": [{"member_id": admin_id, "amount_paid": 90.00}],
+            "split": {"type": "equal", "entries": [{"member_id": admin_id}, {"member_id": b_id}]},
+        },
+    )
+    assert res.status_code == 201, res.text
+
+
+def _close_windows(db_session):
+    db_session.query(NotificationDigest).update(
+        {NotificationDigest.window_ends_at: datetime.now(timezone.utc) - timedelta(seconds=1)}
+    )
+    db_session.commit()
+
+
+def test_burst_is_summarized_after_the_first_push(test_client, db_session, fake_expo, dispatch_notifications):
+    group_id, admin_id, b_id = _make_group(test_client, db_session)
+    for n in range(12):
+        _add_expense(test_client, group_id, admin_id, b_id, description=f"Dinner {n}")
+
+    dispatch_notifications()
+    # The first event of the burst goes out at once; the other 11 are collected.
+    assert [msg["body"] for msg in fake_expo.messages] == ['Test User added "Dinner 0" in Trip — your share is $45.00']
+    assert db_session.query(NotificationOutbox).count() == 0
+    assert db_session.query(NotificationDigest.item_count).scalar() == 11
+
+    dispatch_notifications()
+    assert len(fake_expo.messages) == 1  # window still open
+
+    _close_windows(db_session)
+    dispatch_notifications()
+    assert len(fake_expo.requests) == 2
+    assert fake_expo.messages[-1]["body"] == "Test User added 11 expenses in Trip — your share $495.00"
+    assert fake_expo.messages[-1]["data"]["group_id"] == group_id
+
+    # The window re-arms empty; once it closes with nothing collected, the row goes.
+    db_session.expire_all()
+    assert db_session.query(NotificationDigest.item_count).scalar() == 0
+    _close_windows(db_session)
+    dispatch_notifications()
+    assert db_session.query(NotificationDigest).count() == 0
+    assert len(fake_expo.requests) == 2
+
+
+def test_settlements_are_never_held(test_client, db_session, fake_expo, dispatch_notifications):
+    group_id, admin_id, b_id = _make_group(test_client, db_session)
+    _add_expense(test_client, group_id, admin_id, b_id)
+    _add_expense(test_client, group_id, admin_id, b_id)
+    test_client.post(
+        f"/api/v1/groups/{group_id}/settlements",
+        json={"from_member_id": b_id, "to_member_id": admin_id, "amount": 45.0},
+    )
+
+    dispatch_notifications()
+    bodies = [msg["body"] for msg in fake_expo.messages]
+    assert len(bodies) == 2
+    assert "recorded a settlement of $45.00" in bodies[1]
+
+
+def test_digest_preference_holds_every_event_until_the_interval(test_client, db_session, fake_expo, dispatch_notifications):
+    group_id, admin_id, b_id = _make_group(test_client, db_session)
+    old = app.dependency_overrides.get(auth_required)
+    app.dependency_overrides[auth_required] = lambda: "b@test.com"
+    try:
+        res = test_client.put(f"/api/v1/groups/{group_id}/notification_preferences", json={"digest_minutes": 60})
+        assert res.status_code == 200
+        assert res.json()["digest_minutes"] == 60
+        assert test_client.put(
+            f"/api/v1/groups/{group_id}/notification_preferences", json={"digest_minutes": -1}
+        ).status_code == 422
+    finally:
+        app.dependency_overrides[auth_required] = old
+
+    _add_expense(test_client, group_id, admin_id, b_id)
+    dispatch_notifications()
+    assert fake_expo.messages == []
+    digest = db_session.query(NotificationDigest).one()
+    assert digest.mode == "digest"
+    assert digest.item_count == 1
+    assert digest.window_ends_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) + timedelta(minutes=59)
+
+    _add_expense(test_client, group_id, admin_id, b_id)
+    dispatch_notifications()
+    _close_windows(db_session)
+    dispatch_notifications()
+    assert [msg["body"] for msg in fake_expo.messages] == ["Test User added 2 expenses in Trip — your share $90.00"]
+    assert db_session.query(NotificationDigest).count() == 0  # a digest does not re-arm
+
+
+def test_failed_summary_is_kept_and_retried(test_client, db_session, fake_expo, dispatch_notifications):
+    group_id, admin_id, b_id = _make_group(test_client, db_session)
+    for _ in range(3):
+        _add_expense(test_client, group_id, admin_id, b_id)
+    dispatch_notifications()
+    _close_windows(db_session)
+
+    fake_expo.failures = [503]
+    dispatch_notifications(SEND_RETRIES=0)
+    db_session.expire_all()
+    assert db_session.query(NotificationDigest.item_count).scalar() == 2
+
+    _close_windows(db_session)
+    dispatch_notifications()
+    assert fake_expo.messages[-1]["body"] == "Test User added 2 expenses in Trip — your share $90.00"
+    db_session.expire_all()
+    assert db_session.query(NotificationDigest.item_count).scalar() == 0
+
+
+def test_coalescing_can_be_switched_off(test_client, db_session, fake_expo, dispatch_notifications, monkeypatch):
+    monkeypatch.setenv("NOTIFICATION_COALESCE_WINDOW_SEC", "0")
+    group_id, admin_id, b_id = _make_group(test_client, db_session)
+    for _ in range(3):
+        _add_expense(test_client, group_id, admin_id, b_id)
+    dispatch_notifications()
+    assert len(fake_expo.messages) == 3
+    assert db_session.query(NotificationDigest).count() == 0
+
+
+def test_digest_body_names_actors_and_event_kinds():
+    def item(event_type, actor, share=None):
+        return {"event_id": str(uuid.uuid4()), "event_type": event_type, "actor": actor, "share": share, "body": "x"}
+
+    assert build_digest_body("Goa Trip", [item("comment_added", "Alex")]) == "x"
+    assert build_digest_body("Goa Trip", [item("expense_added", "Alex", 10.0), item("expense_added", "Alex", 5.5)]) == (
+        "Alex added 2 expenses in Goa Trip — your share $15.50"
+    )
+    assert build_digest_body("Goa Trip", [
+        item("expense_added", "Alex", 10.0), item("expense_edited", "Sam"), item("comment_added", "Priya"),
+    ]) == "Alex and 2 others added 1 expense, edited 1 expense and left 1 comment in Goa Trip — your share $10.00"
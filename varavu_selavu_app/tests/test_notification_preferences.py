@@ -1,6 +1,5 @@
 import os
 import uuid
-from unittest.mock import patch
 
 import pytest
 
@@ -50,10 +49,10 @@ def test_default_preferences_are_notify_all(test_client, db_session):
     group_id = _make_group_with_member(test_client, db_session)
     res = test_client.get(f"/api/v1/groups/{group_id}/notification_preferences")
     assert res.status_code == 200
-    assert res.json() == {"group_id": group_id, "muted": False, "muted_events": []}
+    assert res.json() == {"group_id": group_id, "muted": False, "muted_events": [], "digest_minutes": None}
 
 
-def test_muting_group_suppresses_all_events(test_client, db_session):
+def test_muting_group_suppresses_all_events(test_client, db_session, fake_expo, dispatch_notifications):
     group_id = _make_group_with_member(test_client, db_session)
 
     old = _as_user("member2@test.com")
@@ -64,25 +63,25 @@ def test_muting_group_suppresses_all_events(test_client, db_session):
     finally:
         _restore(old)
 
-    with patch("varavu_selavu_service.services.notification_service.NotificationService._send_expo_push") as mock_send:
-        test_client.post(
-            f"/api/v1/groups/{group_id}/expenses",
-            json={
-                "date": "01/15/2026",
-                "description": "Dinner",
-                "category": "Food & Drink",
-                "amount": 30.00,
-                "payers": [{"member_id": _get_admin_member_id(db_session, group_id), "amount_paid": 30.00}],
-                "split": {"type": "equal", "entries": [
-                    {"member_id": _get_admin_member_id(db_session, group_id)},
-                    {"member_id": _get_member_id(db_session, group_id, "member2@test.com")},
-                ]},
-            },
-        )
-        mock_send.assert_not_called()
-
-
-def test_muting_one_event_type_still_delivers_others(test_client, db_session):
+    test_client.post(
+        f"/api/v1/groups/{group_id}/expenses",
+        json={
+            "date": "01/15/2026",
+            "description": "Dinner",
+            "category": "Food & Drink",
+            "amount": 30.00,
+            "payers": [{"member_id": _get_admin_member_id(db_session, group_id), "amount_paid": 30.00}],
+            "split": {"type": "equal", "entries": [
+                {"member_id": _get_admin_member_id(db_session, group_id)},
+                {"member_id": _get_member_id(db_session, group_id, "member2@test.com")},
+            ]},
+        },
+    )
+    dispatch_notifications()
+    assert fake_expo.requests == []
+
+
+def test_muting_one_event_type_still_delivers_others(test_client, db_session, fake_expo, dispatch_notifications):
     group_id = _make_group_with_member(test_client, db_session)
 
     old = _as_user("member2@test.com")
@@ -97,26 +96,26 @@ def test_muting_one_event_type_still_delivers_others(test_client, db_session):
     admin_id = _get_admin_member_id(db_session, group_id)
     member2_id = _get_member_id(db_session, group_id, "member2@test.com")
 
-    with patch("varavu_selavu_service.services.notification_service.NotificationService._send_expo_push") as mock_send:
-        test_client.post(
-            f"/api/v1/groups/{group_id}/expenses",
-            json={
-                "date": "01/15/2026",
-                "description": "Dinner",
-                "category": "Food & Drink",
-                "amount": 30.00,
-                "payers": [{"member_id": admin_id, "amount_paid": 30.00}],
-                "split": {"type": "equal", "entries": [{"member_id": admin_id}, {"member_id": member2_id}]},
-            },
-        )
-        mock_send.assert_not_called()
-
-    with patch("varavu_selavu_service.services.notification_service.NotificationService._send_expo_push") as mock_send:
-        test_client.post(
-            f"/api/v1/groups/{group_id}/settlements",
-            json={"from_member_id": member2_id, "to_member_id": admin_id, "amount": 15.00},
-        )
-        mock_send.assert_called_once()
+    test_client.post(
+        f"/api/v1/groups/{group_id}/expenses",
+        json={
+            "date": "01/15/2026",
+            "description": "Dinner",
+            "category": "Food & Drink",
+            "amount": 30.00,
+            "payers": [{"member_id": admin_id, "amount_paid": 30.00}],
+            "split": {"type": "equal", "entries": [{"member_id": admin_id}, {"member_id": member2_id}]},
+        },
+    )
+    dispatch_notifications()
+    assert fake_expo.requests == []
+
+    test_client.post(
+        f"/api/v1/groups/{group_id}/settlements",
+        json={"from_member_id": member2_id, "to_member_id": admin_id, "amount": 15.00},
+    )
+    dispatch_notifications()
+    assert len(fake_expo.requests) == 1
 
 
 def _get_admin_member_id(db_session, group_id):
@@ -1,11 +1,12 @@
+import asyncio
 import os
 import uuid
-from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta, timezone
 
 import pytest
 
 from varavu_selavu_service.auth.security import auth_required
-from varavu_selavu_service.db.models import DeviceToken, User
+from varavu_selavu_service.db.models import DeviceToken, NotificationOutbox, User
 from varavu_selavu_service.main import app
 
 
@@ -22,6 +23,13 @@ def _groups_enabled():
             os.environ.pop("GROUPS_ENABLED", None)
 
 
+@pytest.fixture(autouse=True)
+def _one_push_per_event(monkeypatch):
+    """These tests are about each event's own push; coalescing bursts of them is
+    covered in tests/test_notification_coalescing.py."""
+    monkeypatch.setenv("NOTIFICATION_COALESCE_WINDOW_SEC", "0")
+
+
 def _as_user(email: str):
     old = app.dependency_overrides.get(auth_required)
     app.dependency_overrides[auth_required] = lambda: email
@@ -35,14 +43,6 @@ def _restore(old):
         app.dependency_overrides.pop(auth_required, None)
 
 
-def _ok_expo_response(n_messages: int):
-    """A successful Expo /send response: one "ok" ticket per message."""
-    resp = MagicMock()
-    resp.raise_for_status.return_value = None
-    resp.json.return_value = {"data": [{"status": "ok", "id": f"ticket-{i}"} for i in range(n_messages)]}
-    return resp
-
-
 def _make_group_with_members(test_client, db_session, other_emails):
     """test@user.com (default auth override) is the admin/creator. Returns (group_id, {email: member_id})."""
     for email in other_emails:
@@ -67,6 +67,9 @@ def _make_group_with_members(test_client, db_session, other_emails):
         res = test_client.post(f"/api/v1/groups/{group_id}/members", json={"email": email})
         member_ids[email] = res.json()["member_id"]
 
+    # The setup's own member_joined events are not what these tests are about.
+    db_session.query(NotificationOutbox).delete()
+    db_session.commit()
     return group_id, member_ids
 
 
@@ -75,13 +78,11 @@ def _register_token(db_session, email, token):
     db_session.commit()
 
 
-@patch("varavu_selavu_service.services.notification_service.requests.post")
-def test_expense_added_notifies_all_members_except_actor(mock_post, test_client, db_session):
+def test_expense_added_notifies_all_members_except_actor(test_client, db_session, fake_expo, dispatch_notifications):
     group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com", "c@test.com"])
     _register_token(db_session, "test@user.com", "tok-admin")  # actor — must never receive a push
     _register_token(db_session, "b@test.com", "tok-b")
     _register_token(db_session, "c@test.com", "tok-c")
-    mock_post.return_value = _ok_expo_response(2)
 
     res = test_client.post(
         f"/api/v1/groups/{group_id}/expenses",
@@ -95,9 +96,11 @@ def test_expense_added_notifies_all_members_except_actor(mock_post, test_client,
         },
     )
     assert res.status_code == 201
+    assert fake_expo.requests == []  # nothing is sent on the request path
 
-    assert mock_post.call_count == 1
-    sent_messages = mock_post.call_args.kwargs["json"]
+    assert dispatch_notifications() == 1
+    assert len(fake_expo.requests) == 1
+    sent_messages = fake_expo.messages
     recipients = {msg["to"] for msg in sent_messages}
     assert recipients == {"tok-b", "tok-c"}  # never tok-admin — the actor
     for msg in sent_messages:
@@ -105,11 +108,36 @@ def test_expense_added_notifies_all_members_except_actor(mock_post, test_client,
         assert msg["data"]["group_id"] == group_id
 
 
-@patch("varavu_selavu_service.services.notification_service.requests.post")
-def test_expense_edited_includes_share_delta_only_when_changed(mock_post, test_client, db_session):
+def test_event_is_written_in_the_mutations_transaction(test_client, db_session, monkeypatch):
+    from varavu_selavu_service.db.models import Expense
+    from varavu_selavu_service.services.notification_service import NotificationService
+
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
+
+    def broken_enqueue(self, group_id, actor_email, event_type, **event_data):
+        raise RuntimeError("outbox unavailable")
+
+    monkeypatch.setattr(NotificationService, "enqueue", broken_enqueue)
+    with pytest.raises(RuntimeError):
+        test_client.post(
+            f"/api/v1/groups/{group_id}/expenses",
+            json={
+                "date": "01/15/2026",
+                "description": "Dinner",
+                "category": "Food & Drink",
+                "amount": 90.00,
+                "payers": [{"member_id": m["test@user.com"], "amount_paid": 90.00}],
+                "split": {"type": "equal", "entries": [{"member_id": m[e]} for e in m]},
+            },
+        )
+    db_session.expire_all()
+    assert db_session.query(Expense).filter(Expense.group_id == uuid.UUID(group_id)).count() == 0
+    assert db_session.query(NotificationOutbox).count() == 0
+
+
+def test_expense_edited_includes_share_delta_only_when_changed(test_client, db_session, fake_expo, dispatch_notifications):
     group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com", "c@test.com"])
     _register_token(db_session, "b@test.com", "tok-b")
-    mock_post.return_value = _ok_expo_response(1)
 
     create_res = test_client.post(
         f"/api/v1/groups/{group_id}/expenses",
@@ -123,7 +151,8 @@ def test_expense_edited_includes_share_delta_only_when_changed(mock_post, test_c
         },
     )
     expense_id = create_res.json()["expense"]["row_id"]
-    mock_post.reset_mock()
+    dispatch_notifications()
+    fake_expo.requests.clear()
 
     # Same amount, same members — every member's share is unchanged (still $30 each).
     same_amount_res = test_client.put(
@@ -138,12 +167,13 @@ def test_expense_edited_includes_share_delta_only_when_changed(mock_post, test_c
         },
     )
     assert same_amount_res.status_code == 200
-    body_no_delta = mock_post.call_args.kwargs["json"][0]["body"]
+    dispatch_notifications()
+    body_no_delta = fake_expo.messages[0]["body"]
     assert "→" not in body_no_delta
     assert "Dinner (renamed)" in body_no_delta
 
-    mock_post.reset_mock()
-    mock_post.return_value = _ok_expo_response(1)
+    dispatch_notifications()
+    fake_expo.requests.clear()
 
     # Amount increases — every member's share changes from $30.00 to $40.00.
     changed_amount_res = test_client.put(
@@ -158,15 +188,14 @@ def test_expense_edited_includes_share_delta_only_when_changed(mock_post, test_c
         },
     )
     assert changed_amount_res.status_code == 200
-    body_with_delta = mock_post.call_args.kwargs["json"][0]["body"]
+    dispatch_notifications()
+    body_with_delta = fake_expo.messages[0]["body"]
     assert "$30.00 → $40.00" in body_with_delta
 
 
-@patch("varavu_selavu_service.services.notification_service.requests.post")
-def test_expense_deleted_notifies_members(mock_post, test_client, db_session):
+def test_expense_deleted_notifies_members(test_client, db_session, fake_expo, dispatch_notifications):
     group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
     _register_token(db_session, "b@test.com", "tok-b")
-    mock_post.return_value = _ok_expo_response(1)
 
     create_res = test_client.post(
         f"/api/v1/groups/{group_id}/expenses",
@@ -180,24 +209,23 @@ def test_expense_deleted_notifies_members(mock_post, test_client, db_session):
         },
     )
     expense_id = create_res.json()["expense"]["row_id"]
-    mock_post.reset_mock()
-    mock_post.return_value = _ok_expo_response(1)
+    dispatch_notifications()
+    fake_expo.requests.clear()
 
     delete_res = test_client.delete(f"/api/v1/groups/{group_id}/expenses/{expense_id}")
     assert delete_res.status_code == 200
 
-    assert mock_post.call_count == 1
-    body = mock_post.call_args.kwargs["json"][0]["body"]
+    dispatch_notifications()
+    assert len(fake_expo.messages) == 1
+    body = fake_expo.messages[0]["body"]
     assert "Groceries" in body
     assert "deleted" in body
 
 
-@patch("varavu_selavu_service.services.notification_service.requests.post")
-def test_settlement_recorded_personalizes_paid_you_message(mock_post, test_client, db_session):
+def test_settlement_recorded_personalizes_paid_you_message(test_client, db_session, fake_expo, dispatch_notifications):
     group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com", "c@test.com"])
     _register_token(db_session, "b@test.com", "tok-b")
     _register_token(db_session, "c@test.com", "tok-c")
-    mock_post.return_value = _ok_expo_response(2)
 
     # Admin (actor) records that b paid c $25.
     res = test_client.post(
@@ -206,36 +234,34 @@ def test_settlement_recorded_personalizes_paid_you_message(mock_post, test_clien
     )
     assert res.status_code == 201
 
-    sent_messages = {msg["to"]: msg["body"] for msg in mock_post.call_args.kwargs["json"]}
+    dispatch_notifications()
+    sent_messages = {msg["to"]: msg["body"] for msg in fake_expo.messages}
     assert "paid you $25.00" in sent_messages["tok-c"]
     assert "paid you" not in sent_messages["tok-b"]
     assert "$25.00" in sent_messages["tok-b"]
 
 
-@patch("varavu_selavu_service.services.notification_service.requests.post")
-def test_member_joined_excludes_actor_and_new_member(mock_post, test_client, db_session):
+def test_member_joined_excludes_actor_and_new_member(test_client, db_session, fake_expo, dispatch_notifications):
     group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
     _register_token(db_session, "b@test.com", "tok-b")
     db_session.add(User(id=uuid.uuid4(), email="d@test.com", password_hash="hash", name="d"))
     db_session.commit()
     _register_token(db_session, "d@test.com", "tok-d")  # the new joiner — must not be notified about themselves
-    mock_post.return_value = _ok_expo_response(1)
 
     res = test_client.post(f"/api/v1/groups/{group_id}/members", json={"email": "d@test.com"})
     assert res.status_code == 201
 
-    assert mock_post.call_count == 1
-    sent_messages = mock_post.call_args.kwargs["json"]
+    dispatch_notifications()
+    sent_messages = fake_expo.messages
     recipients = {msg["to"] for msg in sent_messages}
     assert recipients == {"tok-b"}
     assert "joined Trip" in sent_messages[0]["body"]
 
 
-@patch("varavu_selavu_service.services.notification_service.requests.post")
-def test_expo_send_failure_does_not_raise_into_the_route(mock_post, test_client, db_session):
+def test_expo_send_failure_does_not_raise_into_the_route(test_client, db_session, fake_expo, dispatch_notifications):
     group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
     _register_token(db_session, "b@test.com", "tok-b")
-    mock_post.side_effect = Exception("Expo is down")
+    fake_expo.failures = [503] * 4  # every try of the dispatcher's first pass
 
     res = test_client.post(
         f"/api/v1/groups/{group_id}/expenses",
@@ -250,18 +276,28 @@ def test_expo_send_failure_does_not_raise_into_the_route(mock_post, test_client,
     )
     assert res.status_code == 201  # the group-expense creation itself must still succeed
 
+    # The event stays in the outbox and goes out on a later pass.
+    dispatch_notifications()
+    assert fake_expo.messages == []
+    row = db_session.query(NotificationOutbox).one()
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert "503" in row.last_error
+
+    db_session.expire_all()
+    dispatch_notifications()
+    assert fake_expo.messages == []  # not due yet: retried with backoff
+
+    row.available_at = datetime.now(timezone.utc)
+    db_session.commit()
+    dispatch_notifications()
+    assert [msg["to"] for msg in fake_expo.messages] == ["tok-b"]
+    assert db_session.query(NotificationOutbox).count() == 0
+
 
-@patch("varavu_selavu_service.services.notification_service.requests.post")
-def test_invalid_token_pruned_after_device_not_registered_error(mock_post, test_client, db_session):
+def test_invalid_token_pruned_after_device_not_registered_error(test_client, db_session, fake_expo, dispatch_notifications):
     group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
     _register_token(db_session, "b@test.com", "tok-stale")
-
-    resp = MagicMock()
-    resp.raise_for_status.return_value = None
-    resp.json.return_value = {
-        "data": [{"status": "error", "message": "not registered", "details": {"error": "DeviceNotRegistered"}}]
-    }
-    mock_post.return_value = resp
+    fake_expo.ticket_errors["tok-stale"] = "DeviceNotRegistered"
 
     res = test_client.post(
         f"/api/v1/groups/{group_id}/expenses",
@@ -276,11 +312,11 @@ def test_invalid_token_pruned_after_device_not_registered_error(mock_post, test_
     )
     assert res.status_code == 201
 
+    dispatch_notifications()
     assert db_session.query(DeviceToken).filter(DeviceToken.expo_push_token == "tok-stale").first() is None
 
 
-@patch("varavu_selavu_service.services.notification_service.requests.post")
-def test_no_push_attempted_when_no_recipients_have_tokens(mock_post, test_client, db_session):
+def test_no_push_attempted_when_no_recipients_have_tokens(test_client, db_session, fake_expo, dispatch_notifications):
     group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
     # Nobody has registered a device token.
     res = test_client.post(
@@ -295,4 +331,100 @@ def test_no_push_attempted_when_no_recipients_have_tokens(mock_post, test_client
         },
     )
     assert res.status_code == 201
-    mock_post.assert_not_called()
+    assert dispatch_notifications() == 1
+    assert fake_expo.requests == []
+    assert db_session.query(NotificationOutbox).count() == 0
+
+
+def _add_expense(test_client, group_id, m, description="Dinner"):
+    res = test_client.post(
+        f"/api/v1/groups/{group_id}/expenses",
+        json={
+            "date": "01/15/2026",
+            "description": description,
+            "category": "Food & Drink",
+            "amount": 90.00,
+            "payers": [{"member_id": m["test@user.com"], "amount_paid": 90.00}],
+            "split": {"type": "equal", "entries": [{"member_id": m[e]} for e in m]},
+        },
+    )
+    assert res.status_code == 201
+
+
+def test_events_are_packed_into_expo_sized_requests(test_client, db_session, fake_expo, dispatch_notifications):
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
+    for n in range(45):  # 3 events x 45 devices = 135 messages
+        _register_token(db_session, "b@test.com", f"tok-b-{n}")
+    for n in range(3):
+        _add_expense(test_client, group_id, m, description=f"Dinner {n}")
+
+    assert dispatch_notifications() == 3
+    # Whole events per request, at most 100 messages each: 2 events, then 1.
+    assert [len(batch) for batch in fake_expo.requests] == [90, 45]
+    assert db_session.query(NotificationOutbox).count() == 0
+
+
+def test_resolution_query_count_is_independent_of_recipients(test_client, db_session, fake_expo, dispatch_notifications):
+    from sqlalchemy import event
+
+    engine = db_session.get_bind()
+
+    def count_queries(n_members):
+        emails = [f"r{n_members}-{n}@test.com" for n in range(n_members)]
+        group_id, m = _make_group_with_members(test_client, db_session, emails)
+        for email in emails:
+            _register_token(db_session, email, f"tok-{email}")
+        _add_expense(test_client, group_id, m)
+        statements = []
+        listener = lambda *args: statements.append(args[2])  # noqa: E731
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            dispatch_notifications()
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        return len(statements)
+
+    assert count_queries(2) == count_queries(12)
+    assert len(fake_expo.messages) == 2 + 12
+
+
+def test_receipts_prune_unregistered_tokens(test_client, db_session, fake_expo):
+    from varavu_selavu_service.db.models import PushTicket
+    from sqlalchemy.orm import sessionmaker
+
+    from varavu_selavu_service.services.notification_dispatcher import NotificationDispatcher
+
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com", "c@test.com"])
+    _register_token(db_session, "b@test.com", "tok-b")
+    _register_token(db_session, "c@test.com", "tok-c")
+    _add_expense(test_client, group_id, m)
+    fake_expo.receipt_errors["tok-c"] = "DeviceNotRegistered"
+
+    async def run():
+        async with NotificationDispatcher(sessionmaker(bind=db_session.get_bind()), transport=fake_expo.transport) as dispatcher:
+            await dispatcher.run_once()
+            assert await dispatcher.check_receipts() == 0  # tickets are too fresh for receipts
+            db_session.query(PushTicket).update({PushTicket.created_at: datetime.now(timezone.utc) - timedelta(minutes=20)})
+            db_session.commit()
+            return await dispatcher.check_receipts()
+
+    assert asyncio.run(run()) == 2
+    assert len(fake_expo.receipt_requests) == 1
+    assert db_session.query(PushTicket).count() == 0
+    assert {t.expo_push_token for t in db_session.query(DeviceToken)} == {"tok-b"}
+
+
+def test_event_is_dead_lettered_after_max_attempts(test_client, db_session, fake_expo, dispatch_notifications):
+    group_id, m = _make_group_with_members(test_client, db_session, ["b@test.com"])
+    _register_token(db_session, "b@test.com", "tok-b")
+    _add_expense(test_client, group_id, m)
+    fake_expo.failures = [500] * 100
+
+    for _ in range(3):
+        dispatch_notifications(MAX_ATTEMPTS=3, SEND_RETRIES=0)
+        db_session.query(NotificationOutbox).update({NotificationOutbox.available_at: datetime.now(timezone.utc)})
+        db_session.commit()
+
+    row = db_session.query(NotificationOutbox).one()
+    assert (row.status, row.attempts) == ("dead", 3)
+    assert dispatch_notifications() == 0  # dead events are never claimed again
@@ -107,3 +107,20 @@ def test_ordinary_description_is_untouched(test_client, db_session):
     _add_expense(db_session, description="Dinner at Joe's")
     rows = _rows(test_client)
     assert rows[1][1] == "Dinner at Joe's"
+
+
+def test_export_streams_in_chunks_with_undated_rows_last(db_session):
+    from varavu_selavu_service.services.personal_export_service import PersonalExportService
+
+    for day in range(1, 8):
+        _add_expense(db_session, description=f"d{day}", when=datetime(2026, 1, day))
+    _add_expense(db_session, description="undated", when=None)
+
+    svc = PersonalExportService(db_session)
+    svc.CHUNK_SIZE = 3
+    chunks = list(svc.export_csv("test@user.com"))
+    # Header alone first, so the download starts before any row is read.
+    assert chunks[0].lstrip("﻿").strip() == "date,description,category,merchant,amount,item_count"
+    assert [len(c.splitlines()) for c in chunks[1:]] == [3, 3, 2]
+    rows = list(csv.reader(io.StringIO("".join(chunks).lstrip("﻿"))))
+    assert [r[1] for r in rows[1:]] == [f"d{d}" for d in range(7, 0, -1)] + ["undated"]
@@ -0,0 +1,149 @@
+"""Query-plan regressions for the hot expense reads: each runs the real service
+call, captures the SQL it emits and checks SQLite's EXPLAIN QUERY PLAN picks the
+intended index (idx_expenses_personal_user_purchased, idx_expenses_group_purchased,
+uq_expense_{splits,payers}_expense_member) with no separate sort step.
+tests/test_query_plans_pg.py runs the same checks on Postgres."""
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert
+
+from varavu_selavu_service.db.models import Expense, GroupMember, User
+from varavu_selavu_service.services.analysis_service import AnalysisService
+from varavu_selavu_service.services.balance_service import BalanceService
+from varavu_selavu_service.services.expense_service import ExpenseService
+from varavu_selavu_service.services.group_expense_service import GroupExpenseService
+
+ME = "test@user.com"
+
+
+@pytest.fixture(autouse=True)
+def _groups_enabled():
+    old_val = os.environ.get("GROUPS_ENABLED")
+    os.environ["GROUPS_ENABLED"] = "true"
+    try:
+        yield
+    finally:
+        if old_val is not None:
+            os.environ["GROUPS_ENABLED"] = old_val
+        else:
+            os.environ.pop("GROUPS_ENABLED", None)
+
+
+@contextmanager
+def _plans(db_session):
+    """Yields a list filled with (sql, [plan detail, ...]) for every SELECT on
+    expenses / expense_splits / expense_payers run inside the block."""
+    captured, plans = [], []
+    engine = db_session.get_bind()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "expense" in statement:
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield plans
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    cursor = db_session.connection().connection.dbapi_connection.cursor()
+    # Planner statistics, as a production database has: without them SQLite can't
+    # tell `group_id IS NULL` (most personal rows) from a selective group_id match.
+    cursor.execute("ANALYZE")
+    for statement, parameters in captured:
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        plans.append((statement, [row[-1] for row in cursor.fetchall()]))
+    cursor.execute("DROP TABLE IF EXISTS sqlite_stat1")
+
+
+def _plan_for(plans, needle):
+    matches = [plan for sql, plan in plans if needle in sql]
+    assert matches, f"no captured query contains {needle!r}"
+    return matches[0]
+
+
+def _personal_history(db_session):
+    # Core insert: no rollup is built, so analysis reads the raw rows. Other users'
+    # personal rows share group_id IS NULL, which is what makes user_email the
+    # selective column.
+    others = [f"other{n}@test.com" for n in range(5)]
+    db_session.execute(insert(User), [
+        {"id": uuid.uuid4(), "email": email, "password_hash": "hash", "name": email} for email in others
+    ])
+    start = datetime(2025, 1, 1, 12)
+    db_session.execute(insert(Expense), [
+        {"id": uuid.uuid4(), "user_email": email, "purchased_at": start + timedelta(days=i), "amount": 1,
+         "category_id": "Misc", "description": "x"}
+        for email in [ME] + others
+        for i in range(120)
+    ])
+    db_session.commit()
+
+
+def _group_with_expenses(test_client, db_session, n=5):
+    group_id = test_client.post("/api/v1/groups", json={"name": "Plans"}).json()["group_id"]
+    me_id = str(db_session.query(GroupMember.id).filter(
+        GroupMember.group_id == uuid.UUID(group_id), GroupMember.user_email == ME
+    ).scalar())
+    for i in range(n):
+        res = test_client.post(f"/api/v1/groups/{group_id}/expenses", json={
+            "date": f"01/{i + 1:02d}/2026", "description": f"e{i}", "category": "Food", "amount": 10.0,
+            "payers": [{"member_id": me_id, "amount_paid": 10.0}],
+            "split": {"type": "equal", "entries": [{"member_id": me_id}]},
+        })
+        assert res.status_code == 201, res.text
+    return group_id
+
+
+def test_personal_analysis_range_scans_the_partial_index(db_session):
+    _personal_history(db_session)
+    with _plans(db_session) as plans:
+        AnalysisService(db_session).analyze(ME, start_date="2025-02-10", end_date="2025-03-20", use_cache=False)
+    personal = [(sql, plan) for sql, plan in plans if "group_id IS NULL" in sql]
+    assert personal
+    for sql, plan in personal:
+        assert any("idx_expenses_personal_user_purchased" in p and "purchased_at>" in p for p in plan), (sql, plan)
+    for sql, plan in plans:
+        assert not any(p.startswith("SCAN main.expenses") for p in plan), (sql, plan)
+
+
+def test_personal_listing_walks_the_partial_index_in_order(db_session):
+    _personal_history(db_session)
+    with _plans(db_session) as plans:
+        ExpenseService(db_session).get_expenses_for_user(ME)
+    plan = _plan_for(plans, "ORDER BY")
+    assert any("idx_expenses_personal_user_purchased" in p for p in plan), plan
+    assert not any("TEMP B-TREE" in p for p in plan), plan
+
+
+def test_personal_keyset_page_seeks_the_partial_index(db_session):
+    _personal_history(db_session)
+    svc = ExpenseService(db_session)
+    cursor = svc.list_expenses_page(ME, limit=10)["next_cursor"]
+    with _plans(db_session) as plans:
+        svc.list_expenses_page(ME, limit=10, cursor=cursor)
+    plan = _plan_for(plans, "ORDER BY")
+    assert any("idx_expenses_personal_user_purchased" in p for p in plan), plan
+    assert not any("TEMP B-TREE" in p for p in plan), plan
+
+
+def test_group_listing_walks_the_group_index_in_order(test_client, db_session):
+    group_id = _group_with_expenses(test_client, db_session)
+    with _plans(db_session) as plans:
+        GroupExpenseService(db_session).list_group_expenses(group_id, ME)
+    plan = _plan_for(plans, "ORDER BY")
+    assert any("idx_expenses_group_purchased" in p for p in plan), plan
+    assert not any("TEMP B-TREE" in p for p in plan), plan
+
+
+def test_balance_recompute_reads_ledgers_through_the_expense_member_index(test_client, db_session):
+    group_id = _group_with_expenses(test_client, db_session)
+    with _plans(db_session) as plans:
+        BalanceService(db_session).reconcile_group(group_id)
+    for table in ("expense_payers", "expense_splits"):
+        plan = _plan_for(plans, f"FROM main.{table}")
+        assert any(f"uq_{table}_expense_member" in p for p in plan), plan
+    assert any("idx_expenses_group_purchased" in p for _, plan in plans for p in plan)
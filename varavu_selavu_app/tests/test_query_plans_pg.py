@@ -0,0 +1,152 @@
+"""
+tests/test_query_plans_pg.py — Postgres counterpart of tests/test_query_plans.py.
+
+Same E2E_DATABASE_URL gating as tests/test_analytics_e2e_pg.py (run via
+run_e2e_pg_tests.sh against a migrated database). Seeds a few thousand rows,
+ANALYZEs, and asserts on EXPLAIN (FORMAT JSON) that the hot expense reads use the
+add_expense_composite_indexes indexes — including index-only scans of the
+covering split/payer indexes for balance recomputes.
+"""
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+DB_URL = os.environ.get("E2E_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(
+    not DB_URL, reason="Requires E2E_DATABASE_URL environment variable containing PostgreSQL connection string"
+)
+
+from varavu_selavu_service.db.models import Expense, ExpensePayer, ExpenseSplit, Group, GroupMember, User
+from varavu_selavu_service.services.date_scope import DateScope
+
+E2E_USERS = [f"plans_e2e_{n}@test.com" for n in range(4)]
+ME = E2E_USERS[0]
+
+try:
+    engine = create_engine(DB_URL, execution_options={"schema_translate_map": {"trackspense": "trackspense"}}) if DB_URL else None
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+except Exception:
+    pass
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    db = TestingSessionLocal()
+    db.execute(User.__table__.insert(), [
+        {"id": uuid.uuid4(), "email": e, "password_hash": "hash", "name": e} for e in E2E_USERS
+    ])
+    group_id, member_id = uuid.uuid4(), uuid.uuid4()
+    db.execute(Group.__table__.insert().values(id=group_id, name="plans", group_type="other", currency="USD",
+                                               simplify_debts=False, created_by=ME, status="active"))
+    db.execute(GroupMember.__table__.insert().values(id=member_id, group_id=group_id, user_email=ME,
+                                                     display_name="me", role="owner", status="active"))
+    start = datetime(2023, 1, 1, 12, tzinfo=timezone.utc)
+    personal = [
+        {"id": uuid.uuid4(), "user_email": e, "purchased_at": start + timedelta(hours=9 * i), "amount": 1,
+         "category_id": "Misc", "description": "plans"}
+        for e in E2E_USERS for i in range(1500)
+    ]
+    grouped = [
+        {"id": uuid.uuid4(), "user_email": ME, "group_id": group_id, "purchased_at": start + timedelta(hours=9 * i),
+         "amount": 2, "category_id": "Misc", "description": "plans"}
+        for i in range(1500)
+    ]
+    db.execute(Expense.__table__.insert(), personal + grouped)
+    db.execute(ExpensePayer.__table__.insert(), [
+        {"id": uuid.uuid4(), "expense_id": r["id"], "member_id": member_id, "amount_paid": 2} for r in grouped
+    ])
+    db.execute(ExpenseSplit.__table__.insert(), [
+        {"id": uuid.uuid4(), "expense_id": r["id"], "member_id": member_id, "amount_owed": 2, "basis_type": "equal"}
+        for r in grouped
+    ])
+    db.commit()
+    # Statistics for the planner, and a visibility map so index-only scans qualify.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in ("expenses", "expense_payers", "expense_splits"):
+            conn.execute(text(f"VACUUM ANALYZE trackspense.{table}"))
+    yield db, group_id
+    db.rollback()
+    db.execute(Group.__table__.delete().where(Group.id == group_id))
+    db.execute(Expense.__table__.delete().where(Expense.description == "plans"))
+    db.execute(User.__table__.delete().where(User.email.in_(E2E_USERS)))
+    db.commit()
+    db.close()
+
+
+def _plan_nodes(db, stmt, seqscan=True):
+    compiled = stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    if not seqscan:
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    db.rollback()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    nodes = []
+
+    def walk(node):
+        nodes.append(node)
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return nodes
+
+
+def _indexes(nodes):
+    return {n.get("Index Name") for n in nodes if n.get("Index Name")}
+
+
+def test_personal_range_read_uses_the_partial_index(seeded):
+    db, _ = seeded
+    scope = DateScope.from_params(year=2023, month=6)
+    stmt = (
+        select(Expense.category_id, func.sum(Expense.amount))
+        .where(Expense.user_email == ME, Expense.group_id.is_(None), *scope.filters(Expense.purchased_at))
+        .group_by(Expense.category_id)
+    )
+    assert "idx_expenses_personal_user_purchased" in _indexes(_plan_nodes(db, stmt))
+
+
+def test_personal_listing_needs_no_sort(seeded):
+    db, _ = seeded
+    stmt = (
+        select(Expense.id)
+        .where(Expense.user_email == ME, Expense.group_id.is_(None))
+        .order_by(Expense.purchased_at.desc(), Expense.id.desc())
+        .limit(50)
+    )
+    nodes = _plan_nodes(db, stmt)
+    assert "idx_expenses_personal_user_purchased" in _indexes(nodes)
+    assert not any(n["Node Type"] == "Sort" for n in nodes)
+
+
+def test_group_listing_needs_no_sort(seeded):
+    db, group_id = seeded
+    stmt = (
+        select(Expense.id)
+        .where(Expense.group_id == group_id)
+        .order_by(Expense.purchased_at.desc(), Expense.id.desc())
+        .limit(30)
+    )
+    nodes = _plan_nodes(db, stmt)
+    assert "idx_expenses_group_purchased" in _indexes(nodes)
+    assert not any(n["Node Type"] == "Sort" for n in nodes)
+
+
+def test_balance_ledger_reads_are_index_only(seeded):
+    db, group_id = seeded
+    expense_ids = select(Expense.id).where(Expense.group_id.in_([group_id]))
+    for model, amount, index in (
+        (ExpensePayer, ExpensePayer.amount_paid, "uq_expense_payers_expense_member"),
+        (ExpenseSplit, ExpenseSplit.amount_owed, "uq_expense_splits_expense_member"),
+    ):
+        # The seeded ledger is the whole table, so rule out the seq scan it would
+        # otherwise get; what's under test is that the index alone answers the read.
+        stmt = select(model.expense_id, model.member_id, amount).where(model.expense_id.in_(expense_ids))
+        nodes = _plan_nodes(db, stmt, seqscan=False)
+        assert any(n["Node Type"] == "Index Only Scan" and n.get("Index Name") == index for n in nodes), nodes
@@ -0,0 +1,129 @@
+"""Receipt parse jobs: uploads return a job id at once, the parse runs on the
+pool, and identical bytes are answered from the stored result."""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from varavu_selavu_service.api.routes import get_receipt_service
+from varavu_selavu_service.auth.security import auth_required
+from varavu_selavu_service.db.models import ReceiptParseJob
+from varavu_selavu_service.main import app
+from varavu_selavu_service.services.receipt_job_service import ReceiptJobService
+from varavu_selavu_service.services.receipt_service import ReceiptService
+
+SAMPLE_TEXT = (
+    "Merchant: Test Store\n"
+    "Date: 2025-02-14T18:22:00Z\n"
+    "1. Sample Item qty 1 each price 1.00 total 1.00\n"
+    "Total: 1.00\n"
+)
+
+
+@pytest.fixture
+def mock_ocr():
+    app.dependency_overrides[get_receipt_service] = lambda: ReceiptService(engine="mock")
+    yield
+    app.dependency_overrides.pop(get_receipt_service, None)
+
+
+@pytest.fixture
+def deferred_parses(monkeypatch):
+    """Collects the parses the service hands to its pool; call run() to do them."""
+    queued = []
+    monkeypatch.setattr(ReceiptJobService, "_spawn", lambda self, fn: queued.append(fn))
+
+    class Pool:
+        def run(self):
+            while queued:
+                queued.pop(0)()
+
+        def __len__(self):
+            return len(queued)
+
+    yield Pool()
+    ReceiptJobService._inflight.clear()
+
+
+def _upload(test_client, text=SAMPLE_TEXT, **params):
+    return test_client.post(
+        "/api/v1/ingest/receipt/jobs", params=params, files={"file": ("r.txt", text.encode(), "text/plain")}
+    )
+
+
+def _poll(test_client, job_id, **params):
+    return test_client.get(f"/api/v1/ingest/receipt/jobs/{job_id}", params=params)
+
+
+def test_job_is_queued_then_done(test_client, db_session, mock_ocr, deferred_parses):
+    res = _upload(test_client)
+    assert res.status_code == 202, res.text
+    job_id = res.json()["job_id"]
+    assert res.json()["status"] == "queued"
+    assert _poll(test_client, job_id).json()["status"] == "queued"
+
+    deferred_parses.run()
+    body = _poll(test_client, job_id).json()
+    assert body["status"] == "done"
+    assert body["result"]["header"]["merchant_name"] == "Test Store"
+    assert body["result"]["ocr_text"] is None
+    assert _poll(test_client, job_id, save_ocr_text=True).json()["result"]["ocr_text"] == SAMPLE_TEXT
+
+
+def test_identical_bytes_are_parsed_once(test_client, db_session, mock_ocr, deferred_parses):
+    with patch.object(ReceiptService, "parse", wraps=ReceiptService(engine="mock").parse) as parse:
+        first = _upload(test_client).json()["job_id"]
+        joined = _upload(test_client).json()["job_id"]  # same bytes while the first is pending
+        assert len(deferred_parses) == 1
+        deferred_parses.run()
+
+        again = _upload(test_client).json()
+        assert again["status"] == "done"
+        assert again["result"]["header"]["merchant_name"] == "Test Store"
+
+        sync = test_client.post(
+            "/api/v1/ingest/receipt/parse", files={"file": ("r.txt", SAMPLE_TEXT.encode(), "text/plain")}
+        )
+        assert sync.status_code == 200
+        assert sync.json()["header"]["merchant_name"] == "Test Store"
+        assert parse.call_count == 1
+
+    assert _poll(test_client, first).json()["status"] == "done"
+    assert _poll(test_client, joined).json()["status"] == "done"
+
+
+def test_failed_parse_is_reported_and_not_cached(test_client, db_session, mock_ocr, deferred_parses):
+    with patch.object(ReceiptService, "parse", side_effect=RuntimeError("model timed out")):
+        job_id = _upload(test_client).json()["job_id"]
+        deferred_parses.run()
+    body = _poll(test_client, job_id).json()
+    assert body["status"] == "failed"
+    assert "model timed out" in body["error"]
+
+    assert _upload(test_client).json()["status"] == "queued"
+
+
+def test_jobs_are_private_and_expire(test_client, db_session, mock_ocr, deferred_parses):
+    job_id = _upload(test_client).json()["job_id"]
+    old = app.dependency_overrides.get(auth_required)
+    app.dependency_overrides[auth_required] = lambda: "someone@else.com"
+    try:
+        assert _poll(test_client, job_id).status_code == 404
+    finally:
+        app.dependency_overrides[auth_required] = old
+    assert _poll(test_client, "not-a-uuid").status_code == 404
+
+    # Its process went away before parsing it.
+    db_session.query(ReceiptParseJob).update(
+        {ReceiptParseJob.created_at: datetime.now(timezone.utc) - timedelta(hours=1)}
+    )
+    db_session.commit()
+    assert _poll(test_client, job_id).json()["status"] == "failed"
+
+
+def test_full_queue_is_refused(test_client, db_session, mock_ocr, deferred_parses, monkeypatch):
+    monkeypatch.setenv("RECEIPT_PARSE_MAX_PENDING", "1")
+    assert _upload(test_client).status_code == 202
+    res = _upload(test_client, text=SAMPLE_TEXT + "Tip: 1.00\n")
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "10"
@@ -0,0 +1,253 @@
+"""monthly_spend_rollups must equal a from-scratch aggregation of the raw rows after
+every kind of write, and analytics must read whole months from it while still
+scanning raw rows for partial-month edges."""
+import os
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, insert
+
+from scripts.backfill_spend_rollups import backfill, verify
+from varavu_selavu_service.db.models import Expense, GroupMember, MonthlySpendRollup, SpendRollupState, User
+from varavu_selavu_service.services.analysis_service import AnalysisService
+from varavu_selavu_service.services.budget_service import BudgetService
+from varavu_selavu_service.services.spend_rollup_service import SpendRollupService
+
+ME = "test@user.com"
+
+
+@pytest.fixture(autouse=True)
+def _groups_enabled():
+    old_val = os.environ.get("GROUPS_ENABLED")
+    os.environ["GROUPS_ENABLED"] = "true"
+    try:
+        yield
+    finally:
+        if old_val is not None:
+            os.environ["GROUPS_ENABLED"] = old_val
+        else:
+            os.environ.pop("GROUPS_ENABLED", None)
+
+
+def _expense(email, when, amount, category="Groceries", **kw):
+    return Expense(id=uuid.uuid4(), user_email=email, purchased_at=when, amount=amount, category_id=category,
+                   description=kw.pop("description", "x"), **kw)
+
+
+def _assert_parity(db_session, *emails):
+    db_session.expire_all()
+    rollups = SpendRollupService(db_session)
+    for email in emails:
+        assert rollups.is_built(email)
+        assert rollups.drift(email) == {}
+
+
+def _raw_analysis(db_session, **kwargs):
+    """The same analysis with the rollup marker hidden, i.e. straight from raw rows."""
+    db_session.execute(delete(SpendRollupState).where(SpendRollupState.user_email == ME))
+    try:
+        return AnalysisService(db_session).analyze(ME, use_cache=False, include_details=False, **kwargs)
+    finally:
+        db_session.rollback()
+
+
+def test_personal_writes_keep_rollup_in_step(test_client, db_session):
+    res = test_client.post("/api/v1/expenses", json={
+        "user_id": ME, "date": "01/16/2025", "description": "Lunch", "category": "Food", "cost": 12.5,
+    })
+    assert res.status_code in (200, 201), res.text
+    _assert_parity(db_session, ME)
+
+    groceries = _expense(ME, datetime(2025, 2, 3, 9, tzinfo=timezone.utc), 40.25)
+    undated = _expense(ME, None, 7.00)
+    db_session.add_all([groceries, undated])
+    db_session.commit()
+    _assert_parity(db_session, ME)
+
+    # Move across a month boundary and change category: both months refresh.
+    groceries.purchased_at = datetime(2025, 3, 31, 23, tzinfo=timezone.utc)
+    groceries.category_id = "Household"
+    db_session.commit()
+    _assert_parity(db_session, ME)
+    stored = SpendRollupService(db_session).stored(ME)
+    assert ("personal", "2025-02", "Groceries") not in stored
+    assert stored[("personal", "2025-03", "Household")] == (Decimal("40.25"), 1)
+
+    # Edit after the object expired (no ORM history for the old month).
+    db_session.expire_all()
+    groceries = db_session.get(Expense, groceries.id)
+    db_session.expire(groceries)
+    groceries.purchased_at = datetime(2025, 1, 5, tzinfo=timezone.utc)
+    db_session.commit()
+    _assert_parity(db_session, ME)
+
+    db_session.delete(groceries)
+    db_session.commit()
+    _assert_parity(db_session, ME)
+
+
+def test_group_writes_keep_every_members_shares_in_step(test_client, db_session):
+    db_session.add(User(id=uuid.uuid4(), email="b@test.com", password_hash="hash", name="b"))
+    db_session.commit()
+    group_id = test_client.post("/api/v1/groups", json={"name": "Trip"}).json()["group_id"]
+    b_id = test_client.post(f"/api/v1/groups/{group_id}/members", json={"email": "b@test.com"}).json()["member_id"]
+    me_id = str(db_session.query(GroupMember.id).filter(
+        GroupMember.group_id == uuid.UUID(group_id), GroupMember.user_email == ME
+    ).scalar())
+
+    res = test_client.post(f"/api/v1/groups/{group_id}/expenses", json={
+        "date": "01/15/2026", "description": "Dinner", "category": "Food", "amount": 90.0,
+        "payers": [{"member_id": me_id, "amount_paid": 90.0}],
+        "split": {"type": "equal", "entries": [{"member_id": me_id}, {"member_id": b_id}]},
+    })
+    assert res.status_code == 201, res.text
+    expense_id = res.json()["expense"]["row_id"]
+    _assert_parity(db_session, ME, "b@test.com")
+    stored = SpendRollupService(db_session).stored("b@test.com")
+    assert stored[("my_share", "2026-01", "Food")] == (Decimal("45.00"), 1)
+    for scope in ("combined", "i_paid"):
+        fast = AnalysisService(db_session).analyze(ME, year=2026, scope=scope, use_cache=False, include_details=False)
+        raw = _raw_analysis(db_session, year=2026, scope=scope)
+        assert fast["total_expenses"] == raw["total_expenses"] == (45.0 if scope == "combined" else 90.0)
+        assert fast["category_totals"] == raw["category_totals"]
+
+    res = test_client.put(f"/api/v1/groups/{group_id}/expenses/{expense_id}", json={
+        "date": "02/01/2026", "description": "Dinner", "category": "Food", "amount": 60.0,
+        "payers": [{"member_id": b_id, "amount_paid": 60.0}],
+        "split": {"type": "equal", "entries": [{"member_id": me_id}, {"member_id": b_id}]},
+    })
+    assert res.status_code == 200, res.text
+    _assert_parity(db_session, ME, "b@test.com")
+
+    assert test_client.delete(f"/api/v1/groups/{group_id}/expenses/{expense_id}").status_code == 200
+    _assert_parity(db_session, ME, "b@test.com")
+    assert SpendRollupService(db_session).stored("b@test.com") == {}
+
+
+def test_analysis_reads_whole_months_from_rollup_and_raw_rows_for_edges(db_session):
+    db_session.add_all([
+        _expense(ME, datetime(2025, 1, 5, 12), 10.00),
+        _expense(ME, datetime(2025, 1, 20, 12), 20.00, "Dining"),
+        _expense(ME, datetime(2025, 2, 14, 12), 30.00),
+        _expense(ME, datetime(2025, 3, 2, 12), 40.00),
+        _expense(ME, datetime(2025, 3, 28, 12), 50.00, "Dining"),
+        _expense(ME, None, 5.00),
+    ])
+    db_session.commit()
+
+    svc = AnalysisService(db_session)
+    for kwargs in [{}, {"year": 2025}, {"year": 2025, "month": 2}, {"start_date": "2025-01-10", "end_date": "2025-03-05"}]:
+        fast = svc.analyze(ME, use_cache=False, include_details=False, **kwargs)
+        raw = _raw_analysis(db_session, **kwargs)
+        assert fast["total_expenses"] == raw["total_expenses"]
+        assert fast["category_totals"] == raw["category_totals"]
+        assert fast["monthly_trend"] == raw["monthly_trend"]
+        assert fast["filter_info"]["row_count"] == raw["filter_info"]["row_count"]
+
+    # Prove February (the only whole month in the range) comes from the rollup
+    # and the January/March edges from raw rows.
+    db_session.query(MonthlySpendRollup).filter(
+        MonthlySpendRollup.user_email == ME, MonthlySpendRollup.year_month.in_(["2025-01", "2025-02", "2025-03"])
+    ).update({"total": 1000}, synchronize_session=False)
+    result = svc.analyze(ME, start_date="2025-01-10", end_date="2025-03-05", use_cache=False, include_details=False)
+    assert result["total_expenses"] == 20.00 + 1000 + 40.00
+
+
+def test_budget_and_change_insights_use_rollup(db_session):
+    from varavu_selavu_service.services.insight_analytics_service import InsightAnalyticsService
+
+    db_session.add_all([
+        _expense(ME, datetime(2025, 5, 10, 12), 100.00, "Dining"),
+        _expense(ME, datetime(2025, 6, 10, 12), 180.00, "Dining"),
+    ])
+    db_session.commit()
+
+    assert BudgetService(db_session)._spent_for(ME, "personal", "category", "Dining", date(2025, 6, 1)) == 180.00
+    insights = InsightAnalyticsService(db_session).calculate_change_insights(ME, year=2025, month=6)
+    category = [i for i in insights if i.time_scope == "category"]
+    assert category and category[0].current_value == 180.00 and category[0].previous_value == 100.00
+
+    db_session.query(MonthlySpendRollup).filter(MonthlySpendRollup.year_month == "2025-06").update(
+        {"total": 250}, synchronize_session=False
+    )
+    assert BudgetService(db_session)._spent_for(ME, "personal", "category", "Dining", date(2025, 6, 1)) == 250.00
+    insights = InsightAnalyticsService(db_session).calculate_change_insights(ME, year=2025, month=6)
+    assert [i for i in insights if i.time_scope == "category"][0].current_value == 250.00
+
+
+def test_backfill_builds_legacy_history_and_verify_finds_bulk_writes(db_session):
+    # History loaded with Core inserts bypasses the flush hooks, like pre-migration data.
+    db_session.execute(insert(Expense), [
+        {"id": uuid.uuid4(), "user_email": ME, "purchased_at": datetime(2024, m, 15, 12), "amount": Decimal("12.34"),
+         "category_id": "Groceries", "description": "legacy"}
+        for m in range(1, 7)
+    ])
+    db_session.commit()
+    assert not SpendRollupService(db_session).is_built(ME)
+    raw_year = AnalysisService(db_session).analyze(ME, year=2024, use_cache=False, include_details=False)
+
+    stats = backfill(db_session, user=ME)
+    assert stats["built"] == 1
+    _assert_parity(db_session, ME)
+    assert AnalysisService(db_session).analyze(ME, year=2024, use_cache=False, include_details=False) == raw_year
+    assert backfill(db_session, user=ME)["built"] == 0
+
+    db_session.execute(insert(Expense), [{
+        "id": uuid.uuid4(), "user_email": ME, "purchased_at": datetime(2024, 2, 1, 12), "amount": Decimal("1.00"),
+        "category_id": "Groceries", "description": "bulk",
+    }])
+    db_session.commit()
+    drifted = verify(db_session, user=ME)
+    assert [r["user"] for r in drifted] == [ME]
+    assert list(drifted[0]["cells"]) == [("personal", "2024-02", "Groceries")]
+
+    verify(db_session, user=ME, fix=True)
+    assert verify(db_session, user=ME) == []
+
+
+def test_deleting_the_account_purges_its_rollup(db_session):
+    db_session.add(User(id=uuid.uuid4(), email="gone@test.com", password_hash="hash", name="Gone"))
+    db_session.commit()
+    db_session.add(_expense("gone@test.com", datetime(2025, 1, 5, 12), 10.00))
+    db_session.commit()
+    assert SpendRollupService(db_session).is_built("gone@test.com")
+
+    from varavu_selavu_service.auth.service import AuthService
+
+    assert AuthService(db_session).delete_user("gone@test.com")
+    assert not SpendRollupService(db_session).is_built("gone@test.com")
+    assert db_session.query(MonthlySpendRollup).filter(MonthlySpendRollup.user_email == "gone@test.com").count() == 0
+
+
+def test_first_write_builds_the_rollup_in_the_background(db_session, monkeypatch):
+    from varavu_selavu_service.services import spend_rollup_service
+
+    queued = []
+    monkeypatch.setattr(spend_rollup_service, "_spawn", queued.append)
+    db_session.add(_expense(ME, datetime(2025, 1, 5, 12), 10.00))
+    db_session.commit()
+    assert not SpendRollupService(db_session).is_built(ME)
+    assert db_session.query(MonthlySpendRollup).count() == 0
+    assert AnalysisService(db_session).analyze(ME, use_cache=False, include_details=False)["total_expenses"] == 10.00
+
+    # Written before the build runs: seen by its scan, not maintained by the hook.
+    db_session.add(_expense(ME, datetime(2025, 2, 5, 12), 5.00))
+    db_session.commit()
+    assert len(queued) == 1
+    queued.pop()()
+    _assert_parity(db_session, ME)
+
+    db_session.add(_expense(ME, datetime(2025, 2, 6, 12), 1.00))
+    db_session.commit()
+    assert queued == []
+    _assert_parity(db_session, ME)
+
+    monkeypatch.setenv("SPEND_ROLLUP_BACKGROUND_BUILD", "false")
+    db_session.add(User(id=uuid.uuid4(), email="b@test.com", password_hash="hash", name="b"))
+    db_session.commit()
+    db_session.add(_expense("b@test.com", datetime(2025, 1, 5, 12), 3.00))
+    db_session.commit()
+    assert queued == []
+    assert not SpendRollupService(db_session).is_built("b@test.com")
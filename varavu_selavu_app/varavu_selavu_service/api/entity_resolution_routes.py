@@ -104,6 +104,7 @@ def create_canonical_merchant(
     db.add(entity)
     db.commit()
     db.refresh(entity)
+    svc.index_canonical("merchant", entity)
     return {
         "id": str(entity.id), "canonical_name": entity.canonical_name, "display_name": entity.display_name,
         "default_category_id": entity.default_category_id, "is_global": entity.is_global,
@@ -134,6 +135,7 @@ def create_canonical_item(
     db.add(entity)
     db.commit()
     db.refresh(entity)
+    svc.index_canonical("item", entity)
     return {
         "id": str(entity.id), "canonical_name": entity.canonical_name, "display_name": entity.display_name,
         "brand": entity.brand, "default_category_id": entity.default_category_id,
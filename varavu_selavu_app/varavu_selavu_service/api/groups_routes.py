@@ -1,13 +1,11 @@
-import uuid
 from typing import List, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from varavu_selavu_service.auth.security import auth_required
 from varavu_selavu_service.core.config import Settings
-from varavu_selavu_service.db.models import Expense, ExpenseSplit, GroupMember, ExpenseItem, ExpenseItemSplit
 from varavu_selavu_service.db.session import get_db
 from varavu_selavu_service.models.api_models import (
     AcceptInviteRequest,
@@ -45,65 +43,17 @@ from varavu_selavu_service.services.balance_service import BalanceService
 from varavu_selavu_service.services.expense_comment_service import ExpenseCommentService
 from varavu_selavu_service.services.friend_balance_service import FriendBalanceService
 from varavu_selavu_service.services.group_expense_service import GroupExpenseService
+from varavu_selavu_service.services.columnar_export_service import (
+    ColumnarExportService,
+    ColumnarExportUnavailable,
+    ColumnarFormat,
+)
 from varavu_selavu_service.services.group_export_service import GroupExportService
 from varavu_selavu_service.services.group_service import GroupService
 from varavu_selavu_service.services.notification_service import NotificationService
 from varavu_selavu_service.services.settlement_service import SettlementService
 from varavu_selavu_service.services.split_suggestion_service import SplitSuggestionService
 from varavu_selavu_service.services.analysis_service import AnalysisService
-from varavu_selavu_service.services.insights_aggregation_service import InsightsAggregationService
-
-
-def _to_uuid(value):
-    try:
-        return uuid.UUID(str(value))
-    except (ValueError, AttributeError, TypeError):
-        return None
-
-
-def _get_email_shares(db: Session, eid: uuid.UUID) -> dict:
-    if not eid:
-        return {}
-    results = (
-        db.query(ExpenseSplit, GroupMember)
-        .join(GroupMember, ExpenseSplit.member_id == GroupMember.id)
-        .filter(ExpenseSplit.expense_id == eid)
-        .all()
-    )
-    return {
-        m.user_email: float(s.amount_owed)
-        for s, m in results if m.user_email
-    }
-
-
-def _get_itemized_email_shares(db: Session, eid: uuid.UUID) -> dict:
-    if not eid:
-        return {}
-    results = (
-        db.query(ExpenseItemSplit, ExpenseItem, GroupMember)
-        .join(ExpenseItem, ExpenseItemSplit.expense_item_id == ExpenseItem.id)
-        .join(GroupMember, ExpenseItemSplit.member_id == GroupMember.id)
-        .filter(ExpenseItem.expense_id == eid)
-        .all()
-    )
-    shares = {}
-    for split, item, member in results:
-        if not member.user_email:
-            continue
-        if member.user_email not in shares:
-            shares[member.user_email] = []
-        
-        # Calculate proportional quantity based on the share ratio
-        share_quantity = float(item.quantity) * float(split.ratio) if item.quantity else 1.0
-        
-        shares[member.user_email].append({
-            "normalized_name": item.normalized_name,
-            "item_name": item.item_name,
-            "unit_price": float(item.unit_price) if item.unit_price else float(item.line_total),
-            "share_quantity": share_quantity,
-            "share_amount": float(split.amount),
-        })
-    return shares
 
 
 def require_groups_enabled() -> None:
@@ -135,10 +85,6 @@ def get_analysis_service(db: Session = Depends(get_db)) -> AnalysisService:
     return AnalysisService(db=db, ttl_sec=Settings().ANALYSIS_CACHE_TTL_SEC)
 
 
-def get_insights_aggregation_service(db: Session = Depends(get_db)) -> InsightsAggregationService:
-    return InsightsAggregationService(db)
-
-
 def get_notification_service(db: Session = Depends(get_db)) -> NotificationService:
     # Local provider (mirrors devices_routes.py's) — that module imports
     # require_groups_enabled from this one, so importing back would be circular.
@@ -157,6 +103,10 @@ def get_group_export_service(db: Session = Depends(get_db)) -> GroupExportServic
     return GroupExportService(db)
 
 
+def get_columnar_export_service(db: Session = Depends(get_db)) -> ColumnarExportService:
+    return ColumnarExportService(db)
+
+
 def get_split_suggestion_service(db: Session = Depends(get_db)) -> SplitSuggestionService:
     return SplitSuggestionService(db)
 
@@ -192,21 +142,10 @@ def list_groups(
 @router.post("/invites/accept", response_model=AcceptInviteResponse, summary="Accept a group invite")
 def accept_invite(
     data: AcceptInviteRequest,
-    background_tasks: BackgroundTasks,
     svc: GroupService = Depends(get_group_service),
-    notification_service: NotificationService = Depends(get_notification_service),
     user_email: str = Depends(auth_required),
 ):
-    result = svc.accept_invite(token=data.token, acceptor_email=user_email)
-    # The acceptor is the actor; they're excluded from their own "joined" notification.
-    background_tasks.add_task(
-        notification_service.fan_out,
-        group_id=result["group_id"],
-        actor_email=user_email,
-        event_type="member_joined",
-        new_member_display_name=result["display_name"],
-    )
-    return result
+    return svc.accept_invite(token=data.token, acceptor_email=user_email, notify=True)
 
 
 @router.get("/{group_id}", response_model=GroupDetailResponse, summary="Group detail")
@@ -287,24 +226,10 @@ def restore_group(
 def add_member(
     group_id: str,
     data: AddMemberRequest,
-    background_tasks: BackgroundTasks,
     svc: GroupService = Depends(get_group_service),
-    notification_service: NotificationService = Depends(get_notification_service),
     user_email: str = Depends(auth_required),
 ):
-    member = svc.add_member(group_id, user_email, member_email=data.email, display_name=data.display_name)
-    # Only a registered-user seat (status "active") represents an actual join;
-    # placeholders (no email, status "invited") have no account/device to notify about.
-    if member["status"] == "active" and member.get("user_email"):
-        background_tasks.add_task(
-            notification_service.fan_out,
-            group_id=group_id,
-            actor_email=user_email,
-            event_type="member_joined",
-            new_member_display_name=member["display_name"],
-            exclude_emails=[member["user_email"]],
-        )
-    return member
+    return svc.add_member(group_id, user_email, member_email=data.email, display_name=data.display_name, notify=True)
 
 
 @router.delete("/{group_id}/members/{member_id}", summary="Remove a member (admin)")
@@ -348,12 +273,10 @@ def leave_group(
 def create_settlement(
     group_id: str,
     data: RecordSettlementRequest,
-    background_tasks: BackgroundTasks,
     svc: SettlementService = Depends(get_settlement_service),
-    notification_service: NotificationService = Depends(get_notification_service),
     user_email: str = Depends(auth_required),
 ):
-    settlement = svc.create_settlement(
+    return svc.create_settlement(
         group_id=group_id,
         actor_email=user_email,
         from_member_id=data.from_member_id,
@@ -362,16 +285,8 @@ def create_settlement(
         method=data.method,
         settled_at=data.settled_at,
         notes=data.notes,
+        notify=True,
     )
-    background_tasks.add_task(
-        notification_service.fan_out,
-        group_id=group_id,
-        actor_email=user_email,
-        event_type="settlement_recorded",
-        amount=settlement["amount"],
-        to_member_id=settlement["to_member_id"],
-    )
-    return settlement
 
 
 @router.get("/{group_id}/settlements", response_model=List[SettlementDTO], summary="Settlement history")
@@ -403,12 +318,8 @@ def delete_settlement(
 def create_group_expense(
     group_id: str,
     data: GroupExpenseRequest,
-    background_tasks: BackgroundTasks,
     svc: GroupExpenseService = Depends(get_group_expense_service),
     analysis_service: AnalysisService = Depends(get_analysis_service),
-    aggregation_svc: InsightsAggregationService = Depends(get_insights_aggregation_service),
-    notification_service: NotificationService = Depends(get_notification_service),
-    db: Session = Depends(get_db),
     user_email: str = Depends(auth_required),
 ):
     row = svc.create_expense(
@@ -423,36 +334,10 @@ def create_group_expense(
         split_type=data.split.type,
         split_entries=[e.model_dump() for e in data.split.entries],
         currency=data.currency,
+        notify=True,
+        queue_insights=True,
     )
-    analysis_service.invalidate_cache()
-    eid = _to_uuid(row["row_id"])
-    shares = (
-        {
-            str(s.member_id): float(s.amount_owed)
-            for s in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == eid).all()
-        }
-        if eid is not None
-        else {}
-    )
-    background_tasks.add_task(
-        notification_service.fan_out,
-        group_id=group_id,
-        actor_email=user_email,
-        event_type="expense_added",
-        description=row["description"],
-        shares=shares,
-    )
-    
-    from datetime import datetime
-    email_shares = _get_email_shares(db, eid)
-    if email_shares:
-        background_tasks.add_task(
-            aggregation_svc.on_group_expense_created,
-            member_shares=email_shares,
-            merchant_name=data.merchant_name,
-            purchased_at=datetime.strptime(row["date"], "%m/%d/%Y"),
-        )
-        
+    analysis_service.invalidate_group_cache(group_id)
     return {"success": True, "expense": row}
 
 
@@ -465,12 +350,8 @@ def create_group_expense(
 def create_itemized_group_expense(
     group_id: str,
     data: GroupExpenseWithItemsRequest,
-    background_tasks: BackgroundTasks,
     svc: GroupExpenseService = Depends(get_group_expense_service),
     analysis_service: AnalysisService = Depends(get_analysis_service),
-    aggregation_svc: InsightsAggregationService = Depends(get_insights_aggregation_service),
-    notification_service: NotificationService = Depends(get_notification_service),
-    db: Session = Depends(get_db),
     user_email: str = Depends(auth_required),
 ):
     row = svc.create_itemized_expense(
@@ -484,51 +365,26 @@ def create_itemized_group_expense(
         payers=[p.model_dump() for p in data.payers],
         items=[i.model_dump() for i in data.items],
         currency=data.currency,
+        notify=True,
+        queue_insights=True,
     )
-    analysis_service.invalidate_cache()
-    eid = _to_uuid(row["row_id"])
-    shares = (
-        {
-            str(s.member_id): float(s.amount_owed)
-            for s in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == eid).all()
-        }
-        if eid is not None
-        else {}
-    )
-    background_tasks.add_task(
-        notification_service.fan_out,
-        group_id=group_id,
-        actor_email=user_email,
-        event_type="expense_added",
-        description=row["description"],
-        shares=shares,
-    )
-    
-    from datetime import datetime
-    email_shares = _get_email_shares(db, eid)
-    email_item_shares = _get_itemized_email_shares(db, eid)
-    if email_shares:
-        background_tasks.add_task(
-            aggregation_svc.on_group_expense_with_items_created,
-            expense_id=row["row_id"],
-            member_shares=email_shares,
-            member_item_shares=email_item_shares,
-            merchant_name=data.merchant_name,
-            purchased_at=datetime.strptime(row["date"], "%m/%d/%Y"),
-        )
-        
+    analysis_service.invalidate_group_cache(group_id)
     return {"success": True, "expense": row}
 
 
 @router.get("/{group_id}/expenses", response_model=GroupExpenseListResponse, summary="List group expenses")
 def list_group_expenses(
     group_id: str,
-    limit: int = Query(30, ge=1),
+    limit: int = Query(30, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; takes precedence over offset"),
     svc: GroupExpenseService = Depends(get_group_expense_service),
     user_email: str = Depends(auth_required),
 ):
-    return svc.list_group_expenses(group_id, user_email, limit=limit, offset=offset)
+    try:
+        return svc.list_group_expenses(group_id, user_email, limit=limit, offset=offset, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.put(
@@ -540,39 +396,10 @@ def update_group_expense(
     group_id: str,
     expense_id: str,
     data: GroupExpenseRequest,
-    background_tasks: BackgroundTasks,
     svc: GroupExpenseService = Depends(get_group_expense_service),
     analysis_service: AnalysisService = Depends(get_analysis_service),
-    aggregation_svc: InsightsAggregationService = Depends(get_insights_aggregation_service),
-    notification_service: NotificationService = Depends(get_notification_service),
-    db: Session = Depends(get_db),
-    user_email: str = Depends(auth_required),
-):
-    # Capture the pre-edit shares now — GroupExpenseService.update_expense replaces
-    # (deletes + re-inserts) expense_splits atomically, so the "old" values are gone
-    # from the DB by the time the fire-and-forget notification runs. A malformed
-    # expense_id just yields an empty snapshot here; svc.update_expense below is the
-    # one responsible for raising the proper 404 in that case.
-    eid = _to_uuid(expense_id)
-    gid = _to_uuid(group_id)
-    existing = (
-        db.query(Expense).filter(Expense.id == eid, Expense.group_id == gid).first()
-        if eid is not None and gid is not None
-        else None
-    )
-    old_email_shares = _get_email_shares(db, eid) if existing else {}
-    old_merchant = existing.merchant_name if existing else None
-    old_purchased_at = existing.purchased_at if existing else None
-    
-    old_shares = (
-        {
-            str(s.member_id): float(s.amount_owed)
-            for s in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == eid).all()
-        }
-        if eid is not None
-        else {}
-    )
-
+    user_email: str = Depends(auth_required),
+):
     row = svc.update_expense(
         group_id=group_id,
         expense_id=expense_id,
@@ -586,34 +413,10 @@ def update_group_expense(
         split_type=data.split.type,
         split_entries=[e.model_dump() for e in data.split.entries],
         currency=data.currency,
+        notify=True,
+        queue_insights=True,
     )
-    analysis_service.invalidate_cache()
-    new_shares = {
-        str(s.member_id): float(s.amount_owed)
-        for s in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == eid).all()
-    }
-    background_tasks.add_task(
-        notification_service.fan_out,
-        group_id=group_id,
-        actor_email=user_email,
-        event_type="expense_edited",
-        description=row["description"],
-        old_shares=old_shares,
-        new_shares=new_shares,
-    )
-    
-    from datetime import datetime
-    new_email_shares = _get_email_shares(db, eid)
-    background_tasks.add_task(
-        aggregation_svc.on_group_expense_updated,
-        old_member_shares=old_email_shares,
-        new_member_shares=new_email_shares,
-        old_merchant_name=old_merchant,
-        old_purchased_at=old_purchased_at,
-        new_merchant_name=data.merchant_name,
-        new_purchased_at=datetime.strptime(row["date"], "%m/%d/%Y"),
-    )
-    
+    analysis_service.invalidate_group_cache(group_id)
     return {"success": True, "expense": row}
 
 
@@ -654,7 +457,7 @@ def update_group_expense_items(
         tax=payload.tax,
         discount=payload.discount,
     )
-    analysis_service.invalidate_cache()
+    analysis_service.invalidate_group_cache(group_id)
     return result
 
 
@@ -662,49 +465,12 @@ def update_group_expense_items(
 def delete_group_expense(
     group_id: str,
     expense_id: str,
-    background_tasks: BackgroundTasks,
     svc: GroupExpenseService = Depends(get_group_expense_service),
     analysis_service: AnalysisService = Depends(get_analysis_service),
-    aggregation_svc: InsightsAggregationService = Depends(get_insights_aggregation_service),
-    notification_service: NotificationService = Depends(get_notification_service),
-    db: Session = Depends(get_db),
     user_email: str = Depends(auth_required),
 ):
-    # Snapshot the description before it's gone — svc.delete_expense removes the row
-    # (and cascades expense_payers/expense_splits) before this route can read it back.
-    eid = _to_uuid(expense_id)
-    gid = _to_uuid(group_id)
-    existing = (
-        db.query(Expense).filter(Expense.id == eid, Expense.group_id == gid).first()
-        if eid is not None and gid is not None
-        else None
-    )
-    description = existing.description if existing is not None else None
-    
-    old_email_shares = _get_email_shares(db, eid) if existing else {}
-    old_email_item_shares = _get_itemized_email_shares(db, eid) if existing else {}
-    old_merchant = existing.merchant_name if existing else None
-    old_purchased_at = existing.purchased_at if existing else None
-
-    svc.delete_expense(group_id, expense_id, user_email)
-    analysis_service.invalidate_cache()
-    background_tasks.add_task(
-        notification_service.fan_out,
-        group_id=group_id,
-        actor_email=user_email,
-        event_type="expense_deleted",
-        description=description,
-    )
-    
-    if old_email_shares:
-        background_tasks.add_task(
-            aggregation_svc.on_group_expense_deleted,
-            member_shares=old_email_shares,
-            merchant_name=old_merchant,
-            purchased_at=old_purchased_at,
-            member_item_shares=old_email_item_shares,
-        )
-        
+    svc.delete_expense(group_id, expense_id, user_email, notify=True, queue_insights=True)
+    analysis_service.invalidate_group_cache(group_id)
     return {"success": True}
 
 
@@ -797,20 +563,10 @@ def add_expense_comment(
     group_id: str,
     expense_id: str,
     data: AddCommentRequest,
-    background_tasks: BackgroundTasks,
     svc: ExpenseCommentService = Depends(get_expense_comment_service),
-    notification_service: NotificationService = Depends(get_notification_service),
     user_email: str = Depends(auth_required),
 ):
-    comment = svc.add_comment(group_id, expense_id, user_email, data.body)
-    background_tasks.add_task(
-        notification_service.fan_out,
-        group_id=group_id,
-        actor_email=user_email,
-        event_type="comment_added",
-        description=comment["body"][:80],
-    )
-    return comment
+    return svc.add_comment(group_id, expense_id, user_email, data.body, notify=True)
 
 
 @router.delete(
@@ -860,7 +616,9 @@ def update_notification_preferences(
     user_email: str = Depends(auth_required),
 ):
     group_svc.require_membership(group_id, user_email)
-    return notification_service.update_preferences(user_email, group_id, data.muted, data.muted_events)
+    return notification_service.update_preferences(
+        user_email, group_id, data.muted, data.muted_events, data.digest_minutes
+    )
 
 
 # ------------------------------------------------------------------
@@ -903,15 +661,35 @@ def export_group_csv(
     user_email: str = Depends(auth_required),
 ):
     group = group_svc.get_group_detail(group_id, user_email)
-    csv_text = svc.export_csv(group_id, user_email)
     filename = f"{group['name'].replace(' ', '_')}_export.csv"
     return StreamingResponse(
-        iter([csv_text]),
+        svc.export_csv(group_id, user_email),
         media_type="text/csv",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
+@router.get("/{group_id}/export.{fmt}.zip", summary="Export group ledger tables as Parquet or Arrow IPC")
+def export_group_columnar(
+    group_id: str,
+    fmt: ColumnarFormat,
+    svc: ColumnarExportService = Depends(get_columnar_export_service),
+    group_svc: GroupService = Depends(get_group_service),
+    user_email: str = Depends(auth_required),
+):
+    group = group_svc.get_group_detail(group_id, user_email)
+    try:
+        chunks = svc.export_group(group_id, user_email, fmt)
+    except ColumnarExportUnavailable as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+    filename = f"{group['name'].replace(' ', '_')}_export_{fmt.value}.zip"
+    return StreamingResponse(
+        chunks,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 # ------------------------------------------------------------------
 # AI split suggestions (TS-GRP-133) — heuristic, history-based.
 # ------------------------------------------------------------------
@@ -965,11 +743,8 @@ expenses_router = APIRouter(prefix="/expenses", tags=["Groups"], dependencies=[D
 def move_expense_to_group(
     expense_id: str,
     data: MoveToGroupRequest,
-    background_tasks: BackgroundTasks,
     svc: GroupExpenseService = Depends(get_group_expense_service),
     analysis_service: AnalysisService = Depends(get_analysis_service),
-    notification_service: NotificationService = Depends(get_notification_service),
-    db: Session = Depends(get_db),
     user_email: str = Depends(auth_required),
 ):
     row = svc.convert_personal_expense(
@@ -978,23 +753,7 @@ def move_expense_to_group(
         actor_email=user_email,
         split_type=data.split.type,
         split_entries=[e.model_dump() for e in data.split.entries],
+        notify=True,
     )
-    analysis_service.invalidate_cache()
-    eid = _to_uuid(row["row_id"])
-    shares = (
-        {
-            str(s.member_id): float(s.amount_owed)
-            for s in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == eid).all()
-        }
-        if eid is not None
-        else {}
-    )
-    background_tasks.add_task(
-        notification_service.fan_out,
-        group_id=data.group_id,
-        actor_email=user_email,
-        event_type="expense_added",
-        description=row["description"],
-        shares=shares,
-    )
+    analysis_service.invalidate_group_cache(data.group_id)
     return {"success": True, "expense": row}
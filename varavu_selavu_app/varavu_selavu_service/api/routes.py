@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Response, Depends, status, Query, File, UploadFile, HTTPException, BackgroundTasks, Request
+from fastapi import APIRouter, Response, Depends, status, Query, File, UploadFile, HTTPException, Request
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional
@@ -7,18 +7,23 @@ from fastapi.responses import StreamingResponse
 
 from varavu_selavu_service.models.api_models import (
     ExpenseRequest,
+    ReceiptParseJobResponse,
     ReceiptParseResponse,
     ExpenseWithItemsRequest,
     ExpenseWithItemsResponse,
+    CategorizeBatchRequest,
+    CategorizeBatchResponse,
     CategorizeRequest,
     CategorizeResponse,
     ChatRequest,
     HealthResponse,
+    InsightsOutboxHealthResponse,
     FeatureFlagsResponse,
     DashboardResponse,
     ExpenseCreatedResponse,
     ExpenseRow,
     AnalysisResponse,
+    AnalysisDetailsPage,
     ChatResponse,
     ModelListResponse,
     ExpenseListResponse,
@@ -29,8 +34,15 @@ from varavu_selavu_service.models.api_models import (
 )
 from varavu_selavu_service.core.money import to_decimal, validate_money_amount
 from varavu_selavu_service.services.expense_service import ExpenseService
-from varavu_selavu_service.services.personal_export_service import PersonalExportService
+from varavu_selavu_service.services.personal_export_service import PersonalExportService, export_scope
+from varavu_selavu_service.services.columnar_export_service import (
+    ColumnarExportService,
+    ColumnarExportUnavailable,
+    ColumnarFormat,
+)
+from varavu_selavu_service.services.date_scope import DateScope
 from varavu_selavu_service.services.receipt_service import ReceiptService
+from varavu_selavu_service.services.receipt_job_service import ReceiptJobService, ReceiptQueueFull
 from varavu_selavu_service.repo.postgres_repo import PostgresRepo
 from varavu_selavu_service.services.chat_service import (
     call_chat_model,
@@ -40,7 +52,7 @@ from varavu_selavu_service.services.chat_service import (
 )
 from varavu_selavu_service.services.analysis_service import AnalysisService
 from varavu_selavu_service.services.analytics_service import AnalyticsService
-from varavu_selavu_service.services.insights_aggregation_service import InsightsAggregationService
+from varavu_selavu_service.services import insights_outbox
 from varavu_selavu_service.services.categorization_service import CategorizationService
 from varavu_selavu_service.services.recurring_service import RecurringService
 from varavu_selavu_service.core.config import Settings
@@ -77,9 +89,8 @@ from varavu_selavu_service.models.api_models import (
 from varavu_selavu_service.services.budget_service import BudgetService
 from varavu_selavu_service.services.insight_analytics_service import InsightAnalyticsService
 from varavu_selavu_service.services.group_expense_service import GroupExpenseService
-from varavu_selavu_service.services.notification_service import NotificationService
-from varavu_selavu_service.api.groups_routes import get_group_expense_service, get_notification_service
-from varavu_selavu_service.db.models import ExpenseSplit, Expense
+from varavu_selavu_service.api.groups_routes import get_group_expense_service
+from varavu_selavu_service.db.models import Expense
 import uuid as _uuid
 from varavu_selavu_service.core.limiter import limiter
 
@@ -100,26 +111,32 @@ def get_expense_service(db: Session = Depends(get_db)) -> ExpenseService:
 def get_personal_export_service(db: Session = Depends(get_db)) -> PersonalExportService:
     return PersonalExportService(db)
 
+def get_columnar_export_service(db: Session = Depends(get_db)) -> ColumnarExportService:
+    return ColumnarExportService(db)
+
 def get_analysis_service(db: Session = Depends(get_db)) -> AnalysisService:
     return AnalysisService(db=db, ttl_sec=settings.ANALYSIS_CACHE_TTL_SEC)
 
 def get_analytics_service(db: Session = Depends(get_db)) -> AnalyticsService:
     return AnalyticsService(db)
 
-def get_insights_aggregation_service(db: Session = Depends(get_db)) -> InsightsAggregationService:
-    return InsightsAggregationService(db)
-
 
 def get_receipt_service() -> ReceiptService:
     return ReceiptService(engine=settings.OCR_ENGINE)
 
 
+def get_receipt_job_service(
+    db: Session = Depends(get_db), receipt_service: ReceiptService = Depends(get_receipt_service)
+) -> ReceiptJobService:
+    return ReceiptJobService(db, receipt_service)
+
+
 def get_postgres_repo(db: Session = Depends(get_db)) -> PostgresRepo:
     return PostgresRepo(db=db)
 
 
-def get_categorization_service() -> CategorizationService:
-    return CategorizationService()
+def get_categorization_service(db: Session = Depends(get_db)) -> CategorizationService:
+    return CategorizationService(db)
 
 def get_recurring_service(db: Session = Depends(get_db)) -> RecurringService:
     return RecurringService(db)
@@ -146,6 +163,17 @@ def readiness_check():
     return {"status": "healthy"}
 
 
+@router.get(
+    "/healthz/insights",
+    response_model=InsightsOutboxHealthResponse,
+    tags=["Health"],
+    summary="Insight aggregation outbox lag",
+)
+def insights_outbox_health(db: Session = Depends(get_db)):
+    # Counts and an age only, no user data, so unauthenticated like the probes above.
+    return insights_outbox.lag(db)
+
+
 @router.get("/config", response_model=FeatureFlagsResponse, tags=["Health"], summary="Client-visible feature flags")
 def get_config():
     # Reads Settings() fresh (not the module-level `settings` singleton) so it
@@ -176,6 +204,28 @@ def categorize_expense(
     return {"main_category": main, "subcategory": sub, "merchant_name": merchant}
 
 
+@router.post(
+    "/categorize/batch",
+    response_model=CategorizeBatchResponse,
+    tags=["Expenses"],
+    summary="Suggest categories for up to 500 descriptions at once",
+)
+@limiter.limit("10/minute")
+def categorize_expenses_batch(
+    request: Request,
+    data: CategorizeBatchRequest,
+    categorizer: CategorizationService = Depends(get_categorization_service),
+    _: str = Depends(auth_required),
+):
+    results = categorizer.classify_many(data.descriptions)
+    return {
+        "results": [
+            {"description": description, "main_category": main, "subcategory": sub, "merchant_name": merchant}
+            for description, (main, sub, merchant) in zip(data.descriptions, results)
+        ]
+    }
+
+
 @router.post(
     "/expenses",
     status_code=status.HTTP_201_CREATED,
@@ -185,12 +235,11 @@ def categorize_expense(
 )
 def create_expense(
     data: ExpenseRequest,
-    background_tasks: BackgroundTasks,
     expense_service: ExpenseService = Depends(get_expense_service),
     analysis_service: AnalysisService = Depends(get_analysis_service),
-    aggregation_svc: InsightsAggregationService = Depends(get_insights_aggregation_service),
     user_id: str = Depends(auth_required),
 ):
+    # Insight aggregation is queued in the same commit (services/insights_outbox.py).
     saved = expense_service.add_expense(
         user_id=user_id,
         date=data.date,
@@ -198,18 +247,10 @@ def create_expense(
         category=data.category,
         cost=data.cost,
         merchant_name=data.merchant_name,
+        queue_insights=True,
     )
     # Invalidate analysis cache on writes
-    analysis_service.invalidate_cache()
-    
-    # Asynchronous insight aggregation
-    background_tasks.add_task(
-        aggregation_svc.on_simple_expense_created,
-        user_email=user_id,
-        merchant_name=data.merchant_name,
-        purchased_at=datetime.strptime(saved["date"], "%m/%d/%Y"),
-        amount=data.cost
-    )
+    analysis_service.invalidate_cache(user_id)
     
     # Normalize to response model shape
     expense_payload = {
@@ -234,14 +275,36 @@ def export_personal_expenses_csv(
     svc: PersonalExportService = Depends(get_personal_export_service),
     user_id: str = Depends(auth_required),
 ):
-    csv_text = svc.export_csv(user_id, start_date=start_date, end_date=end_date)
     return StreamingResponse(
-        iter([csv_text]),
+        svc.export_csv(user_id, start_date=start_date, end_date=end_date),
         media_type="text/csv",
         headers={"Content-Disposition": 'attachment; filename="trackspense_expenses.csv"'},
     )
 
 
+@router.get(
+    "/expenses/export.{fmt}.zip",
+    tags=["Expenses"],
+    summary="Export my personal expenses and their items as Parquet or Arrow IPC",
+)
+def export_personal_expenses_columnar(
+    fmt: ColumnarFormat,
+    start_date: Optional[str] = Query(None, description="Inclusive MM/DD/YYYY lower bound"),
+    end_date: Optional[str] = Query(None, description="Inclusive MM/DD/YYYY upper bound"),
+    svc: ColumnarExportService = Depends(get_columnar_export_service),
+    user_id: str = Depends(auth_required),
+):
+    try:
+        chunks = svc.export_personal(user_id, fmt, export_scope(start_date, end_date))
+    except ColumnarExportUnavailable as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+    return StreamingResponse(
+        chunks,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="trackspense_expenses_{fmt.value}.zip"'},
+    )
+
+
 @router.get(
     "/expenses",
     response_model=ExpenseListResponse,
@@ -249,16 +312,33 @@ def export_personal_expenses_csv(
     summary="List expenses for a user",
 )
 def list_expenses(
-    limit: int = Query(30, ge=1),
+    limit: int = Query(30, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; takes precedence over offset"),
+    start_date: Optional[str] = Query(None, description="Inclusive YYYY-MM-DD lower bound"),
+    end_date: Optional[str] = Query(None, description="Inclusive YYYY-MM-DD upper bound"),
+    category: Optional[str] = None,
+    merchant: Optional[str] = Query(None, description="Exact merchant name, case-insensitive"),
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
     expense_service: ExpenseService = Depends(get_expense_service),
     user_id: str = Depends(auth_required),
 ):
-    expenses = expense_service.get_expenses_for_user(user_id)
-    expenses.sort(key=lambda r: datetime.strptime(r["date"], "%m/%d/%Y"), reverse=True)
-    sliced = expenses[offset : offset + limit]
-    next_offset = offset + limit if offset + limit < len(expenses) else None
-    return {"items": sliced, "next_offset": next_offset}
+    try:
+        dates = DateScope.from_params(start_date=start_date, end_date=end_date) if start_date or end_date else None
+        return expense_service.list_expenses_page(
+            user_id,
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
+            dates=dates,
+            category=category,
+            merchant=merchant,
+            min_amount=min_amount,
+            max_amount=max_amount,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.put(
@@ -270,10 +350,8 @@ def list_expenses(
 def update_expense(
     row_id: str,
     data: ExpenseRequest,
-    background_tasks: BackgroundTasks,
     expense_service: ExpenseService = Depends(get_expense_service),
     analysis_service: AnalysisService = Depends(get_analysis_service),
-    aggregation_svc: InsightsAggregationService = Depends(get_insights_aggregation_service),
     user_id: str = Depends(auth_required),
 ):
     saved, old_data = expense_service.update_expense(
@@ -284,21 +362,10 @@ def update_expense(
         category=data.category,
         cost=data.cost,
         merchant_name=data.merchant_name,
+        queue_insights=True,
     )
-    analysis_service.invalidate_cache()
+    analysis_service.invalidate_cache(user_id)
     
-    if old_data:
-        background_tasks.add_task(
-            aggregation_svc.on_simple_expense_updated,
-            user_email=user_id,
-            old_merchant_name=old_data["merchant_name"],
-            old_amount=old_data["amount"],
-            old_purchased_at=old_data["purchased_at"],
-            new_merchant_name=data.merchant_name,
-            new_amount=data.cost,
-            new_purchased_at=datetime.strptime(saved["date"], "%m/%d/%Y")
-        )
-        
     expense_payload = {
         "user_id": saved.get("User ID", user_id),
         "date": data.date,
@@ -318,25 +385,12 @@ def update_expense(
 )
 def delete_expense(
     row_id: str,
-    background_tasks: BackgroundTasks,
     expense_service: ExpenseService = Depends(get_expense_service),
     analysis_service: AnalysisService = Depends(get_analysis_service),
-    aggregation_svc: InsightsAggregationService = Depends(get_insights_aggregation_service),
-    _: str = Depends(auth_required),
+    user_id: str = Depends(auth_required),
 ):
-    deleted_data = expense_service.delete_expense(row_id)
-    analysis_service.invalidate_cache()
-    
-    if deleted_data:
-        background_tasks.add_task(
-            aggregation_svc.on_expense_deleted,
-            user_email=deleted_data["user_email"],
-            merchant_name=deleted_data["merchant_name"],
-            amount=deleted_data["amount"],
-            purchased_at=deleted_data["purchased_at"],
-            items=deleted_data.get("items", [])
-        )
-        
+    expense_service.delete_expense(row_id, queue_insights=True)
+    analysis_service.invalidate_cache(user_id)
     return {"success": True}
 
 
@@ -483,6 +537,10 @@ def analysis(
     end_date: str | None = None,
     scope: str = Query(default="personal", pattern="^(personal|combined|groups|i_paid|group_total)$"),
     group_id: str | None = None,
+    include_details: bool = Query(
+        default=True,
+        description="Set false to omit category_expense_details and page them via /analysis/details",
+    ),
     response: Response = None,
     analysis_service: AnalysisService = Depends(get_analysis_service),
     user_id: str = Depends(auth_required),
@@ -504,6 +562,7 @@ def analysis(
         use_cache=True,
         scope=scope,
         group_id=group_id,
+        include_details=include_details,
     )
     if response is not None:
         # Align Cache-Control header with service TTL
@@ -511,6 +570,48 @@ def analysis(
     return result
 
 
+@router.get(
+    "/analysis/details",
+    response_model=AnalysisDetailsPage,
+    tags=["Analysis"],
+    summary="Page through one category's expenses for an analysis view",
+)
+def analysis_details(
+    category: str,
+    year: int | None = Query(default=None, ge=1970, le=2100),
+    month: int | None = Query(default=None, ge=1, le=12),
+    start_date: str | None = None,
+    end_date: str | None = None,
+    scope: str = Query(default="personal", pattern="^(personal|combined|groups|i_paid|group_total)$"),
+    group_id: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = None,
+    analysis_service: AnalysisService = Depends(get_analysis_service),
+    user_id: str = Depends(auth_required),
+):
+    """The drill-down counterpart of /analysis?include_details=false: the same rows
+    category_expense_details would hold for `category`, newest first, a page at a time."""
+    if not Settings().GROUPS_ENABLED:
+        # Same downgrade as /analysis (TS-GRP-111).
+        scope = "personal"
+        group_id = None
+    try:
+        return analysis_service.category_details_page(
+            user_id=user_id,
+            category=category,
+            year=year,
+            month=month,
+            start_date=start_date,
+            end_date=end_date,
+            scope=scope,
+            group_id=group_id,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
 @router.post(
     "/analysis/chat",
     response_model=ChatResponse,
@@ -574,22 +675,81 @@ def analysis_chat(
     "/ingest/receipt/parse",
     response_model=ReceiptParseResponse,
     tags=["Expenses"],
-    summary="OCR and parse a receipt without persisting",
+    summary="OCR and parse a receipt on this request (no expense is created)",
 )
 @limiter.limit("3/minute")
 def parse_receipt(
     request: Request,
     file: UploadFile = File(...),
     save_ocr_text: bool = False,
-    receipt_service: ReceiptService = Depends(get_receipt_service),
-    _: str = Depends(auth_required),
+    jobs: ReceiptJobService = Depends(get_receipt_job_service),
+    user_id: str = Depends(auth_required),
 ):
+    """Every parse is stored as a done ReceiptParseJob, OCR text included, so an
+    identical upload is answered from it; save_ocr_text only decides whether
+    this response carries the text."""
     data = file.file.read()
-    return receipt_service.parse(
-        data,
-        content_type=file.content_type or "image/png",
-        save_ocr_text=save_ocr_text,
-    )
+    result = jobs.parse_now(user_id, data, content_type=file.content_type or "image/png")
+    return ReceiptJobService.view(result, save_ocr_text)
+
+
+def _receipt_job_response(job, save_ocr_text: bool) -> dict:
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "result": ReceiptJobService.view(job.result, save_ocr_text) if job.status == "done" else None,
+        "error": job.error if job.status == "failed" else None,
+    }
+
+
+@router.post(
+    "/ingest/receipt/jobs",
+    response_model=ReceiptParseJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Expenses"],
+    summary="Start parsing a receipt; poll the returned job for the result",
+)
+@limiter.limit("3/minute")
+def create_receipt_parse_job(
+    request: Request,
+    file: UploadFile = File(...),
+    save_ocr_text: bool = False,
+    jobs: ReceiptJobService = Depends(get_receipt_job_service),
+    user_id: str = Depends(auth_required),
+):
+    data = file.file.read()
+    try:
+        job = jobs.submit(user_id, data, content_type=file.content_type or "image/png")
+    except ReceiptQueueFull:
+        raise HTTPException(
+            status_code=503, detail="Too many receipts are being parsed; please try again shortly.",
+            headers={"Retry-After": "10"},
+        )
+    return _receipt_job_response(job, save_ocr_text)
+
+
+@router.get(
+    "/ingest/receipt/jobs/{job_id}",
+    response_model=ReceiptParseJobResponse,
+    tags=["Expenses"],
+    summary="Status and, once done, result of a receipt parse job",
+)
+@limiter.limit("120/minute")
+def get_receipt_parse_job(
+    request: Request,
+    job_id: str,
+    save_ocr_text: bool = False,
+    jobs: ReceiptJobService = Depends(get_receipt_job_service),
+    user_id: str = Depends(auth_required),
+):
+    try:
+        parsed_id = _uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = jobs.get(user_id, parsed_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _receipt_job_response(job, save_ocr_text)
 
 
 @router.post(
@@ -602,7 +762,6 @@ def parse_receipt(
 def create_expense_with_items(
     payload: ExpenseWithItemsRequest,
     repo: PostgresRepo = Depends(get_postgres_repo),
-    aggregation_svc: InsightsAggregationService = Depends(get_insights_aggregation_service),
     user_id: str = Depends(auth_required),
     force: bool = Query(False),
 ):
@@ -629,25 +788,22 @@ def create_expense_with_items(
     if existing and not force:
         raise HTTPException(status_code=409, detail={"expense_id": existing.get("id")})
     expense_id = repo.append_expense({**header, "user_email": user_id, "split_type": "itemized"})
+    # Item + merchant insight aggregation, queued to commit with the items.
+    insights_outbox.enqueue(
+        repo.db, "expense_with_items_created",
+        user_email=user_id,
+        expense_id=expense_id,
+        merchant_name=header.get("merchant_name"),
+        purchased_at=header.get("purchased_at") if isinstance(header.get("purchased_at"), datetime) else None,
+        items=items,
+    )
     try:
         item_ids = repo.append_items(user_id, expense_id, items)
     except Exception:
+        repo.db.rollback()  # drops the queued event along with the items
         repo.delete_expense(expense_id)
         raise
 
-    # Trigger insights aggregation for item + merchant tracking
-    try:
-        aggregation_svc.on_expense_with_items_created(
-            user_email=user_id,
-            expense_id=expense_id,
-            merchant_name=header.get("merchant_name"),
-            purchased_at=header.get("purchased_at") if isinstance(header.get("purchased_at"), datetime) else None,
-            items=items,
-        )
-    except Exception as exc:
-        import logging as _log
-        _log.getLogger("varavu_selavu.routes").warning("Insights aggregation failed: %s", exc)
-
     return {"expense_id": expense_id, "item_ids": item_ids}
 
 
@@ -719,7 +875,7 @@ def update_expense_items(
     expense.discount = payload.discount
     db.add(expense)
     repo.append_items(user_id, expense_id, items)
-    analysis_service.invalidate_cache()
+    analysis_service.invalidate_cache(user_id)
 
     return {
         "items": repo.get_items_for_expense(expense_id),
@@ -851,11 +1007,9 @@ def get_recurring_due(
 )
 def confirm_recurring(
     payload: ConfirmRecurringRequest,
-    background_tasks: BackgroundTasks,
     svc: RecurringService = Depends(get_recurring_service),
     expense_service: ExpenseService = Depends(get_expense_service),
     group_expense_service: GroupExpenseService = Depends(get_group_expense_service),
-    notification_service: NotificationService = Depends(get_notification_service),
     analysis_service: AnalysisService = Depends(get_analysis_service),
     db: Session = Depends(get_db),
     user_id: str = Depends(auth_required),
@@ -919,7 +1073,7 @@ def confirm_recurring(
                 date_iso_str = str(it.get('date_iso'))
                 formatted_date = datetime.strptime(date_iso_str, "%Y-%m-%d").strftime("%m/%d/%Y")
                 
-                row = group_expense_service.create_expense(
+                group_expense_service.create_expense(
                     group_id=group_id,
                     actor_email=user_id,
                     date=formatted_date,
@@ -930,24 +1084,9 @@ def confirm_recurring(
                     payers=payers,
                     split_type=split_config.get("type", "equal"),
                     split_entries=split_entries,
+                    notify=True,
                 )
-                analysis_service.invalidate_cache()
-                
-                eid = row.get("row_id")
-                if eid:
-                    shares = {
-                        str(s.member_id): float(s.amount_owed)
-                        for s in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == eid).all()
-                    }
-                    background_tasks.add_task(
-                        notification_service.fan_out,
-                        event_type="expense_added",
-                        group_id=group_id,
-                        actor_email=user_id,
-                        expense_description=d['description'],
-                        expense_amount=cost,
-                        shares=shares,
-                    )
+                analysis_service.invalidate_group_cache(group_id)
             except Exception as e:
                 # If group is archived/deleted or other validation fails, skip.
                 import logging
@@ -977,11 +1116,9 @@ def confirm_recurring(
 )
 def execute_recurring_now(
     payload: dict,
-    background_tasks: BackgroundTasks,
     svc: RecurringService = Depends(get_recurring_service),
     expense_service: ExpenseService = Depends(get_expense_service),
     group_expense_service: GroupExpenseService = Depends(get_group_expense_service),
-    notification_service: NotificationService = Depends(get_notification_service),
     analysis_service: AnalysisService = Depends(get_analysis_service),
     db: Session = Depends(get_db),
     user_id: str = Depends(auth_required),
@@ -1063,7 +1200,7 @@ def execute_recurring_now(
                 # group_expense_service._parse_date expects MM/DD/YYYY
                 formatted_date = _dt.strptime(expense_date_iso, "%Y-%m-%d").strftime("%m/%d/%Y")
                     
-                row = group_expense_service.create_expense(
+                group_expense_service.create_expense(
                     group_id=group_id,
                     actor_email=user_id,
                     date=formatted_date,
@@ -1074,24 +1211,9 @@ def execute_recurring_now(
                     payers=payers,
                     split_type=split_config.get("type", "equal"),
                     split_entries=split_entries,
+                    notify=True,
                 )
-                analysis_service.invalidate_cache()
-                
-                eid = row.get("row_id")
-                if eid:
-                    shares = {
-                        str(s.member_id): float(s.amount_owed)
-                        for s in db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == eid).all()
-                    }
-                    background_tasks.add_task(
-                        notification_service.fan_out,
-                        event_type="expense_added",
-                        group_id=group_id,
-                        actor_email=user_id,
-                        expense_description=tpl['description'],
-                        expense_amount=use_cost,
-                        shares=shares,
-                    )
+                analysis_service.invalidate_group_cache(group_id)
                 created = True
             except Exception as e:
                 import logging
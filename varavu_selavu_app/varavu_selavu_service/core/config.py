@@ -39,6 +39,13 @@ class Settings(BaseSettings):
 
     # Analysis cache TTL (seconds)
     ANALYSIS_CACHE_TTL_SEC: int = 60
+    # Analysis cache backend (services/analysis_cache.py): "lru" is per-process and
+    # bounded by entries/bytes; "redis" is shared across workers via
+    # ANALYSIS_CACHE_REDIS_URL, or an in-process stand-in when that is empty.
+    ANALYSIS_CACHE_BACKEND: str = "lru"
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 1024
+    ANALYSIS_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    ANALYSIS_CACHE_REDIS_URL: str = ""
 
     # PostgreSQL Toggles
     DATABASE_URL: str = ""
@@ -49,6 +56,23 @@ class Settings(BaseSettings):
     MAX_UPLOAD_MB: int = 12
     ALLOWED_MIME: str = "image/png,image/jpeg,application/pdf"
     LLM_TIMEOUT_SEC: int = 180
+    # POST /ingest/receipt/jobs (services/receipt_job_service.py): parses run on this
+    # many threads per process, at most RECEIPT_PARSE_MAX_PENDING distinct uploads
+    # queued or running at once (more get a 503); a job still pending after
+    # RECEIPT_JOB_EXPIRY_SEC (its process went away) is reported failed.
+    RECEIPT_PARSE_WORKERS: int = 2
+    RECEIPT_PARSE_MAX_PENDING: int = 20
+    RECEIPT_JOB_EXPIRY_SEC: int = 900
+    # POST /categorize/batch: descriptions per LLM prompt, and prompts in flight at once.
+    CATEGORIZE_BATCH_SIZE: int = 25
+    CATEGORIZE_BATCH_CONCURRENCY: int = 4
+    # EntityResolutionService's in-process name/alias index: seconds before a
+    # shard is reloaded to pick up other processes' writes.
+    ENTITY_INDEX_TTL_SEC: int = 300
+    # services/spend_rollup_service.py: a user with no monthly spend rollup yet gets
+    # one built on a background thread after their first write commits. Set false to
+    # leave that to scripts/backfill_spend_rollups.py (they read raw rows until then).
+    SPEND_ROLLUP_BACKGROUND_BUILD: bool = True
 
     # Email
     MAIL_USERNAME: str = ""
@@ -74,6 +98,12 @@ class Settings(BaseSettings):
     # group-related is reachable until explicitly enabled (spec §13.4).
     GROUPS_ENABLED: bool = False
     PUBLIC_APP_URL: str = "http://localhost:3000"
+    # simplify_debts engine (services/debt_simplification.py): "optimal" finds the
+    # fewest transfers for up to DEBT_SIMPLIFY_MAX_MEMBERS nonzero nets within
+    # DEBT_SIMPLIFY_TIME_BUDGET_MS, falling back to "greedy" past either limit.
+    DEBT_SIMPLIFY_MODE: str = "optimal"
+    DEBT_SIMPLIFY_MAX_MEMBERS: int = 20
+    DEBT_SIMPLIFY_TIME_BUDGET_MS: int = 250
 
     # Smart Entity Resolution (TS-ENT series) — same staged-rollout pattern as
     # GROUPS_ENABLED. See docs/features/smart_entity/TrackSpense_Smart_Entity_Resolution_Spec.md.
@@ -81,11 +111,42 @@ class Settings(BaseSettings):
 
     # Push notifications (TS-GRP-110) — Expo Push Service, no FCM/APNs plumbing needed.
     EXPO_PUSH_URL: str = "https://exp.host/--/api/v2/push/send"
+    EXPO_RECEIPTS_URL: str = "https://exp.host/--/api/v2/push/getReceipts"
     EXPO_ACCESS_TOKEN: str = ""
+    # services/notification_dispatcher.py delivers the notification outbox. By default
+    # each API process runs one in a background thread; set this false when running
+    # scripts/run_notification_dispatcher.py as its own process instead.
+    NOTIFICATION_DISPATCHER_IN_PROCESS: bool = True
+    NOTIFICATION_DISPATCH_CONCURRENCY: int = 4  # Expo requests in flight at once
+    NOTIFICATION_POLL_INTERVAL_SEC: float = 2.0
+    # A burst of expense/comment events in one group reaches each recipient as one
+    # push: the first goes out at once, the rest of the burst is summarized when this
+    # window closes. 0 turns coalescing off. Per-user digests: digest_minutes.
+    NOTIFICATION_COALESCE_WINDOW_SEC: int = 120
+
+    # services/insights_outbox.py applies queued insight aggregation events. Like the
+    # notification dispatcher, each API process runs a worker in a background thread
+    # unless this is false (scripts/run_insights_worker.py runs one on its own).
+    INSIGHTS_WORKER_IN_PROCESS: bool = True
+    INSIGHTS_POLL_INTERVAL_SEC: float = 1.0
+    # On shutdown the worker keeps applying due events for up to this long before
+    # it stops; anything left is picked up by the next worker to start.
+    INSIGHTS_DRAIN_TIMEOUT_SEC: float = 20.0
+    # Oldest pending event older than this: the worker logs a warning each pass.
+    INSIGHTS_LAG_WARN_SEC: float = 300.0
 
     # Multi-currency groups (TS-GRP-131) — free, no-API-key exchange rate provider.
     # A lookup failure never blocks expense creation; FxRateService falls back to 1:1.
     FX_RATE_API_URL: str = "https://open.er-api.com/v6/latest"
+    # Today's rate missing but one at most this many days old stored: serve it and
+    # fetch today's in the background instead of making the request wait.
+    FX_RATE_STALE_DAYS: int = 3
+    # Each API process pre-warms today's rates for active groups' currencies this
+    # often (0 = never; scripts/refresh_fx_rates.py does the same from cron).
+    FX_RATE_REFRESH_INTERVAL_SEC: int = 6 * 3600
+    # Air-gapped runs: never call the provider; serve the latest stored rate
+    # (scripts/refresh_fx_rates.py --import) or 1:1.
+    FX_RATE_OFFLINE: bool = False
 
     # Budgets (TS-BUD series) — unlike GROUPS_ENABLED/ENTITY_RESOLUTION_ENABLED's staged
     # rollout, this defaults ON: budgets are personal-only, additive, and have no cross-user
@@ -9,7 +9,9 @@ Only `str` cells are guarded — numeric cells (amounts) are passed through so a
 legitimately negative number is not mangled into text.
 """
 
-from typing import Iterable, List
+import csv
+import io
+from typing import Iterable, Iterator, List
 
 _FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
 
@@ -25,3 +27,29 @@ def sanitize_csv_cell(value):
 
 def sanitize_csv_row(row: Iterable) -> List:
     return [sanitize_csv_cell(cell) for cell in row]
+
+
+def iter_csv(header: Iterable, rows: Iterable[Iterable], rows_per_chunk: int = 500) -> Iterator[str]:
+    """Streams a guarded CSV as text chunks of about `rows_per_chunk` rows, for
+    StreamingResponse. The first chunk carries a UTF-8 BOM (so Excel-on-Windows
+    opens non-ASCII text unmangled) and the header, and is yielded before any row
+    is read, so a download starts while the rows are still being fetched."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("﻿")
+    writer.writerow(sanitize_csv_row(header))
+    yield buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+
+    pending = 0
+    for row in rows:
+        writer.writerow(sanitize_csv_row(row))
+        pending += 1
+        if pending == rows_per_chunk:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    if pending:
+        yield buf.getvalue()
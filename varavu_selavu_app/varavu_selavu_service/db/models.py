@@ -1,8 +1,8 @@
 import uuid
-from sqlalchemy import Column, String, Numeric, DateTime, Integer, Date, ForeignKey, Text, JSON, UniqueConstraint, CheckConstraint, Boolean, Index
+from sqlalchemy import Column, String, Numeric, DateTime, Integer, BigInteger, Date, ForeignKey, Text, JSON, UniqueConstraint, CheckConstraint, Boolean, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from varavu_selavu_service.db.session import Base
 
 
@@ -48,11 +48,23 @@ class EmailToken(Base):
 
 class Expense(Base):
     __tablename__ = "expenses"
-    __table_args__ = {"schema": "trackspense"}
+    __table_args__ = (
+        # Personal ledger reads (analysis, budgets, insights, GET /expenses) are all
+        # `user_email = ? AND group_id IS NULL` plus a purchased_at range or order;
+        # id makes the (purchased_at, id) keyset order an index walk too.
+        Index(
+            "idx_expenses_personal_user_purchased", "user_email", "purchased_at", "id",
+            postgresql_where=text("group_id IS NULL"), sqlite_where=text("group_id IS NULL"),
+        ),
+        # Group listings/exports/balances: `group_id = ? ORDER BY purchased_at`. Also
+        # serves every plain group_id lookup, so group_id has no index of its own.
+        Index("idx_expenses_group_purchased", "group_id", "purchased_at", "id"),
+        {"schema": "trackspense"}
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_email = Column(String(255), ForeignKey("trackspense.users.email", ondelete="SET NULL"), index=True)
-    group_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.groups.id", ondelete="SET NULL"), index=True)
+    group_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.groups.id", ondelete="SET NULL"))
     split_type = Column(String(20))
     # TS-GRP-131: FX rate at creation time (expense.currency -> group.currency),
     # snapshotted once and never recomputed retroactively. NULL = same currency.
@@ -118,7 +130,10 @@ class RecurringTemplate(Base):
 
 class ItemInsight(Base):
     __tablename__ = "item_insights"
-    __table_args__ = {"schema": "trackspense"}
+    __table_args__ = (
+        UniqueConstraint("user_email", "normalized_name", name="uq_item_insights_user_name"),
+        {"schema": "trackspense"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_email = Column(String(255), ForeignKey("trackspense.users.email", ondelete="CASCADE"), nullable=False, index=True)
@@ -152,7 +167,10 @@ class ItemPriceHistory(Base):
 
 class MerchantInsight(Base):
     __tablename__ = "merchant_insights"
-    __table_args__ = {"schema": "trackspense"}
+    __table_args__ = (
+        UniqueConstraint("user_email", "merchant_name", name="uq_merchant_insights_user_name"),
+        {"schema": "trackspense"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_email = Column(String(255), ForeignKey("trackspense.users.email", ondelete="CASCADE"), nullable=False, index=True)
@@ -168,7 +186,10 @@ class MerchantInsight(Base):
 
 class MerchantAggregate(Base):
     __tablename__ = "merchant_aggregates"
-    __table_args__ = {"schema": "trackspense"}
+    __table_args__ = (
+        UniqueConstraint("merchant_insight_id", "year", "month", name="uq_merchant_aggregates_month"),
+        {"schema": "trackspense"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     merchant_insight_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.merchant_insights.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -179,6 +200,34 @@ class MerchantAggregate(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+class InsightsOutbox(Base):
+    """An expense mutation whose insight deltas are still to be applied. Written
+    by services/insights_outbox.enqueue on the mutation's own session and
+    committed with it; InsightsOutboxWorker claims due rows in seq order
+    (pushing available_at forward as a lease), folds a whole claim into one set
+    of deltas, and deletes the rows in the transaction that applies them.
+    Failing events are retried with backoff and parked as status "dead" after
+    InsightsOutboxWorker.MAX_ATTEMPTS."""
+    __tablename__ = "insights_outbox"
+    __table_args__ = (
+        Index("idx_insights_outbox_due", "status", "available_at"),
+        {"schema": "trackspense"}
+    )
+
+    # Claim order. created_at cannot be it: now() is fixed per transaction on
+    # Postgres and to the second on SQLite, and id is a random uuid4.
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    id = Column(UUID(as_uuid=True), nullable=False, unique=True, default=uuid.uuid4)
+    # One of services/insights_outbox.EVENTS: the InsightsAggregationService
+    # entry point (without "on_") that payload is the keyword arguments of.
+    event_type = Column(String(40), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(10), nullable=False, default="pending")  # "pending" | "dead"
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
 class Group(Base):
     __tablename__ = "groups"
     __table_args__ = {"schema": "trackspense"}
@@ -228,7 +277,13 @@ class GroupInvitation(Base):
 class ExpensePayer(Base):
     __tablename__ = "expense_payers"
     __table_args__ = (
-        UniqueConstraint("expense_id", "member_id", name="uq_expense_payers_expense_member"),
+        # A unique index rather than a constraint so Postgres can carry amount_paid
+        # as an INCLUDE column: balance recomputes (`expense_id IN (...)` reading
+        # expense_id, member_id, amount_paid) become index-only scans.
+        Index(
+            "uq_expense_payers_expense_member", "expense_id", "member_id",
+            unique=True, postgresql_include=["amount_paid"],
+        ),
         {"schema": "trackspense"}
     )
 
@@ -240,7 +295,11 @@ class ExpensePayer(Base):
 class ExpenseSplit(Base):
     __tablename__ = "expense_splits"
     __table_args__ = (
-        UniqueConstraint("expense_id", "member_id", name="uq_expense_splits_expense_member"),
+        # See ExpensePayer: unique index covering amount_owed on Postgres.
+        Index(
+            "uq_expense_splits_expense_member", "expense_id", "member_id",
+            unique=True, postgresql_include=["amount_owed"],
+        ),
         {"schema": "trackspense"}
     )
 
@@ -286,6 +345,86 @@ class Settlement(Base):
     created_by = Column(String(255), ForeignKey("trackspense.users.email", ondelete="SET NULL"))
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+class GroupBalance(Base):
+    """TS-GRP-135: materialized net(m) per (group, member), kept in step with the raw
+    ledger by BalanceService.apply_expense/apply_settlement inside the same transaction as every
+    expense/settlement write. A group with no rows at all has never been materialized
+    (pre-migration history) — BalanceService falls back to the raw ledger for it rather
+    than trusting an empty table. `net` keeps 8 decimal places because FX-converted
+    payer/split amounts (Numeric(12,2) x Numeric(12,6)) are summed unrounded, exactly
+    as the on-request computation does."""
+    __tablename__ = "group_balances"
+    __table_args__ = (
+        UniqueConstraint("group_id", "member_id", name="uq_group_balances_group_member"),
+        {"schema": "trackspense"}
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    group_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.groups.id", ondelete="CASCADE"), nullable=False, index=True)
+    member_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.group_members.id", ondelete="CASCADE"), nullable=False)
+    net = Column(Numeric(20, 8), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class GroupPairBalance(Base):
+    """Pairwise net between two seats of one group, the non-simplified "who owes whom
+    directly" ledger FriendBalanceService reads across all of a user's groups. Keyed
+    (member_a_id, member_b_id) with member_a_id < member_b_id; a positive `net` means
+    a owes b. Maintained alongside GroupBalance by the same writes and seeded with it
+    — a group's GroupBalance rows are the materialization marker for both tables.
+    Keyed by seat rather than email so invite acceptance and account anonymization
+    need no rewrite here."""
+    __tablename__ = "group_pair_balances"
+    __table_args__ = (
+        UniqueConstraint("group_id", "member_a_id", "member_b_id", name="uq_group_pair_balances_group_pair"),
+        {"schema": "trackspense"}
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    group_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.groups.id", ondelete="CASCADE"), nullable=False, index=True)
+    member_a_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.group_members.id", ondelete="CASCADE"), nullable=False, index=True)
+    member_b_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.group_members.id", ondelete="CASCADE"), nullable=False, index=True)
+    net = Column(Numeric(20, 8), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class MonthlySpendRollup(Base):
+    """Per-user spend summed by (scope, calendar month, category), so analytics over
+    whole months read O(months x categories) rows instead of every expense. Scopes
+    mirror AnalysisService's legs: `personal` (own expenses, group_id IS NULL),
+    `my_share` (own split rows) and `i_paid` (own payer rows on group expenses).
+    `year_month` is the same 'YYYY-MM' bucket AnalysisService's month expression
+    produces; undated expenses are never rolled up. Maintained on every flush by
+    services/spend_rollup_service.py for users with a SpendRollupState marker;
+    users without one are read from raw rows. Keyed by email rather than FK'd to
+    users, since split/payer seats can belong to not-yet-registered invitees."""
+    __tablename__ = "monthly_spend_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_email", "scope", "year_month", "category", name="uq_monthly_spend_rollups_key"),
+        {"schema": "trackspense"}
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_email = Column(String(255), nullable=False)
+    scope = Column(String(20), nullable=False)
+    year_month = Column(String(7), nullable=False)
+    category = Column(String(100), nullable=False)
+    total = Column(Numeric(14, 2), nullable=False, default=0)
+    expense_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class SpendRollupState(Base):
+    """One row per user whose MonthlySpendRollup rows are complete — written when the
+    rollup is first built (in the background after that user's first write, or by
+    scripts/backfill_spend_rollups.py) and row-locked while a refresh rewrites them."""
+    __tablename__ = "spend_rollup_state"
+    __table_args__ = {"schema": "trackspense"}
+
+    user_email = Column(String(255), primary_key=True)
+    built_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class GroupActivity(Base):
     __tablename__ = "group_activity"
     __table_args__ = (
@@ -330,10 +469,75 @@ class GroupNotificationPreference(Base):
     group_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.groups.id", ondelete="CASCADE"), nullable=False, index=True)
     muted = Column(Boolean, nullable=False, default=False)
     muted_events = Column(JSON, nullable=False, default=list)
+    # None: push each event as it happens (bursts still coalesce over
+    # NOTIFICATION_COALESCE_WINDOW_SEC). Otherwise collect expense and comment
+    # events into one summary push at most every this many minutes.
+    digest_minutes = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
 
+class NotificationOutbox(Base):
+    """A group event awaiting push delivery. Written by NotificationService.enqueue
+    on the request's own session; services/notification_dispatcher.py claims due
+    rows (pushing available_at forward as a lease), deletes them once delivered,
+    reschedules them with backoff on failure, and parks them as status "dead"
+    after NotificationDispatcher.MAX_ATTEMPTS."""
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("idx_notification_outbox_due", "status", "available_at"),
+        {"schema": "trackspense"}
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    group_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.groups.id", ondelete="CASCADE"), nullable=False)
+    actor_email = Column(String(255), nullable=False)
+    event_type = Column(String(40), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(10), nullable=False, default="pending")  # "pending" | "dead"
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class PushTicket(Base):
+    """An accepted Expo push awaiting its receipt. Expo only reports some delivery
+    failures (notably DeviceNotRegistered) in the receipt, fetched some minutes
+    after the send; the dispatcher prunes the token on such a receipt and deletes
+    the ticket either way."""
+    __tablename__ = "push_tickets"
+    __table_args__ = {"schema": "trackspense"}
+
+    ticket_id = Column(String(64), primary_key=True)
+    user_email = Column(String(255), ForeignKey("trackspense.users.email", ondelete="CASCADE"), nullable=False)
+    expo_push_token = Column(String(255), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class NotificationDigest(Base):
+    """Coalesced pushes for one (recipient, group). While window_ends_at is in the
+    future, coalescible events for the pair are appended to `items` instead of
+    being pushed; once it passes, the dispatcher sends one summary push for the
+    items and, in "coalesce" mode, re-arms the window so a continuing burst keeps
+    being collected. Rows whose window has passed with nothing collected are
+    deleted."""
+    __tablename__ = "notification_digests"
+    __table_args__ = (
+        UniqueConstraint("user_email", "group_id", name="uq_notification_digests_user_group"),
+        Index("idx_notification_digests_due", "window_ends_at"),
+        {"schema": "trackspense"}
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_email = Column(String(255), ForeignKey("trackspense.users.email", ondelete="CASCADE"), nullable=False)
+    group_id = Column(UUID(as_uuid=True), ForeignKey("trackspense.groups.id", ondelete="CASCADE"), nullable=False)
+    mode = Column(String(10), nullable=False)  # "coalesce" | "digest"
+    items = Column(JSON, nullable=False, default=list)
+    item_count = Column(Integer, nullable=False, default=0)
+    window_ends_at = Column(DateTime(timezone=True), nullable=False)
+
+
 class ExpenseComment(Base):
     """TS-GRP-126: flat, chronological comments per group expense (Splitwise-style, not threaded)."""
     __tablename__ = "expense_comments"
@@ -419,6 +623,42 @@ class FxRate(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 
+class ReceiptParseJob(Base):
+    """One receipt upload parsed off the request path. The parse result is kept
+    on the row, and a later upload of the same bytes (content_sha256) with the
+    same engine is answered from it instead of calling the model again."""
+    __tablename__ = "receipt_parse_jobs"
+    __table_args__ = (
+        Index("idx_receipt_parse_jobs_sha_engine", "content_sha256", "engine"),
+        {"schema": "trackspense"}
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_email = Column(String(255), ForeignKey("trackspense.users.email", ondelete="CASCADE"), nullable=False, index=True)
+    content_sha256 = Column(String(64), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    engine = Column(String(20), nullable=False)
+    status = Column(String(10), nullable=False)  # "queued" | "running" | "done" | "failed"
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    finished_at = Column(DateTime(timezone=True))
+
+
+class CategorizationCacheEntry(Base):
+    """LLM categorization answers, keyed by the normalized description, so a
+    description is only ever sent to the model once. Shared across users — the
+    row holds nothing the description itself doesn't say."""
+    __tablename__ = "categorization_cache"
+    __table_args__ = {"schema": "trackspense"}
+
+    description_key = Column(String(255), primary_key=True)
+    main_category = Column(String(100), nullable=False)
+    subcategory = Column(String(100), nullable=False)
+    merchant_name = Column(String(255))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class Budget(Base):
     """TS-BUD-101: a per-user monthly spending limit, overall or per-category, tracked against
     the same unified personal/combined ledger AnalysisService already computes (spec §8) — no
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.responses import FileResponse
 from pathlib import Path
@@ -12,6 +14,10 @@ from varavu_selavu_service.core.limiter import limiter
 from varavu_selavu_service.core.config import Settings
 from varavu_selavu_service.core.csrf import CSRFMiddleware
 from varavu_selavu_service.auth.security import assert_signing_secret_is_safe
+from varavu_selavu_service.db.session import SessionLocal
+from varavu_selavu_service.services import insights_outbox
+from varavu_selavu_service.services.fx_rate_service import run_refresher_in_thread
+from varavu_selavu_service.services.notification_dispatcher import run_in_thread
 
 settings = Settings()
 
@@ -24,7 +30,31 @@ logging.basicConfig(
 # Fail fast rather than serve traffic with a forgeable signing key.
 assert_signing_secret_is_safe(settings.ENVIRONMENT, settings.JWT_SECRET)
 
-app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Off-request-path workers. Deployments that run them as their own processes
+    # (scripts/run_notification_dispatcher.py, scripts/run_insights_worker.py,
+    # scripts/refresh_fx_rates.py) turn them off with
+    # NOTIFICATION_DISPATCHER_IN_PROCESS=false, INSIGHTS_WORKER_IN_PROCESS=false
+    # and FX_RATE_REFRESH_INTERVAL_SEC=0.
+    workers = []
+    if settings.NOTIFICATION_DISPATCHER_IN_PROCESS:
+        workers.append(run_in_thread(SessionLocal, settings))
+    if settings.INSIGHTS_WORKER_IN_PROCESS:
+        workers.append(insights_outbox.run_in_thread(SessionLocal, settings))
+    if settings.FX_RATE_REFRESH_INTERVAL_SEC and not settings.FX_RATE_OFFLINE:
+        workers.append(run_refresher_in_thread(SessionLocal, settings))
+    yield
+    for _, stop in workers:
+        stop.set()
+    # The insights worker drains its due events before exiting.
+    for thread, _ in workers:
+        thread.join(timeout=10 + settings.INSIGHTS_DRAIN_TIMEOUT_SEC)
+
+
+app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION, lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -46,6 +46,15 @@ class ReceiptParseResponse(BaseModel):
     ocr_text: str | None = None
 
 
+class ReceiptParseJobResponse(BaseModel):
+    """An asynchronous receipt parse. `result` is set once status is "done",
+    `error` once it is "failed"; poll while it is "queued" or "running"."""
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    result: Optional[ReceiptParseResponse] = None
+    error: Optional[str] = None
+
+
 class ExpenseItem(BaseModel):
     line_no: int
     item_name: DescriptionStr
@@ -114,6 +123,20 @@ class CategorizeResponse(BaseModel):
     merchant_name: Optional[str] = None
 
 
+class CategorizeBatchRequest(BaseModel):
+    """Request payload for categorizing many descriptions at once (imports, backfills)."""
+    descriptions: List[DescriptionStr] = Field(..., min_length=1, max_length=500)
+
+
+class CategorizeBatchItem(CategorizeResponse):
+    description: str
+
+
+class CategorizeBatchResponse(BaseModel):
+    """One result per requested description, in request order."""
+    results: List[CategorizeBatchItem]
+
+
 class ChatRequest(BaseModel):
     """
     Payload for the `/analysis/chat` endpoint.
@@ -140,6 +163,12 @@ class HealthResponse(BaseModel):
     status: str = "healthy"
 
 
+class InsightsOutboxHealthResponse(BaseModel):
+    pending: int  # insight aggregation events waiting to be applied
+    dead: int  # events given up on after repeated failures
+    lag_seconds: float  # age of the oldest pending event; 0 when none is waiting
+
+
 class FeatureFlagsResponse(BaseModel):
     # Client-visible flag surface (TS-GRP-111) — lets web/mobile hide Groups nav,
     # filters, and toggles without relying on a 404 probe against /groups.
@@ -191,6 +220,7 @@ class ExpenseListResponse(BaseModel):
     """Paginated list of expenses."""
     items: List[ExpenseRow]
     next_offset: int | None = None
+    next_cursor: str | None = None
 
 
 class CategoryTotal(BaseModel):
@@ -247,6 +277,12 @@ class AnalysisResponse(BaseModel):
     group_summaries: Optional[List[AnalysisGroupSummary]] = None
 
 
+class AnalysisDetailsPage(BaseModel):
+    """One page of a category's expense rows for GET /analysis/details."""
+    items: List[ExpenseDetail]
+    next_cursor: Optional[str] = None
+
+
 class ResolvedPeriod(BaseModel):
     """
     The concrete date range the chat agent actually used for a turn (TS-ANL-013)
@@ -584,6 +620,7 @@ class GroupExpenseCreatedResponse(BaseModel):
 class GroupExpenseListResponse(BaseModel):
     items: List[GroupExpenseRow]
     next_offset: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class MemberBalance(BaseModel):
@@ -642,11 +679,15 @@ class GroupNotificationPreferenceDTO(BaseModel):
     group_id: str
     muted: bool
     muted_events: List[str]
+    digest_minutes: Optional[int] = None
 
 
 class UpdateNotificationPreferenceRequest(BaseModel):
     muted: Optional[bool] = None
     muted_events: Optional[List[str]] = None
+    # Collect expense and comment pushes into one summary at most every N minutes;
+    # 0 switches back to a push per event.
+    digest_minutes: Optional[int] = Field(None, ge=0, le=1440)
 
 
 # ---------------------- Expense comments (TS-GRP-126) ---------------------- #
@@ -0,0 +1,214 @@
+"""Cache backends for AnalysisService.
+
+Entries are keyed per user and carry that user's generation number, so an
+expense write bumps only the writer's (or the affected group members')
+generation and every older entry for them simply stops being addressable,
+leaving other users' entries and hit rates untouched. Stale generations age out
+through TTL and the backend's own eviction.
+
+Two backends, selected by ANALYSIS_CACHE_BACKEND:
+
+- ``lru`` (default): in-process, bounded by entry count and serialized bytes,
+  least-recently-used eviction, expired entries dropped on access.
+- ``redis``: any redis-py compatible client at ANALYSIS_CACHE_REDIS_URL, so every
+  uvicorn worker shares one cache and one set of generation counters. With no
+  URL (or redis-py not installed) it runs against LocalRedis, an in-process
+  stand-in implementing the same get/set/incr subset, for development and tests.
+
+Values are stored JSON-encoded: byte accounting is exact and callers can never
+mutate a cached result in place.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("varavu_selavu.analysis_cache")
+
+_GENERATION_PREFIX = "analysis:gen:"
+_EPOCH_KEY = "analysis:epoch"
+_ENTRY_PREFIX = "analysis:entry:"
+
+
+class AnalysisCacheBackend(ABC):
+    """get/set of JSON-able values with a TTL, plus per-user generation counters."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_sec: int) -> None:
+        ...
+
+    @abstractmethod
+    def generation(self, user_id: str) -> int:
+        ...
+
+    @abstractmethod
+    def bump_generation(self, user_id: str) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def entry_key(self, user_id: str, params: Tuple) -> str:
+        return f"{_ENTRY_PREFIX}{user_id}:{self.generation(user_id)}:{json.dumps(params, default=str)}"
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _count(self, value: Optional[Any]) -> Optional[Any]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+
+class LRUCacheBackend(AnalysisCacheBackend):
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _drop(self, key: str) -> None:
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return self._count(None)
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                self._drop(key)
+                return self._count(None)
+            self._entries.move_to_end(key)
+        return self._count(json.loads(payload))
+
+    def set(self, key: str, value: Any, ttl_sec: int) -> None:
+        payload = json.dumps(value)
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.time() + ttl_sec, payload)
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def generation(self, user_id: str) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def bump_generation(self, user_id: str) -> int:
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            return self._generations[user_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._bytes = 0
+
+
+class LocalRedis:
+    """In-process stand-in for the redis-py calls RedisCacheBackend makes."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._lock = RLock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value, ex: Optional[int] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            self._data[key] = (time.time() + ex if ex else None, value)
+        return True
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            current = int(self.get(key) or 0) + 1
+            expires_at = self._data[key][0] if key in self._data else None
+            self._data[key] = (expires_at, str(current).encode())
+            return current
+
+
+class RedisCacheBackend(AnalysisCacheBackend):
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def get(self, key: str) -> Optional[Any]:
+        payload = self.client.get(key)
+        return self._count(json.loads(payload) if payload is not None else None)
+
+    def set(self, key: str, value: Any, ttl_sec: int) -> None:
+        self.client.set(key, json.dumps(value), ex=max(int(ttl_sec), 1))
+
+    def generation(self, user_id: str) -> int:
+        return int(self.client.get(_GENERATION_PREFIX + user_id) or 0)
+
+    def bump_generation(self, user_id: str) -> int:
+        return int(self.client.incr(_GENERATION_PREFIX + user_id))
+
+    def entry_key(self, user_id: str, params: Tuple) -> str:
+        epoch = int(self.client.get(_EPOCH_KEY) or 0)
+        return f"{_ENTRY_PREFIX}{epoch}:{user_id}:{self.generation(user_id)}:{json.dumps(params, default=str)}"
+
+    def clear(self) -> None:
+        # The server may be shared, so no FLUSHDB: bumping the epoch orphans every
+        # entry at once and lets their TTLs reclaim them.
+        self.client.incr(_EPOCH_KEY)
+
+
+def build_cache_backend(settings) -> AnalysisCacheBackend:
+    if settings.ANALYSIS_CACHE_BACKEND == "redis":
+        if settings.ANALYSIS_CACHE_REDIS_URL:
+            try:  # pragma: no cover - optional dependency
+                import redis
+
+                return RedisCacheBackend(redis.Redis.from_url(settings.ANALYSIS_CACHE_REDIS_URL))
+            except ImportError:
+                logger.warning("ANALYSIS_CACHE_REDIS_URL is set but redis-py is not installed; using LocalRedis")
+        return RedisCacheBackend(LocalRedis())
+    return LRUCacheBackend(
+        max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+        max_bytes=settings.ANALYSIS_CACHE_MAX_BYTES,
+    )
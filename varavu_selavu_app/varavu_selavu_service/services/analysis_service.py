@@ -1,14 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from threading import RLock
-import time
 import uuid
-from typing import Any, Dict, Optional, Tuple, List
+from typing import Any, Dict, Iterable, Optional, Tuple, List
 from datetime import datetime
+from decimal import Decimal
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, Integer
+from sqlalchemy import and_, func, or_
+from varavu_selavu_service.core.config import Settings
 from varavu_selavu_service.db.models import Expense, ExpensePayer, ExpenseSplit, Group, GroupMember
+from varavu_selavu_service.services.analysis_cache import AnalysisCacheBackend, build_cache_backend
+from varavu_selavu_service.services.date_scope import DateScope, MonthBlock
+from varavu_selavu_service.services.keyset import decode_cursor, encode_cursor
+from varavu_selavu_service.services.spend_rollup_service import SpendRollupService, month_expr, outside_block
 
 
 def _to_uuid(value) -> Optional[uuid.UUID]:
@@ -18,146 +21,182 @@ def _to_uuid(value) -> Optional[uuid.UUID]:
         return None
 
 
-@dataclass
-class AnalysisResult:
-    data: Dict[str, Any]
-    generated_at: float
-
-
 class AnalysisService:
     """Encapsulates analysis business logic and caching.
 
     Use analyze() to compute analysis for a user with optional year/month filters.
-    The service maintains a simple in-memory cache with a TTL to avoid recomputing
-    frequently for the same parameters.
+    Results are cached with a TTL in a bounded, per-user-invalidated backend
+    (services/analysis_cache.py) to avoid recomputing frequently for the same
+    parameters.
     """
 
-    # Cache key: (user_id, year, month, start_date, end_date, scope, group_id) -> AnalysisResult
-    _CACHE: Dict[Tuple[str, Optional[int], Optional[int], Optional[str], Optional[str], str, Optional[str]], AnalysisResult] = {}
-    _CACHE_LOCK: RLock = RLock()
+    # Entry key: the user's current generation + (year, month, start_date, end_date,
+    # scope, group_id, include_details). Class-level so every request shares it.
+    _CACHE: AnalysisCacheBackend = build_cache_backend(Settings())
 
     def __init__(self, db: Session, ttl_sec: int = 60):
         self.db = db
         self.ttl_sec = ttl_sec
 
-    def invalidate_cache(self) -> None:
-        with self._CACHE_LOCK:
+    def invalidate_cache(self, user_ids: Optional[Iterable[str]] = None) -> None:
+        """Drops the cached analyses of `user_ids` (every user when None) by bumping
+        their generation — other users' entries are untouched."""
+        if user_ids is None:
             self._CACHE.clear()
+            return
+        if isinstance(user_ids, str):
+            user_ids = [user_ids]
+        for user_id in set(u for u in user_ids if u):
+            self._CACHE.bump_generation(user_id)
+
+    def invalidate_group_cache(self, group_id) -> None:
+        """A group expense moves my_share/i_paid/group_total for every member, not
+        just the writer."""
+        gid = _to_uuid(group_id)
+        if gid is None:
+            return
+        emails = [e for (e,) in self.db.query(GroupMember.user_email).filter(GroupMember.group_id == gid).all()]
+        self.invalidate_cache(emails)
 
     # --------------------------------------------------------------------------------
     # Shared date-filter / dual-dialect helpers
     # --------------------------------------------------------------------------------
 
-    def _date_filters(self, column, year, month, start_date, end_date, is_sqlite) -> List:
-        filters = []
-        if start_date:
-            filters.append(column >= start_date)
-        if end_date:
-            filters.append(column <= end_date)
-        if year is not None:
-            if is_sqlite:
-                filters.append(func.cast(func.strftime('%Y', column), Integer) == int(year))
-            else:
-                filters.append(extract('year', column) == int(year))
-        if month is not None:
-            if is_sqlite:
-                filters.append(func.cast(func.strftime('%m', column), Integer) == int(month))
-            else:
-                filters.append(extract('month', column) == int(month))
-        return filters
+    def _date_filters(self, column, year, month, start_date, end_date) -> List:
+        # Half-open range predicates (services/date_scope.py) for every dialect, so
+        # purchased_at stays index-scannable.
+        return DateScope.from_params(year, month, start_date, end_date).filters(column)
 
     def _month_expr(self, column, is_sqlite):
-        if is_sqlite:
-            return func.strftime('%Y-%m', column)
-        return func.to_char(func.date_trunc('month', column), 'YYYY-MM')
+        return month_expr(column, is_sqlite)
+
+    @staticmethod
+    def _rollup_block(year, month, start_date, end_date) -> Optional[Tuple[MonthBlock, bool]]:
+        """The whole months the date filters cover, as (block, exact) — see
+        DateScope.month_block()."""
+        return DateScope.from_params(year, month, start_date, end_date).month_block()
+
+    def _rollup_source(self, user_id, year, month, start_date, end_date) -> Optional[Tuple[MonthBlock, bool]]:
+        """_rollup_block(), but only for users whose monthly_spend_rollups are built."""
+        planned = self._rollup_block(year, month, start_date, end_date)
+        if planned is None or not SpendRollupService(self.db).is_built(user_id):
+            return None
+        return planned
 
     # --------------------------------------------------------------------------------
     # Personal leg — unchanged behavior for scope=personal, plus a group_id IS NULL
     # guard for personal/combined so group expenses (user_email=creator) aren't
     # double-counted the moment group_id exists (spec §9.1).
+    #
+    # Totals, category totals and the monthly trend all come from one grouped scan
+    # over (category, month) — O(categories x months) rows back, rolled up in Python —
+    # instead of separate count/sum/per-category/per-month queries over the same
+    # filtered set. Whole months of that grid come from monthly_spend_rollups when
+    # the user's rollup is built; the scan then only covers partial-month edges and
+    # undated rows. Detail rows are a separate, optional, paged read.
     # --------------------------------------------------------------------------------
 
-    def _compute_personal_leg(self, user_id, year, month, start_date, end_date, is_sqlite) -> Dict[str, Any]:
-        filters = [Expense.user_email == user_id, Expense.group_id.is_(None)]
-        filters += self._date_filters(Expense.purchased_at, year, month, start_date, end_date, is_sqlite)
-
-        category_totals: List[Dict[str, Any]] = []
-        monthly_trend: List[Dict[str, Any]] = []
-        total = 0.0
-        category_expense_details: Dict[str, list] = {}
-
-        row_count = self.db.query(func.count(Expense.id)).filter(*filters).scalar() or 0
+    DETAIL_PAGE_SIZE = 1000
 
-        if row_count > 0:
-            total_val = self.db.query(func.sum(Expense.amount)).filter(*filters).scalar()
-            total = round(float(total_val), 2) if total_val else 0.0
+    def _personal_filters(self, user_id, year, month, start_date, end_date) -> List:
+        filters = [Expense.user_email == user_id, Expense.group_id.is_(None)]
+        filters += self._date_filters(Expense.purchased_at, year, month, start_date, end_date)
+        return filters
 
-            cat_results = self.db.query(
-                Expense.category_id,
-                func.sum(Expense.amount).label('cost')
-            ).filter(*filters).group_by(Expense.category_id).order_by(func.sum(Expense.amount).desc()).all()
-
-            for r in cat_results:
-                cat_name = r[0] or "Uncategorized"
-                val = round(float(r[1]), 2)
-                category_totals.append({"category": cat_name, "total": val})
-
-            month_expr = self._month_expr(Expense.purchased_at, is_sqlite)
-            trend_results = self.db.query(
-                month_expr.label('month'),
-                func.sum(Expense.amount).label('total')
-            ).filter(*filters).group_by(month_expr).order_by(month_expr.asc()).all()
-
-            for r in trend_results:
-                if r[0]:
-                    monthly_trend.append({"month": r[0], "total": round(float(r[1]), 2)})
-
-            detail_rows = self.db.query(
-                Expense.purchased_at,
-                Expense.description,
+    def _personal_aggregates(self, filters, is_sqlite, rollup: Optional[Tuple[str, MonthBlock, bool]] = None) -> Dict[str, Any]:
+        grid = []
+        if rollup is not None:
+            user_id, block, exact = rollup
+            grid = SpendRollupService(self.db).grid(user_id, "personal", block)
+            filters = filters + [outside_block(Expense.purchased_at, block)]
+        if rollup is None or not exact:
+            month_col = self._month_expr(Expense.purchased_at, is_sqlite)
+            grid += self.db.query(
                 Expense.category_id,
-                Expense.amount
-            ).filter(*filters).order_by(Expense.purchased_at.desc()).all()
-
-            for r in detail_rows:
-                cat_name = r[2] or "Uncategorized"
-                if cat_name not in category_expense_details:
-                    category_expense_details[cat_name] = []
-
-                dt_str = ""
-                if r[0]:
-                    if isinstance(r[0], str):
-                        dt_str = r[0][:10]
-                    else:
-                        dt_str = r[0].strftime("%Y-%m-%d")
-
-                category_expense_details[cat_name].append({
-                    "date": dt_str,
-                    "description": r[1] or "",
-                    "category": cat_name,
-                    "cost": float(r[3] or 0),
-                })
+                month_col.label('month'),
+                func.sum(Expense.amount).label('cost'),
+                func.count(Expense.id).label('n'),
+            ).filter(*filters).group_by(Expense.category_id, month_col).all()
+
+        # Summed as Decimal so the rollups equal what SUM() over the raw rows
+        # returns, whichever order the grid cells arrive in.
+        category_sums: Dict[str, Decimal] = {}
+        month_sums: Dict[str, Decimal] = {}
+        total = Decimal("0")
+        row_count = 0
+        for category, month_key, cost, n in grid:
+            cost = Decimal(str(cost or 0))
+            cat_name = category or "Uncategorized"
+            category_sums[cat_name] = category_sums.get(cat_name, Decimal("0")) + cost
+            if month_key:
+                month_sums[month_key] = month_sums.get(month_key, Decimal("0")) + cost
+            total += cost
+            row_count += n
 
         return {
-            "category_totals": category_totals,
-            "monthly_trend": monthly_trend,
-            "total": total,
-            "category_expense_details": category_expense_details,
+            "category_totals": [
+                {"category": k, "total": round(float(v), 2)}
+                for k, v in sorted(category_sums.items(), key=lambda kv: -kv[1])
+            ],
+            "monthly_trend": [{"month": k, "total": round(float(v), 2)} for k, v in sorted(month_sums.items())],
+            "total": round(float(total), 2),
             "row_count": row_count,
         }
 
+    def _personal_detail_rows(self, filters):
+        """Detail rows newest-first, fetched DETAIL_PAGE_SIZE at a time (a server-side
+        cursor on Postgres) rather than materialized in one result set."""
+        query = self.db.query(
+            Expense.purchased_at,
+            Expense.description,
+            Expense.category_id,
+            Expense.amount
+        ).filter(*filters).order_by(Expense.purchased_at.desc(), Expense.id.desc())
+        return query.yield_per(self.DETAIL_PAGE_SIZE)
+
+    @staticmethod
+    def _detail_row(purchased_at, description, category_id, amount) -> Dict[str, Any]:
+        dt_str = ""
+        if purchased_at:
+            if isinstance(purchased_at, str):
+                dt_str = purchased_at[:10]
+            else:
+                dt_str = purchased_at.strftime("%Y-%m-%d")
+        return {
+            "date": dt_str,
+            "description": description or "",
+            "category": category_id or "Uncategorized",
+            "cost": float(amount or 0),
+        }
+
+    def _compute_personal_leg(
+            self, user_id, year, month, start_date, end_date, is_sqlite, include_details: bool = True,
+    ) -> Dict[str, Any]:
+        filters = self._personal_filters(user_id, year, month, start_date, end_date)
+        source = self._rollup_source(user_id, year, month, start_date, end_date)
+        leg = self._personal_aggregates(filters, is_sqlite, (user_id, *source) if source else None)
+
+        category_expense_details: Dict[str, list] = {}
+        if include_details and leg["row_count"] > 0:
+            for r in self._personal_detail_rows(filters):
+                row = self._detail_row(*r)
+                category_expense_details.setdefault(row["category"], []).append(row)
+
+        leg["category_expense_details"] = category_expense_details
+        return leg
+
     # --------------------------------------------------------------------------------
     # "My share" leg — spec §9.1: expense_splits joined to group_members (mine) and
     # expenses (for category/date). Rows are fetched once and aggregated in Python
     # (Phase-1 group data volumes are small, spec §6.5) rather than three separate
-    # grouped SQL queries; the WHERE-clause year/month filters still use the same
-    # is_sqlite branching as the personal leg, since those are real dialect-specific
-    # predicates, not just output formatting.
+    # grouped SQL queries; the WHERE-clause date filters are the same half-open
+    # ranges as the personal leg's.
+    #
+    # Without detail rows (and across all groups) my_share / i_paid read whole months
+    # from monthly_spend_rollups like the personal leg does.
     # --------------------------------------------------------------------------------
 
-
-
-    def _compute_group_leg(self, user_id, year, month, start_date, end_date, is_sqlite, group_id=None, mode="my_share") -> Dict[str, Any]:
+    def _compute_group_leg(self, user_id, year, month, start_date, end_date, group_id=None, mode="my_share", include_details: bool = True) -> Dict[str, Any]:
         from varavu_selavu_service.db.models import ExpensePayer, ExpenseSplit, Expense, GroupMember
         
         if mode == "my_share":
@@ -188,7 +227,7 @@ class AnalysisService:
         elif mode in ("i_paid", "group_total"):
             query = query.filter(Expense.group_id.isnot(None))
             
-        query = query.filter(*self._date_filters(Expense.purchased_at, year, month, start_date, end_date, is_sqlite))
+        query = query.filter(*self._date_filters(Expense.purchased_at, year, month, start_date, end_date))
 
         category_sums = {}
         month_sums = {}
@@ -196,10 +235,26 @@ class AnalysisService:
         total = 0.0
         row_count = 0
 
+        source = None
+        if not include_details and not group_id and mode in ("my_share", "i_paid"):
+            source = self._rollup_source(user_id, year, month, start_date, end_date)
+        if source is not None:
+            block, exact = source
+            for category, month_key, cost, n in SpendRollupService(self.db).grid(user_id, mode, block):
+                cat_name = category or "Uncategorized"
+                amt = float(cost)
+                total += amt
+                row_count += n
+                category_sums[cat_name] = category_sums.get(cat_name, 0.0) + amt
+                month_sums[month_key] = month_sums.get(month_key, 0.0) + amt
+            query = query.filter(outside_block(Expense.purchased_at, block))
+
         # For mode=my_share, we get (ExpenseSplit, Expense)
         # For mode=i_paid, we get (ExpensePayer, Expense)
         # For mode=group_total, we just get Expense, so we map it to (None, Expense)
-        if mode == "group_total":
+        if source is not None and source[1]:
+            results = []
+        elif mode == "group_total":
             results = [(None, exp) for exp in query.all()]
         else:
             results = query.all()
@@ -223,6 +278,8 @@ class AnalysisService:
                 month_sums[month_key] = month_sums.get(month_key, 0.0) + amt
                 dt_str = expense.purchased_at.strftime("%Y-%m-%d")
 
+            if not include_details:
+                continue
             details.setdefault(cat_name, []).append({
                 "date": dt_str,
                 "description": expense.description or "",
@@ -243,8 +300,6 @@ class AnalysisService:
             "row_count": row_count,
         }
 
-
-
     def _merge_legs(self, personal_leg: Dict[str, Any], share_leg: Dict[str, Any]) -> Dict[str, Any]:
         category_sums: Dict[str, float] = {}
         for c in personal_leg["category_totals"] + share_leg["category_totals"]:
@@ -278,7 +333,7 @@ class AnalysisService:
     # Per-group summaries (combined/groups scope) — reuses BalanceService for my_balance
     # --------------------------------------------------------------------------------
 
-    def _compute_group_summaries(self, user_id, year, month, start_date, end_date, is_sqlite, group_id=None) -> List[Dict[str, Any]]:
+    def _compute_group_summaries(self, user_id, year, month, start_date, end_date, group_id=None) -> List[Dict[str, Any]]:
         from varavu_selavu_service.services.balance_service import BalanceService  # local import: avoids importing group/balance services on the hot personal-only path
 
         memberships = (
@@ -300,7 +355,7 @@ class AnalysisService:
             if group is None:
                 continue
 
-            date_filters = self._date_filters(Expense.purchased_at, year, month, start_date, end_date, is_sqlite)
+            date_filters = self._date_filters(Expense.purchased_at, year, month, start_date, end_date)
 
             my_share = float(
                 self.db.query(func.sum(ExpenseSplit.amount_owed))
@@ -336,6 +391,122 @@ class AnalysisService:
 
         return summaries
 
+    # --------------------------------------------------------------------------------
+    # Per-category drill-down — keyset-paginated on (purchased_at DESC, expense id
+    # DESC), NULL dates last on both dialects. Each expense contributes at most one
+    # row per leg (one seat per group), so that key is unique across the merged legs.
+    # --------------------------------------------------------------------------------
+
+    # scope -> the legs analyze() merges for it.
+    _DETAIL_LEGS = {
+        "personal": ("personal",),
+        "combined": ("personal", "my_share"),
+        "groups": ("my_share",),
+        "i_paid": ("personal", "i_paid"),
+        "group_total": ("personal", "group_total"),
+    }
+
+    @staticmethod
+    def encode_details_cursor(purchased_at, expense_id) -> str:
+        return encode_cursor(purchased_at, expense_id)
+
+    @staticmethod
+    def decode_details_cursor(cursor: str) -> Tuple[Optional[datetime], uuid.UUID]:
+        """Raises ValueError on a malformed cursor."""
+        return decode_cursor(cursor)
+
+    def _details_leg_query(self, leg: str, user_id, group_id):
+        if leg == "personal":
+            return self.db.query(
+                Expense.purchased_at, Expense.id, Expense.description, Expense.category_id, Expense.amount
+            ).filter(Expense.user_email == user_id, Expense.group_id.is_(None))
+
+        if leg == "my_share":
+            query = (
+                self.db.query(Expense.purchased_at, Expense.id, Expense.description, Expense.category_id, ExpenseSplit.amount_owed)
+                .select_from(ExpenseSplit)
+                .join(GroupMember, GroupMember.id == ExpenseSplit.member_id)
+                .join(Expense, Expense.id == ExpenseSplit.expense_id)
+                .filter(GroupMember.user_email == user_id)
+            )
+        elif leg == "i_paid":
+            query = (
+                self.db.query(Expense.purchased_at, Expense.id, Expense.description, Expense.category_id, ExpensePayer.amount_paid)
+                .select_from(ExpensePayer)
+                .join(GroupMember, GroupMember.id == ExpensePayer.member_id)
+                .join(Expense, Expense.id == ExpensePayer.expense_id)
+                .filter(GroupMember.user_email == user_id)
+            )
+        else:
+            user_groups = self.db.query(GroupMember.group_id).filter(GroupMember.user_email == user_id).subquery()
+            query = self.db.query(
+                Expense.purchased_at, Expense.id, Expense.description, Expense.category_id, Expense.amount
+            ).filter(Expense.group_id.in_(user_groups))
+
+        # Same group scoping as _compute_group_leg.
+        if group_id:
+            gid = _to_uuid(group_id)
+            if gid is not None:
+                query = query.filter(Expense.group_id == gid)
+        elif leg in ("i_paid", "group_total"):
+            query = query.filter(Expense.group_id.isnot(None))
+        return query
+
+    def category_details_page(
+            self,
+            user_id: str,
+            category: str,
+            year: Optional[int] = None,
+            month: Optional[int] = None,
+            start_date: str | None = None,
+            end_date: str | None = None,
+            scope: str = "personal",
+            group_id: str | None = None,
+            limit: int = 50,
+            cursor: str | None = None,
+    ) -> Dict[str, Any]:
+        """One page of a category's category_expense_details rows, newest first.
+        Returns {"items", "next_cursor"}; next_cursor is None on the last page."""
+        scope = scope or "personal"
+        after = self.decode_details_cursor(cursor) if cursor else None
+
+        if category == "Uncategorized":
+            category_filter = or_(Expense.category_id == category, Expense.category_id.is_(None), Expense.category_id == "")
+        else:
+            category_filter = Expense.category_id == category
+
+        keyset = []
+        if after is not None:
+            after_at, after_id = after
+            if after_at is None:
+                keyset.append(and_(Expense.purchased_at.is_(None), Expense.id < after_id))
+            else:
+                keyset.append(or_(
+                    Expense.purchased_at < after_at,
+                    and_(Expense.purchased_at == after_at, Expense.id < after_id),
+                    Expense.purchased_at.is_(None),
+                ))
+
+        rows = []
+        for leg in self._DETAIL_LEGS.get(scope, ("personal",)):
+            rows.extend(
+                self._details_leg_query(leg, user_id, group_id)
+                .filter(category_filter, *keyset)
+                .filter(*self._date_filters(Expense.purchased_at, year, month, start_date, end_date))
+                .order_by(Expense.purchased_at.is_(None), Expense.purchased_at.desc(), Expense.id.desc())
+                .limit(limit + 1)
+                .all()
+            )
+
+        # Merge the legs' pages on the same key the SQL ordered each by.
+        rows.sort(key=lambda r: (r[0] is not None, r[0] or datetime.min, str(r[1])), reverse=True)
+        page = rows[:limit]
+        next_cursor = self.encode_details_cursor(page[-1][0], page[-1][1]) if len(rows) > limit else None
+        return {
+            "items": [self._detail_row(r[0], r[2], r[3], r[4]) for r in page],
+            "next_cursor": next_cursor,
+        }
+
     # --------------------------------------------------------------------------------
     # Public entrypoint
     # --------------------------------------------------------------------------------
@@ -350,39 +521,43 @@ class AnalysisService:
             use_cache: bool = True,
             scope: str = "personal",
             group_id: str | None = None,
+            include_details: bool = True,
     ) -> Dict[str, Any]:
+        """include_details=False leaves category_expense_details empty, keeping the
+        payload (and cache entry) O(categories + months); clients drill into a
+        category through category_details_page() instead."""
         scope = scope or "personal"
-        cache_key = (
-            user_id,
+        cache_params = (
             int(year) if year is not None else None,
             int(month) if month is not None else None,
             start_date,
             end_date,
             scope,
             group_id,
+            bool(include_details),
         )
 
-        now_ts = time.time()
-
         if use_cache:
-            with self._CACHE_LOCK:
-                entry = self._CACHE.get(cache_key)
-                if entry and (now_ts - entry.generated_at < self.ttl_sec):
-                    return entry.data
+            # Keyed on the generation read *before* computing: a write landing
+            # mid-computation bumps it, so this result is stored where no later
+            # read will look.
+            cache_key = self._CACHE.entry_key(user_id, cache_params)
+            cached = self._CACHE.get(cache_key)
+            if cached is not None:
+                return cached
 
         is_sqlite = "sqlite" in str(self.db.bind.url)
 
-
         personal_leg = None
         group_leg = None
         if scope in ("personal", "combined", "i_paid", "group_total"):
-            personal_leg = self._compute_personal_leg(user_id, year, month, start_date, end_date, is_sqlite)
+            personal_leg = self._compute_personal_leg(user_id, year, month, start_date, end_date, is_sqlite, include_details=include_details)
         if scope in ("combined", "groups"):
-            group_leg = self._compute_group_leg(user_id, year, month, start_date, end_date, is_sqlite, group_id, "my_share")
+            group_leg = self._compute_group_leg(user_id, year, month, start_date, end_date, group_id, "my_share", include_details)
         elif scope == "i_paid":
-            group_leg = self._compute_group_leg(user_id, year, month, start_date, end_date, is_sqlite, group_id, "i_paid")
+            group_leg = self._compute_group_leg(user_id, year, month, start_date, end_date, group_id, "i_paid", include_details)
         elif scope == "group_total":
-            group_leg = self._compute_group_leg(user_id, year, month, start_date, end_date, is_sqlite, group_id, "group_total")
+            group_leg = self._compute_group_leg(user_id, year, month, start_date, end_date, group_id, "group_total", include_details)
 
         if scope == "groups":
             merged = group_leg
@@ -391,7 +566,6 @@ class AnalysisService:
         else:
             merged = personal_leg
 
-
         top_categories = [c["category"] for c in merged["category_totals"][:5]]
 
         result: Dict[str, Any] = {
@@ -413,7 +587,6 @@ class AnalysisService:
             "scope": scope,
         }
 
-
         if scope in ("combined", "groups", "i_paid", "group_total"):
             result["spend_breakdown"] = {
                 "personal": round(personal_leg["total"], 2) if personal_leg else 0.0,
@@ -421,14 +594,13 @@ class AnalysisService:
             }
 
             result["group_summaries"] = self._compute_group_summaries(
-                user_id, year, month, start_date, end_date, is_sqlite, group_id
+                user_id, year, month, start_date, end_date, group_id
             )
         else:
             result["spend_breakdown"] = None
             result["group_summaries"] = None
 
         if use_cache:
-            with self._CACHE_LOCK:
-                self._CACHE[cache_key] = AnalysisResult(result, now_ts)
+            self._CACHE.set(cache_key, result, self.ttl_sec)
 
         return result
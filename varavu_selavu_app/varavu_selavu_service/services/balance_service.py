@@ -1,10 +1,14 @@
 import uuid
-from decimal import Decimal
-from typing import Dict, List, Optional
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List, Optional, Sequence
 
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from varavu_selavu_service.db.models import Expense, ExpensePayer, ExpenseSplit, GroupMember, Settlement, User
+from varavu_selavu_service.core.config import Settings
+from varavu_selavu_service.db.models import Expense, ExpensePayer, ExpenseSplit, GroupBalance, GroupMember, GroupPairBalance, Settlement, User
+from varavu_selavu_service.services.debt_simplification import simplify_debts
 from varavu_selavu_service.services.group_service import GroupService
 
 
@@ -19,10 +23,19 @@ class BalanceService:
     """Implements spec §7.1: net(m) = Σpaid − Σowed + Σsettlements_sent − Σsettlements_received.
 
     Phase 1 only — `transfers` are the literal pairwise accrual (simplify-debts, §7.2, is Phase 2).
+
+    TS-GRP-135: net(m) is read from the materialized `group_balances` table (and
+    pairwise nets, for FriendBalanceService, from `group_pair_balances`), which every
+    balance-affecting write keeps current via ensure_materialized() + apply_expense()/
+    apply_settlement() in its own transaction. `_ledger_nets` and
+    `_ledger_pair_nets_for_groups` are the from-scratch computations — used as the
+    fallback for never-materialized groups and as the source of truth for
+    reconcile_group().
     """
 
     def __init__(self, db: Session):
         self.db = db
+        self.settings = Settings()
         self.group_service = GroupService(db)
 
     def _coerce_group_id(self, group_id) -> Optional[uuid.UUID]:
@@ -38,7 +51,9 @@ class BalanceService:
         NULL rate means same-currency (1:1)."""
         return Decimal(str(expense.fx_rate_to_group_currency)) if expense.fx_rate_to_group_currency is not None else Decimal("1.0")
 
-    def _compute_nets(self, group_id: uuid.UUID) -> Dict[uuid.UUID, Decimal]:
+    def _ledger_nets(self, group_id: uuid.UUID) -> Dict[uuid.UUID, Decimal]:
+        """From-scratch net(m) over every expense_payers/expense_splits/settlements row
+        of the group — O(group history)."""
         members = self.db.query(GroupMember).filter(GroupMember.group_id == group_id).all()
         net_by_member: Dict[uuid.UUID, Decimal] = {m.id: Decimal("0.00") for m in members}
 
@@ -75,60 +90,74 @@ class BalanceService:
 
         return net_by_member
 
-    def _pairwise_transfers(self, group_id: uuid.UUID) -> List[Dict]:
-        """Literal expense-by-expense pairwise ledger (non-simplified).
+    def _stored_nets(self, group_id: uuid.UUID) -> Optional[Dict[uuid.UUID, Decimal]]:
+        """Materialized nets, or None if this group has never been materialized."""
+        rows = self.db.query(GroupBalance).filter(GroupBalance.group_id == group_id).all()
+        if not rows:
+            return None
+        return {r.member_id: Decimal(str(r.net)) for r in rows}
 
-        For each group expense (Phase 1 = single payer): every other participant's
-        split amount is a debt owed to that expense's payer. Settlements between the
-        same two members net directly against that. Spec §7.2 only defines the
-        algorithm for the *simplified* (Phase 2) case — this pairwise-accrual method
-        for the non-simplified case is not spelled out, so this is a direct derivation
-        from §3.1/§7.1, not a literal spec transcription.
-        """
-        pair_net: Dict[tuple, Decimal] = {}
+    def _compute_nets(self, group_id: uuid.UUID) -> Dict[uuid.UUID, Decimal]:
+        stored = self._stored_nets(group_id)
+        if stored is None:
+            # Never trust an empty table: history written before group_balances
+            # existed is only reachable through the raw ledger.
+            return self._ledger_nets(group_id)
+        member_ids = [mid for (mid,) in self.db.query(GroupMember.id).filter(GroupMember.group_id == group_id).all()]
+        # A member with no row has had no balance-affecting activity since the group
+        # was materialized (any such write would have upserted one).
+        return {mid: stored.get(mid, Decimal("0.00")) for mid in member_ids}
+
+    # ------------------------------------------------------------------
+    # Pairwise accrual — shared by the from-scratch ledger walk and the
+    # per-write deltas applied to group_pair_balances, so both produce the
+    # same cents.
+    # ------------------------------------------------------------------
 
-        def _add(debtor_id: uuid.UUID, creditor_id: uuid.UUID, amount: Decimal) -> None:
-            if debtor_id == creditor_id:
-                return
-            a, b = sorted([str(debtor_id), str(creditor_id)])
-            key = (uuid.UUID(a), uuid.UUID(b))
-            sign = 1 if str(debtor_id) == a else -1
-            pair_net[key] = pair_net.get(key, Decimal("0.00")) + sign * amount
-
-        import decimal
-        expenses = self.db.query(Expense).filter(Expense.group_id == group_id).all()
-        for exp in expenses:
-            payer_rows = self.db.query(ExpensePayer).filter(ExpensePayer.expense_id == exp.id).all()
-            if not payer_rows:
+    @staticmethod
+    def _accrue_pair(pair_net: Dict[tuple, Decimal], debtor_id: uuid.UUID, creditor_id: uuid.UUID, amount: Decimal) -> None:
+        """Pairs are keyed (lower_id, higher_id); a positive net means lower owes higher."""
+        if debtor_id == creditor_id:
+            return
+        # UUIDs order exactly like their canonical hex strings, so this is the
+        # same (lower, higher) pair key without a str/UUID round trip per call.
+        if debtor_id < creditor_id:
+            key, signed = (debtor_id, creditor_id), amount
+        else:
+            key, signed = (creditor_id, debtor_id), -amount
+        pair_net[key] = pair_net.get(key, Decimal("0.00")) + signed
+
+    @classmethod
+    def _accrue_expense_pairs(cls, pair_net: Dict[tuple, Decimal], payer_rows: List[tuple], split_rows: List[tuple], fx_rate: Decimal) -> None:
+        """Every participant's split is owed to the payers in proportion to what each
+        fronted; the last payer absorbs the cent-rounding remainder, so `payer_rows`
+        order matters and callers pass rows in scan order."""
+        if not payer_rows:
+            return
+
+        total_paid = sum(amount_paid for _, amount_paid in payer_rows)
+        if total_paid == Decimal('0.00'):
+            return
+
+        for debtor_id, amount_owed in split_rows:
+            # amount_owed is stored in the expense's own currency (§ TS-GRP-131);
+            # convert to the group's home currency before it becomes a transfer.
+            debt_amount = amount_owed * fx_rate
+            if debt_amount == Decimal('0.00'):
                 continue
 
-            total_paid = sum(p.amount_paid for p in payer_rows)
-            if total_paid == Decimal('0.00'):
-                continue
+            allocated_sum = Decimal('0.00')
+            for i, (payer_id, amount_paid) in enumerate(payer_rows):
+                if i == len(payer_rows) - 1:
+                    portion = debt_amount - allocated_sum
+                else:
+                    portion = (debt_amount * (amount_paid / total_paid)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+                    allocated_sum += portion
 
-            fx_rate = self._fx_rate(exp)
-            splits = self.db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == exp.id).all()
-            for s in splits:
-                # amount_owed is stored in the expense's own currency (§ TS-GRP-131);
-                # convert to the group's home currency before it becomes a transfer.
-                debt_amount = s.amount_owed * fx_rate
-                if debt_amount == Decimal('0.00'):
-                    continue
-                    
-                allocated_sum = Decimal('0.00')
-                for i, p in enumerate(payer_rows):
-                    if i == len(payer_rows) - 1:
-                        portion = debt_amount - allocated_sum
-                    else:
-                        portion = (debt_amount * (p.amount_paid / total_paid)).quantize(Decimal('0.01'), rounding=decimal.ROUND_HALF_UP)
-                        allocated_sum += portion
-                        
-                    _add(debtor_id=s.member_id, creditor_id=p.member_id, amount=portion)
-
-        settlements = self.db.query(Settlement).filter(Settlement.group_id == group_id).all()
-        for st in settlements:
-            _add(debtor_id=st.from_member_id, creditor_id=st.to_member_id, amount=-st.amount)
+                cls._accrue_pair(pair_net, debtor_id=debtor_id, creditor_id=payer_id, amount=portion)
 
+    @staticmethod
+    def _transfers_from_pairs(pair_net: Dict[tuple, Decimal]) -> List[Dict]:
         transfers = []
         for (a, b), net in pair_net.items():
             if net > Decimal("0.00"):
@@ -137,47 +166,251 @@ class BalanceService:
                 transfers.append({"from_member_id": str(b), "to_member_id": str(a), "amount": float(-net)})
         return transfers
 
+    def _ledger_pair_nets_for_groups(self, group_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, Dict[tuple, Decimal]]:
+        """Set-based pairwise accrual over any number of groups: four queries in total
+        (expenses, payers, splits, settlements) regardless of how many groups or
+        expenses are involved, instead of two queries per expense.
+
+        Payer rows keep the order a per-expense `filter(expense_id == ...)` scan
+        returned them in, since the last payer absorbs the rounding remainder — so
+        the result is cent-for-cent what the per-expense loop produced.
+        """
+        group_ids = list(dict.fromkeys(group_ids))
+        if not group_ids:
+            return {}
+
+        expenses = (
+            self.db.query(Expense.id, Expense.group_id, Expense.fx_rate_to_group_currency)
+            .filter(Expense.group_id.in_(group_ids))
+            .all()
+        )
+        expense_ids = select(Expense.id).where(Expense.group_id.in_(group_ids))
+
+        payers_by_expense: Dict[uuid.UUID, List[tuple]] = defaultdict(list)
+        for expense_id, member_id, amount_paid in (
+            self.db.query(ExpensePayer.expense_id, ExpensePayer.member_id, ExpensePayer.amount_paid)
+            .filter(ExpensePayer.expense_id.in_(expense_ids))
+            .all()
+        ):
+            payers_by_expense[expense_id].append((member_id, amount_paid))
+
+        splits_by_expense: Dict[uuid.UUID, List[tuple]] = defaultdict(list)
+        for expense_id, member_id, amount_owed in (
+            self.db.query(ExpenseSplit.expense_id, ExpenseSplit.member_id, ExpenseSplit.amount_owed)
+            .filter(ExpenseSplit.expense_id.in_(expense_ids))
+            .all()
+        ):
+            splits_by_expense[expense_id].append((member_id, amount_owed))
+
+        pair_nets: Dict[uuid.UUID, Dict[tuple, Decimal]] = {gid: {} for gid in group_ids}
+        for expense_id, gid, raw_rate in expenses:
+            fx_rate = Decimal(str(raw_rate)) if raw_rate is not None else Decimal("1.0")
+            self._accrue_expense_pairs(
+                pair_nets[gid], payers_by_expense.get(expense_id, []), splits_by_expense.get(expense_id, []), fx_rate
+            )
+
+        for gid, from_id, to_id, amount in (
+            self.db.query(Settlement.group_id, Settlement.from_member_id, Settlement.to_member_id, Settlement.amount)
+            .filter(Settlement.group_id.in_(group_ids))
+            .all()
+        ):
+            self._accrue_pair(pair_nets[gid], debtor_id=from_id, creditor_id=to_id, amount=-amount)
+
+        return pair_nets
+
+    def _stored_pair_nets(self, group_id: uuid.UUID) -> Dict[tuple, Decimal]:
+        rows = self.db.query(GroupPairBalance).filter(GroupPairBalance.group_id == group_id).all()
+        return {(r.member_a_id, r.member_b_id): Decimal(str(r.net)) for r in rows}
+
+    # ------------------------------------------------------------------
+    # Materialized ledger maintenance (TS-GRP-135)
+    # ------------------------------------------------------------------
+
+    def _upsert(self, model):
+        if self.db.get_bind().dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert(model)
+
+    def _seed_ledger(self, group_id: uuid.UUID, nets: Dict[uuid.UUID, Decimal], pair_net: Dict[tuple, Decimal]) -> None:
+        # ON CONFLICT DO NOTHING: when two writers seed the same group at once, the
+        # second one's rows are skipped (both computed them from the same pre-write
+        # ledger) instead of failing on the unique key.
+        if nets:
+            self.db.execute(
+                self._upsert(GroupBalance)
+                .values([
+                    {"id": uuid.uuid4(), "group_id": group_id, "member_id": member_id, "net": net}
+                    for member_id, net in nets.items()
+                ])
+                .on_conflict_do_nothing(index_elements=[GroupBalance.group_id, GroupBalance.member_id])
+            )
+        if pair_net:
+            self.db.execute(
+                self._upsert(GroupPairBalance)
+                .values([
+                    {"id": uuid.uuid4(), "group_id": group_id, "member_a_id": a, "member_b_id": b, "net": net}
+                    for (a, b), net in pair_net.items()
+                ])
+                .on_conflict_do_nothing(
+                    index_elements=[GroupPairBalance.group_id, GroupPairBalance.member_a_id, GroupPairBalance.member_b_id]
+                )
+            )
+
+    def _store_ledger(self, group_id: uuid.UUID, nets: Dict[uuid.UUID, Decimal], pair_net: Dict[tuple, Decimal]) -> None:
+        self.db.query(GroupBalance).filter(GroupBalance.group_id == group_id).delete(synchronize_session=False)
+        self.db.query(GroupPairBalance).filter(GroupPairBalance.group_id == group_id).delete(synchronize_session=False)
+        self._seed_ledger(group_id, nets, pair_net)
+
+    def ensure_materialized(self, group_id) -> None:
+        """Must run at the start of every balance-affecting write, *before* the ledger
+        is touched: a group that predates group_balances is seeded (nets and pairs
+        together — a group_balances row is the marker for both) from its pre-write raw
+        ledger here, so the write's own delta can then be applied on top of it.
+        Does not commit — the caller owns the transaction."""
+        gid = self._coerce_group_id(group_id)
+        if gid is None:
+            return
+        if self.db.query(GroupBalance.id).filter(GroupBalance.group_id == gid).first() is None:
+            self._seed_ledger(gid, self._ledger_nets(gid), self._ledger_pair_nets_for_groups([gid])[gid])
+
+    def expense_contribution(self, expense: Expense) -> Dict[uuid.UUID, Decimal]:
+        """This one expense's share of net(m), in the group's home currency. Reads the
+        expense's current payer/split rows, so callers flush before calling it."""
+        fx_rate = self._fx_rate(expense)
+        contribution: Dict[uuid.UUID, Decimal] = {}
+        for p in self.db.query(ExpensePayer).filter(ExpensePayer.expense_id == expense.id).all():
+            contribution[p.member_id] = contribution.get(p.member_id, Decimal("0.00")) + Decimal(str(p.amount_paid)) * fx_rate
+        for s in self.db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense.id).all():
+            contribution[s.member_id] = contribution.get(s.member_id, Decimal("0.00")) - Decimal(str(s.amount_owed)) * fx_rate
+        return contribution
+
+    def expense_pair_contribution(self, expense: Expense) -> Dict[tuple, Decimal]:
+        """This one expense's pairwise debts, accrued exactly as _ledger_pair_nets_for_groups
+        would. Like expense_contribution, reads current rows, so flush first."""
+        payer_rows = [
+            (p.member_id, Decimal(str(p.amount_paid)))
+            for p in self.db.query(ExpensePayer).filter(ExpensePayer.expense_id == expense.id).all()
+        ]
+        split_rows = [
+            (s.member_id, Decimal(str(s.amount_owed)))
+            for s in self.db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense.id).all()
+        ]
+        pair_net: Dict[tuple, Decimal] = {}
+        self._accrue_expense_pairs(pair_net, payer_rows, split_rows, self._fx_rate(expense))
+        return pair_net
+
+    @staticmethod
+    def settlement_contribution(settlement: Settlement) -> Dict[uuid.UUID, Decimal]:
+        amount = Decimal(str(settlement.amount))
+        return {settlement.from_member_id: amount, settlement.to_member_id: -amount}
+
+    @classmethod
+    def settlement_pair_contribution(cls, settlement: Settlement) -> Dict[tuple, Decimal]:
+        pair_net: Dict[tuple, Decimal] = {}
+        cls._accrue_pair(pair_net, settlement.from_member_id, settlement.to_member_id, -Decimal(str(settlement.amount)))
+        return pair_net
+
+    def apply_contribution(self, group_id, contribution: Dict[uuid.UUID, Decimal], sign: int = 1) -> None:
+        """Adds (sign=1) or backs out (sign=-1) a contribution. One INSERT ... ON CONFLICT
+        DO UPDATE SET net = net + excluded.net, so concurrent writers to the same group
+        neither lose each other's deltas (as an ORM read-modify-write would) nor race
+        to create a member's first row."""
+        gid = self._coerce_group_id(group_id)
+        rows = [
+            {"id": uuid.uuid4(), "group_id": gid, "member_id": member_id, "net": amount * sign}
+            for member_id, amount in contribution.items()
+            if amount * sign != 0
+        ]
+        if not rows:
+            return
+        ins = self._upsert(GroupBalance).values(rows)
+        self.db.execute(ins.on_conflict_do_update(
+            index_elements=[GroupBalance.group_id, GroupBalance.member_id],
+            set_={"net": GroupBalance.net + ins.excluded.net, "updated_at": func.now()},
+        ))
+
+    def apply_pair_contribution(self, group_id, contribution: Dict[tuple, Decimal], sign: int = 1) -> None:
+        """group_pair_balances counterpart of apply_contribution."""
+        gid = self._coerce_group_id(group_id)
+        rows = [
+            {"id": uuid.uuid4(), "group_id": gid, "member_a_id": a, "member_b_id": b, "net": amount * sign}
+            for (a, b), amount in contribution.items()
+            if amount * sign != 0
+        ]
+        if not rows:
+            return
+        ins = self._upsert(GroupPairBalance).values(rows)
+        self.db.execute(ins.on_conflict_do_update(
+            index_elements=[GroupPairBalance.group_id, GroupPairBalance.member_a_id, GroupPairBalance.member_b_id],
+            set_={"net": GroupPairBalance.net + ins.excluded.net, "updated_at": func.now()},
+        ))
+
+    def apply_expense(self, group_id, expense: Expense, sign: int = 1) -> None:
+        self.apply_contribution(group_id, self.expense_contribution(expense), sign)
+        self.apply_pair_contribution(group_id, self.expense_pair_contribution(expense), sign)
+
+    def apply_settlement(self, group_id, settlement: Settlement, sign: int = 1) -> None:
+        self.apply_contribution(group_id, self.settlement_contribution(settlement), sign)
+        self.apply_pair_contribution(group_id, self.settlement_pair_contribution(settlement), sign)
+
+    def reconcile_group(self, group_id, fix: bool = False) -> Dict:
+        """Compares the materialized nets and pairwise nets against a from-scratch
+        ledger computation. With fix=True, a drifted or never-materialized group is
+        rebuilt from the ledger (flushed, not committed)."""
+        gid = self._coerce_group_id(group_id)
+        ledger = self._ledger_nets(gid)
+        ledger_pairs = self._ledger_pair_nets_for_groups([gid])[gid]
+        stored = self._stored_nets(gid)
+        quantum = Decimal("0.00000001")
+        drift = []
+        pair_drift = []
+        if stored is not None:
+            for member_id in set(ledger) | set(stored):
+                expected = ledger.get(member_id, Decimal("0.00")).quantize(quantum)
+                actual = stored.get(member_id, Decimal("0.00")).quantize(quantum)
+                if expected != actual:
+                    drift.append({"member_id": str(member_id), "stored": actual, "ledger": expected})
+            stored_pairs = self._stored_pair_nets(gid)
+            for a, b in set(ledger_pairs) | set(stored_pairs):
+                expected = ledger_pairs.get((a, b), Decimal("0.00")).quantize(quantum)
+                actual = stored_pairs.get((a, b), Decimal("0.00")).quantize(quantum)
+                if expected != actual:
+                    pair_drift.append({"member_a_id": str(a), "member_b_id": str(b), "stored": actual, "ledger": expected})
+        if fix and (stored is None or drift or pair_drift):
+            self._store_ledger(gid, ledger, ledger_pairs)
+        return {"group_id": str(gid), "materialized": stored is not None, "drift": drift, "pair_drift": pair_drift}
+
+    def _pairwise_transfers(self, group_id: uuid.UUID) -> List[Dict]:
+        """Literal expense-by-expense pairwise ledger (non-simplified).
+
+        For each group expense (Phase 1 = single payer): every other participant's
+        split amount is a debt owed to that expense's payer. Settlements between the
+        same two members net directly against that. Spec §7.2 only defines the
+        algorithm for the *simplified* (Phase 2) case — this pairwise-accrual method
+        for the non-simplified case is not spelled out, so this is a direct derivation
+        from §3.1/§7.1, not a literal spec transcription.
+        """
+        return self._pairwise_transfers_for_groups([group_id]).get(group_id, [])
+
+    def _pairwise_transfers_for_groups(self, group_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, List[Dict]]:
+        """Bulk `_pairwise_transfers` for any number of groups (see _ledger_pair_nets_for_groups)."""
+        return {
+            gid: self._transfers_from_pairs(pair_net)
+            for gid, pair_net in self._ledger_pair_nets_for_groups(group_ids).items()
+        }
+
     def _simplified_transfers(self, group_id: uuid.UUID) -> List[Dict]:
-        """Greedy-netting simplified transfers (Phase 2)."""
+        """Simplified transfers (Phase 2), via the configured debt_simplification mode."""
         net_by_member = self._compute_nets(group_id)
-        
-        # Debtors have net < 0 (they owe money to the group).
-        # Creditors have net > 0 (they are owed money by the group).
-        debtors = sorted(
-            [{"id": str(m), "net": -n} for m, n in net_by_member.items() if n < Decimal("0.00")],
-            key=lambda x: x["net"],
-            reverse=True
+        transfers = simplify_debts(
+            {str(m): n for m, n in net_by_member.items()},
+            mode=self.settings.DEBT_SIMPLIFY_MODE,
+            max_members=self.settings.DEBT_SIMPLIFY_MAX_MEMBERS,
+            time_budget_ms=self.settings.DEBT_SIMPLIFY_TIME_BUDGET_MS,
         )
-        creditors = sorted(
-            [{"id": str(m), "net": n} for m, n in net_by_member.items() if n > Decimal("0.00")],
-            key=lambda x: x["net"],
-            reverse=True
-        )
-        
-        transfers = []
-        i, j = 0, 0
-        
-        while i < len(debtors) and j < len(creditors):
-            debtor = debtors[i]
-            creditor = creditors[j]
-            
-            amount = min(debtor["net"], creditor["net"])
-            if amount > Decimal("0.00"):
-                transfers.append({
-                    "from_member_id": debtor["id"],
-                    "to_member_id": creditor["id"],
-                    "amount": float(amount)
-                })
-                
-            debtor["net"] -= amount
-            creditor["net"] -= amount
-            
-            if debtor["net"] <= Decimal("0.00"):
-                i += 1
-            if creditor["net"] <= Decimal("0.00"):
-                j += 1
-                
-        return transfers
+        return [{**t, "amount": float(t["amount"])} for t in transfers]
 
     def get_balances(self, group_id: str, actor_email: str) -> Dict:
         self.group_service.require_membership(group_id, actor_email)
@@ -224,6 +457,13 @@ class BalanceService:
         mid = self._coerce_member_id(member_id)
         if gid is None or mid is None:
             return Decimal("0.00")
+        row = (
+            self.db.query(GroupBalance.net)
+            .filter(GroupBalance.group_id == gid, GroupBalance.member_id == mid)
+            .first()
+        )
+        if row is not None:
+            return Decimal(str(row[0]))
         return self._compute_nets(gid).get(mid, Decimal("0.00"))
 
     def group_is_settled(self, group_id) -> bool:
@@ -2,8 +2,7 @@ from __future__ import annotations
 
 import statistics
 import uuid
-from calendar import monthrange
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import HTTPException
@@ -11,6 +10,7 @@ from sqlalchemy.orm import Session
 
 from varavu_selavu_service.db.models import Budget, BudgetPeriodSnapshot
 from varavu_selavu_service.services.analysis_service import AnalysisService
+from varavu_selavu_service.services.date_scope import month_range
 from varavu_selavu_service.services.recurring_service import RecurringService
 
 DEFAULT_ALERT_THRESHOLDS = [80, 100]
@@ -31,8 +31,8 @@ def _period_bounds(period_str: Optional[str], today: Optional[date] = None) -> T
         year, month = today.year, today.month
     if not (1 <= month <= 12):
         raise HTTPException(status_code=422, detail="period must be in YYYY-MM format")
-    last_day = monthrange(year, month)[1]
-    return date(year, month, 1), date(year, month, last_day)
+    start, end = month_range(year, month)
+    return start, end - timedelta(days=1)
 
 
 def _round(value) -> float:
@@ -88,8 +88,10 @@ class BudgetService:
         # Reuses AnalysisService.analyze() — the same balance/scope function GET /analysis uses —
         # rather than a third calculation path (spec §8 consistency requirement). use_cache=False
         # so a budget reflects an expense saved a moment ago (FR-5), not a stale 60s cache entry.
+        # No detail rows: a calendar-month total is then served from monthly_spend_rollups.
         result = self.analysis_service.analyze(
-            user_id=user_id, year=period_start.year, month=period_start.month, scope=scope, use_cache=False
+            user_id=user_id, year=period_start.year, month=period_start.month, scope=scope, use_cache=False,
+            include_details=False,
         )
         if target_type == "overall":
             return _round(result.get("total_expenses", 0))
@@ -0,0 +1,217 @@
+"""
+Deterministic pre-classifier for CategorizationService.
+
+Answers the descriptions we can categorize with confidence without the LLM:
+
+* a seeded merchant (TS-ENT-104 dictionary) named in the description, whose
+  category comes from the section of the seed it belongs to
+  (MERCHANT_CATEGORIES), e.g. "starbucks latte", "uber to airport";
+* a description made up only of category vocabulary, e.g. "groceries",
+  "monthly rent", "parking" — keywords are the CATEGORY_GROUPS subcategory
+  names plus a few common synonyms (KEYWORD_CATEGORIES).
+
+Anything else — an unknown word that might be a merchant, or keywords that
+disagree ("car insurance") — is left to the LLM, which also infers a merchant
+name the rules cannot.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+Category = Tuple[str, str]  # (main_category, subcategory)
+
+# Seed canonical_name -> category, by section of
+# alembic/versions/fcc03f738abe_seed_merchant_dictionary.py. Merchants whose
+# spend is genuinely mixed (Walmart, Target, Amazon, eBay, convenience stores,
+# craft and beauty retail) are left out on purpose: the rules only answer
+# when they are sure.
+_SECTIONS: Sequence[Tuple[Category, Sequence[str]]] = (
+    (("Food & Drink", "Groceries"), (
+        "costco wholesale", "sams club", "bjs wholesale", "kroger", "safeway", "albertsons", "publix",
+        "whole foods market", "harris teeter", "hy vee", "winco foods", "save a lot", "smiths food and drug",
+        "king soopers", "frys food", "qfc", "jewel osco", "acme markets", "market basket", "hannaford",
+        "price chopper", "weis markets", "ingles markets", "lowes foods", "food 4 less", "food city",
+        "wholesale club", "instacart",
+    )),
+    (("Life", "Medical expenses"), ("cvs pharmacy", "walgreens", "rite aid", "duane reade")),
+    (("Life", "Clothing"), (
+        "kohls", "marshalls", "tj maxx", "ross dress for less", "burlington", "nordstrom", "nordstrom rack",
+        "macys", "jcpenney",
+    )),
+    (("Home", "Household supplies"), (
+        "big lots", "five below", "dollar tree", "dollar general", "family dollar", "bed bath and beyond",
+        "container store", "williams sonoma",
+    )),
+    (("Home", "Maintenance"), ("home depot", "lowes", "menards", "ace hardware", "harbor freight tools")),
+    (("Home", "Electronics"), ("best buy", "apple store", "micro center")),
+    (("Home", "Furniture"), ("pottery barn", "crate and barrel", "ikea")),
+    (("Home", "Pets"), ("petsmart", "petco")),
+    (("Food & Drink", "Dining out"), (
+        "starbucks", "dunkin", "mcdonalds", "burger king", "wendys", "taco bell", "chick fil a",
+        "chipotle mexican grill", "subway", "kfc", "popeyes", "panera bread", "panda express", "dominos pizza",
+        "pizza hut", "papa johns", "five guys", "in n out burger", "shake shack", "sonic drive in", "arbys",
+        "jack in the box", "whataburger", "culvers", "dairy queen", "jimmy johns", "jersey mikes subs",
+        "wingstop", "raising canes", "zaxbys", "dennys", "ihop", "waffle house", "cracker barrel",
+        "olive garden", "applebees", "chilis", "outback steakhouse", "buffalo wild wings", "texas roadhouse",
+        "doordash", "grubhub", "uber eats",
+    )),
+    (("Food & Drink", "Liquor"), ("trader joes wine", "total wine and more", "bevmo")),
+    (("Transportation", "Gas/fuel"), (
+        "shell", "chevron", "exxonmobil", "bp", "sunoco", "speedway", "marathon", "valero", "citgo",
+        "racetrac", "costco gas", "sams club gas",
+    )),
+    (("Transportation", "Plane"), (
+        "delta air lines", "american airlines", "united airlines", "southwest airlines", "jetblue",
+        "alaska airlines", "spirit airlines", "frontier airlines",
+    )),
+    (("Transportation", "Taxi"), ("uber", "lyft")),
+    (("Entertainment", "Movies"), ("netflix", "hulu", "disney plus", "hbo max", "youtube premium")),
+    (("Entertainment", "Music"), ("spotify", "apple music")),
+    (("Entertainment", "Games"), ("gamestop",)),
+    (("Entertainment", "Sports"), (
+        "dicks sporting goods", "rei", "academy sports and outdoors", "planet fitness", "la fitness",
+    )),
+)
+
+MERCHANT_CATEGORIES: Dict[str, Category] = {name: category for category, names in _SECTIONS for name in names}
+
+# Synonyms on top of the subcategory names themselves. Normalized, singular.
+KEYWORD_CATEGORIES: Dict[str, Category] = {
+    **dict.fromkeys(
+        ("restaurant", "dinner", "lunch", "breakfast", "brunch", "cafe", "coffee", "takeout", "pizza", "burger"),
+        ("Food & Drink", "Dining out"),
+    ),
+    **dict.fromkeys(("grocery", "supermarket"), ("Food & Drink", "Groceries")),
+    **dict.fromkeys(("beer", "wine"), ("Food & Drink", "Liquor")),
+    **dict.fromkeys(("petrol", "gasoline"), ("Transportation", "Gas/fuel")),
+    **dict.fromkeys(("cab",), ("Transportation", "Taxi")),
+    **dict.fromkeys(("flight", "airfare"), ("Transportation", "Plane")),
+    **dict.fromkeys(("motel", "hostel", "airbnb"), ("Transportation", "Hotel")),
+    **dict.fromkeys(("electric",), ("Utilities", "Electricity")),
+    **dict.fromkeys(("garbage",), ("Utilities", "Trash")),
+    **dict.fromkeys(("wifi", "broadband"), ("Utilities", "TV/Phone/Internet")),
+    **dict.fromkeys(("laundry",), ("Utilities", "Cleaning")),
+    **dict.fromkeys(
+        ("doctor", "dentist", "hospital", "clinic", "pharmacy", "prescription"), ("Life", "Medical expenses")
+    ),
+    **dict.fromkeys(("tax",), ("Life", "Taxes")),
+    **dict.fromkeys(("tuition", "textbook"), ("Life", "Education")),
+    **dict.fromkeys(("daycare", "babysitter", "nanny"), ("Life", "Childcare")),
+    **dict.fromkeys(("clothe", "shoe"), ("Life", "Clothing")),
+    **dict.fromkeys(("gift",), ("Life", "Gifts")),
+    **dict.fromkeys(("movie", "cinema"), ("Entertainment", "Movies")),
+    **dict.fromkeys(("concert",), ("Entertainment", "Music")),
+    **dict.fromkeys(("gym",), ("Entertainment", "Sports")),
+    **dict.fromkeys(("vet",), ("Home", "Pets")),
+}
+
+# Filler that may sit next to keywords without making a description ambiguous.
+STOPWORDS: Set[str] = {
+    "a", "an", "and", "at", "bill", "by", "fee", "for", "from", "in", "monthly", "my", "of", "on", "our",
+    "the", "to", "weekly", "with",
+}
+
+
+def _singular(token: str) -> str:
+    # Same last-token rule EntityResolutionService applies to items.
+    if len(token) > 3:
+        if token.endswith("ies"):
+            return token[:-3] + "y"
+        if re.search(r"(s|x|z|ch|sh)es$", token):
+            return token[:-2]
+        if token.endswith("s") and not token.endswith("ss"):
+            return token[:-1]
+    return token
+
+
+def _words(normalized: str) -> str:
+    return " ".join(t for t in normalized.split() if t not in STOPWORDS and not t.isdigit())
+
+
+def _keyword_index(category_groups: Mapping[str, Iterable[str]]) -> Dict[str, Category]:
+    """Keyword -> category from the subcategory names (split on "/"), plus the
+    synonyms. A word naming more than one category ("other", "gas" in both
+    Gas/fuel and Heat/gas) is not a keyword at all."""
+    seen: Dict[str, Set[Category]] = {}
+    for main, subs in category_groups.items():
+        for sub in subs:
+            for part in sub.lower().split("/"):
+                seen.setdefault(" ".join(_singular(t) for t in part.split()), set()).add((main, sub))
+    index = {word: categories.pop() for word, categories in seen.items() if len(categories) == 1}
+    index.update(KEYWORD_CATEGORIES)
+    return index
+
+
+class RuleClassifier:
+    """Matches normalized descriptions (see CategorizationService.normalize)
+    against seeded merchants and category keywords."""
+
+    def __init__(
+        self,
+        category_groups: Mapping[str, Iterable[str]],
+        merchants: Optional[Mapping[str, Tuple[str, Category]]] = None,
+    ):
+        # merchants: normalized name or alias -> (display_name, category). Keyed
+        # by the words classify() compares, so "bed bath and beyond" is stored
+        # as "bed bath beyond".
+        self.merchants = {_words(name): hit for name, hit in (merchants or {}).items() if _words(name)}
+        self.keywords = _keyword_index(category_groups)
+        self._max_merchant_words = max((len(name.split()) for name in self.merchants), default=0)
+        self._max_keyword_words = max(len(k.split()) for k in self.keywords)
+
+    def classify(self, normalized: str) -> Optional[Tuple[str, str, Optional[str]]]:
+        tokens = _words(normalized).split()
+        if not tokens:
+            return None
+
+        merchant = self._match_merchant(tokens)
+        if merchant is not None:
+            display_name, category, (start, end) = merchant
+            rest = tokens[:start] + tokens[end:]
+            # Other words may say anything ("starbucks gift card"); only a
+            # keyword pointing elsewhere makes the merchant's category unsure.
+            if any(c != category for c in self._keywords_in(rest)[0]):
+                return None
+            return category[0], category[1], display_name
+
+        categories, unknown = self._keywords_in(tokens)
+        if unknown or len(set(categories)) != 1:
+            return None
+        main, sub = categories[0]
+        return main, sub, None
+
+    def _match_merchant(self, tokens: List[str]) -> Optional[Tuple[str, Category, Tuple[int, int]]]:
+        for start in range(len(tokens)):
+            for n in range(min(self._max_merchant_words, len(tokens) - start), 0, -1):
+                name = " ".join(tokens[start : start + n])
+                hit = self.merchants.get(name)
+                if hit is None:
+                    continue
+                # One-word names are often plain words too ("shell", "delta",
+                # "united"): they count only as the first word, the way card
+                # statements print merchants, and very short ones ("bp", "aa")
+                # only as the whole description.
+                if n == 1 and (start > 0 or (len(name) <= 3 and len(tokens) > 1)):
+                    continue
+                return hit[0], hit[1], (start, start + n)
+        return None
+
+    def _keywords_in(self, tokens: List[str]) -> Tuple[List[Category], bool]:
+        """Categories of the keywords in `tokens`, longest phrase first, and
+        whether any token was not a keyword."""
+        words = [_singular(t) for t in tokens]
+        categories: List[Category] = []
+        unknown = False
+        i = 0
+        while i < len(words):
+            for n in range(min(self._max_keyword_words, len(words) - i), 0, -1):
+                category = self.keywords.get(" ".join(words[i : i + n]))
+                if category is not None:
+                    categories.append(category)
+                    i += n
+                    break
+            else:
+                unknown = True
+                i += 1
+        return categories, unknown
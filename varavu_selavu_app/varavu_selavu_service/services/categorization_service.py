@@ -1,12 +1,25 @@
 import json
 import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple, Union
 
 import os
 import requests
+from sqlalchemy.orm import Session
+
+from varavu_selavu_service.core.config import Settings
+from varavu_selavu_service.db.models import CanonicalMerchant, CategorizationCacheEntry, EntityAlias
+from varavu_selavu_service.services.categorization_rules import MERCHANT_CATEGORIES, RuleClassifier
+from varavu_selavu_service.services.entity_resolution_service import EntityResolutionService
 
 logger = logging.getLogger("varavu_selavu.categorization")
 
+Classification = Tuple[str, str, Optional[str]]  # (main_category, subcategory, merchant_name)
+FALLBACK: Classification = ("Other", "General", None)
+
 # Mapping of main categories to their subcategories
 CATEGORY_GROUPS: Dict[str, List[str]] = {
     "Home": [
@@ -56,8 +69,155 @@ CATEGORY_GROUPS: Dict[str, List[str]] = {
     ],
 }
 
+# Where an answer came from, cheapest first. "fallback" is the LLM failing.
+SOURCES = ("memory", "rule", "db", "llm", "fallback")
+
+
+class _ResultCache:
+    """Bounded, thread-safe LRU of normalized description -> classification."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Classification]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Classification]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: Classification) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class _Stats:
+    """Per-source answer counts and latency, process-wide."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def record(self, source: str, seconds: float) -> None:
+        with self._lock:
+            self.counts[source] += 1
+            self.seconds[source] += seconds
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            total = sum(self.counts.values())
+            local = total - self.counts["llm"] - self.counts["fallback"]
+            return {
+                "requests": total,
+                "hit_rate": round(local / total, 4) if total else 0.0,
+                "sources": {
+                    source: {
+                        "count": self.counts[source],
+                        "avg_ms": round(1000 * self.seconds[source] / self.counts[source], 3) if self.counts[source] else 0.0,
+                    }
+                    for source in SOURCES
+                },
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.counts = dict.fromkeys(SOURCES, 0)
+            self.seconds = dict.fromkeys(SOURCES, 0.0)
+
+
 class CategorizationService:
-    """Classify expense descriptions into categories and subcategories."""
+    """Classify expense descriptions into categories and subcategories.
+
+    Only descriptions nothing local can answer reach the LLM. classify() tries,
+    in order: a process-wide LRU keyed by the normalized description; the
+    deterministic RuleClassifier (seeded merchants and category keywords); the
+    categorization_cache table of earlier LLM answers; and only then the model,
+    whose answer is stored for every process. Without a db session the table
+    and the seeded merchants are skipped. stats() reports how each answer was
+    found and how long it took.
+    """
+
+    _CACHE = _ResultCache()
+    _STATS = _Stats()
+    _rules: Optional[RuleClassifier] = None
+    _rules_lock = threading.Lock()
+    _keyword_rules = RuleClassifier(CATEGORY_GROUPS)
+    _normalizer = EntityResolutionService(None)
+
+    def __init__(self, db: Optional[Session] = None):
+        self.db = db
+
+    @classmethod
+    def normalize(cls, description: str) -> str:
+        return cls._normalizer.normalize(description, entity_type="merchant")
+
+    @classmethod
+    def stats(cls) -> Dict[str, object]:
+        return cls._STATS.snapshot()
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drops the in-process cache, counters and merchant rules (tests, or
+        after the merchant dictionary changes)."""
+        cls._CACHE.clear()
+        cls._STATS.clear()
+        with cls._rules_lock:
+            cls._rules = None
+
+    def rules(self) -> RuleClassifier:
+        """The keyword rules plus the global merchants named in
+        MERCHANT_CATEGORIES and their aliases, loaded from the db once per
+        process."""
+        if self.db is None:
+            return self._keyword_rules
+        with self._rules_lock:
+            if CategorizationService._rules is None:
+                try:
+                    merchants = self._seeded_merchants()
+                except Exception:
+                    # Categorization is a suggestion; a db problem only costs
+                    # the merchant rules until the next request retries.
+                    self.db.rollback()
+                    logger.exception("Failed to load merchant rules")
+                    return self._keyword_rules
+                CategorizationService._rules = RuleClassifier(CATEGORY_GROUPS, merchants)
+            return CategorizationService._rules
+
+    def _seeded_merchants(self) -> Dict[str, Tuple[str, Tuple[str, str]]]:
+        """Normalized name or alias -> (display_name, category) for the global
+        merchants MERCHANT_CATEGORIES knows."""
+        merchants = (
+            self.db.query(CanonicalMerchant.id, CanonicalMerchant.canonical_name, CanonicalMerchant.display_name)
+            .filter(
+                CanonicalMerchant.user_email.is_(None),
+                CanonicalMerchant.canonical_name.in_(list(MERCHANT_CATEGORIES)),
+            )
+            .all()
+        )
+        by_id = {m.id: (m.display_name, MERCHANT_CATEGORIES[m.canonical_name]) for m in merchants}
+        names = {m.canonical_name: by_id[m.id] for m in merchants}
+        if by_id:
+            aliases = (
+                self.db.query(EntityAlias.raw_key, EntityAlias.entity_id)
+                .filter(
+                    EntityAlias.entity_type == "merchant",
+                    EntityAlias.user_email.is_(None),
+                    EntityAlias.entity_id.in_(list(by_id)),
+                )
+                .all()
+            )
+            for raw_key, entity_id in aliases:
+                names.setdefault(raw_key, by_id[entity_id])
+        return names
 
     def _parse_json_response(self, text: str) -> dict:
         """
@@ -98,6 +258,39 @@ class CategorizationService:
         # Fallback error
         raise ValueError("Unrecognized JSON format from LLM")
 
+    def _generate(self, prompt: str) -> str:
+        """One Gemini call; returns the model's text."""
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not configured")
+
+        model = os.getenv("OCR_MODEL", "gemini-2.5-flash") # Use same model as receipt, or default 2.5-flash
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
+
+        body = {
+            "contents": [
+                {"parts": [{"text": prompt}]}
+            ],
+            "generationConfig": {
+                "responseMimeType": "application/json"
+            }
+        }
+
+        resp = requests.post(url, headers={"Content-Type": "application/json"}, json=body, timeout=30)
+        resp.raise_for_status()
+
+        resp_data = resp.json()
+        return resp_data["candidates"][0]["content"]["parts"][0]["text"]
+
+    @staticmethod
+    def _valid(data: dict) -> Optional[Classification]:
+        main = data.get("main_category")
+        sub = data.get("subcategory")
+        merchant = data.get("merchant_name") or None
+        if main in CATEGORY_GROUPS and sub in CATEGORY_GROUPS[main]:
+            return main, sub, merchant
+        return None
+
     def llm_classify(self, description: str) -> Optional[Tuple[str, str, Optional[str]]]:
         """Use an LLM to classify descriptions when no deterministic match exists.
 
@@ -115,47 +308,181 @@ class CategorizationService:
                 "with no extra text or code fences. "
                 f"Description: '{description}'."
             )
-            
-            # Call Gemini directly
-            api_key = os.getenv("GEMINI_API_KEY")
-            if not api_key:
-                raise ValueError("GEMINI_API_KEY not configured")
-                
-            model = os.getenv("OCR_MODEL", "gemini-2.5-flash") # Use same model as receipt, or default 2.5-flash
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
-            
-            body = {
-                "contents": [
-                    {"parts": [{"text": prompt}]}
-                ],
-                "generationConfig": {
-                    "responseMimeType": "application/json"
-                }
-            }
-            
-            resp = requests.post(url, headers={"Content-Type": "application/json"}, json=body, timeout=30)
-            resp.raise_for_status()
-            
-            resp_data = resp.json()
-            response = resp_data["candidates"][0]["content"]["parts"][0]["text"]
-            
-            data = self._parse_json_response(response)
-            main = data.get("main_category")
-            sub = data.get("subcategory")
-            merchant = data.get("merchant_name") or None
-            if main in CATEGORY_GROUPS and sub in CATEGORY_GROUPS[main]:
-                return main, sub, merchant
-            raise ValueError(f"Invalid category combination: {main} / {sub}")
+            data = self._parse_json_response(self._generate(prompt))
+            result = self._valid(data)
+            if result:
+                return result
+            raise ValueError(f"Invalid category combination: {data.get('main_category')} / {data.get('subcategory')}")
         except Exception as exc:  # pragma: no cover - network or parsing errors
             logger.warning("LLM classification failed: %s", exc)
         return None
 
+    def llm_classify_batch(self, descriptions: List[str]) -> List[Optional[Classification]]:
+        """Classifies several descriptions with one LLM call. Returns a result per
+        description, in order; None where the model gave no valid answer (or for
+        all of them if the call failed)."""
+        results: List[Optional[Classification]] = [None] * len(descriptions)
+        try:
+            categories_json = json.dumps(CATEGORY_GROUPS)
+            numbered = json.dumps([{"index": i, "description": d} for i, d in enumerate(descriptions)])
+            prompt = (
+                "You categorize expense descriptions. "
+                f"Available categories: {categories_json}. "
+                "Also infer the merchant or company name from each description if it can be identified (e.g. 'Starbucks', 'Amazon', 'PG&E'). "
+                "If no merchant can be identified, set merchant_name to null. "
+                "Strictly respond with ONLY JSON in the form "
+                "{\"results\":[{\"index\":0, \"main_category\":\"...\", \"subcategory\":\"...\", \"merchant_name\":\"...\"}]} "
+                "with one entry per description, using its index, and no extra text or code fences. "
+                f"Descriptions: {numbered}"
+            )
+            entries = self._parse_json_response(self._generate(prompt)).get("results")
+            if not isinstance(entries, list):
+                raise ValueError("No results list in batch response")
+            for entry in entries:
+                if not isinstance(entry, dict):
+                    continue
+                index = entry.get("index")
+                if isinstance(index, int) and 0 <= index < len(descriptions) and results[index] is None:
+                    results[index] = self._valid(entry)
+        except Exception as exc:  # pragma: no cover - network or parsing errors
+            logger.warning("LLM batch classification of %d descriptions failed: %s", len(descriptions), exc)
+        return results
+
     def classify(self, description: str) -> Tuple[str, str, Optional[str]]:
-        """Classify description using the LLM and fall back to Other/General.
+        """Classify description locally when possible, else with the LLM, and
+        fall back to Other/General.
 
         Returns a 3-tuple (main_category, subcategory, merchant_name).
         """
+        started = time.perf_counter()
+        key = self.normalize(description)
+        source, result = self._lookup(key, description)
+        self._STATS.record(source, time.perf_counter() - started)
+        if source == "llm":
+            logger.info("Categorized %r with the LLM; %s", key, self._STATS.snapshot())
+        return result
+
+    def classify_many(self, descriptions: List[str]) -> List[Classification]:
+        """classify() for a batch, with one result per description, in order.
+
+        Descriptions that normalize alike are answered once. Local answers
+        come from the LRU, the rules and a single query against the table;
+        the rest go to the LLM CATEGORIZE_BATCH_SIZE per prompt, with up to
+        CATEGORIZE_BATCH_CONCURRENCY prompts in flight. Descriptions that
+        normalize to nothing fall back without asking the model.
+        """
+        settings = Settings()
+        keys = [self.normalize(d) for d in descriptions]
+        first: Dict[str, str] = {}
+        for key, description in zip(keys, descriptions):
+            first.setdefault(key, description)
+
+        answers: Dict[str, Tuple[str, Classification]] = {}
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        unresolved = []
+        for key in first:
+            if not key:
+                answers[key] = ("fallback", FALLBACK)
+            elif (cached := self._CACHE.get(key)) is not None:
+                answers[key] = ("memory", cached)
+            elif (ruled := self.rules().classify(key)) is not None:
+                answers[key] = ("rule", ruled)
+            else:
+                unresolved.append(key)
+        for key, stored in self._stored_many(unresolved).items():
+            answers[key] = ("db", stored)
+        local_seconds = time.perf_counter() - started
+        for key in answers:
+            timings[key] = local_seconds / len(first)
+
+        novel = [key for key in unresolved if key not in answers]
+        if novel:
+            started = time.perf_counter()
+            size = max(1, settings.CATEGORIZE_BATCH_SIZE)
+            chunks = [novel[i : i + size] for i in range(0, len(novel), size)]
+            workers = max(1, min(settings.CATEGORIZE_BATCH_CONCURRENCY, len(chunks)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="categorize") as pool:
+                chunk_results = list(pool.map(lambda chunk: self.llm_classify_batch([first[k] for k in chunk]), chunks))
+            learned: Dict[str, Classification] = {}
+            for chunk, results in zip(chunks, chunk_results):
+                for key, result in zip(chunk, results):
+                    if result:
+                        learned[key] = result
+                        answers[key] = ("llm", result)
+                    else:
+                        answers[key] = ("fallback", FALLBACK)
+            self._store_many(learned)
+            llm_seconds = time.perf_counter() - started
+            for key in novel:
+                timings[key] = llm_seconds / len(novel)
+            logger.info(
+                "Categorized %d of %d descriptions with %d LLM call(s); %s",
+                len(learned), len(descriptions), len(chunks), self._STATS.snapshot(),
+            )
+
+        for key, (source, result) in answers.items():
+            if source in ("rule", "db", "llm"):
+                self._CACHE.put(key, result)
+            self._STATS.record(source, timings[key])
+        for _ in range(len(descriptions) - len(first)):
+            self._STATS.record("memory", 0.0)  # repeats within the batch
+        return [answers[key][1] for key in keys]
+
+    def _lookup(self, key: str, description: str) -> Tuple[str, Classification]:
+        if key:
+            cached = self._CACHE.get(key)
+            if cached is not None:
+                return "memory", cached
+            ruled = self.rules().classify(key)
+            if ruled is not None:
+                self._CACHE.put(key, ruled)
+                return "rule", ruled
+            stored = self._stored_many([key]).get(key)
+            if stored is not None:
+                self._CACHE.put(key, stored)
+                return "db", stored
+
         result = self.llm_classify(description)
-        if result:
-            return result
-        return "Other", "General", None
+        if not result:
+            # Not cached: the model may well answer next time.
+            return "fallback", FALLBACK
+        if key:
+            self._store_many({key: result})
+            self._CACHE.put(key, result)
+        return "llm", result
+
+    def _stored_many(self, keys: List[str]) -> Dict[str, Classification]:
+        keys = [key for key in keys if len(key) <= 255]
+        if self.db is None or not keys:
+            return {}
+        try:
+            rows = self.db.query(CategorizationCacheEntry).filter(CategorizationCacheEntry.description_key.in_(keys)).all()
+        except Exception:
+            self.db.rollback()
+            logger.exception("Failed to read stored categorizations")
+            return {}
+        return {row.description_key: (row.main_category, row.subcategory, row.merchant_name) for row in rows}
+
+    def _store_many(self, results: Dict[str, Classification]) -> None:
+        values = [
+            {"description_key": key, "main_category": main, "subcategory": sub, "merchant_name": merchant[:255] if merchant else None}
+            for key, (main, sub, merchant) in results.items()
+            if len(key) <= 255
+        ]
+        if self.db is None or not values:
+            return
+        if self.db.get_bind().dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        try:
+            # Another process may have asked the model about the same
+            # description meanwhile; the first answer stored wins.
+            for start in range(0, len(values), 500):
+                self.db.execute(dialect_insert(CategorizationCacheEntry).values(values[start : start + 500]).on_conflict_do_nothing())
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            logger.exception("Failed to store %d categorization(s)", len(values))
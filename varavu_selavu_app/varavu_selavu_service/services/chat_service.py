@@ -328,18 +328,16 @@ def _build_group_context_block(user_groups, analysis_service, balance_service, u
     if not user_groups or not analysis_service or not balance_service:
         return {}
         
-    is_sqlite = analysis_service.db.bind.dialect.name == "sqlite"
     summaries = analysis_service._compute_group_summaries(
         user_id=user_id,
         year=year,
         month=month,
         start_date=start_date,
         end_date=end_date,
-        is_sqlite=is_sqlite
     )
     
     groups_data = []
-    date_filters = analysis_service._date_filters(Expense.purchased_at, year, month, start_date, end_date, is_sqlite)
+    date_filters = analysis_service._date_filters(Expense.purchased_at, year, month, start_date, end_date)
     
     for g in summaries:
         gid = g["group_id"]
@@ -0,0 +1,203 @@
+"""Columnar (Parquet / Arrow IPC) exports of the personal ledger and of a group.
+
+The CSV exports are for spreadsheets; these are for analysis tools. One download
+is a zip holding one file per table (expenses, expense_items and, for a group,
+expense_payers, expense_splits and settlements), typed from the ORM columns:
+amounts stay decimal128 with their column's precision and scale, timestamps are
+UTC timestamp[us], ids are strings.
+
+Each table is read off a server-side cursor BATCH_SIZE rows at a time and every
+batch becomes one Parquet row group / Arrow record batch, written straight into
+the zip member, so the response streams with one batch in memory. Parquet is
+zstd-compressed per column; the Arrow IPC files are zstd-compressed per buffer.
+The zip itself only stores (both payloads are already compressed).
+
+pyarrow is a declared dependency (pyproject.toml). An environment installed
+without it still serves CSV: the service raises ColumnarExportUnavailable, which
+the routes turn into a 501.
+"""
+
+import io
+import json
+import uuid
+import zipfile
+from enum import Enum
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import JSON, UUID, Boolean, DateTime, Integer, Numeric, select
+from sqlalchemy.orm import Session
+
+from varavu_selavu_service.db.models import Expense, ExpenseItem, ExpensePayer, ExpenseSplit, Settlement
+from varavu_selavu_service.services.date_scope import DateScope
+from varavu_selavu_service.services.group_service import GroupService
+
+
+class ColumnarFormat(str, Enum):
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+class ColumnarExportUnavailable(RuntimeError):
+    pass
+
+
+EXPENSE_COLUMNS = (
+    Expense.id, Expense.user_email, Expense.group_id, Expense.purchased_at, Expense.merchant_name,
+    Expense.merchant_id, Expense.category_id, Expense.description, Expense.amount, Expense.currency,
+    Expense.fx_rate_to_group_currency, Expense.tax, Expense.tip, Expense.discount, Expense.payment_method,
+    Expense.split_type, Expense.created_at,
+)
+ITEM_COLUMNS = (
+    ExpenseItem.id, ExpenseItem.expense_id, ExpenseItem.line_no, ExpenseItem.item_name,
+    ExpenseItem.normalized_name, ExpenseItem.category_id, ExpenseItem.quantity, ExpenseItem.unit,
+    ExpenseItem.unit_price, ExpenseItem.line_total, ExpenseItem.tax, ExpenseItem.discount,
+    ExpenseItem.attributes_json,
+)
+PAYER_COLUMNS = (ExpensePayer.expense_id, ExpensePayer.member_id, ExpensePayer.amount_paid)
+SPLIT_COLUMNS = (
+    ExpenseSplit.expense_id, ExpenseSplit.member_id, ExpenseSplit.amount_owed, ExpenseSplit.basis_type,
+    ExpenseSplit.basis_value, ExpenseSplit.settled_via_settlement_id,
+)
+SETTLEMENT_COLUMNS = (
+    Settlement.id, Settlement.from_member_id, Settlement.to_member_id, Settlement.amount, Settlement.method,
+    Settlement.settled_at, Settlement.notes, Settlement.created_by,
+)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:  # pragma: no cover - pyarrow is installed with the app
+        raise ColumnarExportUnavailable("Columnar export requires pyarrow") from exc
+    return pyarrow
+
+
+def _arrow_type(pa, column):
+    if isinstance(column.type, Numeric):
+        return pa.decimal128(column.type.precision, column.type.scale)
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    return pa.string()  # strings, text, UUIDs and JSON
+
+
+def _converter(column):
+    """Per-column cell conversion to what pa.array() takes, or None to pass the
+    column's values through untouched (the common case, kept off the hot loop)."""
+    if isinstance(column.type, UUID):
+        return lambda v: None if v is None else str(v)
+    if isinstance(column.type, JSON):
+        return lambda v: None if v is None else json.dumps(v)
+    return None
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable target for the zip: collects bytes until drained.
+    zipfile handles unseekable output by writing data descriptors after members."""
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buf += data
+        return len(data)
+
+    def drain(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+
+class ColumnarExportService:
+    BATCH_SIZE = 10_000
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.group_service = GroupService(db)
+
+    def export_personal(
+        self, user_id: str, fmt: ColumnarFormat, dates: Optional[DateScope] = None
+    ) -> Iterator[bytes]:
+        """Zip of expenses.<ext> and expense_items.<ext> for the caller's personal
+        ledger, optionally limited to `dates`."""
+        pa = _pyarrow()
+        filters = [Expense.user_email == user_id, Expense.group_id.is_(None)]
+        if dates is not None:
+            filters += dates.filters(Expense.purchased_at)
+        expense_ids = select(Expense.id).where(*filters)
+        tables = [
+            ("expenses", EXPENSE_COLUMNS,
+             select(*EXPENSE_COLUMNS).where(*filters).order_by(Expense.purchased_at, Expense.id)),
+            ("expense_items", ITEM_COLUMNS,
+             select(*ITEM_COLUMNS).where(ExpenseItem.expense_id.in_(expense_ids))
+             .order_by(ExpenseItem.expense_id, ExpenseItem.line_no)),
+        ]
+        return self._zip(pa, tables, ColumnarFormat(fmt))
+
+    def export_group(self, group_id: str, actor_email: str, fmt: ColumnarFormat) -> Iterator[bytes]:
+        """Zip of expenses, expense_items, expense_payers, expense_splits and
+        settlements for a group. Membership is checked before the first chunk."""
+        pa = _pyarrow()
+        self.group_service.require_membership(group_id, actor_email)
+        gid = uuid.UUID(str(group_id))
+        expense_ids = select(Expense.id).where(Expense.group_id == gid)
+        tables = [
+            ("expenses", EXPENSE_COLUMNS,
+             select(*EXPENSE_COLUMNS).where(Expense.group_id == gid).order_by(Expense.purchased_at, Expense.id)),
+            ("expense_items", ITEM_COLUMNS,
+             select(*ITEM_COLUMNS).where(ExpenseItem.expense_id.in_(expense_ids))
+             .order_by(ExpenseItem.expense_id, ExpenseItem.line_no)),
+            ("expense_payers", PAYER_COLUMNS,
+             select(*PAYER_COLUMNS).where(ExpensePayer.expense_id.in_(expense_ids))
+             .order_by(ExpensePayer.expense_id, ExpensePayer.member_id)),
+            ("expense_splits", SPLIT_COLUMNS,
+             select(*SPLIT_COLUMNS).where(ExpenseSplit.expense_id.in_(expense_ids))
+             .order_by(ExpenseSplit.expense_id, ExpenseSplit.member_id)),
+            ("settlements", SETTLEMENT_COLUMNS,
+             select(*SETTLEMENT_COLUMNS).where(Settlement.group_id == gid)
+             .order_by(Settlement.settled_at, Settlement.id)),
+        ]
+        return self._zip(pa, tables, ColumnarFormat(fmt))
+
+    def _zip(self, pa, tables: List[Tuple[str, Sequence, object]], fmt: ColumnarFormat) -> Iterator[bytes]:
+        sink = _ChunkSink()
+        try:
+            with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+                for name, columns, stmt in tables:
+                    schema = pa.schema([(c.key, _arrow_type(pa, c)) for c in columns])
+                    with zf.open(f"{name}.{fmt.value}", "w", force_zip64=True) as member:
+                        writer = self._writer(pa, pa.PythonFile(member, mode="w"), schema, fmt)
+                        for batch in self._batches(pa, stmt, columns, schema):
+                            writer.write_batch(batch)
+                            yield sink.drain()
+                        writer.close()
+                    yield sink.drain()
+            yield sink.drain()
+        finally:
+            # Streams after get_db() may have closed the session; see
+            # PersonalExportService._rows.
+            self.db.close()
+
+    @staticmethod
+    def _writer(pa, out, schema, fmt: ColumnarFormat):
+        if fmt is ColumnarFormat.PARQUET:
+            return pa.parquet.ParquetWriter(out, schema, compression="zstd")
+        return pa.ipc.new_file(out, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+
+    def _batches(self, pa, stmt, columns, schema) -> Iterator:
+        converters = [_converter(c) for c in columns]
+        # Core execution: rows are plain tuples, without the ORM's per-row loading.
+        result = self.db.connection().execute(stmt.execution_options(yield_per=self.BATCH_SIZE))
+        for rows in result.partitions():
+            arrays = []
+            for values, convert, field in zip(zip(*rows), converters, schema):
+                arrays.append(pa.array(list(map(convert, values)) if convert else values, type=field.type))
+            yield pa.record_batch(arrays, schema=schema)
@@ -0,0 +1,137 @@
+"""Shared date scoping for reads over timestamp columns (Expense.purchased_at).
+
+Every year / month / start_date / end_date combination the API accepts becomes one
+half-open range [start, end) compared with plain >= / <, never extract() or
+strftime() on the column. Those per-row expressions can't use the
+(user_email, purchased_at) / purchased_at indexes, so a "March 2025" filter used
+to read the user's whole history; a range predicate is an index range scan.
+
+Bounds are calendar dates rendered as 'YYYY-MM-DD'. Postgres compares them to a
+timestamptz at midnight in the session time zone — the same zone extract() used —
+and SQLite compares them as strings against SQLAlchemy's 'YYYY-MM-DD HH:MM:SS'
+storage format, so both dialects select exactly the rows the old predicates did.
+
+end_date is inclusive of the whole day (the range ends at the start of the next
+day), as the insights endpoints already treated it. Month without a year is the
+one combination that isn't a single range; it keeps an extract('month') predicate,
+still ANDed with any range.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import extract
+
+# (first month start, exclusive month start); None on either side means unbounded.
+MonthBlock = Tuple[Optional[date], Optional[date]]
+
+
+def next_month(d: date) -> date:
+    return date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)
+
+
+def month_range(year: int, month: int) -> Tuple[date, date]:
+    start = date(int(year), int(month), 1)
+    return start, next_month(start)
+
+
+def year_range(year: int) -> Tuple[date, date]:
+    return date(int(year), 1, 1), date(int(year) + 1, 1, 1)
+
+
+def parse_day(value) -> date:
+    """'YYYY-MM-DD' (or a longer ISO timestamp, of which only the day is kept),
+    a date or a datetime. Raises ValueError for anything else."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def month_block(start: Optional[date], end_exclusive: Optional[date]) -> Optional[MonthBlock]:
+    """The whole calendar months inside [start, end_exclusive), or None if not even
+    one fits."""
+    lo = hi = None
+    if start is not None:
+        lo = date(start.year, start.month, 1)
+        if start.day != 1:
+            lo = next_month(lo)
+    if end_exclusive is not None:
+        hi = date(end_exclusive.year, end_exclusive.month, 1)
+    if lo is not None and hi is not None and lo >= hi:
+        return None
+    return lo, hi
+
+
+def _later(a: Optional[date], b: Optional[date]) -> Optional[date]:
+    return b if a is None else a if b is None else max(a, b)
+
+
+def _earlier(a: Optional[date], b: Optional[date]) -> Optional[date]:
+    return b if a is None else a if b is None else min(a, b)
+
+
+@dataclass(frozen=True)
+class DateScope:
+    """A half-open [start, end) date range, either side optional, plus the
+    month-of-year residue of a month given without a year."""
+
+    start: Optional[date] = None
+    end: Optional[date] = None
+    month_of_year: Optional[int] = None
+
+    @classmethod
+    def between(cls, start: Optional[date] = None, last_day: Optional[date] = None) -> "DateScope":
+        """Inclusive calendar days start..last_day."""
+        return cls(start=start, end=last_day + timedelta(days=1) if last_day is not None else None)
+
+    @classmethod
+    def from_params(
+        cls,
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        start_date=None,
+        end_date=None,
+        dates_take_precedence: bool = False,
+    ) -> "DateScope":
+        """The API's date parameters as one range. By default every given parameter
+        applies (their intersection); with dates_take_precedence, start_date/end_date
+        replace year/month entirely, the insights endpoints' precedence rule."""
+        scope = cls.between(
+            parse_day(start_date) if start_date else None,
+            parse_day(end_date) if end_date else None,
+        )
+        if dates_take_precedence and (start_date or end_date):
+            return scope
+        if year is not None:
+            lo, hi = month_range(year, month) if month is not None else year_range(year)
+            return cls(_later(scope.start, lo), _earlier(scope.end, hi))
+        if month is not None:
+            return cls(scope.start, scope.end, int(month))
+        return scope
+
+    def filters(self, column) -> List:
+        filters = []
+        if self.start is not None:
+            filters.append(column >= self.start.isoformat())
+        if self.end is not None:
+            filters.append(column < self.end.isoformat())
+        if self.month_of_year is not None:
+            filters.append(extract('month', column) == self.month_of_year)
+        return filters
+
+    def month_block(self) -> Optional[Tuple[MonthBlock, bool]]:
+        """The whole months this scope covers, as (block, exact). exact means the
+        scope selects precisely those months, so no edge rows remain outside the
+        block; an all-time scope is never exact because it also selects undated rows.
+        None when not even one whole month fits, or for a bare month-of-year."""
+        if self.month_of_year is not None:
+            return None
+        block = month_block(self.start, self.end)
+        if block is None:
+            return None
+        exact = (self.start is not None or self.end is not None) and block == (self.start, self.end)
+        return block, exact
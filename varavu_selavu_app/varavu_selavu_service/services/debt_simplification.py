@@ -0,0 +1,183 @@
+"""Debt simplification engine (TS-GRP simplify_debts, Phase 2).
+
+Turns per-member nets (positive = owed money, negative = owes money; summing to
+zero) into a list of suggested transfers. Two modes:
+
+- ``greedy``: repeatedly match the largest debtor with the largest creditor.
+  O(n log n), at most n-1 transfers, but not always the fewest.
+- ``optimal``: the minimum number of transfers is n - k, where k is the largest
+  number of disjoint zero-sum subsets the nonzero nets can be partitioned into
+  (each subset settles internally with size-1 transfers). Found exactly by a
+  subset-sum search, which is exponential in the member count — so it is only
+  attempted up to ``max_members`` nonzero nets and within ``time_budget_ms``,
+  and falls back to greedy otherwise.
+
+Transfers are ``{"from_member_id", "to_member_id", "amount"}`` dicts with a
+Decimal amount; callers format them for the API.
+"""
+import time
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, List, Optional, Sequence, Tuple
+
+GREEDY = "greedy"
+OPTIMAL = "optimal"
+MODES = (GREEDY, OPTIMAL)
+
+# Nets carry 8 decimal places (group_balances.net is Numeric(20, 8)); the exact
+# search works on integers at that scale so zero-sum tests are exact.
+_SCALE = Decimal("0.00000001")
+
+
+class DebtSimplificationError(ValueError):
+    """Raised for an unknown simplification mode."""
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def greedy_transfers(nets: Dict[str, Decimal]) -> List[Dict]:
+    """Largest-debtor/largest-creditor matching."""
+    # Debtors have net < 0 (they owe money to the group).
+    # Creditors have net > 0 (they are owed money by the group).
+    debtors = sorted(
+        [{"id": m, "net": -n} for m, n in nets.items() if n < Decimal("0.00")],
+        key=lambda x: x["net"],
+        reverse=True
+    )
+    creditors = sorted(
+        [{"id": m, "net": n} for m, n in nets.items() if n > Decimal("0.00")],
+        key=lambda x: x["net"],
+        reverse=True
+    )
+
+    transfers = []
+    i, j = 0, 0
+
+    while i < len(debtors) and j < len(creditors):
+        debtor = debtors[i]
+        creditor = creditors[j]
+
+        amount = min(debtor["net"], creditor["net"])
+        if amount > Decimal("0.00"):
+            transfers.append({
+                "from_member_id": debtor["id"],
+                "to_member_id": creditor["id"],
+                "amount": amount
+            })
+
+        debtor["net"] -= amount
+        creditor["net"] -= amount
+
+        if debtor["net"] <= Decimal("0.00"):
+            i += 1
+        if creditor["net"] <= Decimal("0.00"):
+            j += 1
+
+    return transfers
+
+
+def _zero_sum_partition(values: Sequence[int], deadline: float) -> List[int]:
+    """Partition indexes of `values` (which sum to zero) into the maximum number of
+    disjoint zero-sum subsets, returned as bitmasks. Raises _BudgetExceeded past
+    `deadline` (a time.perf_counter() value)."""
+    n = len(values)
+    if n == 0:
+        return []
+    full = (1 << n) - 1
+
+    # The complement of a zero-sum subset is zero-sum too, so only subsets of the
+    # first n-1 members need enumerating: the piece holding the last member is
+    # whatever is left over. sums[mask] is built by doubling, one list
+    # comprehension per member.
+    sums = [0]
+    for v in values[:-1]:
+        sums += [s + v for s in sums]
+        if time.perf_counter() > deadline:
+            raise _BudgetExceeded()
+    zero_masks = [mask for mask, s in enumerate(sums) if s == 0 and mask]
+    del sums
+
+    # best[z] = (max zero-sum pieces z splits into, the piece holding z's lowest
+    # member). Ascending mask order visits every submask before its supersets,
+    # and the remainder z ^ s of a zero-sum piece s is itself zero-sum.
+    best: Dict[int, Tuple[int, int]] = {0: (0, 0)}
+    for count, z in enumerate(zero_masks):
+        low = z & -z
+        top = (0, z)
+        for s in islice(zero_masks, count):
+            if s & low and s & z == s:
+                pieces = best[z ^ s][0] + 1
+                if pieces > top[0]:
+                    top = (pieces, s)
+        best[z] = top if top[0] else (1, z)
+        if count % 256 == 0 and time.perf_counter() > deadline:
+            raise _BudgetExceeded()
+
+    mask = max(best, key=lambda z: best[z][0])
+    partition = [full ^ mask]
+    while mask:
+        piece = best[mask][1]
+        partition.append(piece)
+        mask ^= piece
+    return partition
+
+
+def optimal_transfers(
+    nets: Dict[str, Decimal], max_members: int = 20, time_budget_ms: int = 250
+) -> Optional[List[Dict]]:
+    """Fewest-transfers simplification, or None when more than `max_members` nonzero
+    nets remain after settling exactly-opposite pairs, the nets do not sum to exactly zero, or the search runs past
+    `time_budget_ms`. Callers fall back to greedy on None."""
+    deadline = time.perf_counter() + time_budget_ms / 1000.0
+    units = {
+        m: int((Decimal(str(n)) / _SCALE).to_integral_value())
+        for m, n in nets.items()
+    }
+    units = {m: u for m, u in units.items() if u != 0}
+    if sum(units.values()) != 0:
+        return None
+
+    # An exactly-opposite pair is always one piece of some optimal partition, so
+    # settle those up front and keep the exponential search small.
+    groups: List[List[str]] = []
+    unmatched: Dict[int, List[str]] = {}
+    rest: List[str] = []
+    for m, u in units.items():
+        partners = unmatched.get(-u)
+        if partners:
+            groups.append([partners.pop(), m])
+        else:
+            unmatched.setdefault(u, []).append(m)
+    for members in unmatched.values():
+        rest.extend(members)
+    # Keep the caller's member order for deterministic output.
+    order = {m: i for i, m in enumerate(nets)}
+    rest.sort(key=order.__getitem__)
+
+    if len(rest) > max_members:
+        return None
+    try:
+        partition = _zero_sum_partition([units[m] for m in rest], deadline)
+    except _BudgetExceeded:
+        return None
+    for piece in partition:
+        groups.append([m for i, m in enumerate(rest) if piece >> i & 1])
+
+    groups.sort(key=lambda g: min(order[m] for m in g))
+    transfers: List[Dict] = []
+    for group in groups:
+        transfers.extend(greedy_transfers({m: nets[m] for m in sorted(group, key=order.__getitem__)}))
+    return transfers
+
+
+def simplify_debts(
+    nets: Dict[str, Decimal], mode: str = OPTIMAL, max_members: int = 20, time_budget_ms: int = 250
+) -> List[Dict]:
+    if mode == GREEDY:
+        return greedy_transfers(nets)
+    if mode == OPTIMAL:
+        transfers = optimal_transfers(nets, max_members=max_members, time_budget_ms=time_budget_ms)
+        return transfers if transfers is not None else greedy_transfers(nets)
+    raise DebtSimplificationError(f"Unsupported debt simplification mode: {mode}")
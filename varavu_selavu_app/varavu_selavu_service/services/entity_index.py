@@ -0,0 +1,284 @@
+"""
+In-process index of canonical entities for EntityResolutionService.
+
+Holds, per entity type, every canonical name and alias a resolve() can match:
+a global shard (user_email NULL: the seed dictionary) and one shard per user,
+each loaded from the database the first time it is needed and then kept up
+to date by the service's own writes (add_entity / add_alias). Tiers 1-2 are
+dict lookups and tiers 3-5 score candidates with trigram_similarity(), a
+port of pg_trgm's similarity(), so resolution behaves the same on Postgres
+and SQLite without a query per name.
+
+Other processes' writes are picked up when a shard is older than
+ENTITY_INDEX_TTL_SEC; before minting a new entity the service still checks
+the database (EntityResolutionService._stored_match), so a stale shard can
+never cause a duplicate canonical. Typeahead (suggest) reads the same shards:
+each keeps its keys in a sorted array for prefix ranges and memoizes the
+top SUGGEST_CACHE_K matches per query typed, updating every memoized query
+in place as names and aliases are added. Linked outcomes (raw_key -> canonical) are
+kept in an LRU per user until that user's shard or the global one changes.
+"""
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+# Matches kept per memoized typeahead query (the endpoint's largest `limit`),
+# and memoized queries kept per shard.
+SUGGEST_CACHE_K = 50
+SUGGEST_CACHE_QUERIES = 5_000
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """pg_trgm's trigram set: lowercased alphanumeric words, each padded with
+    two spaces in front and one behind."""
+    grams: Set[str] = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def trigram_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+@dataclass(frozen=True)
+class IndexedEntity:
+    id: uuid.UUID
+    canonical_name: str
+    display_name: str
+    category_id: Optional[str]
+
+
+@dataclass
+class _Suggestions:
+    grams: FrozenSet[str]
+    min_score: float
+    hits: List[Tuple[uuid.UUID, float]]  # best first, at most SUGGEST_CACHE_K
+
+
+@dataclass
+class Shard:
+    names: Dict[str, uuid.UUID] = field(default_factory=dict)
+    aliases: Dict[str, uuid.UUID] = field(default_factory=dict)
+    # One entry per distinct (key, entity): its trigram set, and an inverted
+    # index from trigram to entry so a search only scores entries it overlaps.
+    entries: List[Tuple[uuid.UUID, FrozenSet[str]]] = field(default_factory=list)
+    postings: Dict[str, List[int]] = field(default_factory=dict)
+    seen: Set[Tuple[str, uuid.UUID]] = field(default_factory=set)
+    # (key, entity) sorted by key, so the keys starting with a prefix are one
+    # contiguous range.
+    sorted_keys: List[Tuple[str, uuid.UUID]] = field(default_factory=list)
+    suggestions: "OrderedDict[str, _Suggestions]" = field(default_factory=OrderedDict)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def add_key(self, key: str, entity_id: uuid.UUID, keep_sorted: bool = True) -> None:
+        if (key, entity_id) in self.seen:
+            return
+        self.seen.add((key, entity_id))
+        grams = trigrams(key)
+        position = len(self.entries)
+        self.entries.append((entity_id, grams))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(position)
+        if not keep_sorted:
+            self.sorted_keys.append((key, entity_id))
+            return
+        bisect.insort(self.sorted_keys, (key, entity_id))
+        for query, cached in self.suggestions.items():
+            score = trigram_similarity(grams, cached.grams)
+            hits = dict(cached.hits)
+            if (key.startswith(query) or score >= cached.min_score) and score >= hits.get(entity_id, 0.0):
+                hits[entity_id] = score
+                cached.hits = _top(hits)
+
+    def scores(self, grams: FrozenSet[str]) -> Dict[uuid.UUID, float]:
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for position in self.postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        best: Dict[uuid.UUID, float] = {}
+        for position, count in shared.items():
+            entity_id, entry_grams = self.entries[position]
+            score = count / (len(grams) + len(entry_grams) - count)
+            if score > best.get(entity_id, 0.0):
+                best[entity_id] = score
+        return best
+
+    def suggest(self, query: str, min_score: float) -> List[Tuple[uuid.UUID, float]]:
+        """Entities with a key starting with `query` or scoring at least
+        `min_score` against it, best first — memoized per query."""
+        cached = self.suggestions.get(query)
+        if cached is not None and cached.min_score == min_score:
+            self.suggestions.move_to_end(query)
+            return cached.hits
+        grams = trigrams(query)
+        best = {entity_id: score for entity_id, score in self.scores(grams).items() if score >= min_score}
+        for position in range(bisect.bisect_left(self.sorted_keys, (query,)), len(self.sorted_keys)):
+            key, entity_id = self.sorted_keys[position]
+            if not key.startswith(query):
+                break
+            best[entity_id] = max(best.get(entity_id, 0.0), trigram_similarity(trigrams(key), grams))
+        hits = _top(best)
+        self.suggestions[query] = _Suggestions(grams=grams, min_score=min_score, hits=hits)
+        while len(self.suggestions) > SUGGEST_CACHE_QUERIES:
+            self.suggestions.popitem(last=False)
+        return hits
+
+
+def _top(scores: Dict[uuid.UUID, float]) -> List[Tuple[uuid.UUID, float]]:
+    return sorted(scores.items(), key=lambda hit: (-hit[1], str(hit[0])))[:SUGGEST_CACHE_K]
+
+
+class EntityIndex:
+    """The index for one entity type. Loading is the caller's job (see
+    EntityResolutionService._shard): this class only stores and searches."""
+
+    def __init__(self, max_users: int = 2_000, max_results: int = 20_000):
+        self.max_users = max_users
+        self.max_results = max_results
+        self.entities: Dict[uuid.UUID, IndexedEntity] = {}
+        self._global: Optional[Shard] = None
+        self._users: "OrderedDict[str, Shard]" = OrderedDict()
+        self._results: "OrderedDict[Tuple[str, str], IndexedEntity]" = OrderedDict()
+        self.lock = threading.RLock()
+
+    # -- shards ------------------------------------------------------------
+    def shard(self, user_email: Optional[str], ttl_sec: float) -> Optional[Shard]:
+        """The loaded, fresh shard for `user_email` (None: global), or None."""
+        with self.lock:
+            shard = self._global if user_email is None else self._users.get(user_email)
+            if shard is None or time.monotonic() - shard.loaded_at > ttl_sec:
+                return None
+            if user_email is not None:
+                self._users.move_to_end(user_email)
+            return shard
+
+    def load(
+        self,
+        user_email: Optional[str],
+        entities: Iterable[IndexedEntity],
+        aliases: Iterable[Tuple[str, uuid.UUID]],
+    ) -> Shard:
+        """Replaces the shard for `user_email` with `entities` and `aliases`
+        ((raw_key, entity_id) pairs) scoped to it."""
+        shard = Shard()
+        with self.lock:
+            for entity in entities:
+                self.entities[entity.id] = entity
+                shard.names.setdefault(entity.canonical_name, entity.id)
+                shard.add_key(entity.canonical_name, entity.id, keep_sorted=False)
+            for raw_key, entity_id in aliases:
+                shard.aliases.setdefault(raw_key, entity_id)
+                shard.add_key(raw_key, entity_id, keep_sorted=False)
+            shard.sorted_keys.sort()
+            if user_email is None:
+                self._global = shard
+                self._results.clear()
+            else:
+                self._users[user_email] = shard
+                self._users.move_to_end(user_email)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+                self._forget_results(user_email)
+        return shard
+
+    def add_entity(self, entity: IndexedEntity, user_email: Optional[str]) -> None:
+        with self.lock:
+            self.entities[entity.id] = entity
+            shard = self._global if user_email is None else self._users.get(user_email)
+            if shard is not None:
+                shard.names.setdefault(entity.canonical_name, entity.id)
+                shard.add_key(entity.canonical_name, entity.id)
+            self._forget_results(user_email)
+
+    def add_alias(self, raw_key: str, entity_id: uuid.UUID, user_email: Optional[str]) -> None:
+        with self.lock:
+            shard = self._global if user_email is None else self._users.get(user_email)
+            if shard is not None:
+                shard.aliases.setdefault(raw_key, entity_id)
+                shard.add_key(raw_key, entity_id)
+            self._forget_results(user_email)
+
+    # -- lookups -----------------------------------------------------------
+    @staticmethod
+    def exact(shards: List[Shard], key: str) -> Optional[uuid.UUID]:
+        for shard in shards:
+            if key in shard.names:
+                return shard.names[key]
+        return None
+
+    @staticmethod
+    def alias(shards: List[Shard], key: str) -> Optional[uuid.UUID]:
+        for shard in shards:
+            if key in shard.aliases:
+                return shard.aliases[key]
+        return None
+
+    def search(self, shards: List[Shard], key: str, min_score: float, limit: int) -> List[Tuple[IndexedEntity, float]]:
+        grams = trigrams(key)
+        best: Dict[uuid.UUID, float] = {}
+        with self.lock:
+            for shard in shards:
+                for entity_id, score in shard.scores(grams).items():
+                    if score > best.get(entity_id, 0.0):
+                        best[entity_id] = score
+            hits = [
+                (self.entities[entity_id], score)
+                for entity_id, score in best.items()
+                if score >= min_score and entity_id in self.entities
+            ]
+        hits.sort(key=lambda hit: (-hit[1], hit[0].display_name))
+        return hits[:limit]
+
+    def suggest(self, shards: List[Shard], query: str, min_score: float, limit: int) -> List[Tuple[IndexedEntity, float]]:
+        best: Dict[uuid.UUID, float] = {}
+        with self.lock:
+            for shard in shards:
+                for entity_id, score in shard.suggest(query, min_score):
+                    if score > best.get(entity_id, -1.0):
+                        best[entity_id] = score
+            hits = [(self.entities[entity_id], score) for entity_id, score in best.items() if entity_id in self.entities]
+        hits.sort(key=lambda hit: (-hit[1], hit[0].display_name))
+        return hits[:limit]
+
+    # -- results LRU -------------------------------------------------------
+    def cached_result(self, user_email: str, key: str) -> Optional[IndexedEntity]:
+        with self.lock:
+            result = self._results.get((user_email, key))
+            if result is not None:
+                self._results.move_to_end((user_email, key))
+            return result
+
+    def cache_result(self, user_email: str, key: str, result: IndexedEntity) -> None:
+        with self.lock:
+            self._results[(user_email, key)] = result
+            self._results.move_to_end((user_email, key))
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def _forget_results(self, user_email: Optional[str]) -> None:
+        if user_email is None:
+            self._results.clear()
+            return
+        for cached_key in [k for k in self._results if k[0] == user_email]:
+            del self._results[cached_key]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entities.clear()
+            self._global = None
+            self._users.clear()
+            self._results.clear()
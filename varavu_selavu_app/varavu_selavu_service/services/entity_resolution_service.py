@@ -12,6 +12,10 @@ create a brand-new canonical entity) — this mirrors the spec's own per-tier
 silently corrupt data, so ambiguous matches wait for an explicit confirm
 (P1 — no confirm endpoint exists yet in this phase, so a "suggested" result
 today just stays unresolved until that ships).
+
+Tiers 1-4 are answered from an in-process index of canonical names and
+aliases (services/entity_index.py) rather than per-name queries, scored with
+pg_trgm's similarity() in Python so SQLite and Postgres resolve identically.
 """
 from __future__ import annotations
 
@@ -19,13 +23,14 @@ import re
 import uuid
 import logging
 from dataclasses import dataclass, field
-from typing import Dict, List, Literal, Optional, Type, Union
+from typing import Dict, List, Literal, Optional, Sequence, Type, Union
 
-from sqlalchemy import func, or_
-from sqlalchemy.exc import DBAPIError
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
+from varavu_selavu_service.core.config import Settings
 from varavu_selavu_service.db.models import CanonicalMerchant, CanonicalItem, EntityAlias
+from varavu_selavu_service.services.entity_index import EntityIndex, IndexedEntity, Shard, trigrams
 
 logger = logging.getLogger("varavu_selavu.entity_resolution")
 
@@ -88,8 +93,13 @@ class ResolutionResult:
 
 
 class EntityResolutionService:
+    # Per-process, per-entity-type index of canonical names and aliases; see
+    # services/entity_index.py.
+    _INDEXES: Dict[str, EntityIndex] = {entity_type: EntityIndex() for entity_type in _MODEL_BY_TYPE}
+
     def __init__(self, db: Session):
         self.db = db
+        self.index_ttl_sec = Settings().ENTITY_INDEX_TTL_SEC
 
     # ------------------------------------------------------------------
     # Normalization (pure, no DB) — spec §6.1
@@ -162,36 +172,17 @@ class EntityResolutionService:
         q = self.normalize(query, entity_type=entity_type)
         if not q:
             return []
-        model = _MODEL_BY_TYPE[entity_type]
-
-        name_sim = func.similarity(model.canonical_name, q)
-        name_rows = (
-            self.db.query(model.id, model.display_name, model.default_category_id, name_sim.label("score"))
-            .filter(or_(model.user_email == user_email, model.user_email.is_(None)))
-            .filter(or_(model.canonical_name.like(f"{q}%"), name_sim >= SUGGEST_MIN_SIMILARITY))
-            .all()
-        )
-
-        # Known aliases (e.g. seed variants like "cosco") — joined back to the
-        # canonical entity so a hit here still surfaces the right display_name,
-        # not the raw alias text.
-        alias_sim = func.similarity(EntityAlias.raw_key, q)
-        alias_rows = (
-            self.db.query(model.id, model.display_name, model.default_category_id, alias_sim.label("score"))
-            .join(EntityAlias, EntityAlias.entity_id == model.id)
-            .filter(EntityAlias.entity_type == entity_type)
-            .filter(or_(model.user_email == user_email, model.user_email.is_(None)))
-            .filter(or_(EntityAlias.raw_key.like(f"{q}%"), alias_sim >= SUGGEST_MIN_SIMILARITY))
-            .all()
-        )
-
-        best: Dict[str, Candidate] = {}
-        for entity_id, display_name, category_id, score in [*name_rows, *alias_rows]:
-            key = str(entity_id)
-            score = float(score)
-            if key not in best or score > best[key].score:
-                best[key] = Candidate(id=key, display_name=display_name, score=score, category_id=category_id)
-        return sorted(best.values(), key=lambda c: c.score, reverse=True)[:limit]
+        # Names and known aliases (e.g. seed variants like "cosco") starting
+        # with q or similar to it, from the user's and the global shard; an
+        # alias hit surfaces its canonical entity's display_name, not the raw
+        # alias text. Each shard memoizes its top matches per q, so this
+        # costs the same per keystroke however large the dictionary grows.
+        index = self._INDEXES[entity_type]
+        hits = index.suggest(self._shards(entity_type, user_email), q, SUGGEST_MIN_SIMILARITY, limit)
+        return [
+            Candidate(id=str(entity.id), display_name=entity.display_name, score=score, category_id=entity.category_id)
+            for entity, score in hits
+        ]
 
     # ------------------------------------------------------------------
     # Cascade — spec §6.2
@@ -208,47 +199,18 @@ class EntityResolutionService:
         if not raw_key:
             return ResolutionResult(status="new", canonical=None, candidates=[])
 
-        model = _MODEL_BY_TYPE[entity_type]
-
-        # Tier 1 — exact canonical_name match. Prefer the user's own entity
-        # over a same-named global one if somehow both exist (a user-scoped
-        # row represents a deliberate override of their own history).
-        exact = (
-            self.db.query(model)
-            .filter(model.canonical_name == raw_key)
-            .filter(or_(model.user_email == user_email, model.user_email.is_(None)))
-            .order_by((model.user_email == user_email).desc())
-            .first()
-        )
-        if exact is not None:
-            return ResolutionResult(status="linked", canonical=self._to_ref(exact))
-
-        # Tier 2 — known alias (this is the Resolution Pipeline's memory).
-        alias = (
-            self.db.query(EntityAlias)
-            .filter(EntityAlias.entity_type == entity_type, EntityAlias.raw_key == raw_key)
-            .filter(or_(EntityAlias.user_email == user_email, EntityAlias.user_email.is_(None)))
-            .order_by((EntityAlias.user_email == user_email).desc())
-            .first()
-        )
-        if alias is not None:
-            canonical = self.db.query(model).filter(model.id == alias.entity_id).first()
-            if canonical is not None:
-                return ResolutionResult(status="linked", canonical=self._to_ref(canonical))
-            logger.warning(
-                "Dangling alias %s -> missing %s %s (canonical entity was deleted); "
-                "falling through to trigram search", alias.id, entity_type, alias.entity_id,
-            )
+        shards = self._shards(entity_type, user_email)
+        known = self._known(entity_type, shards, raw_key, user_email)
+        if known is not None:
+            return ResolutionResult(status="linked", canonical=self._to_ref(known))
 
         # Tiers 3-5 share one trigram fetch, isolated in its own method
-        # specifically so it's mockable — SQLite (every unit test in this
-        # repo) has no pg_trgm/similarity(); real tier-3 behavior is only
-        # exercised by the Postgres E2E suite.
+        # specifically so it's mockable.
         candidates = self._fetch_trigram_candidates(raw_key, entity_type, user_email, limit=RESOLVE_TOPN)
 
         if candidates and candidates[0].score >= RESOLVE_HIGH:
             top = candidates[0]
-            canonical = self.db.query(model).filter(model.id == uuid.UUID(top.id)).first()
+            canonical = self._entity(entity_type, uuid.UUID(top.id))
             self._write_alias(entity_type, uuid.UUID(top.id), raw_key, user_email, source="auto_high", confidence=top.score)
             return ResolutionResult(status="linked", canonical=self._to_ref(canonical), candidates=candidates)
 
@@ -257,50 +219,271 @@ class EntityResolutionService:
             # (P1) before they become an alias.
             return ResolutionResult(status="suggested", canonical=None, candidates=candidates)
 
+        # The index may be behind another process's writes (it reloads every
+        # ENTITY_INDEX_TTL_SEC); ask the database before minting a duplicate.
+        stored = self._stored_match(entity_type, raw_key, user_email)
+        if stored is not None:
+            return ResolutionResult(status="linked", canonical=self._to_ref(stored), candidates=candidates)
+
         # Tier 5 — no match anywhere close; mint a new canonical entity.
         new_entity = self._create_canonical(entity_type, raw_key, raw, user_email, brand)
         self._write_alias(entity_type, new_entity.id, raw_key, user_email, source=source_hint, confidence=None)
         return ResolutionResult(status="new", canonical=self._to_ref(new_entity), candidates=candidates)
 
+    def resolve_many(
+        self,
+        names: Sequence[str],
+        entity_type: EntityType,
+        user_email: str,
+        source_hint: Literal["user", "llm", "backfill"] = "user",
+    ) -> List[ResolutionResult]:
+        """resolve() for a batch of one user's names, in input order.
+
+        Names are normalized and deduped; the keys tiers 1-2 cannot answer
+        from the index are looked up in the database with one IN query per
+        table (the tier-5 duplicate guard, done once for the batch); and the
+        aliases and canonicals tiers 3/5 produce are inserted with a single
+        commit. Keys are classified in order, so a key minted early in the
+        batch is a candidate for the keys after it, as it would be with
+        one resolve() per name. Those keys are scored from a batch-local
+        shard and reach the shared index only once the commit succeeds, so
+        no concurrent resolve() can link to a row that is not stored yet.
+        """
+        keys = [self.normalize(name, entity_type=entity_type) for name in names]
+        originals: Dict[str, str] = {}
+        for name, raw_key in zip(names, keys):
+            if raw_key:
+                originals.setdefault(raw_key, name)
+
+        index = self._INDEXES[entity_type]
+        shards = self._shards(entity_type, user_email)
+        unknown = [k for k in originals if index.exact(shards, k) is None and index.alias(shards, k) is None]
+        if unknown:
+            self._catch_up(entity_type, unknown, user_email)
+
+        model = _MODEL_BY_TYPE[entity_type]
+        new_entities: List[Union[CanonicalMerchant, CanonicalItem]] = []
+        new_aliases: List[EntityAlias] = []
+        # What this batch has written so far, unpublished until the commit.
+        batch = Shard()
+        batch_entities: Dict[uuid.UUID, IndexedEntity] = {}
+
+        def alias(entity: IndexedEntity, raw_key: str, source: str, confidence: Optional[float]) -> None:
+            new_aliases.append(EntityAlias(
+                id=uuid.uuid4(), user_email=user_email, entity_type=entity_type, entity_id=entity.id,
+                raw_key=raw_key, source=source, confidence=confidence, confirmed=False,
+            ))
+            batch_entities.setdefault(entity.id, entity)
+            batch.add_key(raw_key, entity.id, keep_sorted=False)
+
+        def candidates_for(raw_key: str) -> List[Candidate]:
+            found = {c.id: c for c in self._fetch_trigram_candidates(raw_key, entity_type, user_email, limit=RESOLVE_TOPN)}
+            for entity_id, score in batch.scores(trigrams(raw_key)).items():
+                entity = batch_entities[entity_id]
+                if score >= RESOLVE_LOW and score > (found[str(entity_id)].score if str(entity_id) in found else 0.0):
+                    found[str(entity_id)] = Candidate(
+                        id=str(entity_id), display_name=entity.display_name, score=score, category_id=entity.category_id,
+                    )
+            return sorted(found.values(), key=lambda c: (-c.score, c.display_name))[:RESOLVE_TOPN]
+
+        resolved: Dict[str, ResolutionResult] = {}
+        for raw_key, raw in originals.items():
+            known = self._known(entity_type, shards, raw_key, user_email)
+            if known is not None:
+                resolved[raw_key] = ResolutionResult(status="linked", canonical=self._to_ref(known))
+                continue
+            candidates = candidates_for(raw_key)
+            if candidates and candidates[0].score >= RESOLVE_HIGH:
+                top = candidates[0]
+                top_id = uuid.UUID(top.id)
+                canonical = batch_entities.get(top_id) or self._entity(entity_type, top_id)
+                alias(canonical, raw_key, "auto_high", top.score)
+                resolved[raw_key] = ResolutionResult(status="linked", canonical=self._to_ref(canonical), candidates=candidates)
+            elif candidates and candidates[0].score >= RESOLVE_LOW:
+                resolved[raw_key] = ResolutionResult(status="suggested", canonical=None, candidates=candidates)
+            else:
+                entity = model(
+                    id=uuid.uuid4(), user_email=user_email, canonical_name=raw_key,
+                    display_name=raw.strip(), is_global=False,
+                )
+                new_entities.append(entity)
+                alias(self._indexed(entity), raw_key, source_hint, None)
+                resolved[raw_key] = ResolutionResult(status="new", canonical=self._to_ref(entity), candidates=candidates)
+
+        if new_entities or new_aliases:
+            try:
+                self.db.add_all(new_entities)
+                self.db.add_all(new_aliases)
+                self.db.commit()
+            except Exception:
+                # Most likely another process stored one of these keys first:
+                # start over from the database, one name at a time.
+                self.db.rollback()
+                logger.warning(
+                    "Bulk resolve of %d %s names for %s failed; resolving one by one",
+                    len(originals), entity_type, user_email, exc_info=True,
+                )
+                return [self.resolve(name, entity_type, user_email, source_hint=source_hint) for name in names]
+            for entity in new_entities:
+                index.add_entity(self._indexed(entity), user_email)
+            for new_alias in new_aliases:
+                index.add_alias(new_alias.raw_key, new_alias.entity_id, user_email)
+
+        empty = ResolutionResult(status="new", canonical=None, candidates=[])
+        return [resolved[k] if k else empty for k in keys]
+
+    def index_canonical(self, entity_type: EntityType, entity: Union[CanonicalMerchant, CanonicalItem]) -> None:
+        """Makes a canonical entity committed outside resolve() (e.g. the
+        POST /canonical/* endpoints) resolvable from this process at once."""
+        self._INDEXES[entity_type].add_entity(self._indexed(entity), entity.user_email)
+
+    @classmethod
+    def reset_index(cls) -> None:
+        for index in cls._INDEXES.values():
+            index.clear()
+
     # ------------------------------------------------------------------
     # Helpers
     # ------------------------------------------------------------------
-    def _fetch_trigram_candidates(
-        self, raw_key: str, entity_type: EntityType, user_email: str, limit: int = RESOLVE_TOPN,
-    ) -> List[Candidate]:
+    def _shards(self, entity_type: EntityType, user_email: str) -> List[Shard]:
+        """The user's shard, then the global one — loading either that is
+        missing or older than ENTITY_INDEX_TTL_SEC."""
+        index = self._INDEXES[entity_type]
+        shards = []
+        for scope in (user_email, None):
+            shard = index.shard(scope, self.index_ttl_sec)
+            if shard is None:
+                shard = self._load_shard(entity_type, scope)
+            shards.append(shard)
+        return shards
+
+    def _load_shard(self, entity_type: EntityType, user_email: Optional[str]) -> Shard:
         model = _MODEL_BY_TYPE[entity_type]
-        sim = func.similarity(model.canonical_name, raw_key)
-        try:
-            # SAVEPOINT so a missing pg_trgm extension only aborts this one
-            # query, not the caller's whole transaction (resolve() is called
-            # from insights_aggregation_service mid-write, with an
-            # already-flushed-but-uncommitted row on the session).
-            with self.db.begin_nested():
-                rows = (
-                    self.db.query(model, sim.label("score"))
-                    .filter(or_(model.user_email == user_email, model.user_email.is_(None)))
-                    .filter(sim >= RESOLVE_LOW)
-                    .order_by(sim.desc())
-                    .limit(limit)
-                    .all()
-                )
-        except DBAPIError:
-            # similarity() undefined (e.g. SQLite in tests/local dev without
-            # pg_trgm) — degrade to "no fuzzy candidates" so resolve() still
-            # falls through to tier 5 instead of hard-crashing every caller.
+        owner = model.user_email.is_(None) if user_email is None else model.user_email == user_email
+        alias_owner = EntityAlias.user_email.is_(None) if user_email is None else EntityAlias.user_email == user_email
+        entities = [
+            IndexedEntity(id=entity_id, canonical_name=canonical_name, display_name=display_name, category_id=category_id)
+            for entity_id, canonical_name, display_name, category_id in (
+                self.db.query(model.id, model.canonical_name, model.display_name, model.default_category_id)
+                .filter(owner)
+                .all()
+            )
+        ]
+        aliases = (
+            self.db.query(EntityAlias.raw_key, EntityAlias.entity_id)
+            .filter(EntityAlias.entity_type == entity_type, alias_owner)
+            .all()
+        )
+        return self._INDEXES[entity_type].load(user_email, entities, aliases)
+
+    def _known(
+        self, entity_type: EntityType, shards: List[Shard], raw_key: str, user_email: str,
+    ) -> Optional[IndexedEntity]:
+        """Tiers 1-2 against the index (and the results LRU in front of it)."""
+        index = self._INDEXES[entity_type]
+        cached = index.cached_result(user_email, raw_key)
+        if cached is not None:
+            return cached
+
+        # Tier 1 — exact canonical_name match. Prefer the user's own entity
+        # over a same-named global one if somehow both exist (a user-scoped
+        # row represents a deliberate override of their own history); the
+        # user's shard comes first in `shards` for exactly that reason.
+        exact_id = index.exact(shards, raw_key)
+        if exact_id is not None:
+            exact = index.entities[exact_id]
+            index.cache_result(user_email, raw_key, exact)
+            return exact
+
+        # Tier 2 — known alias (this is the Resolution Pipeline's memory).
+        alias_target = index.alias(shards, raw_key)
+        if alias_target is not None:
+            canonical = self._entity(entity_type, alias_target)
+            if canonical is not None:
+                index.cache_result(user_email, raw_key, canonical)
+                return canonical
             logger.warning(
-                "Trigram similarity() unavailable while resolving %s '%s'; treating as no candidates",
-                entity_type, raw_key,
+                "Dangling alias '%s' -> missing %s %s (canonical entity was deleted); "
+                "falling through to trigram search", raw_key, entity_type, alias_target,
             )
-            return []
+        return None
+
+    def _entity(self, entity_type: EntityType, entity_id: uuid.UUID) -> Optional[IndexedEntity]:
+        index = self._INDEXES[entity_type]
+        entity = index.entities.get(entity_id)
+        if entity is not None:
+            return entity
+        # An alias may point outside the loaded shards (or at a row this
+        # process has not seen yet); the database has the final word.
+        model = _MODEL_BY_TYPE[entity_type]
+        row = self.db.query(model).filter(model.id == entity_id).first()
+        if row is None:
+            return None
+        entity = self._indexed(row)
+        index.add_entity(entity, row.user_email)
+        return entity
+
+    def _stored_match(self, entity_type: EntityType, raw_key: str, user_email: str) -> Optional[IndexedEntity]:
+        """Tiers 1-2 against the database itself, for the tier-5 guard."""
+        model = _MODEL_BY_TYPE[entity_type]
+        index = self._INDEXES[entity_type]
+        exact = (
+            self.db.query(model)
+            .filter(model.canonical_name == raw_key)
+            .filter(or_(model.user_email == user_email, model.user_email.is_(None)))
+            .order_by((model.user_email == user_email).desc())
+            .first()
+        )
+        if exact is not None:
+            entity = self._indexed(exact)
+            index.add_entity(entity, exact.user_email)
+            return entity
+        alias = (
+            self.db.query(EntityAlias)
+            .filter(EntityAlias.entity_type == entity_type, EntityAlias.raw_key == raw_key)
+            .filter(or_(EntityAlias.user_email == user_email, EntityAlias.user_email.is_(None)))
+            .order_by((EntityAlias.user_email == user_email).desc())
+            .first()
+        )
+        if alias is None:
+            return None
+        entity = self._entity(entity_type, alias.entity_id)
+        if entity is not None:
+            index.add_alias(raw_key, alias.entity_id, alias.user_email)
+        return entity
+
+    def _catch_up(self, entity_type: EntityType, raw_keys: List[str], user_email: str) -> None:
+        """_stored_match() for a batch: indexes whatever names or aliases
+        among `raw_keys` the database has and the index does not."""
+        model = _MODEL_BY_TYPE[entity_type]
+        index = self._INDEXES[entity_type]
+        rows = (
+            self.db.query(model)
+            .filter(model.canonical_name.in_(raw_keys))
+            .filter(or_(model.user_email == user_email, model.user_email.is_(None)))
+            .all()
+        )
+        for row in rows:
+            index.add_entity(self._indexed(row), row.user_email)
+        aliases = (
+            self.db.query(EntityAlias.raw_key, EntityAlias.entity_id, EntityAlias.user_email)
+            .filter(EntityAlias.entity_type == entity_type, EntityAlias.raw_key.in_(raw_keys))
+            .filter(or_(EntityAlias.user_email == user_email, EntityAlias.user_email.is_(None)))
+            .all()
+        )
+        for raw_key, entity_id, owner in aliases:
+            index.add_alias(raw_key, entity_id, owner)
+
+    def _fetch_trigram_candidates(
+        self, raw_key: str, entity_type: EntityType, user_email: str, limit: int = RESOLVE_TOPN,
+    ) -> List[Candidate]:
+        # Scored in process against canonical names and aliases alike, with
+        # pg_trgm's similarity() — so SQLite resolves exactly like Postgres.
+        index = self._INDEXES[entity_type]
+        hits = index.search(self._shards(entity_type, user_email), raw_key, RESOLVE_LOW, limit)
         return [
-            Candidate(
-                id=str(entity.id),
-                display_name=entity.display_name,
-                score=float(score),
-                category_id=entity.default_category_id,
-            )
-            for entity, score in rows
+            Candidate(id=str(entity.id), display_name=entity.display_name, score=score, category_id=entity.category_id)
+            for entity, score in hits
         ]
 
     def _write_alias(
@@ -322,6 +505,7 @@ class EntityResolutionService:
             .first()
         )
         if existing is not None:
+            self._INDEXES[entity_type].add_alias(raw_key, existing.entity_id, user_email)
             return existing
         alias = EntityAlias(
             id=uuid.uuid4(),
@@ -335,6 +519,7 @@ class EntityResolutionService:
         )
         self.db.add(alias)
         self.db.commit()
+        self._INDEXES[entity_type].add_alias(raw_key, entity_id, user_email)
         return alias
 
     def _create_canonical(
@@ -359,11 +544,21 @@ class EntityResolutionService:
         self.db.add(entity)
         self.db.commit()
         self.db.refresh(entity)
+        self.index_canonical(entity_type, entity)
         return entity
 
-    def _to_ref(self, entity: Union[CanonicalMerchant, CanonicalItem]) -> CanonicalRef:
+    @staticmethod
+    def _indexed(entity: Union[CanonicalMerchant, CanonicalItem]) -> IndexedEntity:
+        return IndexedEntity(
+            id=entity.id,
+            canonical_name=entity.canonical_name,
+            display_name=entity.display_name,
+            category_id=entity.default_category_id,
+        )
+
+    def _to_ref(self, entity: Union[CanonicalMerchant, CanonicalItem, IndexedEntity]) -> CanonicalRef:
         return CanonicalRef(
             id=str(entity.id),
             display_name=entity.display_name,
-            category_id=entity.default_category_id,
+            category_id=entity.category_id if isinstance(entity, IndexedEntity) else entity.default_category_id,
         )
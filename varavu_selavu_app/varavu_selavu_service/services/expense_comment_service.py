@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from varavu_selavu_service.db.models import Expense, ExpenseComment, GroupMember
 from varavu_selavu_service.services.group_service import GroupService
+from varavu_selavu_service.services.notification_service import NotificationService
 
 
 def _to_uuid(value) -> Optional[uuid.UUID]:
@@ -61,7 +62,8 @@ class ExpenseCommentService:
         )
         return [self._dto(c, m) for c, m in rows]
 
-    def add_comment(self, group_id: str, expense_id: str, actor_email: str, body: str) -> Dict:
+    def add_comment(self, group_id: str, expense_id: str, actor_email: str, body: str, notify: bool = False) -> Dict:
+        """With notify, the comment_added push event is queued in the same commit."""
         member = self.group_service.require_membership(group_id, actor_email)
         gid, eid = _to_uuid(group_id), _to_uuid(expense_id)
         self._get_expense_or_404(gid, eid)
@@ -71,6 +73,13 @@ class ExpenseCommentService:
 
         comment = ExpenseComment(id=uuid.uuid4(), expense_id=eid, member_id=member.id, body=body.strip())
         self.db.add(comment)
+        if notify:
+            NotificationService(self.db).enqueue(
+                group_id=gid,
+                actor_email=actor_email,
+                event_type="comment_added",
+                description=comment.body[:80],
+            )
         self.db.commit()
         self.db.refresh(comment)
         return self._dto(comment, member)
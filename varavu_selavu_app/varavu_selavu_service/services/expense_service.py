@@ -6,12 +6,26 @@ import uuid
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from varavu_selavu_service.db.models import Expense
+from varavu_selavu_service.services import insights_outbox
+from varavu_selavu_service.services.date_scope import DateScope
+from varavu_selavu_service.services.keyset import listing_page
 
 class ExpenseService:
     def __init__(self, db: Session):
         self.db = db
 
-    def add_expense(self, user_id: str, date: Union[str, date_type], description: str, category: str, cost: float, merchant_name: Optional[str] = None) -> Dict:
+    def add_expense(
+        self,
+        user_id: str,
+        date: Union[str, date_type],
+        description: str,
+        category: str,
+        cost: float,
+        merchant_name: Optional[str] = None,
+        queue_insights: bool = False,
+    ) -> Dict:
+        """With queue_insights, the insight aggregation event for the new expense
+        is queued (services/insights_outbox.py) in the same commit."""
         if isinstance(date, date_type):
             date_str = date.strftime("%m/%d/%Y")
         else:
@@ -49,6 +63,11 @@ class ExpenseService:
             line_total=cost,
         )
         self.db.add(proxy_item)
+        if queue_insights:
+            insights_outbox.enqueue(
+                self.db, "simple_expense_created",
+                user_email=user_id, merchant_name=merchant_name, purchased_at=purchased_at, amount=cost,
+            )
         self.db.commit()
         
         return {
@@ -61,7 +80,7 @@ class ExpenseService:
             "merchant_name": merchant_name,
         }
 
-    def delete_expense(self, row_id: Union[int, str]) -> Optional[Dict]:
+    def delete_expense(self, row_id: Union[int, str], queue_insights: bool = False) -> Optional[Dict]:
         try:
             parsed_id = uuid.UUID(str(row_id))
         except ValueError:
@@ -89,13 +108,52 @@ class ExpenseService:
             ]
             
             self.db.delete(expense)
+            if queue_insights:
+                insights_outbox.enqueue(self.db, "expense_deleted", **deleted_data)
             self.db.commit()
             return deleted_data
         return None
 
-    def get_expenses_for_user(self, user_id: str) -> List[Dict]:
-        expenses = self.db.query(Expense).filter(Expense.user_email == user_id, Expense.group_id.is_(None)).order_by(Expense.purchased_at.desc()).all()
+    def get_expenses_for_user(self, user_id: str, dates: Optional[DateScope] = None) -> List[Dict]:
+        query = self.db.query(Expense).filter(Expense.user_email == user_id, Expense.group_id.is_(None))
+        if dates is not None:
+            query = query.filter(*dates.filters(Expense.purchased_at))
+        expenses = query.order_by(Expense.purchased_at.desc()).all()
+        return self._rows(user_id, expenses)
+
+    def list_expenses_page(
+        self,
+        user_id: str,
+        limit: int = 30,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        dates: Optional[DateScope] = None,
+        category: Optional[str] = None,
+        merchant: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+    ) -> Dict:
+        """One page of the user's personal expenses, newest first (undated last),
+        filtered in SQL. Pages by keyset when given a cursor (or on the first page)
+        and by offset otherwise, so offset-paging clients keep working; the response
+        carries both next_cursor and, in offset mode, next_offset.
+        Raises ValueError on a malformed cursor."""
+        query = self.db.query(Expense).filter(Expense.user_email == user_id, Expense.group_id.is_(None))
+        if dates is not None:
+            query = query.filter(*dates.filters(Expense.purchased_at))
+        if category:
+            query = query.filter(Expense.category_id == category)
+        if merchant and merchant.strip():
+            query = query.filter(func.lower(func.trim(Expense.merchant_name)) == merchant.strip().lower())
+        if min_amount is not None:
+            query = query.filter(Expense.amount >= min_amount)
+        if max_amount is not None:
+            query = query.filter(Expense.amount <= max_amount)
 
+        expenses, next_cursor, next_offset = listing_page(query, Expense.purchased_at, Expense.id, limit, offset, cursor)
+        return {"items": self._rows(user_id, expenses), "next_cursor": next_cursor, "next_offset": next_offset}
+
+    def _rows(self, user_id: str, expenses: List[Expense]) -> List[Dict]:
         from varavu_selavu_service.db.models import ExpenseItem
         expense_ids = [r.id for r in expenses]
         item_counts: Dict[str, int] = {}
@@ -134,6 +192,7 @@ class ExpenseService:
         category: str,
         cost: float,
         merchant_name: Optional[str] = None,
+        queue_insights: bool = False,
     ) -> tuple[Dict, Optional[Dict]]:
         if isinstance(date, date_type):
             date_str = date.strftime("%m/%d/%Y")
@@ -189,6 +248,17 @@ class ExpenseService:
                 )
                 self.db.add(proxy_item)
 
+            if queue_insights:
+                insights_outbox.enqueue(
+                    self.db, "simple_expense_updated",
+                    user_email=user_id,
+                    old_merchant_name=old_expense_data["merchant_name"],
+                    old_amount=old_expense_data["amount"],
+                    old_purchased_at=old_expense_data["purchased_at"],
+                    new_merchant_name=merchant_name,
+                    new_amount=cost,
+                    new_purchased_at=purchased_at,
+                )
             self.db.commit()
             
         return {
@@ -1,11 +1,12 @@
 import uuid
+from decimal import Decimal
 from typing import Dict, List, Optional
 
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from varavu_selavu_service.db.models import GroupMember
+from varavu_selavu_service.db.models import Group, GroupBalance, GroupMember, GroupPairBalance
 from varavu_selavu_service.services.balance_service import BalanceService
-from varavu_selavu_service.services.group_service import GroupService
 
 
 def _to_uuid(value) -> Optional[uuid.UUID]:
@@ -18,9 +19,10 @@ def _to_uuid(value) -> Optional[uuid.UUID]:
 class FriendBalanceService:
     """TS-GRP-128: total owed to/from a person across all shared groups.
 
-    Built on top of BalanceService._pairwise_transfers (per-group directed
-    debtor->creditor amounts) rather than a new table — this just aggregates
-    those across every group the caller shares with each counterparty.
+    Reads the maintained `group_pair_balances` index (TS-GRP-135), so the whole view
+    is a fixed handful of indexed queries no matter how many groups or expenses the
+    caller has. Groups that have never been materialized fall back to one bulk
+    BalanceService._pairwise_transfers_for_groups ledger walk.
 
     Registered counterparties (stable user_email) are aggregated across groups.
     Placeholder members have no stable identity across groups, so they are
@@ -29,54 +31,85 @@ class FriendBalanceService:
 
     def __init__(self, db: Session):
         self.db = db
-        self.group_service = GroupService(db)
         self.balance_service = BalanceService(db)
 
     def get_friend_balances(self, user_email: str) -> List[Dict]:
-        groups = self.group_service.list_groups_for_user(user_email)
-        agg: Dict[str, Dict] = {}
-
-        for g in groups:
-            group_id = g["group_id"]
-            gid = _to_uuid(group_id)
-            my_member = self.group_service.get_member_by_email(group_id, user_email)
-            if my_member is None or gid is None:
-                continue
+        # My active seat in every active group, in one query.
+        seats = (
+            self.db.query(Group.id, Group.name, GroupMember.id)
+            .join(GroupMember, GroupMember.group_id == Group.id)
+            .filter(GroupMember.user_email == user_email, GroupMember.status == "active", Group.status == "active")
+            .all()
+        )
+        if not seats:
+            return []
+        group_names = {gid: name for gid, name, _ in seats}
+        my_members = {gid: member_id for gid, _, member_id in seats}
+
+        materialized = {
+            gid
+            for (gid,) in self.db.query(GroupBalance.group_id)
+            .filter(GroupBalance.group_id.in_(list(my_members)))
+            .distinct()
+            .all()
+        }
+
+        # (group_id, counterparty_member_id) -> net, positive = they owe me.
+        deltas: Dict[tuple, Decimal] = {}
+
+        my_ids = [my_members[gid] for gid in materialized]
+        if my_ids:
+            for gid, a, b, net in (
+                self.db.query(GroupPairBalance.group_id, GroupPairBalance.member_a_id, GroupPairBalance.member_b_id, GroupPairBalance.net)
+                .filter(or_(GroupPairBalance.member_a_id.in_(my_ids), GroupPairBalance.member_b_id.in_(my_ids)))
+                .all()
+            ):
+                if my_members.get(gid) == a:
+                    deltas[(gid, b)] = deltas.get((gid, b), Decimal("0.00")) - Decimal(str(net))  # I owe them
+                elif my_members.get(gid) == b:
+                    deltas[(gid, a)] = deltas.get((gid, a), Decimal("0.00")) + Decimal(str(net))  # they owe me
+
+        unmaterialized = [gid for gid in my_members if gid not in materialized]
+        if unmaterialized:
+            for gid, transfers in self.balance_service._pairwise_transfers_for_groups(unmaterialized).items():
+                my_id = str(my_members[gid])
+                for t in transfers:
+                    if t["from_member_id"] == my_id:
+                        key, delta = (gid, uuid.UUID(t["to_member_id"])), -Decimal(str(t["amount"]))
+                    elif t["to_member_id"] == my_id:
+                        key, delta = (gid, uuid.UUID(t["from_member_id"])), Decimal(str(t["amount"]))
+                    else:
+                        continue
+                    deltas[key] = deltas.get(key, Decimal("0.00")) + delta
+
+        counterparty_ids = {member_id for (_, member_id), net in deltas.items() if net != 0}
+        if not counterparty_ids:
+            return []
+        member_map = {
+            m.id: m for m in self.db.query(GroupMember).filter(GroupMember.id.in_(list(counterparty_ids))).all()
+        }
 
-            transfers = self.balance_service._pairwise_transfers(gid)
-            if not transfers:
+        agg: Dict[str, Dict] = {}
+        for (gid, counterparty_id), net in deltas.items():
+            counterparty = member_map.get(counterparty_id)
+            if counterparty is None or net == 0:
                 continue
-
-            members = self.db.query(GroupMember).filter(GroupMember.group_id == gid).all()
-            member_map = {str(m.id): m for m in members}
-            my_id = str(my_member.id)
-
-            for t in transfers:
-                from_id, to_id, amount = t["from_member_id"], t["to_member_id"], t["amount"]
-                if from_id == my_id:
-                    counterparty_id, delta = to_id, -amount  # I owe them
-                elif to_id == my_id:
-                    counterparty_id, delta = from_id, amount  # they owe me
-                else:
-                    continue
-
-                counterparty = member_map.get(counterparty_id)
-                if counterparty is None or delta == 0:
-                    continue
-
-                # Registered members aggregate by email; placeholders are scoped to
-                # this one group so they never merge with an unrelated placeholder.
-                key = counterparty.user_email or f"__placeholder__:{group_id}:{counterparty_id}"
-
-                if key not in agg:
-                    agg[key] = {
-                        "counterparty_email": counterparty.user_email,
-                        "counterparty_display_name": counterparty.display_name,
-                        "net": 0.0,
-                        "groups": {},
-                    }
-                agg[key]["net"] += delta
-                agg[key]["groups"][group_id] = agg[key]["groups"].get(group_id, 0.0) + delta
+            group_id = str(gid)
+            delta = float(net)
+
+            # Registered members aggregate by email; placeholders are scoped to
+            # this one group so they never merge with an unrelated placeholder.
+            key = counterparty.user_email or f"__placeholder__:{group_id}:{counterparty_id}"
+
+            if key not in agg:
+                agg[key] = {
+                    "counterparty_email": counterparty.user_email,
+                    "counterparty_display_name": counterparty.display_name,
+                    "net": 0.0,
+                    "groups": {},
+                }
+            agg[key]["net"] += delta
+            agg[key]["groups"][group_id] = agg[key]["groups"].get(group_id, 0.0) + delta
 
         results = []
         for entry in agg.values():
@@ -87,17 +120,10 @@ class FriendBalanceService:
                 "counterparty_display_name": entry["counterparty_display_name"],
                 "net": round(entry["net"], 2),
                 "groups": [
-                    {"group_id": gid_, "name": self._group_name(gid_, groups), "net": round(net_, 2)}
+                    {"group_id": gid_, "name": group_names.get(uuid.UUID(gid_), ""), "net": round(net_, 2)}
                     for gid_, net_ in entry["groups"].items()
                     if round(net_, 2) != 0.0
                 ],
             })
         results.sort(key=lambda r: abs(r["net"]), reverse=True)
         return results
-
-    @staticmethod
-    def _group_name(group_id: str, groups: List[Dict]) -> str:
-        for g in groups:
-            if g["group_id"] == group_id:
-                return g["name"]
-        return ""
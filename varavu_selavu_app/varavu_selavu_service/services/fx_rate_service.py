@@ -1,17 +1,66 @@
 import logging
+import threading
 import uuid
-from datetime import date as date_type, datetime, timezone
-from decimal import Decimal
-from typing import Optional
+from collections import OrderedDict
+from datetime import date as date_type, datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
 
 import requests
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from varavu_selavu_service.core.config import Settings
-from varavu_selavu_service.db.models import FxRate
+from varavu_selavu_service.db.models import Expense, FxRate, Group
 
 logger = logging.getLogger("varavu_selavu.fx_rate")
 
+RateKey = Tuple[date_type, str, str]  # (rate_date, from_currency, to_currency)
+
+
+def _today() -> date_type:
+    return datetime.now(timezone.utc).date()
+
+
+class _RateCache:
+    """Bounded, thread-safe LRU of (rate_date, from, to) -> rate. A stored rate is
+    a historical fact, so entries never go stale; they only fall out by size."""
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[RateKey, Decimal]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: RateKey) -> Optional[Decimal]:
+        with self._lock:
+            rate = self._entries.get(key)
+            if rate is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rate
+
+    def put_many(self, rates: Dict[RateKey, Decimal]) -> None:
+        with self._lock:
+            for key, rate in rates.items():
+                self._entries[key] = rate
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def _start_thread(fn: Callable[[], None]) -> None:
+    threading.Thread(target=fn, name="fx-rate-revalidate", daemon=True).start()
+
 
 class FxRateService:
     """TS-GRP-131: daily-granularity FX rate lookup with a DB-backed cache.
@@ -19,8 +68,24 @@ class FxRateService:
     Rates are looked up once per (date, from, to) triple and never
     recomputed — an expense's FX rate is a historical fact, snapshotted at
     creation time on `Expense.fx_rate_to_group_currency`.
+
+    Lookups go through a process-wide LRU in front of the fx_rates table. The
+    provider is asked for a whole base currency at a time (load_rates), so one
+    call fills every pair from that base. When today's rate is missing but one
+    from the last FX_RATE_STALE_DAYS is stored, that rate is served at once and
+    today's is fetched in the background (stale-while-revalidate); the request
+    only waits on the provider when nothing recent is stored. The refresher
+    (run_refresher_in_thread / scripts/refresh_fx_rates.py) pre-warms today's
+    rates for every currency active groups use, so that wait is rare, and
+    FX_RATE_OFFLINE serves whatever is stored (import_rates) without ever
+    calling the provider.
     """
 
+    _CACHE = _RateCache()
+    _revalidating: Set[Tuple[date_type, str]] = set()
+    _revalidating_lock = threading.Lock()
+    _spawn = staticmethod(_start_thread)  # tests run revalidation inline
+
     def __init__(self, db: Session):
         self.db = db
         self.settings = Settings()
@@ -31,53 +96,179 @@ class FxRateService:
         if from_currency == to_currency:
             return Decimal("1.0")
 
-        rate_date = as_of or datetime.now(timezone.utc).date()
+        rate_date = as_of or _today()
+        key = (rate_date, from_currency, to_currency)
+        cached = self._CACHE.get(key)
+        if cached is not None:
+            return cached
+
+        stored = self._stored_rate(rate_date, from_currency, to_currency)
+        if stored is not None:
+            self._CACHE.put_many({key: stored})
+            return stored
+
+        if self.settings.FX_RATE_OFFLINE:
+            earlier = self._earlier_rate(rate_date, from_currency, to_currency)
+            if earlier is not None:
+                return earlier
+            logger.error("No stored FX rate for %s->%s on or before %s (offline); using 1:1", from_currency, to_currency, rate_date)
+            return Decimal("1.0")
 
-        cached = (
-            self.db.query(FxRate)
+        stale = self._earlier_rate(rate_date, from_currency, to_currency, max_age_days=self.settings.FX_RATE_STALE_DAYS)
+        if stale is not None:
+            self._revalidate(from_currency, rate_date)
+            return stale
+
+        rate = self.load_rates(from_currency, rate_date).get(to_currency)
+        if rate is None:
+            # A lookup failure must never block expense creation — fall back to a
+            # 1:1 rate and log loudly so it's visible in ops, not silently wrong.
+            # The fallback is not stored, so the next lookup asks again.
+            logger.error("FX rate lookup failed for %s->%s; falling back to 1:1", from_currency, to_currency)
+            return Decimal("1.0")
+        return rate
+
+    def load_rates(self, base_currency: str, rate_date: Optional[date_type] = None) -> Dict[str, Decimal]:
+        """Fetches every rate from `base_currency` in one provider call, stores them
+        under `rate_date` (today by default) and caches them. Returns {} if the
+        provider fails."""
+        base_currency = base_currency.upper()
+        rate_date = rate_date or _today()
+        rates = self._fetch_rates(base_currency)
+        if rates:
+            self._upsert({(rate_date, base_currency, to): rate for to, rate in rates.items()})
+        return rates
+
+    def import_rates(self, rows: Iterable[Tuple[date_type, str, str, Decimal]]) -> int:
+        """Stores (rate_date, from, to, rate) rows, e.g. from an offline rate table;
+        rows for a (date, pair) already stored are left alone. Returns how many
+        rows were new."""
+        rates = {
+            (rate_date, from_currency.upper(), to_currency.upper()): Decimal(str(rate))
+            for rate_date, from_currency, to_currency, rate in rows
+        }
+        return self._upsert(rates)
+
+    def refresh_active_currencies(self, rate_date: Optional[date_type] = None) -> Dict[str, int]:
+        """Loads `rate_date`'s (today's) rates for every currency an active group
+        uses, as group currency or expense currency, skipping bases already
+        loaded. Returns {base: rates loaded}."""
+        rate_date = rate_date or _today()
+        active_groups = select(Group.id).where(Group.status == "active")
+        currencies = {c for (c,) in self.db.query(Group.currency).filter(Group.status == "active").distinct()}
+        currencies |= {
+            c
+            for (c,) in self.db.query(Expense.currency)
+            .filter(Expense.group_id.in_(active_groups), Expense.currency.isnot(None))
+            .distinct()
+        }
+        loaded = {c for (c,) in self.db.query(FxRate.from_currency).filter(FxRate.rate_date == rate_date).distinct()}
+        return {
+            base: len(self.load_rates(base, rate_date))
+            for base in sorted({c.upper() for c in currencies} - loaded)
+        }
+
+    def _stored_rate(self, rate_date: date_type, from_currency: str, to_currency: str) -> Optional[Decimal]:
+        rate = (
+            self.db.query(FxRate.rate)
             .filter(FxRate.rate_date == rate_date, FxRate.from_currency == from_currency, FxRate.to_currency == to_currency)
-            .first()
+            .scalar()
         )
-        if cached is not None:
-            return Decimal(str(cached.rate))
-
-        rate = self._fetch_rate(from_currency, to_currency)
-        row = FxRate(
-            id=uuid.uuid4(),
-            rate_date=rate_date,
-            from_currency=from_currency,
-            to_currency=to_currency,
-            rate=rate,
+        return Decimal(str(rate)) if rate is not None else None
+
+    def _earlier_rate(
+        self, rate_date: date_type, from_currency: str, to_currency: str, max_age_days: Optional[int] = None
+    ) -> Optional[Decimal]:
+        query = self.db.query(FxRate.rate).filter(
+            FxRate.from_currency == from_currency, FxRate.to_currency == to_currency, FxRate.rate_date < rate_date
         )
-        self.db.add(row)
-        try:
-            self.db.commit()
-        except Exception:
-            # Another concurrent request may have inserted the same (date, pair) row
-            # first (unique constraint) — that's fine, just re-read it.
-            self.db.rollback()
-            existing = (
-                self.db.query(FxRate)
-                .filter(FxRate.rate_date == rate_date, FxRate.from_currency == from_currency, FxRate.to_currency == to_currency)
-                .first()
-            )
-            if existing is not None:
-                return Decimal(str(existing.rate))
-        return rate
+        if max_age_days is not None:
+            query = query.filter(FxRate.rate_date >= rate_date - timedelta(days=max_age_days))
+        rate = query.order_by(FxRate.rate_date.desc()).limit(1).scalar()
+        return Decimal(str(rate)) if rate is not None else None
+
+    def _revalidate(self, base_currency: str, rate_date: date_type) -> None:
+        """Loads `base_currency`'s rates for `rate_date` on a background thread with
+        its own session, at most once at a time per (date, base)."""
+        flight = (rate_date, base_currency)
+        with self._revalidating_lock:
+            if flight in self._revalidating:
+                return
+            self._revalidating.add(flight)
+        bind = self.db.get_bind()
+
+        def refresh() -> None:
+            try:
+                with Session(bind=bind) as db:
+                    FxRateService(db).load_rates(base_currency, rate_date)
+            except Exception:
+                logger.exception("Background FX refresh failed for %s", base_currency)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(flight)
 
-    def _fetch_rate(self, from_currency: str, to_currency: str) -> Decimal:
+        self._spawn(refresh)
+
+    def _upsert(self, rates: Dict[RateKey, Decimal]) -> int:
+        if not rates:
+            return 0
+        if self.db.get_bind().dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        values = [
+            {"id": uuid.uuid4(), "rate_date": d, "from_currency": f, "to_currency": t, "rate": rate}
+            for (d, f, t), rate in rates.items()
+        ]
+        inserted = 0
+        for start in range(0, len(values), 1000):
+            # Another process may have stored the same (date, pair) first — the
+            # unique constraint keeps theirs, which is the same day's rate.
+            result = self.db.execute(dialect_insert(FxRate).values(values[start : start + 1000]).on_conflict_do_nothing())
+            inserted += max(result.rowcount or 0, 0)
+        self.db.commit()
+        self._CACHE.put_many(rates)
+        return inserted
+
+    def _fetch_rates(self, base_currency: str) -> Dict[str, Decimal]:
         try:
-            resp = requests.get(f"{self.settings.FX_RATE_API_URL}/{from_currency}", timeout=5)
+            resp = requests.get(f"{self.settings.FX_RATE_API_URL}/{base_currency}", timeout=5)
             resp.raise_for_status()
-            data = resp.json()
-            rate = data.get("rates", {}).get(to_currency)
-            if rate is None:
-                raise ValueError(f"No rate for {to_currency} in provider response")
-            return Decimal(str(rate))
+            rates = {}
+            for code, value in (resp.json().get("rates") or {}).items():
+                if code.upper() == base_currency:
+                    continue
+                try:
+                    rates[code.upper()] = Decimal(str(value))
+                except InvalidOperation:
+                    continue
+            if not rates:
+                raise ValueError(f"No rates for {base_currency} in provider response")
+            return rates
         except Exception:
-            # A lookup failure must never block expense creation — fall back to a
-            # 1:1 rate and log loudly so it's visible in ops, not silently wrong.
-            logger.exception(
-                "FX rate lookup failed for %s->%s; falling back to 1:1", from_currency, to_currency
-            )
-            return Decimal("1.0")
+            logger.exception("FX rate fetch failed for base %s", base_currency)
+            return {}
+
+
+def run_refresher_in_thread(session_factory, settings: Optional[Settings] = None) -> Tuple[threading.Thread, threading.Event]:
+    """Pre-warms today's rates for active groups' currencies now and then every
+    FX_RATE_REFRESH_INTERVAL_SEC, on a daemon thread. Set the returned event to
+    stop it."""
+    settings = settings or Settings()
+    stop = threading.Event()
+
+    def loop() -> None:
+        while not stop.is_set():
+            try:
+                with session_factory() as db:
+                    loaded = FxRateService(db).refresh_active_currencies()
+                if loaded:
+                    logger.info("Pre-warmed FX rates for %s", ", ".join(sorted(loaded)))
+            except Exception:
+                logger.exception("FX rate refresh failed")
+            stop.wait(settings.FX_RATE_REFRESH_INTERVAL_SEC)
+
+    thread = threading.Thread(target=loop, name="fx-rate-refresher", daemon=True)
+    thread.start()
+    return thread, stop
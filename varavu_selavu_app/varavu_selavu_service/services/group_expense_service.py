@@ -1,4 +1,5 @@
 import uuid
+from collections import defaultdict
 from datetime import datetime, timezone
 from decimal import ROUND_HALF_UP, Decimal
 from typing import Dict, List, Optional
@@ -7,9 +8,13 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
 from varavu_selavu_service.db.models import Expense, ExpensePayer, ExpenseSplit, ExpenseItem, ExpenseItemSplit, Group, GroupMember
+from varavu_selavu_service.services import insights_outbox
+from varavu_selavu_service.services.balance_service import BalanceService
 from varavu_selavu_service.services.group_service import GroupService
+from varavu_selavu_service.services.notification_service import NotificationService
 from varavu_selavu_service.services.split_engine import SplitError, resolve_split, validate_payers
 from varavu_selavu_service.services.item_split_engine import resolve_itemized_split
+from varavu_selavu_service.services.keyset import listing_page
 
 
 def _to_uuid(value) -> Optional[uuid.UUID]:
@@ -23,6 +28,8 @@ class GroupExpenseService:
     def __init__(self, db: Session):
         self.db = db
         self.group_service = GroupService(db)
+        self.balance_service = BalanceService(db)
+        self.notification_service = NotificationService(db)
         from varavu_selavu_service.services.activity_service import ActivityService
         self.activity_svc = ActivityService(db)
 
@@ -87,34 +94,99 @@ class GroupExpenseService:
         rate = FxRateService(self.db).get_rate(expense_currency, group_currency)
         return expense_currency, rate
 
-    def _expense_row(self, expense: Expense, actor_email: str) -> Dict:
-        caller_member = self.group_service.get_member_by_email(expense.group_id, actor_email)
-        split_rows = self.db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense.id).all()
-        my_share = 0.0
-        if caller_member is not None:
-            mine = next((s for s in split_rows if s.member_id == caller_member.id), None)
-            if mine is not None:
-                my_share = float(mine.amount_owed)
-        splits = [{"member_id": str(s.member_id), "share": float(s.amount_owed)} for s in split_rows]
-
-        payer_rows = self.db.query(ExpensePayer).filter(ExpensePayer.expense_id == expense.id).all()
-        payer_summary = [{"member_id": str(p.member_id), "amount_paid": float(p.amount_paid)} for p in payer_rows]
+    def _apply_balance(self, gid: uuid.UUID, expense: Expense, sign: int = 1) -> None:
+        """TS-GRP-135: adds (or, with sign=-1, backs out) this expense's current
+        payers/splits into the materialized group_balances/group_pair_balances, inside the caller's
+        transaction. Callers run balance_service.ensure_materialized(gid) first."""
+        self.db.flush()
+        self.balance_service.apply_expense(gid, expense, sign)
 
+    def _member_shares(self, expense_id: uuid.UUID) -> Dict[str, float]:
+        """member_id -> amount_owed as the session currently sees it (flushed)."""
         return {
-            "row_id": str(expense.id),
-            "date": expense.purchased_at.strftime("%m/%d/%Y") if expense.purchased_at else "01/01/1970",
-            "description": expense.description or "",
-            "category": expense.category_id or "",
-            "cost": float(expense.amount or 0),
-            "merchant_name": expense.merchant_name,
-            "my_share": my_share,
-            "payer_summary": payer_summary,
-            "splits": splits,
-            "currency": expense.currency,
-            "fx_rate_to_group_currency": float(expense.fx_rate_to_group_currency) if expense.fx_rate_to_group_currency is not None else None,
-            "split_type": expense.split_type,
+            str(s.member_id): float(s.amount_owed)
+            for s in self.db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense_id).all()
         }
 
+    def _email_shares(self, expense_id: uuid.UUID) -> Dict[str, float]:
+        """user_email -> amount_owed for the expense's registered members (placeholders
+        have no insights of their own)."""
+        rows = (
+            self.db.query(ExpenseSplit, GroupMember)
+            .join(GroupMember, ExpenseSplit.member_id == GroupMember.id)
+            .filter(ExpenseSplit.expense_id == expense_id)
+            .all()
+        )
+        return {m.user_email: float(s.amount_owed) for s, m in rows if m.user_email}
+
+    def _email_item_shares(self, expense_id: uuid.UUID) -> Dict[str, List[dict]]:
+        """user_email -> that member's share of each line item, for item insights."""
+        rows = (
+            self.db.query(ExpenseItemSplit, ExpenseItem, GroupMember)
+            .join(ExpenseItem, ExpenseItemSplit.expense_item_id == ExpenseItem.id)
+            .join(GroupMember, ExpenseItemSplit.member_id == GroupMember.id)
+            .filter(ExpenseItem.expense_id == expense_id)
+            .all()
+        )
+        shares = defaultdict(list)
+        for split, item, member in rows:
+            if not member.user_email:
+                continue
+            shares[member.user_email].append({
+                "normalized_name": item.normalized_name,
+                "item_name": item.item_name,
+                "unit_price": float(item.unit_price) if item.unit_price else float(item.line_total),
+                # Proportional quantity based on the share ratio.
+                "share_quantity": float(item.quantity) * float(split.ratio) if item.quantity else 1.0,
+                "share_amount": float(split.amount),
+            })
+        return dict(shares)
+
+    def _expense_row(self, expense: Expense, actor_email: str) -> Dict:
+        caller_member = self.group_service.get_member_by_email(expense.group_id, actor_email)
+        return self._expense_rows([expense], caller_member)[0]
+
+    def _expense_rows(self, expenses: List[Expense], caller_member: Optional[GroupMember]) -> List[Dict]:
+        """Response rows for a batch of expenses: splits and payers for the whole
+        batch are read in one query each, however many expenses there are."""
+        expense_ids = [e.id for e in expenses]
+        splits_by_expense: Dict[uuid.UUID, List[ExpenseSplit]] = defaultdict(list)
+        payers_by_expense: Dict[uuid.UUID, List[ExpensePayer]] = defaultdict(list)
+        if expense_ids:
+            for s in self.db.query(ExpenseSplit).filter(ExpenseSplit.expense_id.in_(expense_ids)).all():
+                splits_by_expense[s.expense_id].append(s)
+            for p in self.db.query(ExpensePayer).filter(ExpensePayer.expense_id.in_(expense_ids)).all():
+                payers_by_expense[p.expense_id].append(p)
+
+        rows = []
+        for expense in expenses:
+            split_rows = splits_by_expense.get(expense.id, [])
+            my_share = 0.0
+            if caller_member is not None:
+                mine = next((s for s in split_rows if s.member_id == caller_member.id), None)
+                if mine is not None:
+                    my_share = float(mine.amount_owed)
+            splits = [{"member_id": str(s.member_id), "share": float(s.amount_owed)} for s in split_rows]
+            payer_summary = [
+                {"member_id": str(p.member_id), "amount_paid": float(p.amount_paid)}
+                for p in payers_by_expense.get(expense.id, [])
+            ]
+            rows.append({
+                "row_id": str(expense.id),
+                "date": expense.purchased_at.strftime("%m/%d/%Y") if expense.purchased_at else "01/01/1970",
+                "description": expense.description or "",
+                "category": expense.category_id or "",
+                "cost": float(expense.amount or 0),
+                "merchant_name": expense.merchant_name,
+                "my_share": my_share,
+                "payer_summary": payer_summary,
+                "splits": splits,
+                "currency": expense.currency,
+                "fx_rate_to_group_currency": float(expense.fx_rate_to_group_currency) if expense.fx_rate_to_group_currency is not None else None,
+                "split_type": expense.split_type,
+            })
+        return rows
+
     # ------------------------------------------------------------------
     # CRUD
     # ------------------------------------------------------------------
@@ -132,12 +204,18 @@ class GroupExpenseService:
         split_type: str,
         split_entries: List[dict],
         currency: Optional[str] = None,
+        notify: bool = False,
+        queue_insights: bool = False,
     ) -> Dict:
+        """With notify, the expense_added push event is queued in the same commit;
+        with queue_insights, so is the insight aggregation event
+        (services/insights_outbox.py)."""
         self.group_service.require_membership(group_id, actor_email)
         gid = _to_uuid(group_id)
 
         split_results = self._validate_and_resolve(gid, amount, payers, split_type, split_entries)
         expense_currency, fx_rate = self._resolve_currency(gid, currency)
+        self.balance_service.ensure_materialized(gid)
 
         expense = Expense(
             id=uuid.uuid4(),
@@ -175,6 +253,21 @@ class GroupExpenseService:
                     basis_value=r.basis_value,
                 )
             )
+        self._apply_balance(gid, expense)
+        if notify:
+            self.notification_service.enqueue(
+                group_id=gid,
+                actor_email=actor_email,
+                event_type="expense_added",
+                description=expense.description,
+                shares=self._member_shares(expense.id),
+            )
+        email_shares = self._email_shares(expense.id) if queue_insights else None
+        if email_shares:
+            insights_outbox.enqueue(
+                self.db, "group_expense_created",
+                member_shares=email_shares, merchant_name=merchant_name, purchased_at=expense.purchased_at,
+            )
         self.db.commit()
         
         self.activity_svc.log(
@@ -187,16 +280,25 @@ class GroupExpenseService:
 
         return self._expense_row(expense, actor_email)
 
-    def list_group_expenses(self, group_id: str, actor_email: str, limit: int = 30, offset: int = 0) -> Dict:
-        self.group_service.require_membership(group_id, actor_email)
+    def list_group_expenses(
+        self,
+        group_id: str,
+        actor_email: str,
+        limit: int = 30,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+    ) -> Dict:
+        """One page of the group's expenses, newest first (undated last). Pages by
+        keyset on (purchased_at, id) when given a cursor or on the first page, by
+        offset otherwise; either way a page costs the same handful of queries.
+        Raises ValueError on a malformed cursor."""
+        caller_member = self.group_service.require_membership(group_id, actor_email)
         gid = _to_uuid(group_id)
 
-        rows = self.db.query(Expense).filter(Expense.group_id == gid).order_by(Expense.purchased_at.desc()).all()
-        total = len(rows)
-        sliced = rows[offset : offset + limit]
-        items = [self._expense_row(e, actor_email) for e in sliced]
-        next_offset = offset + limit if offset + limit < total else None
-        return {"items": items, "next_offset": next_offset}
+        query = self.db.query(Expense).filter(Expense.group_id == gid)
+        expenses, next_cursor, next_offset = listing_page(query, Expense.purchased_at, Expense.id, limit, offset, cursor)
+        items = self._expense_rows(expenses, caller_member)
+        return {"items": items, "next_cursor": next_cursor, "next_offset": next_offset}
 
     def update_expense(
         self,
@@ -212,7 +314,12 @@ class GroupExpenseService:
         split_type: str,
         split_entries: List[dict],
         currency: Optional[str] = None,
+        notify: bool = False,
+        queue_insights: bool = False,
     ) -> Dict:
+        """With notify, the expense_edited push event (old and new shares) is
+        queued in the same commit; with queue_insights, so is the insight
+        aggregation event."""
         # Any group member may edit any group expense (spec §5.2, decision §17.2).
         self.group_service.require_membership(group_id, actor_email)
         gid = _to_uuid(group_id)
@@ -225,6 +332,15 @@ class GroupExpenseService:
 
         split_results = self._validate_and_resolve(gid, amount, payers, split_type, split_entries)
         expense_currency, fx_rate = self._resolve_currency(gid, currency)
+        self.balance_service.ensure_materialized(gid)
+        self._apply_balance(gid, expense, sign=-1)
+        old_shares = self._member_shares(expense.id) if notify else None
+        if queue_insights:
+            old_insights = {
+                "old_member_shares": self._email_shares(expense.id),
+                "old_merchant_name": expense.merchant_name,
+                "old_purchased_at": expense.purchased_at,
+            }
 
         # Snapshot pre-edit values so the activity log (and TS-GRP-127's edit
         # history view built on top of it) can show a real old -> new diff.
@@ -269,6 +385,24 @@ class GroupExpenseService:
                     basis_value=r.basis_value,
                 )
             )
+        self._apply_balance(gid, expense)
+        if notify:
+            self.notification_service.enqueue(
+                group_id=gid,
+                actor_email=actor_email,
+                event_type="expense_edited",
+                description=expense.description,
+                old_shares=old_shares,
+                new_shares=self._member_shares(expense.id),
+            )
+        if queue_insights:
+            insights_outbox.enqueue(
+                self.db, "group_expense_updated",
+                new_member_shares=self._email_shares(expense.id),
+                new_merchant_name=merchant_name,
+                new_purchased_at=expense.purchased_at,
+                **old_insights,
+            )
         self.db.commit()
         
         new_snapshot = {
@@ -287,7 +421,11 @@ class GroupExpenseService:
 
         return self._expense_row(expense, actor_email)
 
-    def delete_expense(self, group_id: str, expense_id: str, actor_email: str) -> None:
+    def delete_expense(
+        self, group_id: str, expense_id: str, actor_email: str, notify: bool = False, queue_insights: bool = False,
+    ) -> None:
+        """With notify, the expense_deleted push event is queued in the same commit;
+        with queue_insights, so is the insight aggregation event."""
         self.group_service.require_membership(group_id, actor_email)
         gid = _to_uuid(group_id)
         eid = _to_uuid(expense_id)
@@ -297,7 +435,25 @@ class GroupExpenseService:
         if expense is None:
             raise HTTPException(status_code=404, detail="Group expense not found")
 
+        self.balance_service.ensure_materialized(gid)
+        self._apply_balance(gid, expense, sign=-1)
+        email_shares = self._email_shares(expense.id) if queue_insights else None
+        if email_shares:
+            insights_outbox.enqueue(
+                self.db, "group_expense_deleted",
+                member_shares=email_shares,
+                merchant_name=expense.merchant_name,
+                purchased_at=expense.purchased_at,
+                member_item_shares=self._email_item_shares(expense.id),
+            )
         self.db.delete(expense)
+        if notify:
+            self.notification_service.enqueue(
+                group_id=gid,
+                actor_email=actor_email,
+                event_type="expense_deleted",
+                description=expense.description,
+            )
         self.db.commit()
         
         self.activity_svc.log(
@@ -316,11 +472,13 @@ class GroupExpenseService:
         actor_email: str,
         split_type: str,
         split_entries: List[dict],
+        notify: bool = False,
     ) -> Dict:
         """TS-GRP-121: converts an existing personal expense into a group
         expense in place — same expense.id, gains group_id/split_type plus
         new expense_payers/expense_splits rows. The converter is sole payer
-        by default (E11); only the expense's own owner may convert it."""
+        by default (E11); only the expense's own owner may convert it. With
+        notify, the expense_added push event is queued in the same commit."""
         eid = _to_uuid(expense_id)
         expense = self.db.query(Expense).filter(Expense.id == eid).first() if eid else None
         if expense is None:
@@ -339,6 +497,7 @@ class GroupExpenseService:
         payers = [{"member_id": str(converter_member.id), "amount_paid": amount}]
         split_results = self._validate_and_resolve(gid, amount, payers, split_type, split_entries)
         expense_currency, fx_rate = self._resolve_currency(gid, expense.currency)
+        self.balance_service.ensure_materialized(gid)
 
         expense.group_id = gid
         expense.split_type = split_type
@@ -365,6 +524,15 @@ class GroupExpenseService:
                     basis_value=r.basis_value,
                 )
             )
+        self._apply_balance(gid, expense)
+        if notify:
+            self.notification_service.enqueue(
+                group_id=gid,
+                actor_email=actor_email,
+                event_type="expense_added",
+                description=expense.description,
+                shares=self._member_shares(expense.id),
+            )
         self.db.commit()
 
         self.activity_svc.log(
@@ -390,7 +558,11 @@ class GroupExpenseService:
         items: List[dict],
         fingerprint: Optional[str] = None,
         currency: Optional[str] = None,
+        notify: bool = False,
+        queue_insights: bool = False,
     ) -> Dict:
+        """With notify, the expense_added push event is queued in the same commit;
+        with queue_insights, so is the insight aggregation event."""
         self.group_service.require_membership(group_id, actor_email)
         gid = _to_uuid(group_id)
         expense_currency, fx_rate = self._resolve_currency(gid, currency)
@@ -424,6 +596,7 @@ class GroupExpenseService:
         except SplitError as e:
             raise HTTPException(status_code=400, detail={"message": str(e), **e.details})
 
+        self.balance_service.ensure_materialized(gid)
         expense = Expense(
             id=uuid.uuid4(),
             user_email=actor_email,
@@ -465,6 +638,25 @@ class GroupExpenseService:
             
         self._write_items(expense.id, actor_email, items)
 
+        self._apply_balance(gid, expense)
+        if notify:
+            self.notification_service.enqueue(
+                group_id=gid,
+                actor_email=actor_email,
+                event_type="expense_added",
+                description=expense.description,
+                shares=self._member_shares(expense.id),
+            )
+        email_shares = self._email_shares(expense.id) if queue_insights else None
+        if email_shares:
+            insights_outbox.enqueue(
+                self.db, "group_expense_with_items_created",
+                expense_id=expense.id,
+                member_shares=email_shares,
+                member_item_shares=self._email_item_shares(expense.id),
+                merchant_name=merchant_name,
+                purchased_at=expense.purchased_at,
+            )
         self.db.commit()
 
         self.activity_svc.log(
@@ -644,6 +836,9 @@ class GroupExpenseService:
 
         new_payers = self._rescale_payers(existing_payers, Decimal(str(expense.amount or 0)), Decimal(str(amount)))
 
+        self.balance_service.ensure_materialized(gid)
+        self._apply_balance(gid, expense, sign=-1)
+
         item_ids_subq = self.db.query(ExpenseItem.id).filter(ExpenseItem.expense_id == expense.id)
         self.db.query(ExpenseItemSplit).filter(ExpenseItemSplit.expense_item_id.in_(item_ids_subq)).delete(synchronize_session=False)
         self.db.query(ExpenseItem).filter(ExpenseItem.expense_id == expense.id).delete(synchronize_session=False)
@@ -674,6 +869,7 @@ class GroupExpenseService:
             )
         self._write_items(expense.id, actor_email, items_with_ratios)
 
+        self._apply_balance(gid, expense)
         self.db.commit()
 
         self.activity_svc.log(
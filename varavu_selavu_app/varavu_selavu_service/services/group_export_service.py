@@ -1,11 +1,11 @@
-import csv
-import io
 import uuid
-from typing import Optional
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
 
 from sqlalchemy.orm import Session
 
-from varavu_selavu_service.core.csv_safety import sanitize_csv_row
+from varavu_selavu_service.core.csv_safety import iter_csv
 from varavu_selavu_service.db.models import Expense, ExpensePayer, ExpenseSplit, GroupMember, Settlement
 from varavu_selavu_service.services.group_service import GroupService
 
@@ -21,72 +21,89 @@ class GroupExportService:
     """TS-GRP-132: one CSV per group, discriminated by a `record_type` column
     (expense|settlement) so it imports cleanly into any spreadsheet tool."""
 
+    CHUNK_SIZE = 500
+
+    HEADER = [
+        "record_type", "date", "description_or_note", "category", "amount", "currency",
+        "from_or_payer", "to_or_participant", "method",
+    ]
+
     def __init__(self, db: Session):
         self.db = db
         self.group_service = GroupService(db)
 
-    def export_csv(self, group_id: str, actor_email: str) -> str:
+    def export_csv(self, group_id: str, actor_email: str) -> Iterator[str]:
+        """The group's expenses then settlements, oldest first, as an iterator of
+        CSV text chunks for a StreamingResponse. Membership is checked here, before
+        the first chunk, so a non-member still gets a 403 rather than a cut-off body.
+
+        Every data row goes through the formula-injection guard in iter_csv():
+        descriptions, notes and member display names are unrestricted free text."""
         self.group_service.require_membership(group_id, actor_email)
-        gid = _to_uuid(group_id)
-
-        members = {m.id: m for m in self.db.query(GroupMember).filter(GroupMember.group_id == gid).all()}
-
-        buf = io.StringIO()
-        writer = csv.writer(buf)
-
-        def write_row(row):
-            """Every data row goes through the formula-injection guard: descriptions,
-            notes and member display names are unrestricted free text."""
-            writer.writerow(sanitize_csv_row(row))
-
-        write_row([
-            "record_type", "date", "description_or_note", "category", "amount", "currency",
-            "from_or_payer", "to_or_participant", "method",
-        ])
-
-        expenses = (
-            self.db.query(Expense).filter(Expense.group_id == gid).order_by(Expense.purchased_at.asc()).all()
-        )
-        for e in expenses:
-            payers = self.db.query(ExpensePayer).filter(ExpensePayer.expense_id == e.id).all()
-            payer_names = ", ".join(
-                f"{members[p.member_id].display_name} (${float(p.amount_paid):.2f})"
-                for p in payers if p.member_id in members
+        return iter_csv(self.HEADER, self._rows(_to_uuid(group_id)), self.CHUNK_SIZE)
+
+    def _rows(self, gid: uuid.UUID) -> Iterator[List]:
+        try:
+            members = {m.id: m.display_name for m in self.db.query(GroupMember).filter(GroupMember.group_id == gid).all()}
+
+            def names(amounts) -> str:
+                return ", ".join(f"{members[mid]} (${float(amount):.2f})" for mid, amount in amounts if mid in members)
+
+            expenses = iter(
+                self.db.query(Expense).filter(Expense.group_id == gid)
+                .order_by(Expense.purchased_at.asc(), Expense.id.asc())
+                .yield_per(self.CHUNK_SIZE)
             )
-            splits = self.db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == e.id).all()
-            split_names = ", ".join(
-                f"{members[s.member_id].display_name} (${float(s.amount_owed):.2f})"
-                for s in splits if s.member_id in members
+            while True:
+                chunk = list(islice(expenses, self.CHUNK_SIZE))
+                if not chunk:
+                    break
+                payers, splits = self._ledgers([e.id for e in chunk])
+                for e in chunk:
+                    yield [
+                        "expense",
+                        e.purchased_at.strftime("%m/%d/%Y") if e.purchased_at else "",
+                        e.description or "",
+                        e.category_id or "",
+                        float(e.amount or 0),
+                        e.currency or "USD",
+                        names(payers.get(e.id, [])),
+                        names(splits.get(e.id, [])),
+                        "",
+                    ]
+
+            settlements = (
+                self.db.query(Settlement).filter(Settlement.group_id == gid)
+                .order_by(Settlement.settled_at.asc(), Settlement.id.asc())
+                .yield_per(self.CHUNK_SIZE)
             )
-            write_row([
-                "expense",
-                e.purchased_at.strftime("%m/%d/%Y") if e.purchased_at else "",
-                e.description or "",
-                e.category_id or "",
-                float(e.amount or 0),
-                e.currency or "USD",
-                payer_names,
-                split_names,
-                "",
-            ])
-
-        settlements = (
-            self.db.query(Settlement).filter(Settlement.group_id == gid).order_by(Settlement.settled_at.asc()).all()
-        )
-        for s in settlements:
-            from_name = members[s.from_member_id].display_name if s.from_member_id in members else "Unknown"
-            to_name = members[s.to_member_id].display_name if s.to_member_id in members else "Unknown"
-            write_row([
-                "settlement",
-                s.settled_at.strftime("%m/%d/%Y") if s.settled_at else "",
-                s.notes or "",
-                "",
-                float(s.amount or 0),
-                "",
-                from_name,
-                to_name,
-                s.method or "",
-            ])
-
-        # UTF-8 BOM so Excel-on-Windows opens it without mangling non-ASCII names.
-        return "﻿" + buf.getvalue()
+            for s in settlements:
+                yield [
+                    "settlement",
+                    s.settled_at.strftime("%m/%d/%Y") if s.settled_at else "",
+                    s.notes or "",
+                    "",
+                    float(s.amount or 0),
+                    "",
+                    members.get(s.from_member_id, "Unknown"),
+                    members.get(s.to_member_id, "Unknown"),
+                    s.method or "",
+                ]
+        finally:
+            # See PersonalExportService._rows: the body outlives get_db()'s close.
+            self.db.close()
+
+    def _ledgers(self, expense_ids: List[uuid.UUID]):
+        """(payers, splits) for a chunk of expenses, each {expense_id: [(member_id,
+        amount), ...]}, in one read apiece off the covering expense/member indexes."""
+        payers: Dict[uuid.UUID, list] = defaultdict(list)
+        splits: Dict[uuid.UUID, list] = defaultdict(list)
+        for expense_id, member_id, amount in self.db.query(
+            ExpensePayer.expense_id, ExpensePayer.member_id, ExpensePayer.amount_paid
+        ).filter(ExpensePayer.expense_id.in_(expense_ids)):
+            payers[expense_id].append((member_id, amount))
+        for expense_id, member_id, amount in self.db.query(
+            ExpenseSplit.expense_id, ExpenseSplit.member_id, ExpenseSplit.amount_owed
+        ).filter(ExpenseSplit.expense_id.in_(expense_ids)):
+            splits[expense_id].append((member_id, amount))
+        return payers, splits
@@ -14,6 +14,7 @@ from varavu_selavu_service.db.models import (
     GroupMember,
     User,
 )
+from varavu_selavu_service.services.notification_service import NotificationService
 
 _VALID_GROUP_TYPES = {"trip", "home", "couple", "other"}
 _INVITE_TTL_DAYS = 7
@@ -339,7 +340,10 @@ class GroupService:
         email: str,
         member_email: Optional[str] = None,
         display_name: Optional[str] = None,
+        notify: bool = False,
     ) -> Dict:
+        """With notify, adding a registered user queues the member_joined push
+        event in the same commit."""
         group = self._get_group_or_404(group_id)
         self.require_membership(group_id, email)
 
@@ -376,6 +380,16 @@ class GroupService:
             joined_at=datetime.now(timezone.utc) if member_email else None,
         )
         self.db.add(new_member)
+        # Only a registered-user seat (status "active") represents an actual join;
+        # placeholders (no email, status "invited") have no account/device to notify about.
+        if notify and member_email:
+            NotificationService(self.db).enqueue(
+                group_id=group.id,
+                actor_email=email,
+                event_type="member_joined",
+                new_member_display_name=resolved_display_name,
+                exclude_emails=[member_email],
+            )
         self.db.commit()
         
         self.activity_svc.log(
@@ -467,7 +481,8 @@ class GroupService:
             "expires_at": expires_at.isoformat(),
         }
 
-    def accept_invite(self, token: str, acceptor_email: str) -> Dict:
+    def accept_invite(self, token: str, acceptor_email: str, notify: bool = False) -> Dict:
+        """With notify, the member_joined push event is queued in the same commit."""
         invite = self.db.query(GroupInvitation).filter(GroupInvitation.token == token).first()
         if invite is None:
             raise HTTPException(status_code=404, detail="Invite not found")
@@ -499,6 +514,14 @@ class GroupService:
         member.status = "active"
         member.joined_at = now
         self.db.delete(invite)
+        if notify:
+            # The acceptor is the actor; they're excluded from their own "joined" notification.
+            NotificationService(self.db).enqueue(
+                group_id=member.group_id,
+                actor_email=acceptor_email,
+                event_type="member_joined",
+                new_member_display_name=member.display_name,
+            )
         self.db.commit()
         
         self.activity_svc.log(
@@ -8,6 +8,8 @@ from threading import RLock
 
 from varavu_selavu_service.db.models import Expense, ExpenseItem, GroupMember, RecurringTemplate
 from varavu_selavu_service.models.api_models import InsightMetrics, MerchantInsightSummary, ItemInsightSummary, ChangeInsight
+from varavu_selavu_service.services.date_scope import DateScope
+from varavu_selavu_service.services.spend_rollup_service import SpendRollupService
 
 
 def classify_confidence(transaction_count: int, distinct_merchants: int | None = None) -> str:
@@ -29,18 +31,6 @@ def canonicalize_name(name: str | None) -> str:
     return (name or "").strip().lower()
 
 
-def _exclusive_end(end_date: str) -> str:
-    """`Expense.purchased_at` is a tz-aware DateTime, not a bare Date, but every
-    end-date filter here is a plain 'YYYY-MM-DD' string. `purchased_at <= end_date`
-    compares against midnight of that day, so it silently excludes every
-    transaction recorded *later* that same day — i.e. almost all of them — which
-    quietly drops the last day of every period from both the current and
-    previous totals. Returns the start of the *next* day so callers can use a
-    half-open `purchased_at < _exclusive_end(end_date)` comparison that actually
-    includes the whole end date."""
-    return (datetime.strptime(end_date, "%Y-%m-%d").date() + timedelta(days=1)).strftime("%Y-%m-%d")
-
-
 class InsightAnalyticsService:
     """
     Core service to dynamically calculate InsightMetrics for merchants, items, and changes.
@@ -63,28 +53,11 @@ class InsightAnalyticsService:
           1. start_date / end_date
           2. year / month
           3. all-time (no filters)
+        Each becomes a half-open purchased_at range (services/date_scope.py); an
+        end_date includes that whole day.
         """
-        filters = []
-        is_sqlite = "sqlite" in str(self.db.bind.url)
-
-        if start_date or end_date:
-            if start_date:
-                filters.append(Expense.purchased_at >= start_date)
-            if end_date:
-                filters.append(Expense.purchased_at < _exclusive_end(end_date))
-        else:
-            if year is not None:
-                if is_sqlite:
-                    filters.append(func.cast(func.strftime('%Y', Expense.purchased_at), Integer) == int(year))
-                else:
-                    filters.append(extract('year', Expense.purchased_at) == int(year))
-            if month is not None:
-                if is_sqlite:
-                    filters.append(func.cast(func.strftime('%m', Expense.purchased_at), Integer) == int(month))
-                else:
-                    filters.append(extract('month', Expense.purchased_at) == int(month))
-
-        return filters
+        scope = DateScope.from_params(year, month, start_date, end_date, dates_take_precedence=True)
+        return scope.filters(Expense.purchased_at)
 
     def _resolve_comparison_periods(
         self,
@@ -167,10 +140,7 @@ class InsightAnalyticsService:
         query = self.db.query(canon_key, func.sum(Expense.amount)).filter(
             Expense.user_email == user_id, Expense.group_id.is_(None), Expense.merchant_name != None
         )
-        if start_date:
-            query = query.filter(Expense.purchased_at >= start_date)
-        if end_date:
-            query = query.filter(Expense.purchased_at < _exclusive_end(end_date))
+        query = query.filter(*DateScope.from_params(start_date=start_date, end_date=end_date).filters(Expense.purchased_at))
         return {r[0]: float(r[1] or 0) for r in query.group_by(canon_key).all()}
 
     def _item_totals_for_period(
@@ -182,10 +152,7 @@ class InsightAnalyticsService:
             .join(Expense, ExpenseItem.expense_id == Expense.id)
             .filter(Expense.user_email == user_id, Expense.group_id.is_(None), ExpenseItem.normalized_name != None)
         )
-        if start_date:
-            query = query.filter(Expense.purchased_at >= start_date)
-        if end_date:
-            query = query.filter(Expense.purchased_at < _exclusive_end(end_date))
+        query = query.filter(*DateScope.from_params(start_date=start_date, end_date=end_date).filters(Expense.purchased_at))
         return {r[0]: float(r[1] or 0) for r in query.group_by(ExpenseItem.normalized_name).all()}
 
     def calculate_merchant_metrics(
@@ -731,6 +698,8 @@ class InsightAnalyticsService:
         cs_str, ce_str, ps_str, pe_str = self._resolve_comparison_periods(
             start_date, end_date, year, month, default_to_current_month=True
         )
+        curr_scope = DateScope.from_params(start_date=cs_str, end_date=ce_str)
+        prev_scope = DateScope.from_params(start_date=ps_str, end_date=pe_str)
 
         insights = []
         
@@ -814,13 +783,10 @@ class InsightAnalyticsService:
         # group_id.is_(None) guard: without it, a user's own group expenses would be
         # double-counted here at their *full* amount on top of whatever their actual
         # personal spend is (same class of bug TS-GRP-106 fixed in AnalysisService).
-        curr_cat_query = self.db.query(Expense.category_id, func.sum(Expense.amount)).filter(Expense.user_email == user_id, Expense.group_id.is_(None), Expense.purchased_at >= cs_str)
-        if ce_str: curr_cat_query = curr_cat_query.filter(Expense.purchased_at < _exclusive_end(ce_str))
-        curr_cats = {r[0]: float(r[1] or 0) for r in curr_cat_query.group_by(Expense.category_id).all()}
-
-        prev_cat_query = self.db.query(Expense.category_id, func.sum(Expense.amount)).filter(Expense.user_email == user_id, Expense.group_id.is_(None), Expense.purchased_at >= ps_str)
-        if pe_str: prev_cat_query = prev_cat_query.filter(Expense.purchased_at < _exclusive_end(pe_str))
-        prev_cats = {r[0]: float(r[1] or 0) for r in prev_cat_query.group_by(Expense.category_id).all()}
+        # Whole months come from monthly_spend_rollups; only partial-month edges hit raw rows.
+        rollups = SpendRollupService(self.db)
+        curr_cats = {c: float(v) for c, v in rollups.category_totals(user_id, curr_scope).items()}
+        prev_cats = {c: float(v) for c, v in rollups.category_totals(user_id, prev_scope).items()}
         
         cat_diffs = []
         for c, curr_spent in curr_cats.items():
@@ -882,10 +848,8 @@ class InsightAnalyticsService:
         if baseline_count >= 5 and baseline_avg > 0:
             curr_largest_query = (
                 self.db.query(Expense.amount, Expense.merchant_name, Expense.description)
-                .filter(Expense.user_email == user_id, Expense.group_id.is_(None), Expense.purchased_at >= cs_str)
+                .filter(Expense.user_email == user_id, Expense.group_id.is_(None), *curr_scope.filters(Expense.purchased_at))
             )
-            if ce_str:
-                curr_largest_query = curr_largest_query.filter(Expense.purchased_at < _exclusive_end(ce_str))
             largest = curr_largest_query.order_by(Expense.amount.desc()).first()
 
             if largest:
@@ -924,20 +888,16 @@ class InsightAnalyticsService:
                 Expense.user_email == user_id,
                 Expense.group_id.is_(None),
                 Expense.description == tpl.description,
-                Expense.purchased_at >= cs_str,
+                *curr_scope.filters(Expense.purchased_at),
             )
-            if ce_str:
-                curr_tpl_query = curr_tpl_query.filter(Expense.purchased_at < _exclusive_end(ce_str))
             curr_amount = float(curr_tpl_query.scalar() or 0)
 
             prev_tpl_query = self.db.query(func.sum(Expense.amount)).filter(
                 Expense.user_email == user_id,
                 Expense.group_id.is_(None),
                 Expense.description == tpl.description,
-                Expense.purchased_at >= ps_str,
+                *prev_scope.filters(Expense.purchased_at),
             )
-            if pe_str:
-                prev_tpl_query = prev_tpl_query.filter(Expense.purchased_at < _exclusive_end(pe_str))
             prev_amount = float(prev_tpl_query.scalar() or 0)
 
             if prev_amount > 0 and curr_amount > prev_amount:
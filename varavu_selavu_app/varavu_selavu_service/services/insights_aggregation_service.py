@@ -4,15 +4,34 @@ InsightsAggregationService
 Called when expenses (or expense items) are created/updated to keep the
 pre-calculated item_insights, item_price_history, merchant_insights, and
 merchant_aggregates tables up-to-date.
+
+Every entry point first folds its inputs into per-key deltas in memory (one
+per (user, item name), (user, merchant) and (user, merchant, month)), then
+applies them set-wise: one multi-row INSERT ... ON CONFLICT DO UPDATE per
+table when adding (SQLite and Postgres share the syntax), one executemany
+UPDATE when backing out, and one bulk insert for the price history. A
+60-line receipt is a handful of statements instead of a SELECT plus an
+UPDATE per line. Names are resolved to canonical entities up front with
+EntityResolutionService.resolve_many().
+
+Inside coalesce(), entry points only fold into a shared set of deltas, which
+is applied once on exit. The insights outbox worker (services/insights_outbox.py)
+replays a whole claim of queued events that way, so five edits of one expense
+become one net adjustment per (user, merchant, month) rather than five
+back-out/re-apply passes.
 """
 from __future__ import annotations
 
 import uuid
 import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
+from sqlalchemy import bindparam, case, func, insert, select, update
 from sqlalchemy.orm import Session
 from varavu_selavu_service.db.models import (
     Expense,
@@ -26,6 +45,109 @@ from varavu_selavu_service.services.entity_resolution_service import EntityResol
 
 logger = logging.getLogger("varavu_selavu.insights_aggregation")
 
+# A line on a receipt as the aggregation sees it: (normalized_name, unit_price, quantity, line_total).
+ItemLine = Tuple[str, float, float, float]
+
+
+@dataclass
+class _ItemDelta:
+    total: float = 0.0
+    quantity: float = 0.0
+    first_unit_price: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    lines: int = 0
+
+    def add(self, unit_price: float, quantity: float, line_total: float) -> None:
+        self.total += line_total
+        self.quantity += quantity
+        self.lines += 1
+        if self.first_unit_price is None:
+            self.first_unit_price = unit_price
+        self.min_price = unit_price if self.min_price is None else min(self.min_price, unit_price)
+        self.max_price = unit_price if self.max_price is None else max(self.max_price, unit_price)
+
+    @property
+    def avg_unit_price(self) -> float:
+        # A new row from a single line keeps that line's unit price, exactly
+        # as the first write of a name always has.
+        if self.lines == 1:
+            return self.first_unit_price
+        return self.total / self.quantity if self.quantity else 0.0
+
+
+@dataclass
+class _ItemBackOut:
+    total: float = 0.0
+    quantity: float = 0.0
+
+
+@dataclass
+class _MerchantDelta:
+    amount: float = 0.0
+    count: int = 0
+    months: Dict[Tuple[int, int], List[float]] = field(default_factory=lambda: defaultdict(lambda: [0.0, 0]))
+
+
+@dataclass
+class _Deltas:
+    """Everything a run of entry-point calls changes, folded per key.
+
+    Merchant changes only ever add to a row, so they net out per (user,
+    merchant) and per month whatever order they came in. Item back-outs clamp
+    at zero and reset min/max on an emptied row, so each item name keeps an
+    ordered list of runs instead: consecutive adds fold into one _ItemDelta,
+    consecutive back-outs into one _ItemBackOut."""
+    merchants: Dict[Tuple[str, str], _MerchantDelta] = field(default_factory=lambda: defaultdict(_MerchantDelta))
+    items: Dict[Tuple[str, str], List[Union[_ItemDelta, _ItemBackOut]]] = field(default_factory=lambda: defaultdict(list))
+    history: List[Tuple[str, str, Dict[str, Any]]] = field(default_factory=list)  # (user, name, price-history row)
+
+    def merchant(self, user_email: Optional[str], merchant_name: Optional[str], purchased_at: Optional[datetime], amount, count: int) -> None:
+        if not user_email or not merchant_name:
+            return  # Can't track without a merchant name
+        amount = float(amount or 0)
+        delta = self.merchants[(user_email, merchant_name)]
+        delta.amount += amount
+        delta.count += count
+        dt = purchased_at or datetime.utcnow()
+        month = delta.months[(dt.year, dt.month)]
+        month[0] += amount
+        month[1] += count
+
+    def add_items(
+        self,
+        user_email: str,
+        expense_id: str,
+        store_name: Optional[str],
+        purchased_at: Optional[datetime],
+        lines: List[ItemLine],
+    ) -> None:
+        for name, unit_price, quantity, line_total in lines:
+            runs = self.items[(user_email, name)]
+            if not runs or not isinstance(runs[-1], _ItemDelta):
+                runs.append(_ItemDelta())
+            runs[-1].add(unit_price, quantity, line_total)
+            # Price history keeps one row per line, as before.
+            self.history.append((user_email, name, {
+                "expense_id": uuid.UUID(str(expense_id)),
+                "store_name": store_name,
+                "date": purchased_at or datetime.utcnow(),
+                "unit_price": _dec(unit_price),
+                "quantity": _dec(quantity),
+            }))
+
+    def back_out_items(self, user_email: str, lines: List[ItemLine]) -> None:
+        for name, _, quantity, line_total in lines:
+            runs = self.items[(user_email, name)]
+            if not runs or not isinstance(runs[-1], _ItemBackOut):
+                runs.append(_ItemBackOut())
+            runs[-1].total += line_total
+            runs[-1].quantity += quantity
+
+
+def _dec(value: float) -> Decimal:
+    return Decimal(str(value))
+
 
 class InsightsAggregationService:
     """Recalculates item & merchant insight rows after expense mutations."""
@@ -38,6 +160,29 @@ class InsightsAggregationService:
         # path uses these columns yet — that cutover is a later, separate
         # change, gated on the reconciliation check passing.
         self._resolver = EntityResolutionService(db)
+        self._pending: Optional[_Deltas] = None
+
+    @contextmanager
+    def coalesce(self) -> Iterator[None]:
+        """Folds every entry point called inside into one set of deltas and
+        applies it on exit. Does not commit; the caller does, along with
+        whatever else belongs in the same transaction."""
+        self._pending = _Deltas()
+        try:
+            yield
+            self._apply(self._pending)
+        finally:
+            self._pending = None
+
+    @contextmanager
+    def _deltas(self) -> Iterator[_Deltas]:
+        if self._pending is not None:
+            yield self._pending
+            return
+        deltas = _Deltas()
+        yield deltas
+        self._apply(deltas)
+        self.db.commit()
 
     # ------------------------------------------------------------------
     # Public entry points
@@ -59,19 +204,9 @@ class InsightsAggregationService:
         else:
             merchant_amount = float(sum(i.get("line_total", 0) for i in items))
 
-        self._update_merchant_insight(user_email, merchant_name, purchased_at, merchant_amount)
-        for item in items:
-            self._update_item_insight(
-                user_email=user_email,
-                expense_id=expense_id,
-                store_name=merchant_name,
-                purchased_at=purchased_at,
-                normalized_name=item.get("normalized_name") or item.get("item_name", "Unknown"),
-                unit_price=float(item.get("unit_price") or item.get("line_total", 0)),
-                quantity=float(item.get("quantity", 1) or 1),
-                line_total=float(item.get("line_total", 0)),
-            )
-        self.db.commit()
+        with self._deltas() as d:
+            d.merchant(user_email, merchant_name, purchased_at, merchant_amount, 1)
+            d.add_items(user_email, expense_id, merchant_name, purchased_at, [self._line(item) for item in items])
 
     def on_simple_expense_created(
         self,
@@ -81,8 +216,8 @@ class InsightsAggregationService:
         amount: float,
     ) -> None:
         """Call after a simple (non-receipt) expense is persisted."""
-        self._update_merchant_insight(user_email, merchant_name, purchased_at, amount, count_delta=1)
-        self.db.commit()
+        with self._deltas() as d:
+            d.merchant(user_email, merchant_name, purchased_at, amount, 1)
 
     def on_simple_expense_updated(
         self,
@@ -95,19 +230,10 @@ class InsightsAggregationService:
         new_purchased_at: Optional[datetime],
     ) -> None:
         """Call after a simple (non-receipt) expense is updated to adjust aggregates."""
-        # 1. Back out old values completely (-amount, -1 count)
-        if old_merchant_name:
-            self._update_merchant_insight(
-                user_email, old_merchant_name, old_purchased_at, -old_amount, count_delta=-1
-            )
-            
-        # 2. Add the new values (+amount, +1 count)
-        if new_merchant_name:
-            self._update_merchant_insight(
-                user_email, new_merchant_name, new_purchased_at, new_amount, count_delta=1
-            )
-            
-        self.db.commit()
+        with self._deltas() as d:
+            # Back out old values completely (-amount, -1 count), add the new ones.
+            d.merchant(user_email, old_merchant_name, old_purchased_at, -float(old_amount or 0), -1)
+            d.merchant(user_email, new_merchant_name, new_purchased_at, new_amount, 1)
 
     def on_expense_deleted(
         self,
@@ -118,46 +244,9 @@ class InsightsAggregationService:
         items: List[Dict[str, Any]]
     ) -> None:
         """Call after an expense is deleted to decrement aggregates."""
-        # 1. Back out merchant totals
-        if merchant_name:
-            self._update_merchant_insight(
-                user_email, merchant_name, purchased_at, -amount, count_delta=-1
-            )
-            
-        # 2. Back out item aggregates
-        for item in items:
-            normalized_name = item.get("normalized_name") or item.get("item_name", "Unknown")
-            unit_price = float(item.get("unit_price") or item.get("line_total", 0))
-            quantity = float(item.get("quantity", 1) or 1)
-            line_total = float(item.get("line_total", 0))
-            
-            insight = (
-                self.db.query(ItemInsight)
-                .filter(
-                    ItemInsight.user_email == user_email,
-                    ItemInsight.normalized_name == normalized_name,
-                )
-                .first()
-            )
-            if insight:
-                # Decrement values
-                prev_total = float(insight.total_spent or 0)
-                prev_qty = float(insight.total_quantity_bought or 0)
-                new_total = max(0, prev_total - line_total)
-                new_qty = max(0, prev_qty - quantity)
-                
-                insight.total_spent = Decimal(str(new_total))
-                insight.total_quantity_bought = Decimal(str(new_qty))
-                insight.avg_unit_price = Decimal(str(new_total / new_qty)) if new_qty > 0 else Decimal("0")
-                
-                # Note: We can't strictly restore min/max without re-scanning all history,
-                # but we leave them as-is. If qty is 0, we could reset them.
-                if new_qty == 0:
-                    insight.min_price = Decimal("0")
-                    insight.max_price = Decimal("0")
-                    insight.avg_unit_price = Decimal("0")
-                    
-        self.db.commit()
+        with self._deltas() as d:
+            d.merchant(user_email, merchant_name, purchased_at, -float(amount or 0), -1)
+            d.back_out_items(user_email, [self._line(item) for item in items])
 
     # ------------------------------------------------------------------
     # Group expense entry points (TS-GRP-123)
@@ -170,11 +259,9 @@ class InsightsAggregationService:
         purchased_at: Optional[datetime],
     ) -> None:
         """Call after a group simple expense is persisted."""
-        for member_email, share_amount in member_shares.items():
-            if not member_email:
-                continue
-            self._update_merchant_insight(member_email, merchant_name, purchased_at, share_amount, count_delta=1)
-        self.db.commit()
+        with self._deltas() as d:
+            for email, share in member_shares.items():
+                d.merchant(email, merchant_name, purchased_at, share, 1)
 
     def on_group_expense_updated(
         self,
@@ -186,25 +273,11 @@ class InsightsAggregationService:
         new_purchased_at: Optional[datetime],
     ) -> None:
         """Call after a group simple expense is updated."""
-        # 1. Back out old values
-        if old_merchant_name:
-            for member_email, share_amount in old_member_shares.items():
-                if not member_email:
-                    continue
-                self._update_merchant_insight(
-                    member_email, old_merchant_name, old_purchased_at, -share_amount, count_delta=-1
-                )
-        
-        # 2. Add new values
-        if new_merchant_name:
-            for member_email, share_amount in new_member_shares.items():
-                if not member_email:
-                    continue
-                self._update_merchant_insight(
-                    member_email, new_merchant_name, new_purchased_at, share_amount, count_delta=1
-                )
-                
-        self.db.commit()
+        with self._deltas() as d:
+            for email, share in old_member_shares.items():
+                d.merchant(email, old_merchant_name, old_purchased_at, -float(share or 0), -1)
+            for email, share in new_member_shares.items():
+                d.merchant(email, new_merchant_name, new_purchased_at, share, 1)
 
     def on_group_expense_deleted(
         self,
@@ -215,49 +288,12 @@ class InsightsAggregationService:
         member_item_shares: Dict[str, List[Dict[str, Any]]] = None
     ) -> None:
         """Call after a group expense (simple or itemized) is deleted."""
-        # 1. Back out merchant totals
-        if merchant_name:
-            for member_email, share_amount in member_shares.items():
-                if not member_email:
-                    continue
-                self._update_merchant_insight(
-                    member_email, merchant_name, purchased_at, -share_amount, count_delta=-1
-                )
-        
-        # 2. Back out item aggregates
-        if member_item_shares:
-            for member_email, user_items in member_item_shares.items():
-                if not member_email:
-                    continue
-                for item in user_items:
-                    normalized_name = item.get("normalized_name") or item.get("item_name", "Unknown")
-                    quantity = float(item.get("share_quantity", 1))
-                    line_total = float(item.get("share_amount", 0))
-                    
-                    insight = (
-                        self.db.query(ItemInsight)
-                        .filter(
-                            ItemInsight.user_email == member_email,
-                            ItemInsight.normalized_name == normalized_name,
-                        )
-                        .first()
-                    )
-                    if insight:
-                        prev_total = float(insight.total_spent or 0)
-                        prev_qty = float(insight.total_quantity_bought or 0)
-                        new_total = max(0, prev_total - line_total)
-                        new_qty = max(0, prev_qty - quantity)
-                        
-                        insight.total_spent = Decimal(str(new_total))
-                        insight.total_quantity_bought = Decimal(str(new_qty))
-                        insight.avg_unit_price = Decimal(str(new_total / new_qty)) if new_qty > 0 else Decimal("0")
-                        
-                        if new_qty == 0:
-                            insight.min_price = Decimal("0")
-                            insight.max_price = Decimal("0")
-                            insight.avg_unit_price = Decimal("0")
-
-        self.db.commit()
+        with self._deltas() as d:
+            for email, share in member_shares.items():
+                d.merchant(email, merchant_name, purchased_at, -float(share or 0), -1)
+            for member_email, user_items in (member_item_shares or {}).items():
+                if member_email:
+                    d.back_out_items(member_email, [self._share_line(item) for item in user_items])
 
     def on_group_expense_with_items_created(
         self,
@@ -268,189 +304,322 @@ class InsightsAggregationService:
         purchased_at: Optional[datetime],
     ) -> None:
         """Call after a group receipt-based expense + items are persisted."""
-        # 1. Update merchant insights using full member share
-        for member_email, share_amount in member_shares.items():
-            if not member_email:
-                continue
-            self._update_merchant_insight(member_email, merchant_name, purchased_at, share_amount, count_delta=1)
-            
-        # 2. Update item insights using member's specific item shares
-        for member_email, user_items in member_item_shares.items():
-            if not member_email:
-                continue
-            for item in user_items:
-                self._update_item_insight(
-                    user_email=member_email,
-                    expense_id=expense_id,
-                    store_name=merchant_name,
-                    purchased_at=purchased_at,
-                    normalized_name=item.get("normalized_name") or item.get("item_name", "Unknown"),
-                    unit_price=float(item.get("unit_price") or item.get("line_total", 0)), # True unit price
-                    quantity=float(item.get("share_quantity", 1)),
-                    line_total=float(item.get("share_amount", 0)),
-                )
-        self.db.commit()
+        with self._deltas() as d:
+            # Merchant insights use the full member share...
+            for email, share in member_shares.items():
+                d.merchant(email, merchant_name, purchased_at, share, 1)
+            # ...item insights each member's specific item shares.
+            for member_email, user_items in member_item_shares.items():
+                if member_email:
+                    d.add_items(
+                        member_email, expense_id, merchant_name, purchased_at, [self._share_line(item) for item in user_items],
+                    )
 
     # ------------------------------------------------------------------
-    # Internal: Item insight helpers
+    # Internal: input shapes
     # ------------------------------------------------------------------
 
-    def _update_item_insight(
-        self,
-        user_email: str,
-        expense_id: str,
-        store_name: Optional[str],
-        purchased_at: Optional[datetime],
-        normalized_name: str,
-        unit_price: float,
-        quantity: float,
-        line_total: float,
-    ) -> None:
-        insight = (
-            self.db.query(ItemInsight)
-            .filter(
-                ItemInsight.user_email == user_email,
-                ItemInsight.normalized_name == normalized_name,
-            )
-            .first()
+    @staticmethod
+    def _line(item: Dict[str, Any]) -> ItemLine:
+        return (
+            item.get("normalized_name") or item.get("item_name", "Unknown"),
+            float(item.get("unit_price") or item.get("line_total", 0)),
+            float(item.get("quantity", 1) or 1),
+            float(item.get("line_total", 0)),
         )
 
-        if insight is None:
-            insight = ItemInsight(
-                id=uuid.uuid4(),
-                user_email=user_email,
-                normalized_name=normalized_name,
-                avg_unit_price=Decimal(str(unit_price)),
-                min_price=Decimal(str(unit_price)),
-                max_price=Decimal(str(unit_price)),
-                total_quantity_bought=Decimal(str(quantity)),
-                total_spent=Decimal(str(line_total)),
-            )
-            self.db.add(insight)
-            self.db.flush()  # get insight.id
+    @staticmethod
+    def _share_line(item: Dict[str, Any]) -> ItemLine:
+        return (
+            item.get("normalized_name") or item.get("item_name", "Unknown"),
+            float(item.get("unit_price") or item.get("line_total", 0)),  # True unit price
+            float(item.get("share_quantity", 1)),
+            float(item.get("share_amount", 0)),
+        )
+
+    @property
+    def _is_sqlite(self) -> bool:
+        return self.db.get_bind().dialect.name == "sqlite"
+
+    def _upsert(self, model):
+        if self._is_sqlite:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
         else:
-            # Recalculate aggregates
-            prev_total = float(insight.total_spent or 0)
-            prev_qty = float(insight.total_quantity_bought or 0)
-            new_total = prev_total + line_total
-            new_qty = prev_qty + quantity
-            insight.total_spent = Decimal(str(new_total))
-            insight.total_quantity_bought = Decimal(str(new_qty))
-            insight.avg_unit_price = Decimal(str(new_total / new_qty)) if new_qty else Decimal("0")
-            if unit_price < float(insight.min_price or unit_price):
-                insight.min_price = Decimal(str(unit_price))
-            if unit_price > float(insight.max_price or 0):
-                insight.max_price = Decimal(str(unit_price))
-
-        self._dual_write_canonical_item(insight, normalized_name, user_email)
-
-        # Append to price history
-        history = ItemPriceHistory(
-            id=uuid.uuid4(),
-            item_insight_id=insight.id,
-            expense_id=uuid.UUID(str(expense_id)),
-            store_name=store_name,
-            date=purchased_at or datetime.utcnow(),
-            unit_price=Decimal(str(unit_price)),
-            quantity=Decimal(str(quantity)),
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert(model)
+
+    def _apply(self, deltas: _Deltas) -> None:
+        # Resolution may commit the entities it creates, so it runs before
+        # any insight row is touched.
+        merchant_names: Dict[str, List[str]] = defaultdict(list)
+        for user_email, merchant_name in deltas.merchants:
+            merchant_names[user_email].append(merchant_name)
+        item_names: Dict[str, List[str]] = defaultdict(list)
+        for (user_email, name), runs in deltas.items.items():
+            if any(isinstance(run, _ItemDelta) for run in runs):
+                item_names[user_email].append(name)
+        merchant_canonical = self._resolve_all(merchant_names, "merchant")
+        item_canonical = self._resolve_all(item_names, "item")
+
+        if deltas.merchants:
+            self._apply_merchant_deltas(deltas.merchants, merchant_canonical)
+        if deltas.items:
+            self._apply_item_runs(deltas, item_canonical)
+
+    # ------------------------------------------------------------------
+    # Internal: Item insight helpers
+    # ------------------------------------------------------------------
+
+    def _apply_item_runs(self, deltas: _Deltas, canonical: Dict[Tuple[str, str], Optional[uuid.UUID]]) -> None:
+        # Round k applies the k-th run of every name: names are independent
+        # rows, so only each name's own order matters.
+        insight_ids: Dict[Tuple[str, str], uuid.UUID] = {}
+        rounds = max(len(runs) for runs in deltas.items.values())
+        for k in range(rounds):
+            adds: Dict[Tuple[str, str], _ItemDelta] = {}
+            back_outs: Dict[Tuple[str, str], _ItemBackOut] = {}
+            for key, runs in deltas.items.items():
+                if k < len(runs):
+                    if isinstance(runs[k], _ItemDelta):
+                        adds[key] = runs[k]
+                    else:
+                        back_outs[key] = runs[k]
+            if adds:
+                insight_ids.update(self._upsert_items(adds, canonical))
+            if back_outs:
+                self._back_out_items(back_outs)
+
+        history = [
+            {"id": uuid.uuid4(), "item_insight_id": insight_ids[(user_email, name)], **row}
+            for user_email, name, row in deltas.history
+        ]
+        if history:
+            self.db.execute(insert(ItemPriceHistory), history)
+
+    def _upsert_items(
+        self,
+        adds: Dict[Tuple[str, str], _ItemDelta],
+        canonical: Dict[Tuple[str, str], Optional[uuid.UUID]],
+    ) -> Dict[Tuple[str, str], uuid.UUID]:
+        ins = self._upsert(ItemInsight).values([
+            {
+                "id": uuid.uuid4(),
+                "user_email": user_email,
+                "normalized_name": name,
+                "canonical_item_id": canonical.get((user_email, name)),
+                "avg_unit_price": _dec(delta.avg_unit_price),
+                "min_price": _dec(delta.min_price),
+                "max_price": _dec(delta.max_price),
+                "total_quantity_bought": _dec(delta.quantity),
+                "total_spent": _dec(delta.total),
+            }
+            for (user_email, name), delta in adds.items()
+        ])
+        new = ins.excluded
+        total = func.coalesce(ItemInsight.total_spent, 0) + new.total_spent
+        quantity = func.coalesce(ItemInsight.total_quantity_bought, 0) + new.total_quantity_bought
+        stmt = ins.on_conflict_do_update(
+            index_elements=[ItemInsight.user_email, ItemInsight.normalized_name],
+            set_={
+                "total_spent": total,
+                "total_quantity_bought": quantity,
+                "avg_unit_price": case((quantity != 0, total / quantity), else_=0),
+                # A stored min of 0 (or NULL) is left alone, as it always has
+                # been: 0 is what a fully backed-out row is reset to.
+                "min_price": case(
+                    (new.min_price < func.coalesce(func.nullif(ItemInsight.min_price, 0), new.min_price), new.min_price),
+                    else_=ItemInsight.min_price,
+                ),
+                "max_price": case(
+                    (new.max_price > func.coalesce(ItemInsight.max_price, 0), new.max_price),
+                    else_=ItemInsight.max_price,
+                ),
+                "canonical_item_id": func.coalesce(new.canonical_item_id, ItemInsight.canonical_item_id),
+                "updated_at": func.now(),
+            },
+        ).returning(ItemInsight.user_email, ItemInsight.normalized_name, ItemInsight.id)
+        return {(user_email, name): insight_id for user_email, name, insight_id in self.db.execute(stmt)}
+
+    def _back_out_items(self, back_outs: Dict[Tuple[str, str], _ItemBackOut]) -> None:
+        # Clamped at zero; we can't strictly restore min/max without
+        # re-scanning all history, so they are left as-is unless nothing is
+        # left, in which case the row reads as all zeros.
+        greatest = func.max if self._is_sqlite else func.greatest  # SQLite's two-argument max() is scalar
+        total = greatest(0, func.coalesce(ItemInsight.total_spent, 0) - bindparam("b_total", type_=ItemInsight.total_spent.type))
+        quantity = greatest(0, func.coalesce(ItemInsight.total_quantity_bought, 0) - bindparam("b_quantity", type_=ItemInsight.total_quantity_bought.type))
+        emptied = quantity == 0
+        stmt = (
+            update(ItemInsight.__table__)
+            .where(ItemInsight.user_email == bindparam("b_user"), ItemInsight.normalized_name == bindparam("b_name"))
+            .values(
+                total_spent=total,
+                total_quantity_bought=quantity,
+                avg_unit_price=case((emptied, 0), else_=total / quantity),
+                min_price=case((emptied, 0), else_=ItemInsight.min_price),
+                max_price=case((emptied, 0), else_=ItemInsight.max_price),
+                updated_at=func.now(),
+            )
         )
-        self.db.add(history)
+        self.db.connection().execute(stmt, [
+            {"b_user": user_email, "b_name": name, "b_total": _dec(b.total), "b_quantity": _dec(b.quantity)}
+            for (user_email, name), b in back_outs.items()
+        ])
 
     # ------------------------------------------------------------------
     # Internal: Merchant insight helpers
     # ------------------------------------------------------------------
 
-    def _update_merchant_insight(
+    def _apply_merchant_deltas(
         self,
-        user_email: str,
-        merchant_name: Optional[str],
-        purchased_at: Optional[datetime],
-        amount: float,
-        count_delta: int = 1,
+        deltas: Dict[Tuple[str, str], _MerchantDelta],
+        canonical: Dict[Tuple[str, str], Optional[uuid.UUID]],
     ) -> None:
-        if not merchant_name:
-            return  # Can't track without a merchant name
-
-        insight = (
-            self.db.query(MerchantInsight)
-            .filter(
-                MerchantInsight.user_email == user_email,
-                MerchantInsight.merchant_name == merchant_name,
+        """A key whose net count is positive is upserted; any other only
+        adjusts the rows that exist (removing never creates). Months are
+        split the same way by their own net count."""
+        adding = {key: d for key, d in deltas.items() if d.count > 0}
+        adjusting = {
+            key: d for key, d in deltas.items()
+            if d.count <= 0 and (d.amount or d.count or any(a or c for a, c in d.months.values()))
+        }
+        insight_ids: Dict[Tuple[str, str], uuid.UUID] = {}
+        if adding:
+            insight_ids.update(self._upsert_merchant_insights(adding, canonical))
+        if adjusting:
+            insight_ids.update(self._adjust_merchant_insights(adjusting, canonical))
+
+        months = [
+            (insight_ids[key], year, month, amount, count)
+            for key, delta in deltas.items() if key in insight_ids
+            for (year, month), (amount, count) in delta.months.items()
+            if amount or count
+        ]
+        upserts = [m for m in months if m[4] > 0]
+        updates = [m for m in months if m[4] <= 0]
+        if upserts:
+            ins = self._upsert(MerchantAggregate).values([
+                {
+                    "id": uuid.uuid4(), "merchant_insight_id": insight_id, "year": year, "month": month,
+                    "total_spent": _dec(amount), "transaction_count": count,
+                }
+                for insight_id, year, month, amount, count in upserts
+            ])
+            self.db.execute(ins.on_conflict_do_update(
+                index_elements=[MerchantAggregate.merchant_insight_id, MerchantAggregate.year, MerchantAggregate.month],
+                set_={
+                    "total_spent": func.coalesce(MerchantAggregate.total_spent, 0) + ins.excluded.total_spent,
+                    "transaction_count": func.coalesce(MerchantAggregate.transaction_count, 0) + ins.excluded.transaction_count,
+                    "updated_at": func.now(),
+                },
+            ))
+        if updates:
+            stmt = (
+                update(MerchantAggregate.__table__)
+                .where(
+                    MerchantAggregate.merchant_insight_id == bindparam("b_insight"),
+                    MerchantAggregate.year == bindparam("b_year"),
+                    MerchantAggregate.month == bindparam("b_month"),
+                )
+                .values(
+                    total_spent=func.coalesce(MerchantAggregate.total_spent, 0) + bindparam("b_amount", type_=MerchantAggregate.total_spent.type),
+                    transaction_count=func.coalesce(MerchantAggregate.transaction_count, 0) + bindparam("b_count"),
+                    updated_at=func.now(),
+                )
             )
-            .first()
-        )
+            self.db.connection().execute(stmt, [
+                {"b_insight": insight_id, "b_year": year, "b_month": month, "b_amount": _dec(amount), "b_count": count}
+                for insight_id, year, month, amount, count in updates
+            ])
 
-        if insight is None:
-            if count_delta <= 0:
-                return  # Don't create if removing
-            insight = MerchantInsight(
-                id=uuid.uuid4(),
-                user_email=user_email,
-                merchant_name=merchant_name,
-                total_spent=Decimal(str(amount)),
-                transaction_count=count_delta,
+    def _upsert_merchant_insights(
+        self,
+        deltas: Dict[Tuple[str, str], _MerchantDelta],
+        canonical: Dict[Tuple[str, str], Optional[uuid.UUID]],
+    ) -> Dict[Tuple[str, str], uuid.UUID]:
+        ins = self._upsert(MerchantInsight).values([
+            {
+                "id": uuid.uuid4(),
+                "user_email": user_email,
+                "merchant_name": merchant_name,
+                "canonical_merchant_id": canonical.get((user_email, merchant_name)),
+                "total_spent": _dec(delta.amount),
+                "transaction_count": delta.count,
+            }
+            for (user_email, merchant_name), delta in deltas.items()
+        ])
+        stmt = ins.on_conflict_do_update(
+            index_elements=[MerchantInsight.user_email, MerchantInsight.merchant_name],
+            set_={
+                "total_spent": func.coalesce(MerchantInsight.total_spent, 0) + ins.excluded.total_spent,
+                "transaction_count": func.coalesce(MerchantInsight.transaction_count, 0) + ins.excluded.transaction_count,
+                "canonical_merchant_id": func.coalesce(ins.excluded.canonical_merchant_id, MerchantInsight.canonical_merchant_id),
+                "updated_at": func.now(),
+            },
+        ).returning(MerchantInsight.user_email, MerchantInsight.merchant_name, MerchantInsight.id)
+        return {(user_email, name): insight_id for user_email, name, insight_id in self.db.execute(stmt)}
+
+    def _adjust_merchant_insights(
+        self,
+        deltas: Dict[Tuple[str, str], _MerchantDelta],
+        canonical: Dict[Tuple[str, str], Optional[uuid.UUID]],
+    ) -> Dict[Tuple[str, str], uuid.UUID]:
+        # Don't create if removing: only rows that exist are adjusted.
+        self.db.flush()
+        rows = self.db.execute(
+            select(MerchantInsight.user_email, MerchantInsight.merchant_name, MerchantInsight.id).where(
+                MerchantInsight.user_email.in_({user_email for user_email, _ in deltas}),
+                MerchantInsight.merchant_name.in_({name for _, name in deltas}),
             )
-            self.db.add(insight)
-            self.db.flush()
-        else:
-            insight.total_spent = Decimal(str(float(insight.total_spent or 0) + amount))
-            insight.transaction_count = (insight.transaction_count or 0) + count_delta
-
-        self._dual_write_canonical_merchant(insight, merchant_name, user_email)
-
-        # Update monthly aggregate
-        dt = purchased_at or datetime.utcnow()
-        agg = (
-            self.db.query(MerchantAggregate)
-            .filter(
-                MerchantAggregate.merchant_insight_id == insight.id,
-                MerchantAggregate.year == dt.year,
-                MerchantAggregate.month == dt.month,
+        ).all()
+        insight_ids = {(u, n): i for u, n, i in rows if (u, n) in deltas}
+        if not insight_ids:
+            return insight_ids
+        stmt = (
+            update(MerchantInsight.__table__)
+            .where(MerchantInsight.id == bindparam("b_id"))
+            .values(
+                total_spent=func.coalesce(MerchantInsight.total_spent, 0) + bindparam("b_amount", type_=MerchantInsight.total_spent.type),
+                transaction_count=func.coalesce(MerchantInsight.transaction_count, 0) + bindparam("b_count"),
+                canonical_merchant_id=func.coalesce(
+                    bindparam("b_canonical", type_=MerchantInsight.canonical_merchant_id.type),
+                    MerchantInsight.canonical_merchant_id,
+                ),
+                updated_at=func.now(),
             )
-            .first()
         )
-        if agg is None:
-            if count_delta > 0:
-                agg = MerchantAggregate(
-                    id=uuid.uuid4(),
-                    merchant_insight_id=insight.id,
-                    year=dt.year,
-                    month=dt.month,
-                    total_spent=Decimal(str(amount)),
-                    transaction_count=count_delta,
-                )
-                self.db.add(agg)
-        else:
-            agg.total_spent = Decimal(str(float(agg.total_spent or 0) + amount))
-            agg.transaction_count = (agg.transaction_count or 0) + count_delta
+        self.db.connection().execute(stmt, [
+            {
+                "b_id": insight_id, "b_amount": _dec(deltas[key].amount), "b_count": deltas[key].count,
+                "b_canonical": canonical.get(key),
+            }
+            for key, insight_id in insight_ids.items()
+        ])
+        return insight_ids
 
     # ------------------------------------------------------------------
     # Dual-write helpers (TS-ENT-1xx, spec §14.2)
     # ------------------------------------------------------------------
 
-    def _dual_write_canonical_item(self, insight: ItemInsight, normalized_name: str, user_email: str) -> None:
+    def _resolve_all(self, names: Dict[str, List[str]], entity_type: str) -> Dict[Tuple[str, str], Optional[uuid.UUID]]:
+        canonical: Dict[Tuple[str, str], Optional[uuid.UUID]] = {}
+        for user_email, user_names in names.items():
+            for name, canonical_id in self._resolve_many(user_names, entity_type, user_email).items():
+                canonical[(user_email, name)] = canonical_id
+        return canonical
+
+    def _resolve_many(self, names: List[str], entity_type: str, user_email: str) -> Dict[str, Optional[uuid.UUID]]:
         try:
-            result = self._resolver.resolve(normalized_name, "item", user_email)
+            results = self._resolver.resolve_many(names, entity_type, user_email)
         except Exception:
             # Never let entity resolution break an insight write — the
             # string-keyed side (still the only side any read path uses) must
             # always succeed regardless of this best-effort FK population.
             logger.exception(
-                "Entity resolution failed for item '%s' (user=%s); leaving canonical_item_id unset",
-                normalized_name, user_email,
-            )
-            return
-        if result.canonical is not None:
-            insight.canonical_item_id = uuid.UUID(result.canonical.id)
-
-    def _dual_write_canonical_merchant(self, insight: MerchantInsight, merchant_name: str, user_email: str) -> None:
-        try:
-            result = self._resolver.resolve(merchant_name, "merchant", user_email)
-        except Exception:
-            logger.exception(
-                "Entity resolution failed for merchant '%s' (user=%s); leaving canonical_merchant_id unset",
-                merchant_name, user_email,
+                "Entity resolution failed for %d %s names (user=%s); leaving canonical ids unset",
+                len(names), entity_type, user_email,
             )
-            return
-        if result.canonical is not None:
-            insight.canonical_merchant_id = uuid.UUID(result.canonical.id)
+            return {}
+        return {
+            name: uuid.UUID(result.canonical.id) if result.canonical is not None else None
+            for name, result in zip(names, results)
+        }
@@ -0,0 +1,299 @@
+"""Applies the insight aggregation outbox (InsightsOutbox) off the request path.
+
+enqueue() records an InsightsAggregationService call as an outbox row on the
+caller's session without committing, so an expense mutation and its insight
+event commit (or roll back) together and nothing is lost if the process dies
+right after the response. A worker pass:
+
+1. claims up to CLAIM_SIZE due rows in seq (insert) order, by pushing their available_at
+   forward by LEASE (FOR UPDATE SKIP LOCKED on Postgres, so concurrent workers never
+   claim the same row; if a worker dies mid-pass the lease lapses and the rows are
+   retried);
+2. replays them in order inside InsightsAggregationService.coalesce(), so the whole
+   claim becomes one net delta per (user, merchant), (user, merchant, month) and
+   (user, item) -- five edits of one expense are one adjustment, not five back-out/
+   re-apply passes -- applied with one set of statements;
+3. deletes the rows in the transaction that applies them, so each event is applied
+   exactly once.
+
+If a claim fails as a whole, its events are applied one at a time so one bad event
+cannot hold up the rest; a failing event is rescheduled with backoff and parked as
+status "dead" after MAX_ATTEMPTS. Later events of that claim touching any of its
+(user, merchant) or (user, item) aggregates are held back until its retry, so
+they cannot overtake it.
+
+Merchant deltas are sums, so the order events apply in does not matter to them.
+An item's add and later back-out do depend on order: one worker keeps it, but two
+workers holding claims at once may apply them out of order.
+
+lag() reports pending and dead counts and the age of the oldest pending event
+(GET /healthz/insights serves it); the worker logs a warning while that age is over
+INSIGHTS_LAG_WARN_SEC. run_in_thread() starts a worker beside the API (main.py does
+so unless INSIGHTS_WORKER_IN_PROCESS is off) which, once stopped, drains due events
+for up to INSIGHTS_DRAIN_TIMEOUT_SEC before exiting; scripts/run_insights_worker.py
+runs one as a process of its own.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from varavu_selavu_service.core.config import Settings
+from varavu_selavu_service.db.models import InsightsOutbox
+from varavu_selavu_service.services.insights_aggregation_service import InsightsAggregationService
+
+logger = logging.getLogger("varavu_selavu.insights_outbox")
+
+# InsightsAggregationService entry points an event may name (without "on_").
+EVENTS = frozenset({
+    "expense_with_items_created",
+    "simple_expense_created",
+    "simple_expense_updated",
+    "expense_deleted",
+    "group_expense_created",
+    "group_expense_updated",
+    "group_expense_deleted",
+    "group_expense_with_items_created",
+})
+
+
+@dataclass
+class _Event:
+    id: uuid.UUID
+    event_type: str
+    payload: dict
+    attempts: int
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(dt: datetime) -> datetime:
+    # SQLite hands timestamps back naive; they are stored as UTC.
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: dict) -> Any:
+    if set(obj) == {"$datetime"}:
+        return datetime.fromisoformat(obj["$datetime"])
+    return obj
+
+
+def _keys(payload: dict) -> Set[Tuple[str, str, Optional[str]]]:
+    """The (user, merchant) and (user, item) aggregates an event's payload touches."""
+    users = {payload["user_email"]} if payload.get("user_email") else set()
+    for field in ("member_shares", "old_member_shares", "new_member_shares"):
+        users.update(payload.get(field) or {})
+    merchants = {payload[f] for f in ("merchant_name", "old_merchant_name", "new_merchant_name") if f in payload}
+    keys = {("merchant", user, merchant) for user in users for merchant in merchants}
+    item_lists = dict(payload.get("member_item_shares") or {})
+    if payload.get("user_email"):
+        item_lists[payload["user_email"]] = [*item_lists.get(payload["user_email"], []), *(payload.get("items") or [])]
+    for user, items in item_lists.items():
+        keys.update(("item", user, item.get("normalized_name") or item.get("item_name", "Unknown")) for item in items)
+    return keys
+
+
+def enqueue(db: Session, event_type: str, **kwargs) -> None:
+    """Queues InsightsAggregationService.on_<event_type>(**kwargs) on `db` without
+    committing: the event is written by the caller's next commit, together with the
+    mutation it describes."""
+    if event_type not in EVENTS:
+        raise ValueError(f"Unknown insights event {event_type!r}")
+    db.add(
+        InsightsOutbox(
+            id=uuid.uuid4(),
+            event_type=event_type,
+            payload=json.loads(json.dumps(kwargs, default=_encode)),
+            status="pending",
+            attempts=0,
+            available_at=_utcnow(),
+        )
+    )
+
+
+def lag(db: Session) -> Dict[str, Any]:
+    """Pending and dead event counts, and how long the oldest pending event has
+    been waiting (0 when none is)."""
+    counts = {"pending": 0, "dead": 0}
+    oldest = None
+    rows = (
+        db.query(InsightsOutbox.status, func.count(InsightsOutbox.id), func.min(InsightsOutbox.created_at))
+        .group_by(InsightsOutbox.status)
+        .all()
+    )
+    for status, count, first in rows:
+        counts[status] = count
+        if status == "pending":
+            oldest = first
+    lag_seconds = max(0.0, (_utcnow() - _aware(oldest)).total_seconds()) if oldest is not None else 0.0
+    return {**counts, "lag_seconds": lag_seconds}
+
+
+class InsightsOutboxWorker:
+    CLAIM_SIZE = 500
+    LEASE = timedelta(minutes=2)
+    MAX_ATTEMPTS = 8
+    RETRY_BASE = timedelta(seconds=30)
+    RETRY_CAP = timedelta(hours=1)
+    LAG_CHECK_INTERVAL_SEC = 60
+
+    def __init__(self, session_factory, settings: Optional[Settings] = None):
+        """`session_factory` makes a fresh Session per step (db.session.SessionLocal
+        in production)."""
+        self.session_factory = session_factory
+        self.settings = settings or Settings()
+        self._lag_checked_at = 0.0
+
+    def run_once(self) -> int:
+        """Claims and applies one batch of due events; returns how many it claimed."""
+        events = self._claim()
+        if events and not self._apply(events):
+            held: Dict[tuple, datetime] = {}  # aggregate key -> when its failed event retries
+            for event in events:
+                keys = _keys(event.payload)
+                until = max((held[k] for k in keys if k in held), default=None)
+                if until is not None:
+                    self._hold(event, until)
+                elif not self._apply([event]) and event.attempts < self.MAX_ATTEMPTS:
+                    until = _utcnow() + self._backoff(event.attempts)
+                if until is not None:
+                    held.update((k, max(until, held.get(k, until))) for k in keys)
+        return len(events)
+
+    def drain(self, timeout: Optional[float] = None) -> int:
+        """Applies due events until none is left or `timeout` seconds have passed;
+        returns how many it claimed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        total = 0
+        while deadline is None or time.monotonic() < deadline:
+            claimed = self.run_once()
+            total += claimed
+            if claimed < self.CLAIM_SIZE:
+                break
+        return total
+
+    def _claim(self) -> List[_Event]:
+        now = _utcnow()
+        with self.session_factory() as db:
+            rows = (
+                db.query(InsightsOutbox)
+                .filter(InsightsOutbox.status == "pending", InsightsOutbox.available_at <= now)
+                .order_by(InsightsOutbox.seq)
+                .limit(self.CLAIM_SIZE)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            events = []
+            for row in rows:
+                row.available_at = now + self.LEASE
+                row.attempts += 1
+                events.append(_Event(row.id, row.event_type, dict(row.payload or {}), row.attempts))
+            db.commit()
+        return events
+
+    def _apply(self, events: List[_Event]) -> bool:
+        with self.session_factory() as db:
+            svc = InsightsAggregationService(db)
+            try:
+                with svc.coalesce():
+                    for e in events:
+                        if e.event_type not in EVENTS:
+                            raise ValueError(f"Unknown insights event {e.event_type!r}")
+                        payload = json.loads(json.dumps(e.payload), object_hook=_decode)
+                        getattr(svc, f"on_{e.event_type}")(**payload)
+                db.query(InsightsOutbox).filter(
+                    InsightsOutbox.id.in_([e.id for e in events])
+                ).delete(synchronize_session=False)
+                db.commit()
+                return True
+            except Exception as exc:
+                db.rollback()
+                if len(events) > 1:
+                    logger.warning("Applying %d insight events together failed (%r); applying them one at a time", len(events), exc)
+                else:
+                    self._fail(db, events[0], exc)
+                return False
+
+    def _fail(self, db: Session, event: _Event, exc: Exception) -> None:
+        values = {"last_error": repr(exc)[:1000]}
+        if event.attempts >= self.MAX_ATTEMPTS:
+            values["status"] = "dead"
+            logger.error("Giving up on insights event %s (%s) after %d attempts", event.id, event.event_type, event.attempts)
+        else:
+            logger.warning("Insights event %s (%s) failed: %r", event.id, event.event_type, exc)
+            values["available_at"] = _utcnow() + self._backoff(event.attempts)
+        db.query(InsightsOutbox).filter(InsightsOutbox.id == event.id).update(values, synchronize_session=False)
+        db.commit()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        return min(self.RETRY_BASE * 2 ** (attempts - 1), self.RETRY_CAP)
+
+    def _hold(self, event: _Event, until: datetime) -> None:
+        """Puts an event back, unapplied and without spending an attempt, to be
+        claimed again no earlier than the failed event it must not overtake."""
+        with self.session_factory() as db:
+            db.query(InsightsOutbox).filter(InsightsOutbox.id == event.id).update(
+                {"available_at": until, "attempts": InsightsOutbox.attempts - 1}, synchronize_session=False,
+            )
+            db.commit()
+
+    def _check_lag(self) -> None:
+        if time.monotonic() - self._lag_checked_at < self.LAG_CHECK_INTERVAL_SEC:
+            return
+        self._lag_checked_at = time.monotonic()
+        with self.session_factory() as db:
+            stats = lag(db)
+        if stats["lag_seconds"] > self.settings.INSIGHTS_LAG_WARN_SEC:
+            logger.warning(
+                "Insights outbox is %.0fs behind (%d pending, %d dead)",
+                stats["lag_seconds"], stats["pending"], stats["dead"],
+            )
+
+    def run_forever(self, stop: threading.Event) -> None:
+        """Polls until `stop` is set, then drains for up to INSIGHTS_DRAIN_TIMEOUT_SEC."""
+        while not stop.is_set():
+            claimed = 0
+            try:
+                claimed = self.run_once()
+                self._check_lag()
+            except Exception:
+                logger.exception("Insights outbox pass failed")
+            if claimed < self.CLAIM_SIZE:  # caught up: wait for more
+                stop.wait(self.settings.INSIGHTS_POLL_INTERVAL_SEC)
+        try:
+            drained = self.drain(self.settings.INSIGHTS_DRAIN_TIMEOUT_SEC)
+            if drained:
+                logger.info("Applied %d insight event(s) while shutting down", drained)
+        except Exception:
+            logger.exception("Draining the insights outbox failed")
+
+
+def run_in_thread(session_factory, settings: Optional[Settings] = None) -> Tuple[threading.Thread, threading.Event]:
+    """Runs a worker in a daemon thread. Set the returned event to stop it; the
+    thread exits once it has drained the outbox (or run out of drain time)."""
+    stop = threading.Event()
+    worker = InsightsOutboxWorker(session_factory, settings)
+    thread = threading.Thread(target=worker.run_forever, args=(stop,), name="insights-outbox", daemon=True)
+    thread.start()
+    return thread, stop
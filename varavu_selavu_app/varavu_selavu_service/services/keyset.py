@@ -0,0 +1,99 @@
+"""Keyset ("seek") pagination over (purchased_at, id), newest first.
+
+A page is read by seeking past the previous page's last key rather than with
+OFFSET, so page N costs the same as page 1: with idx_expenses_personal_user_purchased
+or idx_expenses_group_purchased it is an index walk that stops after limit + 1 rows.
+
+Undated rows (purchased_at IS NULL) sort after every dated row. Rather than an
+`ORDER BY purchased_at IS NULL` that no index can serve, newest_first_page() reads
+the dated rows first and, once they run out, continues with the undated ones
+ordered by id — two index-friendly reads, the second only on the page where the
+dated rows end.
+
+Cursors are opaque urlsafe-base64 JSON; decode_cursor() raises ValueError on
+anything malformed, which routes turn into a 400.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+Key = Tuple[Optional[datetime], uuid.UUID]
+
+
+def encode_cursor(purchased_at: Optional[datetime], row_id) -> str:
+    raw = json.dumps({"t": purchased_at.isoformat() if purchased_at else None, "id": str(row_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Key:
+    """Raises ValueError on a malformed cursor."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        purchased_at = datetime.fromisoformat(raw["t"]) if raw["t"] else None
+        return purchased_at, uuid.UUID(raw["id"])
+    except (KeyError, TypeError, AttributeError, json.JSONDecodeError, UnicodeDecodeError, binascii.Error) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def newest_first_page(
+    query,
+    at_col,
+    id_col,
+    limit: int,
+    after: Optional[Key] = None,
+    key: Callable[[Any], Key] = lambda row: (row.purchased_at, row.id),
+) -> Tuple[List[Any], Optional[str]]:
+    """One page of `query` (an ORM Query) ordered at_col DESC, id_col DESC with
+    undated rows last, starting after the key `after`. Returns (rows, next_cursor);
+    next_cursor is None on the last page."""
+    rows: List[Any] = []
+    if after is None or after[0] is not None:
+        dated = query.filter(at_col.isnot(None))
+        if after is not None:
+            dated = dated.filter(tuple_(at_col, id_col) < tuple_(after[0], after[1]))
+        rows = dated.order_by(at_col.desc(), id_col.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        undated = query.filter(at_col.is_(None))
+        if after is not None and after[0] is None:
+            undated = undated.filter(id_col < after[1])
+        rows += undated.order_by(id_col.desc()).limit(limit + 1 - len(rows)).all()
+
+    page = rows[:limit]
+    next_cursor = encode_cursor(*key(page[-1])) if len(rows) > limit else None
+    return page, next_cursor
+
+
+def offset_page(query, at_col, id_col, limit: int, offset: int) -> Tuple[List[Any], bool]:
+    """The same order as newest_first_page() by OFFSET, for clients that still page
+    by offset. Returns (rows, has_more)."""
+    rows = (
+        query.order_by(at_col.is_(None), at_col.desc(), id_col.desc())
+        .offset(offset)
+        .limit(limit + 1)
+        .all()
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def listing_page(
+    query, at_col, id_col, limit: int, offset: int = 0, cursor: Optional[str] = None,
+) -> Tuple[List[Any], Optional[str], Optional[int]]:
+    """A listing page in either mode: by keyset when given a cursor (or on the first
+    page), by offset otherwise, so offset-paging clients keep working. Returns
+    (rows, next_cursor, next_offset); next_offset is set in offset mode and on a
+    first page with more to come. Raises ValueError on a malformed cursor."""
+    if cursor or offset == 0:
+        after = decode_cursor(cursor) if cursor else None
+        rows, next_cursor = newest_first_page(query, at_col, id_col, limit, after)
+        return rows, next_cursor, limit if not cursor and next_cursor else None
+    rows, has_more = offset_page(query, at_col, id_col, limit, offset)
+    if not has_more:
+        return rows, None, None
+    return rows, encode_cursor(getattr(rows[-1], at_col.key), getattr(rows[-1], id_col.key)), offset + limit
@@ -0,0 +1,530 @@
+"""Delivers the notification outbox (NotificationOutbox) through Expo's push API.
+
+NotificationService.enqueue records each group event on the request's session;
+nothing about delivery runs on the request worker. A dispatcher pass:
+
+1. claims up to CLAIM_SIZE due rows by pushing their available_at forward by LEASE
+   (FOR UPDATE SKIP LOCKED on Postgres, so concurrent dispatchers never claim the
+   same row; if a dispatcher dies mid-send the lease lapses and the row is retried);
+2. resolves groups, recipients, preferences and device tokens for the whole claim
+   with one query each, where the request-time path ran a preference query and a
+   token query per recipient;
+3. coalesces: an expense or comment event reaches a recipient who was pushed about
+   the same group within NOTIFICATION_COALESCE_WINDOW_SEC (or who has a digest
+   preference) through their NotificationDigest instead, and digests whose window
+   has closed go out as one summary push each;
+4. packs the messages into Expo's 100-message requests, keeping each event's
+   messages together where they fit, and sends the requests concurrently over one
+   pooled httpx.AsyncClient, retrying transport errors, 429s and 5xxs with backoff;
+5. deletes delivered events, reschedules failed ones with backoff (status "dead"
+   after MAX_ATTEMPTS), prunes tokens whose ticket says DeviceNotRegistered, and
+   records every accepted ticket as a PushTicket.
+
+Every RECEIPT_INTERVAL it also fetches receipts for tickets at least RECEIPT_DELAY
+old (Expo's guidance is ~15 minutes) and prunes tokens whose receipt says
+DeviceNotRegistered.
+
+Delivery is at least once: an event whose messages span two Expo requests, one of
+which fails, is retried whole.
+
+run_in_thread() starts a dispatcher beside the API (main.py does so unless
+NOTIFICATION_DISPATCHER_IN_PROCESS is off); scripts/run_notification_dispatcher.py
+runs one as a process of its own.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import httpx
+
+from varavu_selavu_service.core.config import Settings
+from varavu_selavu_service.db.models import (
+    DeviceToken,
+    Group,
+    GroupMember,
+    GroupNotificationPreference,
+    NotificationDigest,
+    NotificationOutbox,
+    PushTicket,
+)
+from varavu_selavu_service.services.notification_service import (
+    COALESCIBLE_EVENTS,
+    build_body,
+    build_digest_body,
+    digest_item,
+    is_suppressed,
+)
+
+logger = logging.getLogger("varavu_selavu.notifications")
+
+EXPO_BATCH_SIZE = 100  # Expo's push API caps a single request at 100 messages.
+EXPO_RECEIPT_BATCH_SIZE = 1000  # ...and a receipts request at 1000 ids.
+
+
+@dataclass
+class _Event:
+    id: uuid.UUID
+    group_id: uuid.UUID
+    actor_email: str
+    event_type: str
+    payload: dict
+    attempts: int
+
+
+@dataclass
+class _Digest:
+    id: uuid.UUID
+    user_email: str
+    group_id: uuid.UUID
+    items: List[dict]
+
+
+@dataclass
+class _Message:
+    source_id: uuid.UUID  # the outbox event or digest it delivers
+    user_email: str
+    expo: dict
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(dt: datetime) -> datetime:
+    # SQLite hands timestamps back naive; they are stored as UTC.
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+def _expo_message(token: str, group_id: uuid.UUID, body: str) -> dict:
+    return {
+        "to": token,
+        "title": "TrackSpense",
+        "body": body,
+        "data": {"deep_link": f"trackspense://groups/{group_id}", "group_id": str(group_id)},
+    }
+
+
+def _tokens(db, emails) -> Dict[str, List[str]]:
+    tokens: Dict[str, List[str]] = defaultdict(list)
+    if emails:
+        for email, token in db.query(DeviceToken.user_email, DeviceToken.expo_push_token).filter(
+            DeviceToken.user_email.in_(emails)
+        ):
+            tokens[email].append(token)
+    return tokens
+
+
+def _pack(messages: List[_Message]) -> List[List[_Message]]:
+    """Expo requests of at most EXPO_BATCH_SIZE messages. An event (or digest) is
+    kept in one request where it fits, so a failed request retries as few events as
+    possible; only an event with more messages than that spans several."""
+    by_source: Dict[uuid.UUID, List[_Message]] = {}
+    for m in messages:
+        by_source.setdefault(m.source_id, []).append(m)
+
+    batches: List[List[_Message]] = []
+    current: List[_Message] = []
+    for event_messages in by_source.values():
+        if current and len(current) + len(event_messages) > EXPO_BATCH_SIZE:
+            batches.append(current)
+            current = []
+        for m in event_messages:
+            if len(current) == EXPO_BATCH_SIZE:
+                batches.append(current)
+                current = []
+            current.append(m)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _prune(db, stale: Iterable[Tuple[str, str]]) -> None:
+    for user_email, token in stale:
+        db.query(DeviceToken).filter(
+            DeviceToken.user_email == user_email, DeviceToken.expo_push_token == token
+        ).delete(synchronize_session=False)
+
+
+class NotificationDispatcher:
+    CLAIM_SIZE = 200
+    LEASE = timedelta(minutes=2)
+    MAX_ATTEMPTS = 8
+    RETRY_BASE = timedelta(seconds=30)
+    RETRY_CAP = timedelta(hours=1)
+    SEND_RETRIES = 3
+    SEND_BACKOFF_SEC = 0.5
+    RECEIPT_DELAY = timedelta(minutes=15)
+    RECEIPT_TTL = timedelta(hours=24)  # Expo keeps receipts for a day.
+    RECEIPT_INTERVAL_SEC = 300
+
+    def __init__(self, session_factory, settings: Optional[Settings] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """`session_factory` makes a fresh Session per step (db.session.SessionLocal
+        in production); `transport` lets tests point the client at a fake Expo."""
+        self.session_factory = session_factory
+        self.settings = settings or Settings()
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._receipts_checked_at = 0.0
+
+    async def __aenter__(self) -> "NotificationDispatcher":
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if self.settings.EXPO_ACCESS_TOKEN:
+            headers["Authorization"] = f"Bearer {self.settings.EXPO_ACCESS_TOKEN}"
+        concurrency = max(1, self.settings.NOTIFICATION_DISPATCH_CONCURRENCY)
+        self._client = httpx.AsyncClient(
+            headers=headers,
+            timeout=10,
+            transport=self._transport,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self._slots = asyncio.Semaphore(concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._client.aclose()
+        self._client = None
+
+    # ------------------------------------------------------------------
+    # Outbox
+    # ------------------------------------------------------------------
+
+    async def run_once(self) -> int:
+        """Claims and delivers one batch of due events and of digests whose window
+        has closed; returns how many of them it claimed."""
+        events = self._claim()
+        digests = self._claim_digests()
+        if not events and not digests:
+            return 0
+        messages = (self._resolve(events) if events else []) + (self._resolve_digests(digests) if digests else [])
+        batches = _pack(messages)
+        results = await asyncio.gather(
+            *(self._post(self.settings.EXPO_PUSH_URL, [m.expo for m in batch]) for batch in batches),
+            return_exceptions=True,
+        )
+        self._settle(events, digests, batches, results)
+        return len(events) + len(digests)
+
+    def _claim(self) -> List[_Event]:
+        now = _utcnow()
+        with self.session_factory() as db:
+            rows = (
+                db.query(NotificationOutbox)
+                .filter(NotificationOutbox.status == "pending", NotificationOutbox.available_at <= now)
+                .order_by(NotificationOutbox.available_at)
+                .limit(self.CLAIM_SIZE)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            events = []
+            for row in rows:
+                row.available_at = now + self.LEASE
+                row.attempts += 1
+                events.append(_Event(row.id, row.group_id, row.actor_email, row.event_type, dict(row.payload or {}), row.attempts))
+            db.commit()
+        return events
+
+    def _resolve(self, events: List[_Event]) -> List[_Message]:
+        now = _utcnow()
+        group_ids = {e.group_id for e in events}
+        messages: List[_Message] = []
+        with self.session_factory() as db:
+            group_names = dict(db.query(Group.id, Group.name).filter(Group.id.in_(group_ids)).all())
+            members = (
+                db.query(GroupMember)
+                .filter(
+                    GroupMember.group_id.in_(group_ids),
+                    GroupMember.status == "active",
+                    GroupMember.user_email.isnot(None),
+                )
+                .all()
+            )
+            prefs = {
+                (p.group_id, p.user_email): p
+                for p in db.query(GroupNotificationPreference).filter(GroupNotificationPreference.group_id.in_(group_ids))
+            }
+            emails = {m.user_email for m in members}
+            tokens = _tokens(db, emails)
+            digests: Dict[Tuple[uuid.UUID, str], NotificationDigest] = {}
+            if emails and any(e.event_type in COALESCIBLE_EVENTS for e in events):
+                digests = {
+                    (d.group_id, d.user_email): d
+                    for d in db.query(NotificationDigest)
+                    .filter(NotificationDigest.group_id.in_(group_ids), NotificationDigest.user_email.in_(emails))
+                    .with_for_update()
+                }
+
+            members_by_group: Dict[uuid.UUID, List[GroupMember]] = defaultdict(list)
+            for m in members:
+                members_by_group[m.group_id].append(m)
+
+            for e in events:
+                group_name = group_names.get(e.group_id)
+                if group_name is None:
+                    continue
+                group_members = members_by_group[e.group_id]
+                actor = next((m for m in group_members if m.user_email == e.actor_email), None)
+                actor_name = actor.display_name if actor is not None else e.actor_email
+                exclude_emails = {e.actor_email} | set(e.payload.get("exclude_emails") or [])
+                for member in group_members:
+                    if member.user_email in exclude_emails or not tokens.get(member.user_email):
+                        continue
+                    pref = prefs.get((e.group_id, member.user_email))
+                    if is_suppressed(pref, e.event_type):
+                        continue
+                    body = build_body(e.event_type, actor_name, group_name, member.id, e.payload)
+                    if not body:
+                        continue
+                    if e.event_type in COALESCIBLE_EVENTS:
+                        item = digest_item(e.id, e.event_type, actor_name, member.id, e.payload, body)
+                        if not self._push_now(db, digests, e.group_id, member.user_email, pref, item, now):
+                            continue
+                    for token in tokens[member.user_email]:
+                        messages.append(_Message(e.id, member.user_email, _expo_message(token, e.group_id, body)))
+            db.commit()
+        return messages
+
+    def _push_now(self, db, digests, group_id, user_email, pref, item, now) -> bool:
+        """Whether a coalescible event goes to `user_email` right away. If not, it
+        has been collected into their NotificationDigest for the group instead."""
+        digest_minutes = pref.digest_minutes if pref is not None else None
+        if digest_minutes:
+            window = timedelta(minutes=digest_minutes)
+        else:
+            window = timedelta(seconds=self.settings.NOTIFICATION_COALESCE_WINDOW_SEC)
+        if not window:
+            return True
+
+        digest = digests.get((group_id, user_email))
+        if digest is not None and (digest.item_count or _aware(digest.window_ends_at) > now):
+            if all(i["event_id"] != item["event_id"] for i in digest.items):  # a retried event is collected once
+                digest.items = digest.items + [item]
+                digest.item_count = len(digest.items)
+            return False
+
+        if digest is None:
+            digest = NotificationDigest(id=uuid.uuid4(), user_email=user_email, group_id=group_id)
+            db.add(digest)
+            digests[(group_id, user_email)] = digest
+        # A new window: a digest holds even its first event; otherwise the first
+        # event goes out now and only the rest of the burst is collected.
+        digest.mode = "digest" if digest_minutes else "coalesce"
+        digest.items = [item] if digest_minutes else []
+        digest.item_count = len(digest.items)
+        digest.window_ends_at = now + window
+        return not digest_minutes
+
+    def _claim_digests(self) -> List[_Digest]:
+        now = _utcnow()
+        with self.session_factory() as db:
+            rows = (
+                db.query(NotificationDigest)
+                .filter(NotificationDigest.window_ends_at <= now)
+                .order_by(NotificationDigest.window_ends_at)
+                .limit(self.CLAIM_SIZE)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            digests = []
+            for row in rows:
+                if not row.item_count:
+                    db.delete(row)  # the window closed without collecting anything
+                    continue
+                # Leased like outbox rows; events arriving meanwhile are appended
+                # and stay behind when these items are cleared.
+                row.window_ends_at = now + self.LEASE
+                digests.append(_Digest(row.id, row.user_email, row.group_id, list(row.items)))
+            db.commit()
+        return digests
+
+    def _resolve_digests(self, digests: List[_Digest]) -> List[_Message]:
+        with self.session_factory() as db:
+            group_names = dict(
+                db.query(Group.id, Group.name).filter(Group.id.in_({d.group_id for d in digests})).all()
+            )
+            tokens = _tokens(db, {d.user_email for d in digests})
+        messages: List[_Message] = []
+        for d in digests:
+            body = build_digest_body(group_names.get(d.group_id, "your group"), d.items)
+            for token in tokens.get(d.user_email, []):
+                messages.append(_Message(d.id, d.user_email, _expo_message(token, d.group_id, body)))
+        return messages
+
+    def _settle(
+        self, events: List[_Event], digests: List[_Digest], batches: List[List[_Message]], results: list
+    ) -> None:
+        now = _utcnow()
+        failed: Dict[uuid.UUID, str] = {}
+        tickets: List[PushTicket] = []
+        stale: Set[Tuple[str, str]] = set()
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                logger.warning("Expo push send failed for a batch of %d messages: %r", len(batch), result)
+                for m in batch:
+                    failed[m.source_id] = repr(result)
+                continue
+            for m, ticket in zip(batch, (result or {}).get("data") or []):
+                if not isinstance(ticket, dict):
+                    continue
+                if ticket.get("status") == "ok" and ticket.get("id"):
+                    tickets.append(PushTicket(ticket_id=ticket["id"], user_email=m.user_email, expo_push_token=m.expo["to"], created_at=now))
+                elif ticket.get("status") == "error":
+                    error_code = (ticket.get("details") or {}).get("error")
+                    if error_code == "DeviceNotRegistered":
+                        stale.add((m.user_email, m.expo["to"]))
+                    else:
+                        logger.warning("Expo rejected a push (%s): %s", error_code, ticket.get("message"))
+
+        with self.session_factory() as db:
+            delivered = [e.id for e in events if e.id not in failed]
+            if delivered:
+                db.query(NotificationOutbox).filter(NotificationOutbox.id.in_(delivered)).delete(synchronize_session=False)
+            for e in events:
+                if e.id not in failed:
+                    continue
+                values = {"last_error": failed[e.id][:1000]}
+                if e.attempts >= self.MAX_ATTEMPTS:
+                    values["status"] = "dead"
+                    logger.error("Giving up on notification %s (%s) after %d attempts", e.id, e.event_type, e.attempts)
+                else:
+                    values["available_at"] = now + min(self.RETRY_BASE * 2 ** (e.attempts - 1), self.RETRY_CAP)
+                db.query(NotificationOutbox).filter(NotificationOutbox.id == e.id).update(values, synchronize_session=False)
+            if digests:
+                self._settle_digests(db, digests, failed, now)
+            db.add_all(tickets)
+            _prune(db, stale)
+            db.commit()
+
+    def _settle_digests(self, db, digests: List[_Digest], failed: Dict[uuid.UUID, str], now: datetime) -> None:
+        sent = {d.id: len(d.items) for d in digests}
+        rows = db.query(NotificationDigest).filter(NotificationDigest.id.in_(sent)).with_for_update().all()
+        for row in rows:
+            if row.id in failed:
+                row.window_ends_at = now + self.RETRY_BASE
+                continue
+            row.items = row.items[sent[row.id]:]
+            row.item_count = len(row.items)
+            if row.mode == "coalesce":
+                # Keep collecting while the burst lasts.
+                row.window_ends_at = now + timedelta(seconds=self.settings.NOTIFICATION_COALESCE_WINDOW_SEC)
+            elif row.items:
+                row.window_ends_at = now  # arrived during the send; goes out next pass
+            else:
+                db.delete(row)
+
+    # ------------------------------------------------------------------
+    # Receipts
+    # ------------------------------------------------------------------
+
+    async def check_receipts(self) -> int:
+        """Fetches receipts for tickets old enough to have one; returns how many
+        tickets it resolved (and deleted)."""
+        now = _utcnow()
+        concurrency = max(1, self.settings.NOTIFICATION_DISPATCH_CONCURRENCY)
+        with self.session_factory() as db:
+            db.query(PushTicket).filter(PushTicket.created_at < now - self.RECEIPT_TTL).delete(synchronize_session=False)
+            db.commit()
+            due = (
+                db.query(PushTicket.ticket_id, PushTicket.user_email, PushTicket.expo_push_token)
+                .filter(PushTicket.created_at <= now - self.RECEIPT_DELAY)
+                .order_by(PushTicket.created_at)
+                .limit(EXPO_RECEIPT_BATCH_SIZE * concurrency)
+                .all()
+            )
+        if not due:
+            return 0
+
+        chunks = [due[i : i + EXPO_RECEIPT_BATCH_SIZE] for i in range(0, len(due), EXPO_RECEIPT_BATCH_SIZE)]
+        results = await asyncio.gather(
+            *(self._post(self.settings.EXPO_RECEIPTS_URL, {"ids": [t.ticket_id for t in chunk]}) for chunk in chunks),
+            return_exceptions=True,
+        )
+        resolved: List[str] = []
+        stale: Set[Tuple[str, str]] = set()
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                logger.warning("Expo receipts fetch failed for %d tickets: %r", len(chunk), result)
+                continue
+            receipts = (result or {}).get("data") or {}
+            for t in chunk:
+                receipt = receipts.get(t.ticket_id)
+                if receipt is None:
+                    continue  # not ready yet; retried next time until RECEIPT_TTL
+                resolved.append(t.ticket_id)
+                if receipt.get("status") == "error":
+                    error_code = (receipt.get("details") or {}).get("error")
+                    if error_code == "DeviceNotRegistered":
+                        stale.add((t.user_email, t.expo_push_token))
+                    else:
+                        logger.warning("Expo push failed after acceptance (%s): %s", error_code, receipt.get("message"))
+
+        with self.session_factory() as db:
+            if resolved:
+                db.query(PushTicket).filter(PushTicket.ticket_id.in_(resolved)).delete(synchronize_session=False)
+            _prune(db, stale)
+            db.commit()
+        return len(resolved)
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    async def _post(self, url: str, payload) -> dict:
+        """POSTs to Expo within the concurrency cap, retrying transport errors, 429s
+        and 5xxs with exponential backoff (or Retry-After). Raises once retries run out."""
+        async with self._slots:
+            attempt = 0
+            while True:
+                delay = self.SEND_BACKOFF_SEC * 2 ** attempt
+                try:
+                    resp = await self._client.post(url, json=payload)
+                except httpx.TransportError:
+                    if attempt >= self.SEND_RETRIES:
+                        raise
+                else:
+                    if (resp.status_code != 429 and resp.status_code < 500) or attempt >= self.SEND_RETRIES:
+                        resp.raise_for_status()
+                        return resp.json()
+                    retry_after = resp.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        delay = min(float(retry_after), 30.0)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+
+    async def run_forever(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            claimed = 0
+            try:
+                claimed = await self.run_once()
+                if time.monotonic() - self._receipts_checked_at >= self.RECEIPT_INTERVAL_SEC:
+                    self._receipts_checked_at = time.monotonic()
+                    await self.check_receipts()
+            except Exception:
+                logger.exception("Notification dispatch pass failed")
+            if claimed < self.CLAIM_SIZE:  # caught up: wait for more
+                await asyncio.sleep(self.settings.NOTIFICATION_POLL_INTERVAL_SEC)
+
+
+def run_in_thread(session_factory, settings: Optional[Settings] = None) -> Tuple[threading.Thread, threading.Event]:
+    """Runs a dispatcher on its own event loop in a daemon thread, so its database
+    work never blocks the API's loop. Set the returned event to stop it."""
+    stop = threading.Event()
+
+    async def main() -> None:
+        async with NotificationDispatcher(session_factory, settings) as dispatcher:
+            await dispatcher.run_forever(stop)
+
+    thread = threading.Thread(target=asyncio.run, args=(main(),), name="notification-dispatcher", daemon=True)
+    thread.start()
+    return thread, stop
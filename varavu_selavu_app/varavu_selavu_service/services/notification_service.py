@@ -1,18 +1,12 @@
-import logging
+import json
 import uuid
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from typing import List, Optional
 
-import requests
 from sqlalchemy.orm import Session
 
-from varavu_selavu_service.core.config import Settings
-from varavu_selavu_service.db.models import DeviceToken, Group, GroupMember, GroupNotificationPreference
-from varavu_selavu_service.services.group_service import GroupService
-
-logger = logging.getLogger("varavu_selavu.notifications")
-
-_EXPO_BATCH_SIZE = 100  # Expo's push API caps a single request at 100 messages.
+from varavu_selavu_service.db.models import DeviceToken, GroupNotificationPreference, NotificationOutbox
 
 
 def _to_uuid(value) -> Optional[uuid.UUID]:
@@ -25,8 +19,6 @@ def _to_uuid(value) -> Optional[uuid.UUID]:
 class NotificationService:
     def __init__(self, db: Session):
         self.db = db
-        self.settings = Settings()
-        self.group_service = GroupService(db)
 
     # ------------------------------------------------------------------
     # Device registration (§6.1, §8.3)
@@ -63,7 +55,8 @@ class NotificationService:
 
     # ------------------------------------------------------------------
     # Notification preferences (TS-GRP-125) — per-(user, group) mute +
-    # per-event-type suppression. Absence of a row means "notify" (default).
+    # per-event-type suppression + optional digest interval. Absence of a
+    # row means "notify each event" (default).
     # ------------------------------------------------------------------
 
     def get_preferences(self, user_email: str, group_id: str) -> dict:
@@ -76,12 +69,18 @@ class NotificationService:
             else None
         )
         if pref is None:
-            return {"group_id": group_id, "muted": False, "muted_events": []}
-        return {"group_id": group_id, "muted": pref.muted, "muted_events": list(pref.muted_events or [])}
+            return {"group_id": group_id, "muted": False, "muted_events": [], "digest_minutes": None}
+        return _preferences_dict(group_id, pref)
 
     def update_preferences(
-        self, user_email: str, group_id: str, muted: Optional[bool] = None, muted_events: Optional[List[str]] = None
+        self,
+        user_email: str,
+        group_id: str,
+        muted: Optional[bool] = None,
+        muted_events: Optional[List[str]] = None,
+        digest_minutes: Optional[int] = None,
     ) -> dict:
+        """`digest_minutes=0` switches digests off (stored as NULL); None leaves it."""
         gid = _to_uuid(group_id)
         pref = (
             self.db.query(GroupNotificationPreference)
@@ -99,159 +98,141 @@ class NotificationService:
             pref.muted = muted
         if muted_events is not None:
             pref.muted_events = muted_events
+        if digest_minutes is not None:
+            pref.digest_minutes = digest_minutes or None
         self.db.commit()
-        return {"group_id": group_id, "muted": pref.muted, "muted_events": list(pref.muted_events or [])}
-
-    def _is_suppressed(self, user_email: str, group_id: uuid.UUID, event_type: str) -> bool:
-        pref = (
-            self.db.query(GroupNotificationPreference)
-            .filter(GroupNotificationPreference.user_email == user_email, GroupNotificationPreference.group_id == group_id)
-            .first()
-        )
-        if pref is None:
-            return False
-        if pref.muted:
-            return True
-        return event_type in (pref.muted_events or [])
+        return _preferences_dict(group_id, pref)
 
     # ------------------------------------------------------------------
-    # Fan-out (§12.3) — fire-and-forget: never raises into the caller,
-    # since this always runs via FastAPI BackgroundTasks after the
-    # originating group mutation has already been committed/returned.
+    # Outbox (§12.3) — the mutating service adds the event to its own session
+    # before its commit, so the event and the change it describes are written
+    # together; services/notification_dispatcher.py resolves recipients and
+    # delivers it, out of the request entirely.
     # ------------------------------------------------------------------
 
-    def fan_out(self, group_id: str, actor_email: str, event_type: str, **event_data) -> None:
-        try:
-            self._fan_out(group_id, actor_email, event_type, event_data)
-        except Exception:
-            logger.exception(
-                "NotificationService.fan_out failed (group_id=%s, event_type=%s)", group_id, event_type
-            )
-
-    def _fan_out(self, group_id: str, actor_email: str, event_type: str, event_data: dict) -> None:
-        gid = _to_uuid(group_id)
-        if gid is None:
-            return
-        group = self.db.query(Group).filter(Group.id == gid).first()
-        if group is None:
-            return
-
-        actor_member = self.group_service.get_member_by_email(group_id, actor_email)
-        actor_name = actor_member.display_name if actor_member is not None else actor_email
-
-        exclude_emails = {actor_email} | set(event_data.get("exclude_emails") or [])
-        recipients = (
-            self.db.query(GroupMember)
-            .filter(
-                GroupMember.group_id == gid,
-                GroupMember.status == "active",
-                GroupMember.user_email.isnot(None),
+    def enqueue(self, group_id: str, actor_email: str, event_type: str, **event_data) -> None:
+        """Adds a group event for push delivery to the session. Does not commit:
+        the caller's commit writes it with the mutation it describes."""
+        self.db.add(
+            NotificationOutbox(
+                id=uuid.uuid4(),
+                group_id=_to_uuid(group_id),
+                actor_email=actor_email,
+                event_type=event_type,
+                # JSON-safe: shares are floats already, but amounts may be Decimal.
+                payload=json.loads(json.dumps(event_data, default=str)),
+                status="pending",
+                attempts=0,
+                available_at=_utcnow(),
             )
-            .all()
         )
-        recipients = [
-            m for m in recipients
-            if m.user_email not in exclude_emails and not self._is_suppressed(m.user_email, gid, event_type)
-        ]
-        if not recipients:
-            return
-
-        messages: List[Dict] = []
-        token_owner: Dict[str, str] = {}
-        for member in recipients:
-            body = self._build_body(event_type, actor_name, group.name, member, event_data)
-            if not body:
-                continue
-            tokens = self.db.query(DeviceToken).filter(DeviceToken.user_email == member.user_email).all()
-            for t in tokens:
-                messages.append(
-                    {
-                        "to": t.expo_push_token,
-                        "title": "TrackSpense",
-                        "body": body,
-                        "data": {"deep_link": f"trackspense://groups/{group_id}", "group_id": str(group_id)},
-                    }
-                )
-                token_owner[t.expo_push_token] = member.user_email
-
-        if messages:
-            self._send_expo_push(messages, token_owner)
-
-    def _build_body(
-        self, event_type: str, actor_name: str, group_name: str, member: GroupMember, event_data: dict
-    ) -> Optional[str]:
-        mid = str(member.id)
-        description = event_data.get("description") or "an expense"
-
-        if event_type == "expense_added":
-            share = (event_data.get("shares") or {}).get(mid)
-            if share is not None:
-                return f'{actor_name} added "{description}" in {group_name} — your share is ${share:.2f}'
-            return f'{actor_name} added "{description}" in {group_name}'
-
-        if event_type == "expense_edited":
-            old_share = (event_data.get("old_shares") or {}).get(mid)
-            new_share = (event_data.get("new_shares") or {}).get(mid)
-            if old_share is not None and new_share is not None and round(old_share, 2) != round(new_share, 2):
-                return (
-                    f'{actor_name} edited "{description}" in {group_name} — '
-                    f"your share changed ${old_share:.2f} → ${new_share:.2f}"
-                )
-            return f'{actor_name} edited "{description}" in {group_name}'
-
-        if event_type == "expense_deleted":
-            return f'{actor_name} deleted "{description}" in {group_name}'
-
-        if event_type == "settlement_recorded":
-            amount = float(event_data.get("amount") or 0.0)
-            to_member_id = event_data.get("to_member_id")
-            if to_member_id and str(to_member_id) == mid:
-                return f"{actor_name} settled up: paid you ${amount:.2f}"
-            return f"{actor_name} recorded a settlement of ${amount:.2f} in {group_name}"
-
-        if event_type == "member_joined":
-            new_member_name = event_data.get("new_member_display_name") or "A new member"
-            return f"{new_member_name} joined {group_name}"
-
-        if event_type == "comment_added":
-            return f'{actor_name} commented on "{description}" in {group_name}'
-
-        return None
 
-    # ------------------------------------------------------------------
-    # Expo transport
-    # ------------------------------------------------------------------
 
-    def _send_expo_push(self, messages: List[Dict], token_owner: Dict[str, str]) -> None:
-        headers = {"Content-Type": "application/json", "Accept": "application/json"}
-        if self.settings.EXPO_ACCESS_TOKEN:
-            headers["Authorization"] = f"Bearer {self.settings.EXPO_ACCESS_TOKEN}"
-
-        for i in range(0, len(messages), _EXPO_BATCH_SIZE):
-            batch = messages[i : i + _EXPO_BATCH_SIZE]
-            try:
-                resp = requests.post(self.settings.EXPO_PUSH_URL, json=batch, headers=headers, timeout=10)
-                resp.raise_for_status()
-                body = resp.json()
-            except Exception:
-                logger.exception("Expo push send failed for a batch of %d messages", len(batch))
-                continue
-
-            tickets = body.get("data") or []
-            for msg, ticket in zip(batch, tickets):
-                if not isinstance(ticket, dict) or ticket.get("status") != "error":
-                    continue
-                error_code = (ticket.get("details") or {}).get("error")
-                if error_code == "DeviceNotRegistered":
-                    self._prune_token(token_owner.get(msg["to"]), msg["to"])
-
-    def _prune_token(self, user_email: Optional[str], expo_push_token: str) -> None:
-        if not user_email:
-            return
-        self.db.query(DeviceToken).filter(
-            DeviceToken.user_email == user_email, DeviceToken.expo_push_token == expo_push_token
-        ).delete()
-        self.db.commit()
+def _preferences_dict(group_id: str, pref: GroupNotificationPreference) -> dict:
+    return {
+        "group_id": group_id,
+        "muted": pref.muted,
+        "muted_events": list(pref.muted_events or []),
+        "digest_minutes": pref.digest_minutes,
+    }
+
+
+# Events that merge into one summary push per (recipient, group) when they come
+# in bursts (see NotificationDigest), with the wording of each one's clause.
+COALESCIBLE_EVENTS = {
+    "expense_added": ("added", "expense"),
+    "expense_edited": ("edited", "expense"),
+    "comment_added": ("left", "comment"),
+}
+
+
+def is_suppressed(pref: Optional[GroupNotificationPreference], event_type: str) -> bool:
+    """TS-GRP-125: a missing preference row means "notify"."""
+    if pref is None:
+        return False
+    if pref.muted:
+        return True
+    return event_type in (pref.muted_events or [])
+
+
+def build_body(
+    event_type: str, actor_name: str, group_name: str, member_id, event_data: dict
+) -> Optional[str]:
+    """The push text `member_id` receives for one event, or None if the event
+    type isn't pushed."""
+    mid = str(member_id)
+    description = event_data.get("description") or "an expense"
+
+    if event_type == "expense_added":
+        share = (event_data.get("shares") or {}).get(mid)
+        if share is not None:
+            return f'{actor_name} added "{description}" in {group_name} — your share is ${share:.2f}'
+        return f'{actor_name} added "{description}" in {group_name}'
+
+    if event_type == "expense_edited":
+        old_share = (event_data.get("old_shares") or {}).get(mid)
+        new_share = (event_data.get("new_shares") or {}).get(mid)
+        if old_share is not None and new_share is not None and round(old_share, 2) != round(new_share, 2):
+            return (
+                f'{actor_name} edited "{description}" in {group_name} — '
+                f"your share changed ${old_share:.2f} → ${new_share:.2f}"
+            )
+        return f'{actor_name} edited "{description}" in {group_name}'
+
+    if event_type == "expense_deleted":
+        return f'{actor_name} deleted "{description}" in {group_name}'
+
+    if event_type == "settlement_recorded":
+        amount = float(event_data.get("amount") or 0.0)
+        to_member_id = event_data.get("to_member_id")
+        if to_member_id and str(to_member_id) == mid:
+            return f"{actor_name} settled up: paid you ${amount:.2f}"
+        return f"{actor_name} recorded a settlement of ${amount:.2f} in {group_name}"
+
+    if event_type == "member_joined":
+        new_member_name = event_data.get("new_member_display_name") or "A new member"
+        return f"{new_member_name} joined {group_name}"
+
+    if event_type == "comment_added":
+        return f'{actor_name} commented on "{description}" in {group_name}'
+
+    return None
+
+
+def digest_item(event_id, event_type: str, actor_name: str, member_id, event_data: dict, body: str) -> dict:
+    """What a NotificationDigest keeps of one coalesced event: enough to render
+    it alone (`body`) or as part of a summary."""
+    share = None
+    if event_type == "expense_added":
+        share = (event_data.get("shares") or {}).get(str(member_id))
+    return {"event_id": str(event_id), "event_type": event_type, "actor": actor_name, "share": share, "body": body}
+
+
+def build_digest_body(group_name: str, items: List[dict]) -> str:
+    """One push for a recipient's coalesced events, e.g.
+    "Alex added 12 expenses in Goa Trip — your share $184.20"."""
+    if len(items) == 1:
+        return items[0]["body"]
+
+    actors = list(dict.fromkeys(item["actor"] for item in items))
+    if len(actors) == 1:
+        who = actors[0]
+    elif len(actors) == 2:
+        who = f"{actors[0]} and {actors[1]}"
+    else:
+        who = f"{actors[0]} and {len(actors) - 1} others"
+
+    counts = Counter(item["event_type"] for item in items)
+    clauses = [
+        f"{verb} {counts[event_type]} {noun}{'' if counts[event_type] == 1 else 's'}"
+        for event_type, (verb, noun) in COALESCIBLE_EVENTS.items()
+        if counts[event_type]
+    ]
+    what = clauses[0] if len(clauses) == 1 else f"{', '.join(clauses[:-1])} and {clauses[-1]}"
+
+    shares = [item["share"] for item in items if item.get("share") is not None]
+    suffix = f" — your share ${sum(shares):.2f}" if shares else ""
+    return f"{who} {what} in {group_name}{suffix}"
 
 
 def _utcnow():
@@ -1,78 +1,108 @@
 """P2-5: "Export all my expenses" for the personal ledger.
 
 The per-group export (GroupExportService) already existed; this is its personal
-counterpart. Both route every cell through the same formula-injection guard.
+counterpart. Both route every cell through the same formula-injection guard and
+stream: rows come off a server-side cursor and go out in chunks, so a multi-year
+export holds one chunk in memory, not the whole ledger.
 """
 
-import csv
-import io
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from varavu_selavu_service.core.csv_safety import sanitize_csv_row
-from varavu_selavu_service.services.expense_service import ExpenseService
+from varavu_selavu_service.core.csv_safety import iter_csv
+from varavu_selavu_service.db.models import Expense, ExpenseItem
+from varavu_selavu_service.services.date_scope import DateScope
+
+
+def export_scope(start_date: Optional[str] = None, end_date: Optional[str] = None) -> Optional[DateScope]:
+    """The personal exports' inclusive MM/DD/YYYY bounds as a DateScope (an
+    unparseable bound is ignored), or None when neither is given. The scope goes
+    to SQL as a half-open purchased_at range, so undated rows only appear in an
+    unbounded export."""
+    def parse(value: Optional[str]) -> Optional[date]:
+        try:
+            return datetime.strptime(value, "%m/%d/%Y").date()
+        except (TypeError, ValueError):
+            return None
+
+    start, end = parse(start_date), parse(end_date)
+    return DateScope.between(start, end) if start or end else None
+
+
+HEADER = ["date", "description", "category", "merchant", "amount", "item_count"]
 
 
 class PersonalExportService:
+    CHUNK_SIZE = 500
+
     def __init__(self, db: Session):
         self.db = db
-        self.expense_service = ExpenseService(db)
 
     def export_csv(
         self,
         user_id: str,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-    ) -> str:
-        """CSV of the caller's personal (non-group) expenses, newest first.
+    ) -> Iterator[str]:
+        """CSV of the caller's personal (non-group) expenses, newest first, as an
+        iterator of text chunks for a StreamingResponse.
 
-        `start_date`/`end_date` are inclusive MM/DD/YYYY bounds; omitting both
-        exports everything.
+        `start_date`/`end_date` are as for export_scope(); omitting both exports
+        everything.
         """
-        rows = self.expense_service.get_expenses_for_user(user_id)
-
-        def parse(value: str) -> Optional[datetime]:
-            try:
-                return datetime.strptime(value, "%m/%d/%Y")
-            except (TypeError, ValueError):
-                return None
-
-        start = parse(start_date) if start_date else None
-        end = parse(end_date) if end_date else None
-        if start or end:
-            filtered = []
-            for row in rows:
-                dt = parse(row.get("date", ""))
-                if dt is None:
-                    continue
-                if start and dt < start:
-                    continue
-                if end and dt > end:
-                    continue
-                filtered.append(row)
-            rows = filtered
-
-        rows.sort(key=lambda r: parse(r.get("date", "")) or datetime.min, reverse=True)
-
-        buf = io.StringIO()
-        writer = csv.writer(buf)
-
-        def write_row(row):
-            writer.writerow(sanitize_csv_row(row))
-
-        write_row(["date", "description", "category", "merchant", "amount", "item_count"])
-        for r in rows:
-            write_row([
-                r.get("date", ""),
-                r.get("description", ""),
-                r.get("category", ""),
-                r.get("merchant_name") or "",
-                float(r.get("cost") or 0),
-                r.get("item_count", 0),
-            ])
-
-        # UTF-8 BOM so Excel-on-Windows opens it without mangling non-ASCII text,
-        # matching the group export.
-        return "﻿" + buf.getvalue()
+        dates = export_scope(start_date, end_date)
+        return iter_csv(HEADER, self._rows(user_id, dates), self.CHUNK_SIZE)
+
+    def _rows(self, user_id: str, dates: Optional[DateScope]) -> Iterator[List]:
+        try:
+            expenses = self._expenses(user_id, dates)
+            while True:
+                chunk = list(islice(expenses, self.CHUNK_SIZE))
+                if not chunk:
+                    break
+                item_counts = self._item_counts([e.id for e in chunk])
+                for e in chunk:
+                    yield [
+                        e.purchased_at.strftime("%m/%d/%Y") if e.purchased_at else "01/01/1970",
+                        e.description or "",
+                        e.category_id or "",
+                        e.merchant_name or "",
+                        float(e.amount or 0),
+                        item_counts.get(e.id, 0),
+                    ]
+        finally:
+            # The body streams after the route returns, by which point get_db()
+            # may already have closed this session and the reads above checked out
+            # a fresh connection; hand it back once the last chunk is out.
+            self.db.close()
+
+    def _expenses(self, user_id: str, dates: Optional[DateScope]) -> Iterator:
+        """Dated rows newest first, then undated ones: two ordered walks of
+        idx_expenses_personal_user_purchased, rather than an `IS NULL` sort key
+        that would force a full sort before the first row."""
+        query = self.db.query(
+            Expense.id, Expense.purchased_at, Expense.description, Expense.category_id,
+            Expense.merchant_name, Expense.amount,
+        ).filter(Expense.user_email == user_id, Expense.group_id.is_(None))
+        if dates is not None:
+            query = query.filter(*dates.filters(Expense.purchased_at))
+        yield from (
+            query.filter(Expense.purchased_at.isnot(None))
+            .order_by(Expense.purchased_at.desc(), Expense.id.desc())
+            .yield_per(self.CHUNK_SIZE)
+        )
+        if dates is None:
+            yield from query.filter(Expense.purchased_at.is_(None)).order_by(Expense.id.desc()).yield_per(self.CHUNK_SIZE)
+
+    def _item_counts(self, expense_ids: List) -> Dict:
+        rows = (
+            self.db.query(ExpenseItem.expense_id, func.count(ExpenseItem.id))
+            .filter(ExpenseItem.expense_id.in_(expense_ids))
+            .group_by(ExpenseItem.expense_id)
+            .all()
+        )
+        return dict(rows)
@@ -0,0 +1,199 @@
+"""
+ReceiptJobService
+=================
+Receipt parsing off the request path. POST /ingest/receipt/jobs stores a
+queued ReceiptParseJob and hands the bytes to a bounded, process-wide thread
+pool (RECEIPT_PARSE_WORKERS); the client polls GET /ingest/receipt/jobs/{id}
+for the result, so no API worker waits on the model.
+
+Every parse is keyed by the SHA-256 of the uploaded bytes and the OCR engine.
+An upload whose bytes were parsed before is answered from that job's stored
+result at once, on both the job and the synchronous /ingest/receipt/parse
+paths; one whose bytes are already being parsed in this process joins that
+parse instead of starting another.
+
+Jobs live in one process's pool: a job queued on a process that exits is
+reported failed once RECEIPT_JOB_EXPIRY_SEC has passed, and the client
+uploads again.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from varavu_selavu_service.core.config import Settings
+from varavu_selavu_service.db.models import ReceiptParseJob
+from varavu_selavu_service.services.receipt_service import ReceiptService
+
+logger = logging.getLogger("varavu_selavu.receipt_jobs")
+
+PENDING = ("queued", "running")
+
+
+class ReceiptQueueFull(Exception):
+    """RECEIPT_PARSE_MAX_PENDING parses are already waiting in this process."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class ReceiptJobService:
+    _pool: Optional[ThreadPoolExecutor] = None
+    _inflight: Set[Tuple[str, str]] = set()  # (sha256, engine) of parses queued or running here
+    _lock = threading.Lock()
+
+    def __init__(self, db: Session, receipt_service: ReceiptService):
+        self.db = db
+        self.receipt_service = receipt_service
+        self.settings = Settings()
+
+    # Tests replace this to run the parse inline.
+    def _spawn(self, fn: Callable[[], None]) -> None:
+        with self._lock:
+            if ReceiptJobService._pool is None:
+                ReceiptJobService._pool = ThreadPoolExecutor(
+                    max_workers=max(1, self.settings.RECEIPT_PARSE_WORKERS), thread_name_prefix="receipt-parse"
+                )
+        ReceiptJobService._pool.submit(fn)
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def submit(self, user_email: str, data: bytes, content_type: str) -> ReceiptParseJob:
+        """Stores a job for `data` and starts parsing it — or, if the same bytes
+        were parsed before, stores it already done with that result."""
+        sha = self.digest(data)
+        engine = self.receipt_service.engine
+        job = ReceiptParseJob(
+            id=uuid.uuid4(), user_email=user_email, content_sha256=sha, content_type=content_type,
+            engine=engine, status="queued",
+        )
+        cached = self._cached_result(sha, engine)
+        if cached is not None:
+            job.status, job.result, job.finished_at = "done", cached, _now()
+            self.db.add(job)
+            self.db.commit()
+            return job
+
+        flight = (sha, engine)
+        with self._lock:
+            if flight in self._inflight:
+                # The running parse finishes every pending job for these bytes
+                # once it is done; committing under the lock makes sure this
+                # one is visible by then.
+                self.db.add(job)
+                self.db.commit()
+                return job
+            if len(self._inflight) >= self.settings.RECEIPT_PARSE_MAX_PENDING:
+                raise ReceiptQueueFull()
+            self._inflight.add(flight)
+        try:
+            self.db.add(job)
+            self.db.commit()
+        except Exception:
+            with self._lock:
+                self._inflight.discard(flight)
+            raise
+        bind = self.db.get_bind()
+        self._spawn(lambda: self._run(bind, data, content_type, sha, engine))
+        return job
+
+    def get(self, user_email: str, job_id: uuid.UUID) -> Optional[ReceiptParseJob]:
+        job = (
+            self.db.query(ReceiptParseJob)
+            .filter(ReceiptParseJob.id == job_id, ReceiptParseJob.user_email == user_email)
+            .first()
+        )
+        if job is not None and job.status in PENDING:
+            expiry = timedelta(seconds=self.settings.RECEIPT_JOB_EXPIRY_SEC)
+            if _aware(job.created_at) < _now() - expiry:
+                job.status, job.error, job.finished_at = "failed", "Parsing was interrupted; please upload again.", _now()
+                self.db.commit()
+        return job
+
+    def parse_now(self, user_email: str, data: bytes, content_type: str) -> Dict[str, Any]:
+        """The synchronous path: the stored result for these bytes if there is
+        one, else a parse on this request, stored as a done job for next time."""
+        sha = self.digest(data)
+        engine = self.receipt_service.engine
+        cached = self._cached_result(sha, engine)
+        if cached is not None:
+            return cached
+        result = self.receipt_service.parse(data, content_type=content_type, save_ocr_text=True)
+        try:
+            self.db.add(ReceiptParseJob(
+                id=uuid.uuid4(), user_email=user_email, content_sha256=sha, content_type=content_type,
+                engine=engine, status="done", result=result, finished_at=_now(),
+            ))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            logger.exception("Failed to store the parse of receipt %s", sha)
+        return result
+
+    @staticmethod
+    def view(result: Dict[str, Any], save_ocr_text: bool) -> Dict[str, Any]:
+        """A stored result always keeps ocr_text; callers only see it on request."""
+        if save_ocr_text or "ocr_text" not in result:
+            return result
+        return {k: v for k, v in result.items() if k != "ocr_text"}
+
+    def _cached_result(self, sha: str, engine: str) -> Optional[Dict[str, Any]]:
+        try:
+            return (
+                self.db.query(ReceiptParseJob.result)
+                .filter(
+                    ReceiptParseJob.content_sha256 == sha,
+                    ReceiptParseJob.engine == engine,
+                    ReceiptParseJob.status == "done",
+                )
+                .order_by(ReceiptParseJob.finished_at.desc())
+                .limit(1)
+                .scalar()
+            )
+        except Exception:
+            # A cache miss only costs a parse.
+            self.db.rollback()
+            logger.exception("Failed to look up a stored parse of receipt %s", sha)
+            return None
+
+    def _run(self, bind, data: bytes, content_type: str, sha: str, engine: str) -> None:
+        pending = (
+            ReceiptParseJob.content_sha256 == sha,
+            ReceiptParseJob.engine == engine,
+            ReceiptParseJob.status.in_(PENDING),
+        )
+        try:
+            with Session(bind=bind) as db:
+                db.query(ReceiptParseJob).filter(*pending).update({"status": "running"}, synchronize_session=False)
+                db.commit()
+                try:
+                    result = self.receipt_service.parse(data, content_type=content_type, save_ocr_text=True)
+                    values = {"status": "done", "result": result, "finished_at": _now()}
+                except Exception as exc:
+                    logger.exception("Receipt parse %s failed", sha)
+                    values = {"status": "failed", "error": f"Could not parse the receipt: {exc}"[:1000], "finished_at": _now()}
+                with self._lock:
+                    # Later uploads of these bytes no longer join this parse;
+                    # every job that did is committed and gets the update below.
+                    self._inflight.discard((sha, engine))
+                db.query(ReceiptParseJob).filter(*pending).update(values, synchronize_session=False)
+                db.commit()
+        except Exception:
+            logger.exception("Receipt parse job for %s could not be recorded", sha)
+        finally:
+            with self._lock:
+                self._inflight.discard((sha, engine))
@@ -6,7 +6,9 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
 from varavu_selavu_service.db.models import Expense, ExpensePayer, ExpenseSplit, GroupMember, Settlement
+from varavu_selavu_service.services.balance_service import BalanceService
 from varavu_selavu_service.services.group_service import GroupService
+from varavu_selavu_service.services.notification_service import NotificationService
 
 
 def _to_uuid(value) -> Optional[uuid.UUID]:
@@ -20,6 +22,7 @@ class SettlementService:
     def __init__(self, db: Session):
         self.db = db
         self.group_service = GroupService(db)
+        self.balance_service = BalanceService(db)
         from varavu_selavu_service.services.activity_service import ActivityService
         self.activity_svc = ActivityService(db)
 
@@ -56,7 +59,9 @@ class SettlementService:
         method: Optional[str] = None,
         settled_at: Optional[str] = None,
         notes: Optional[str] = None,
+        notify: bool = False,
     ) -> Dict:
+        """With notify, the settlement_recorded push event is queued in the same commit."""
         # Caller must be a member of the group they're recording a settlement in.
         self.group_service.require_membership(group_id, actor_email)
 
@@ -92,7 +97,17 @@ class SettlementService:
             notes=notes,
             created_by=actor_email,
         )
+        self.balance_service.ensure_materialized(gid)
         self.db.add(settlement)
+        self.balance_service.apply_settlement(gid, settlement)
+        if notify:
+            NotificationService(self.db).enqueue(
+                group_id=gid,
+                actor_email=actor_email,
+                event_type="settlement_recorded",
+                amount=float(settlement.amount),
+                to_member_id=str(to_mid),
+            )
         self.db.commit()
         
         self.activity_svc.log(
@@ -128,6 +143,8 @@ class SettlementService:
         )
         if row is None:
             raise HTTPException(status_code=404, detail="Settlement not found")
+        self.balance_service.ensure_materialized(gid)
+        self.balance_service.apply_settlement(gid, row, sign=-1)
         self.db.delete(row)
         self.db.commit()
         
@@ -209,8 +226,10 @@ class SettlementService:
             notes=notes,
             created_by=actor_email,
         )
+        self.balance_service.ensure_materialized(gid)
         self.db.add(settlement)
         self.db.flush()
+        self.balance_service.apply_settlement(gid, settlement)
 
         split.settled_via_settlement_id = settlement.id
         self.db.commit()
@@ -0,0 +1,478 @@
+"""Maintained monthly spend rollups (MonthlySpendRollup) and the helpers analytics
+use to read them.
+
+A user's rollup holds, per scope ('personal', 'my_share', 'i_paid'), calendar month
+and category, the same sum and row count AnalysisService's legs compute from raw
+rows. Readers take whole months from the rollup and only scan raw rows for the
+partial-month edges of a range (plus undated expenses, which are never rolled up):
+see DateScope.month_block() / outside_block().
+
+Maintenance is a pair of flush hooks, installed on the app's SessionLocal factory
+(install()), rather than calls sprinkled through every write path: before a flush
+they note which expenses, split/payer rows, seats and users are changing (reading
+pre-edit values from the database, since ORM history is empty for expired
+attributes), and after it they refresh the affected (user, month) rows from raw data
+in the same transaction — so a rollback undoes both. Only users with a
+SpendRollupState marker are maintained; the rest are read from raw rows, so history
+that predates the table stays correct. Their rollup is built by
+scripts/backfill_spend_rollups.py or, once a write of theirs commits, on a background
+thread (SPEND_ROLLUP_BACKGROUND_BUILD) — never inside the request. On Postgres a
+build holds a per-user advisory lock that every maintaining flush takes shared, so a
+write cannot slip between a build's scan and its commit.
+
+Bulk Query.update()/delete() and Core inserts bypass the hooks. The app's own
+such writes are covered by other rows in the same flush:
+- account deletion also deletes the User row, which purges that user's rollup;
+- GroupExpenseService.update_expense and update_items bulk-delete the expense's
+  ExpensePayer/ExpenseSplit rows, but always add replacements through the ORM
+  before flushing. Those new rows (and, if its date moved, the dirty Expense)
+  refresh the expense's months for every member of the group, recomputed from
+  raw rows that already reflect the delete.
+Anything else (ad-hoc scripts, bulk loads) should be followed by
+scripts/backfill_spend_rollups.py --verify --fix.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, insert, or_, select
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, sessionmaker
+
+from varavu_selavu_service.core.config import Settings
+from varavu_selavu_service.db.models import (
+    Expense,
+    ExpensePayer,
+    ExpenseSplit,
+    GroupMember,
+    MonthlySpendRollup,
+    SpendRollupState,
+    User,
+)
+from varavu_selavu_service.db.session import SessionLocal
+from varavu_selavu_service.services.date_scope import DateScope, MonthBlock, next_month
+
+logger = logging.getLogger("varavu_selavu.spend_rollups")
+
+SCOPES = ("personal", "my_share", "i_paid")
+
+_CENTS = Decimal("0.01")
+# Postgres buckets timestamptz by the session time zone, but a write's months are
+# derived here in Python: refreshing every month within the widest UTC offset of
+# the instant always includes the bucket the database used.
+_MAX_UTC_OFFSET = timedelta(hours=14)
+_PENDING_KEY = "spend_rollup_pending"
+_UNBUILT_KEY = "spend_rollup_unbuilt"
+# First key of the two-key advisory locks that serialize a user's build with writes.
+_BUILD_LOCK_CLASS = 0x5350
+_EXPENSE_ATTRS = ("user_email", "group_id", "purchased_at", "category_id", "amount")
+_LEDGER_ATTRS = {ExpenseSplit: ("expense_id", "member_id", "amount_owed"), ExpensePayer: ("expense_id", "member_id", "amount_paid")}
+
+RollupKey = Tuple[str, str, str]  # (scope, year_month, category)
+
+
+def month_expr(column, is_sqlite):
+    if is_sqlite:
+        return func.strftime('%Y-%m', column)
+    return func.to_char(func.date_trunc('month', column), 'YYYY-MM')
+
+
+def outside_block(column, block: MonthBlock):
+    """Predicate for the rows a rollup read over `block` does not cover: the
+    partial-month edges of the range and undated rows. Half-open range comparisons,
+    so it stays index-friendly."""
+    lo, hi = block
+    clauses = [column.is_(None)]
+    if lo is not None:
+        clauses.append(column < lo.isoformat())
+    if hi is not None:
+        clauses.append(column >= hi.isoformat())
+    return or_(*clauses)
+
+
+def _month_keys(value) -> Set[str]:
+    if value is None:
+        return set()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        return {value.strftime("%Y-%m")}
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return {(value + offset).strftime("%Y-%m") for offset in (-_MAX_UTC_OFFSET, timedelta(0), _MAX_UTC_OFFSET)}
+
+
+class SpendRollupService:
+    """Builds, refreshes and reads MonthlySpendRollup rows. Every statement runs on
+    Session.connection(), so the same code is safe inside the flush hooks below
+    (where Session.execute could autoflush re-entrantly) and joins the caller's
+    transaction everywhere else. Never commits."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @property
+    def is_sqlite(self) -> bool:
+        return self.db.get_bind().dialect.name == "sqlite"
+
+    def _conn(self):
+        return self.db.connection()
+
+    # ------------------------------------------------------------------ reads
+
+    def built_users(self, user_emails: Iterable[str]) -> Set[str]:
+        emails = sorted(set(e for e in user_emails if e))
+        if not emails:
+            return set()
+        rows = self._conn().execute(select(SpendRollupState.user_email).where(SpendRollupState.user_email.in_(emails)))
+        return {e for (e,) in rows}
+
+    def is_built(self, user_email: str) -> bool:
+        return bool(self.built_users([user_email]))
+
+    def grid(self, user_email: str, scope: str, block: MonthBlock) -> List[Tuple[str, str, Decimal, int]]:
+        """(category, year_month, total, expense_count) for every rolled-up cell in `block`."""
+        stmt = select(
+            MonthlySpendRollup.category,
+            MonthlySpendRollup.year_month,
+            MonthlySpendRollup.total,
+            MonthlySpendRollup.expense_count,
+        ).where(MonthlySpendRollup.user_email == user_email, MonthlySpendRollup.scope == scope)
+        lo, hi = block
+        if lo is not None:
+            stmt = stmt.where(MonthlySpendRollup.year_month >= lo.strftime("%Y-%m"))
+        if hi is not None:
+            stmt = stmt.where(MonthlySpendRollup.year_month < hi.strftime("%Y-%m"))
+        return [(c, ym, Decimal(str(t)), int(n)) for c, ym, t, n in self._conn().execute(stmt)]
+
+    def category_totals(self, user_email: str, dates: DateScope) -> Dict[str, Decimal]:
+        """Personal spend per category within `dates`: whole months from the rollup
+        when the user has one, raw rows for the rest."""
+        filters = [Expense.user_email == user_email, Expense.group_id.is_(None)] + dates.filters(Expense.purchased_at)
+
+        totals: Dict[str, Decimal] = {}
+        planned = dates.month_block()
+        if planned is not None and self.is_built(user_email):
+            block, exact = planned
+            for category, _, total, _ in self.grid(user_email, "personal", block):
+                totals[category] = totals.get(category, Decimal("0")) + total
+            if exact:
+                return totals
+            filters.append(outside_block(Expense.purchased_at, block))
+
+        stmt = select(Expense.category_id, func.sum(Expense.amount)).where(*filters).group_by(Expense.category_id)
+        for category, total in self._conn().execute(stmt):
+            totals[category] = totals.get(category, Decimal("0")) + Decimal(str(total or 0))
+        return totals
+
+    # ----------------------------------------------------- raw recomputation
+
+    def _raw_grid(self, user_email: str, scope: str, months: Optional[Set[str]] = None):
+        m = month_expr(Expense.purchased_at, self.is_sqlite)
+        if scope == "personal":
+            stmt = (
+                select(Expense.category_id, m, func.sum(Expense.amount), func.count(Expense.id))
+                .where(Expense.user_email == user_email, Expense.group_id.is_(None))
+            )
+        elif scope == "my_share":
+            stmt = (
+                select(Expense.category_id, m, func.sum(ExpenseSplit.amount_owed), func.count(ExpenseSplit.id))
+                .select_from(ExpenseSplit)
+                .join(GroupMember, GroupMember.id == ExpenseSplit.member_id)
+                .join(Expense, Expense.id == ExpenseSplit.expense_id)
+                .where(GroupMember.user_email == user_email)
+            )
+        else:
+            stmt = (
+                select(Expense.category_id, m, func.sum(ExpensePayer.amount_paid), func.count(ExpensePayer.id))
+                .select_from(ExpensePayer)
+                .join(GroupMember, GroupMember.id == ExpensePayer.member_id)
+                .join(Expense, Expense.id == ExpensePayer.expense_id)
+                .where(GroupMember.user_email == user_email, Expense.group_id.isnot(None))
+            )
+        stmt = stmt.where(Expense.purchased_at.isnot(None))
+        if months:
+            ordered = sorted(months)
+            # A day of slack either side keeps the range test sargable without
+            # second-guessing the session time zone; the bucket test is exact.
+            lo = date.fromisoformat(ordered[0] + "-01") - timedelta(days=1)
+            hi = next_month(date.fromisoformat(ordered[-1] + "-01")) + timedelta(days=1)
+            stmt = stmt.where(Expense.purchased_at >= lo.isoformat(), Expense.purchased_at < hi.isoformat(), m.in_(ordered))
+        return self._conn().execute(stmt.group_by(Expense.category_id, m)).all()
+
+    def computed(self, user_email: str, months: Optional[Set[str]] = None) -> Dict[RollupKey, Tuple[Decimal, int]]:
+        cells: Dict[RollupKey, Tuple[Decimal, int]] = {}
+        for scope in SCOPES:
+            for category, year_month, total, n in self._raw_grid(user_email, scope, months):
+                key = (scope, year_month, category or "")
+                prev_total, prev_n = cells.get(key, (Decimal("0"), 0))
+                cells[key] = (prev_total + Decimal(str(total or 0)), prev_n + int(n))
+        return {k: (t.quantize(_CENTS), n) for k, (t, n) in cells.items()}
+
+    def stored(self, user_email: str) -> Dict[RollupKey, Tuple[Decimal, int]]:
+        rows = self._conn().execute(
+            select(
+                MonthlySpendRollup.scope,
+                MonthlySpendRollup.year_month,
+                MonthlySpendRollup.category,
+                MonthlySpendRollup.total,
+                MonthlySpendRollup.expense_count,
+            ).where(MonthlySpendRollup.user_email == user_email)
+        )
+        return {(s, ym, c): (Decimal(str(t)).quantize(_CENTS), int(n)) for s, ym, c, t, n in rows}
+
+    def drift(self, user_email: str) -> Dict[RollupKey, Tuple[Optional[Tuple[Decimal, int]], Optional[Tuple[Decimal, int]]]]:
+        """Cells whose stored (total, count) differs from a raw recomputation, as
+        {key: (stored, computed)} with None for a missing side."""
+        stored, computed = self.stored(user_email), self.computed(user_email)
+        return {
+            k: (stored.get(k), computed.get(k))
+            for k in set(stored) | set(computed)
+            if stored.get(k) != computed.get(k)
+        }
+
+    # ------------------------------------------------------------------ writes
+
+    def _insert_ignore(self, model):
+        if self.is_sqlite:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert(model).on_conflict_do_nothing()
+
+    def _build_lock(self, user_emails: Iterable[str], shared: bool) -> None:
+        """Per-user transaction-scoped advisory locks (Postgres only): build() takes
+        its user's exclusively, maintaining flushes take theirs shared, so a build
+        waits for in-flight writes to commit and later writes wait for the build."""
+        if self.is_sqlite:
+            return
+        lock = func.pg_advisory_xact_lock_shared if shared else func.pg_advisory_xact_lock
+        conn = self._conn()
+        for email in sorted(set(user_emails)):
+            conn.execute(select(lock(_BUILD_LOCK_CLASS, func.hashtext(email))))
+
+    def _lock(self, user_email: str) -> None:
+        """Ensures the user's marker exists and row-locks it (a no-op on SQLite), so
+        concurrent refreshes of one user's rows serialize instead of racing on the
+        unique key."""
+        conn = self._conn()
+        conn.execute(self._insert_ignore(SpendRollupState).values(user_email=user_email))
+        conn.execute(select(SpendRollupState.user_email).where(SpendRollupState.user_email == user_email).with_for_update())
+
+    def _write(self, user_email: str, cells: Dict[RollupKey, Tuple[Decimal, int]], months: Optional[Set[str]] = None) -> None:
+        conn = self._conn()
+        stmt = delete(MonthlySpendRollup).where(MonthlySpendRollup.user_email == user_email)
+        if months is not None:
+            stmt = stmt.where(MonthlySpendRollup.year_month.in_(sorted(months)))
+        conn.execute(stmt)
+        if cells:
+            conn.execute(insert(MonthlySpendRollup), [
+                {
+                    "user_email": user_email,
+                    "scope": scope,
+                    "year_month": year_month,
+                    "category": category,
+                    "total": total,
+                    "expense_count": n,
+                }
+                for (scope, year_month, category), (total, n) in cells.items()
+            ])
+
+    def build(self, user_email: str) -> None:
+        """(Re)builds every month of the user's rollup from raw rows and marks it built."""
+        self._build_lock([user_email], shared=False)
+        self._lock(user_email)
+        self._write(user_email, self.computed(user_email))
+
+    def refresh(self, user_email: str, months: Set[str]) -> None:
+        if not months:
+            return
+        self._lock(user_email)
+        self._write(user_email, self.computed(user_email, months), months)
+
+    def purge(self, user_email: str) -> None:
+        conn = self._conn()
+        conn.execute(delete(MonthlySpendRollup).where(MonthlySpendRollup.user_email == user_email))
+        conn.execute(delete(SpendRollupState).where(SpendRollupState.user_email == user_email))
+
+    # ------------------------------------------------------ flush maintenance
+
+    def _apply_pending(self, pending: dict) -> Set[str]:
+        """Refreshes built users' affected months; returns the users touched that have
+        no rollup yet."""
+        conn = self._conn()
+        rows = list(pending["pre_rows"])
+        post_ids = set(pending["expense_ids"])
+        post_ids.update(obj.id for obj in pending["new_expenses"])
+        post_ids.update(obj.expense_id for obj in pending["new_ledger_rows"])
+        post_ids.discard(None)
+        if post_ids:
+            rows += conn.execute(
+                select(Expense.id, Expense.user_email, Expense.group_id, Expense.purchased_at).where(Expense.id.in_(post_ids))
+            ).all()
+
+        targets: Dict[str, Set[str]] = {}
+        group_months: Dict = {}
+        for _, user_email, group_id, purchased_at in rows:
+            months = _month_keys(purchased_at)
+            if not months:
+                continue
+            if group_id is None:
+                if user_email:
+                    targets.setdefault(user_email, set()).update(months)
+            else:
+                group_months.setdefault(group_id, set()).update(months)
+        if group_months:
+            members = conn.execute(
+                select(GroupMember.group_id, GroupMember.user_email)
+                .where(GroupMember.group_id.in_(list(group_months)), GroupMember.user_email.isnot(None))
+            )
+            for group_id, user_email in members:
+                targets.setdefault(user_email, set()).update(group_months[group_id])
+
+        purge = pending["purge"]
+        rebuild = pending["rebuild"] - purge
+        emails = (set(targets) | rebuild) - purge
+        self._build_lock(emails, shared=True)
+        built = self.built_users(emails)
+        for user_email in purge:
+            self.purge(user_email)
+        for user_email in sorted(emails & built):
+            if user_email in rebuild:
+                self.build(user_email)
+            else:
+                self.refresh(user_email, targets[user_email])
+        return emails - built
+
+
+# Tests replace this to run the build inline.
+def _spawn(fn: Callable[[], None]) -> None:
+    threading.Thread(target=fn, name="spend-rollup-build", daemon=True).start()
+
+
+_building: Set[str] = set()  # users with a background build queued or running here
+_building_lock = threading.Lock()
+
+
+def _build_in_background(session_factory: sessionmaker, user_emails: Set[str]) -> None:
+    with _building_lock:
+        todo = sorted(user_emails - _building)
+        _building.update(todo)
+    if not todo:
+        return
+
+    def run() -> None:
+        try:
+            with session_factory() as db:
+                rollups = SpendRollupService(db)
+                for user_email in todo:
+                    try:
+                        if not rollups.built_users([user_email]):
+                            rollups.build(user_email)
+                        db.commit()
+                    except Exception:
+                        db.rollback()
+                        logger.exception("Building the spend rollup for %s failed", user_email)
+        finally:
+            with _building_lock:
+                _building.difference_update(todo)
+
+    _spawn(run)
+
+
+def _changed(obj, attrs) -> bool:
+    state = sa_inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in attrs)
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    session.info.pop(_PENDING_KEY, None)  # left behind by a flush that failed
+    pending = {
+        "pre_rows": [],
+        "expense_ids": set(),
+        "new_expenses": [],
+        "new_ledger_rows": [],
+        "rebuild": set(),
+        "purge": set(),
+    }
+    pre_expense_ids: Set = set()
+    pre_member_ids: Set = set()
+
+    for obj in session.new:
+        if isinstance(obj, Expense):
+            pending["new_expenses"].append(obj)
+        elif isinstance(obj, (ExpenseSplit, ExpensePayer)):
+            pending["new_ledger_rows"].append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Expense) and _changed(obj, _EXPENSE_ATTRS):
+            pre_expense_ids.add(obj.id)
+        elif isinstance(obj, (ExpenseSplit, ExpensePayer)) and _changed(obj, _LEDGER_ATTRS[type(obj)]):
+            pending["expense_ids"].add(obj.expense_id)
+            pending["expense_ids"].update(sa_inspect(obj).attrs.expense_id.history.deleted or ())
+        elif isinstance(obj, GroupMember) and _changed(obj, ("user_email",)):
+            pre_member_ids.add(obj.id)
+            if obj.user_email:
+                pending["rebuild"].add(obj.user_email)
+    for obj in session.deleted:
+        if isinstance(obj, Expense):
+            pre_expense_ids.add(sa_inspect(obj).identity[0])
+        elif isinstance(obj, (ExpenseSplit, ExpensePayer)):
+            pending["expense_ids"].add(obj.expense_id)
+        elif isinstance(obj, GroupMember):
+            pre_member_ids.add(sa_inspect(obj).identity[0])
+        elif isinstance(obj, User):
+            pending["purge"].add(obj.email)
+
+    if not (pre_expense_ids or pre_member_ids or any(pending.values())):
+        return
+    conn = session.connection()
+    if pre_expense_ids:
+        pending["pre_rows"] = conn.execute(
+            select(Expense.id, Expense.user_email, Expense.group_id, Expense.purchased_at).where(Expense.id.in_(pre_expense_ids))
+        ).all()
+        pending["expense_ids"].update(pre_expense_ids)
+    if pre_member_ids:
+        pending["rebuild"].update(
+            e for (e,) in conn.execute(select(GroupMember.user_email).where(GroupMember.id.in_(pre_member_ids))) if e
+        )
+    session.info[_PENDING_KEY] = pending
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending is not None:
+        unbuilt = SpendRollupService(session)._apply_pending(pending)
+        if unbuilt:
+            session.info.setdefault(_UNBUILT_KEY, set()).update(unbuilt)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_UNBUILT_KEY, None)
+
+
+_installed: Set[sessionmaker] = set()
+
+
+def install(session_factory: sessionmaker) -> None:
+    """Maintains rollups from every session `session_factory` makes. Sessions from
+    other factories (or bare Session()s) are not hooked."""
+    if session_factory in _installed:
+        return
+    _installed.add(session_factory)
+
+    def after_commit(session: Session) -> None:
+        unbuilt = session.info.pop(_UNBUILT_KEY, None)
+        if unbuilt and Settings().SPEND_ROLLUP_BACKGROUND_BUILD:
+            _build_in_background(session_factory, unbuilt)
+
+    event.listen(session_factory, "before_flush", _before_flush)
+    event.listen(session_factory, "after_flush", _after_flush)
+    event.listen(session_factory, "after_commit", after_commit)
+    event.listen(session_factory, "after_rollback", _after_rollback)
+
+
+install(SessionLocal)